@@ -0,0 +1,73 @@
+"""
+Compare fixed nchunk chunking with adaptive chunking (funcs_chunking) on a
+survey whose range setting and speed change between transects: spread of
+per-chunk sonar bytes and along-track length, and the warp_coords memory
+_rectSonRubber would need per chunk (which downscales above 1 GiB).
+
+    python -m pingmapper.benchmarks.bench_chunking --pings 200000 --nchunk 500 --pix-res 0.02
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.funcs_chunking import CHUNK_TARGET_M, CHUNK_TARGET_MB, adaptive_chunk_ids
+
+
+def _survey(n, seed=0):
+    '''Transects alternating short/long range and slow/fast speed.'''
+    rng = np.random.default_rng(seed)
+    transect = np.repeat(np.arange(20), n // 20)
+    samples = np.array([500, 1500, 4000, 2000])[transect % 4]
+    speed = np.array([0.05, 0.2, 0.1, 0.4])[(transect // 2) % 4]  # m per ping
+    pixM = np.full(len(transect), 0.02)
+    step = speed * rng.uniform(0.8, 1.2, len(transect))
+    return pd.DataFrame({'transect': transect, 'ping_cnt': samples, 'pixM': pixM,
+                         'trk_dist': np.cumsum(step)})
+
+
+def _report(name, df, chunk_id, pix_res, bytes_per_sample):
+    g = pd.DataFrame({'chunk_id': chunk_id, 'nbytes': df['ping_cnt'] * bytes_per_sample,
+                      'trk_dist': df['trk_dist'], 'range': df['ping_cnt'] * df['pixM']}).groupby('chunk_id')
+    mb = g['nbytes'].sum() / 2**20
+    length = g['trk_dist'].max() - g['trk_dist'].min()
+    width = 2 * g['range'].max()
+    # Straight track: raster spans the chunk's length by twice the range
+    warp_gb = 16 * (length / pix_res) * (width / pix_res) / 2**30
+    print('{:9s} {:6d} chunks  MB/chunk {:6.2f}-{:6.2f} (cv {:.2f})  m/chunk {:6.1f}-{:6.1f}  '
+          'warp GiB max {:5.2f}, {} chunks > 1 GiB'.format(
+              name, len(mb), mb.min(), mb.max(), mb.std() / mb.mean(), length.min(), length.max(),
+              warp_gb.max(), int((warp_gb > 1).sum())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pings', type=int, default=200000)
+    parser.add_argument('--nchunk', type=int, default=500)
+    parser.add_argument('--target-mb', type=float, default=CHUNK_TARGET_MB)
+    parser.add_argument('--target-m', type=float, default=CHUNK_TARGET_M)
+    parser.add_argument('--pix-res', type=float, default=0.02, help='rectified pixel size (m)')
+    parser.add_argument('--bytes-per-sample', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    df = _survey(args.pings)
+    bps = args.bytes_per_sample
+
+    fixed = np.concatenate([np.arange(len(g)) // args.nchunk for _, g in df.groupby('transect')])
+    fixed += np.repeat(np.cumsum([0] + [-(-len(g) // args.nchunk) for _, g in df.groupby('transect')][:-1]),
+                       df.groupby('transect').size())
+    _report('fixed', df, fixed, args.pix_res, bps)
+
+    t = time.perf_counter()
+    adaptive = adaptive_chunk_ids(df['transect'], df['ping_cnt'] * bps, df['trk_dist'],
+                                  target_bytes=args.target_mb * 2**20, target_dist=args.target_m,
+                                  min_pings=args.nchunk // 4, max_pings=args.nchunk * 4)
+    elapsed = time.perf_counter() - t
+    _report('adaptive', df, adaptive, args.pix_res, bps)
+    print('adaptive assignment of {} pings: {:.3f} s'.format(len(df), elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark sonogram CLAHE: skimage's float64 equalize_adapthist vs the
+OpenCV uint16 engine (funcs_clahe), on chunk-sized sonograms.
+
+    python -m pingmapper.benchmarks.bench_clahe --samples 4000 --pings 500 --chunks 10
+"""
+
+import argparse
+
+import numpy as np
+
+from pingmapper.benchmarks.common import best_time, make_sonogram
+from pingmapper.funcs_clahe import CLAHE_LEVELS, clahe, clahe_lut, to_clahe_levels
+
+
+def _seam(chunks):
+    """
+    Step in ping-mean intensity across chunk boundaries, relative to the
+    median step between neighbouring pings inside chunks (1 = no seam).
+    """
+    step = np.abs(np.diff(np.concatenate(chunks, axis=1).mean(axis=0)))
+    edges = np.cumsum([c.shape[1] for c in chunks[:-1]]) - 1
+    return step[edges].mean() / np.median(np.delete(step, edges))
+
+
+def main(argv=None):
+    from skimage import exposure
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=4000)
+    parser.add_argument('--pings', type=int, default=500, help='pings per chunk')
+    parser.add_argument('--chunks', type=int, default=10)
+    parser.add_argument('--clip-limit', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    whole = make_sonogram(args.samples, args.pings * args.chunks)
+    # Along-track gain changes make seams between chunks visible
+    gain = 0.75 + 0.6 * np.sin(np.arange(whole.shape[1]) / (1.4 * args.pings))
+    whole = np.clip(whole * gain[None, :].astype(np.float32), 0, 1)
+    chunks = np.split(whole, args.chunks, axis=1)
+    print('{} chunks of {} samples x {} pings'.format(args.chunks, args.samples, args.pings))
+
+    hist = np.bincount((to_clahe_levels(whole) // 257).ravel(), minlength=CLAHE_LEVELS)
+    lut = clahe_lut(hist, args.clip_limit)
+
+    sk = lambda: [exposure.equalize_adapthist(c, clip_limit=args.clip_limit) for c in chunks]
+    cv = lambda: [clahe(c, args.clip_limit) for c in chunks]
+    cv_seam = lambda: [clahe(c, args.clip_limit, seam_lut=lut) for c in chunks]
+
+    ts = best_time(sk, repeat=args.repeat)
+    tc = best_time(cv, repeat=args.repeat)
+    tb = best_time(cv_seam, repeat=args.repeat)
+    print('{:<16s} skimage {:8.3f} s   opencv {:8.3f} s   x{:.1f}'.format('clahe', ts, tc, ts / tc))
+    print('{:<16s} opencv+seam {:8.3f} s'.format('', tb))
+    print('{:<16s} skimage {:8.2f}     opencv {:8.2f}     blended {:8.2f}'.format(
+        'seam step ratio', _seam(sk()), _seam(cv()), _seam(cv_seam())))
+
+
+if __name__ == '__main__':
+    main()
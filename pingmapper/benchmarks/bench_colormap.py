@@ -0,0 +1,62 @@
+"""
+Benchmark colormap application: matplotlib float RGBA arrays vs cached
+colormap lookup tables (funcs_colormap), for an 8-bit sonogram tile and a
+16-bit rectified chunk.  Reports time and peak traced memory.
+
+    python -m pingmapper.benchmarks.bench_colormap --samples 4000 --pings 500 --rect 3000
+"""
+
+import argparse
+
+import numpy as np
+
+from pingmapper.benchmarks.common import best_time, loop_colorize, peak_mb
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_colormap import colormap_palette, level_index_lut
+
+
+def _report(label, old, new, repeat):
+    to = best_time(old, repeat=repeat)
+    tn = best_time(new, repeat=repeat)
+    print('{:<26s} rgba {:7.3f} s {:7.1f} MB   lut {:7.3f} s {:7.1f} MB   x{:.1f}'.format(
+        label, to, peak_mb(old), tn, peak_mb(new), to / tn))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=4000)
+    parser.add_argument('--pings', type=int, default=500)
+    parser.add_argument('--rect', type=int, default=3000, help='rectified chunk size (pixels per side)')
+    parser.add_argument('--cmap', default='copper')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    son = sonObj.__new__(sonObj)
+    rng = np.random.default_rng(0)
+
+    # Sonogram tile, 8 bit
+    tile = rng.integers(0, 256, (args.samples, args.pings)).astype(np.uint8)
+    old = lambda: loop_colorize(son._normalize_for_colormap(tile), tile > 0, args.cmap, 255.0, np.uint8)
+    new = lambda: son._colorize_sonar_array(tile, args.cmap)
+    assert np.array_equal(old(), new())
+    _report('tile {}x{} u8'.format(*tile.shape), old, new, args.repeat)
+
+    # Rectified chunk, 16 bit, pre-normalized
+    rect = np.minimum(rng.gamma(2.0, 6000.0, (args.rect, args.rect)), 65535).astype(np.uint16)
+    norm = lambda: np.clip(rect.astype(np.float32) / 65535.0, 0.0, 1.0)
+    for rgb_uint8, scale_max, dtype in ((True, 255.0, np.uint8), (False, 65535.0, np.uint16)):
+        old = lambda: loop_colorize(norm(), rect > 0, args.cmap, scale_max, dtype)
+        new = lambda: son._colorize_pre_normalized_uint16(rect, args.cmap, rgb_uint8=rgb_uint8)
+        assert np.array_equal(old(), new())
+        _report('rect {0}x{0} -> {1}'.format(args.rect, np.dtype(dtype).name), old, new, args.repeat)
+
+    # Palette index in place of RGB
+    palette = colormap_palette(args.cmap)
+    levels = np.clip(np.arange(65536, dtype=np.float32) / 65535.0, 0.0, 1.0)
+    pal = lambda: level_index_lut(levels, len(palette))[rect]
+    old = lambda: loop_colorize(norm(), rect > 0, args.cmap, 255.0, np.uint8)
+    _report('rect -> palette', old, pal, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark random ping-span access: decoding per-chunk PNG tiles and slicing
+their concatenation (what tile consumers do today) vs reading the span from
+the sonar cube (funcs_cube), compressed and uncompressed.
+
+    python -m pingmapper.benchmarks.bench_cube --samples 2000 --pings 20000 --nchunk 500
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from pingmapper.benchmarks.common import best_time, make_tile
+from pingmapper.funcs_cube import create_cube
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--pings', type=int, default=20000)
+    parser.add_argument('--nchunk', type=int, default=500)
+    parser.add_argument('--span', type=int, default=300, help='pings per random read')
+    parser.add_argument('--reads', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        sonar = make_tile((args.pings, args.samples))  # (ping, sample)
+        n_chunks = -(-args.pings // args.nchunk)
+        for c in range(n_chunks):
+            tile = sonar[c * args.nchunk:(c + 1) * args.nchunk].T
+            cv2.imwrite(os.path.join(tmp, 'wcp_{:05d}.png'.format(c)), tile)
+
+        cubes = {}
+        for level in (1, 0):
+            t = time.perf_counter()
+            cube = create_cube(os.path.join(tmp, 'cube{}.zarr'.format(level)), args.pings, args.samples, 'uint8',
+                               chunk_pings=args.nchunk, level=level)
+            for s, e in cube.chunk_ranges():
+                cube.write(s, sonar[s:e])
+            cubes[level] = cube
+            print('write cube (zlib level {})  {:.2f} s'.format(level, time.perf_counter() - t))
+
+        rng = np.random.default_rng(0)
+        starts = rng.integers(0, args.pings - args.span, args.reads)
+
+        def from_tiles():
+            for s in starts:
+                e = s + args.span
+                tiles = [cv2.imread(os.path.join(tmp, 'wcp_{:05d}.png'.format(c)), cv2.IMREAD_UNCHANGED)
+                         for c in range(s // args.nchunk, -(-e // args.nchunk))]
+                out = np.hstack(tiles)[:, s - (s // args.nchunk) * args.nchunk:][:, :args.span]
+                assert out.shape[1] == args.span
+
+        def from_cube(cube):
+            for s in starts:
+                cube.read(s, s + args.span)
+
+        for s in starts[:3]:
+            assert np.array_equal(cubes[1].read(s, s + args.span), sonar[s:s + args.span])
+
+        tt = best_time(from_tiles, repeat=args.repeat)
+        print('{} reads of {} pings:  tiles {:.3f} s'.format(args.reads, args.span, tt))
+        for level, cube in cubes.items():
+            tc = best_time(from_cube, cube, repeat=args.repeat)
+            print('  cube zlib level {}  {:.3f} s   x{:.1f}'.format(level, tc, tt / tc))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark time-table and DQ-log filtering: per-interval DataFrame masks vs
+the sorted searchsorted engine (funcs_intervals).
+
+The loop reference is timed on the first --loop-intervals intervals and
+extrapolated, since the full loop takes tens of minutes at default sizes.
+
+    python -m pingmapper.benchmarks.bench_intervals --pings 1000000 --intervals 50000
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.common import best_time, loop_interval_mask, make_intervals
+from pingmapper.funcs_intervals import event_lookup, interval_mask, parse_datetimes
+
+
+def _merge_event_lookup(times, event_times, event_keep):
+    """DQ event-state resolution the way _filterDQ did it through DataFrames."""
+    son = pd.DataFrame({'_son_idx': np.arange(len(times)), '_son_ts': times})
+    son = son[son['_son_ts'].notna()]
+    ev = pd.DataFrame({'_dq_ts': event_times, '_dq_keep': event_keep})
+    ev = ev.sort_values('_dq_ts').groupby('_dq_ts', as_index=False)['_dq_keep'].last()
+    idx = np.searchsorted(ev['_dq_ts'].to_numpy(), son['_son_ts'].to_numpy(), side='right') - 1
+    keep = np.zeros(len(son), dtype=bool)
+    keep[idx >= 0] = ev['_dq_keep'].to_numpy()[idx[idx >= 0]]
+    return son.loc[keep, '_son_idx']
+
+
+def _ping_strings(n):
+    t = pd.Timestamp('2024-06-01 08:00:00') + pd.to_timedelta(np.arange(n) * 0.05, unit='s')
+    return pd.Series(t.strftime('%Y-%m-%d')) + ' ' + pd.Series(t.strftime('%H:%M:%S.%f'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pings', type=int, default=1000000)
+    parser.add_argument('--intervals', type=int, default=50000)
+    parser.add_argument('--loop-intervals', type=int, default=50, help='intervals timed for the loop reference')
+    parser.add_argument('--parse-pings', type=int, default=100000, help='ping timestamps parsed in the string test')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    times, starts, ends = make_intervals(args.pings, args.intervals)
+    print('{} pings x {} intervals'.format(args.pings, args.intervals))
+
+    # Time-table clips
+    n = min(args.loop_intervals, args.intervals)
+    assert np.array_equal(interval_mask(times, starts[:n], ends[:n]), loop_interval_mask(times, starts[:n], ends[:n]))
+    tl = best_time(loop_interval_mask, times, starts[:n], ends[:n], repeat=1) * args.intervals / n
+    tv = best_time(interval_mask, times, starts, ends, repeat=args.repeat)
+    print('{:<16s} loop {:10.2f} s (est.)   vectorized {:8.3f} s   x{:.0f}'.format('time_table', tl, tv, tl / tv))
+
+    # DQ event log
+    keep = np.random.default_rng(1).random(args.intervals) < 0.5
+    values, found = event_lookup(times, starts, keep)
+    assert np.array_equal(np.flatnonzero(found & values), _merge_event_lookup(times, starts, keep).to_numpy())
+    tl = best_time(_merge_event_lookup, times, starts, keep, repeat=args.repeat)
+    tv = best_time(event_lookup, times, starts, keep, repeat=args.repeat)
+    print('{:<16s} merge {:9.3f} s          vectorized {:8.3f} s   x{:.1f}'.format('dq_events', tl, tv, tl / tv))
+
+    # Ping date/time strings
+    s = _ping_strings(args.parse_pings)
+    mixed = lambda x: pd.to_datetime(x, errors='coerce', format='mixed')
+    assert parse_datetimes(s).equals(mixed(s))
+    tl = best_time(mixed, s, repeat=1)
+    tv = best_time(parse_datetimes, s, repeat=args.repeat)
+    print('{:<16s} mixed {:9.3f} s          iso8601    {:8.3f} s   x{:.1f}   ({} strings)'.format(
+        'parse_datetimes', tl, tv, tl / tv, args.parse_pings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark substrate label post-processing: per-ping loops vs vectorized
+kernels (funcs_label) on chunk-sized label arrays.
+
+    python -m pingmapper.benchmarks.bench_label_postprocess --rows 3000 --pings 500
+"""
+
+import argparse
+
+import numpy as np
+
+from pingmapper.benchmarks.common import best_time, loop_fill_runs, loop_fill_span
+from pingmapper.funcs_label import bed_mask, fill_zero_runs, fill_zero_span
+
+
+def _make_chunk(rows, pings, seed=0):
+    """Label chunk with a water column, a nadir gap and scattered holes."""
+    rng = np.random.default_rng(seed)
+    label = np.repeat(rng.integers(1, 7, (rows // 50 + 1, pings)), 50, axis=0)[:rows].astype('uint8')
+    bedPick = (rows * 0.1 + 20 * np.sin(np.linspace(0, 6, pings))).astype(int)
+    label[~bed_mask(bedPick, label.shape)] = 0
+    for p in range(pings):
+        d = bedPick[p]
+        label[d:d + rng.integers(0, 15), p] = 0
+        for r in rng.integers(d, rows, 5):
+            label[r:r + rng.integers(1, 20), p] = 0
+    return label, bedPick
+
+
+def _loop_bed_mask(bedPick, shape):
+    mask = np.zeros(shape)
+    for p, s in enumerate(bedPick):
+        mask[s:, p] = 1
+    return mask
+
+
+def _loop_map_substrate(label, bedPick):
+    """Post-classification step of _mapSubstrate() before vectorizing."""
+    label = np.where(bed_mask(bedPick, label.shape) & (label == 8), 0, label)
+    return loop_fill_span(label, bedPick)
+
+
+def _vec_map_substrate(label, bedPick):
+    return fill_zero_span(label, bedPick, clear_value=8)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=3000, help='samples per ping')
+    parser.add_argument('--pings', type=int, default=500, help='pings per chunk (nchunk)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    label, bedPick = _make_chunk(args.rows, args.pings)
+    cases = [
+        ('bed_mask', _loop_bed_mask, bed_mask, (bedPick, label.shape)),
+        ('fill_zero_span', loop_fill_span, fill_zero_span, (label, bedPick)),
+        ('fill_zero_runs', loop_fill_runs, fill_zero_runs, (label, bedPick)),
+        ('map_substrate', _loop_map_substrate, _vec_map_substrate, (label, bedPick)),
+    ]
+
+    print('chunk: {} rows x {} pings'.format(args.rows, args.pings))
+    for name, loop, vec, fargs in cases:
+        assert np.array_equal(np.asarray(loop(*fargs)).astype(bool) if name == 'bed_mask' else loop(*fargs), vec(*fargs))
+        tl = best_time(loop, *fargs, repeat=args.repeat)
+        tv = best_time(vec, *fargs, repeat=args.repeat)
+        print('{:<16s} loop {:8.1f} ms   vectorized {:8.1f} ms   x{:.1f}'.format(name, tl * 1e3, tv * 1e3, tl / tv))
+
+
+if __name__ == '__main__':
+    main()
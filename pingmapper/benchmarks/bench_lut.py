@@ -0,0 +1,62 @@
+"""
+Benchmark the integer intensity pipeline: per-sample float transforms on an
+int64 chunk vs native 8/16-bit chunks with lookup tables (funcs_lut).
+Reports time and peak traced memory for one chunk.
+
+    python -m pingmapper.benchmarks.bench_lut --samples 4000 --pings 500
+"""
+
+import argparse
+
+import numpy as np
+
+from pingmapper.benchmarks.common import array_db_transform, array_to_uint8, best_time, make_samples, peak_mb
+from pingmapper.class_sonObj import sonObj
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=4000)
+    parser.add_argument('--pings', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    shape = (args.samples, args.pings)
+    print('chunk of {} samples x {} pings'.format(*shape))
+
+    son = sonObj.__new__(sonObj)
+    for bits, dtype in ((8, np.uint8), (16, np.uint16)):
+        son.son8bit = bits == 8
+        samples = make_samples(dtype, shape)
+
+        # Decode buffer and reduction to 8 bit
+        def old_decode():
+            sonDat = np.zeros(shape).astype(int)
+            sonDat[:] = samples
+            if bits == 8:
+                return np.clip(sonDat, 0, 255).astype(np.uint8)
+            return array_to_uint8(sonDat)
+
+        def new_decode():
+            sonDat = np.zeros(shape, dtype=dtype)
+            sonDat[:] = samples
+            return son._convert_son_dat_to_uint8(sonDat)
+
+        assert np.array_equal(old_decode(), new_decode())
+        to = best_time(old_decode, repeat=args.repeat)
+        tn = best_time(new_decode, repeat=args.repeat)
+        print('{:<16s} int64 {:7.3f} s {:7.1f} MB   lut {:7.3f} s {:7.1f} MB'.format(
+            'decode u{}'.format(bits), to, peak_mb(old_decode), tn, peak_mb(new_decode)))
+
+        # Display dB transform
+        new_db = lambda: son._apply_display_db_transform(samples, db_transform=True)
+        old_db = lambda: array_db_transform(samples)
+        assert np.array_equal(old_db(), new_db())
+        to = best_time(old_db, repeat=args.repeat)
+        tn = best_time(new_db, repeat=args.repeat)
+        print('{:<16s} float {:7.3f} s {:7.1f} MB   lut {:7.3f} s {:7.1f} MB'.format(
+            'db u{}'.format(bits), to, peak_mb(old_db), tn, peak_mb(new_db)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark QA figure rendering: pyplot bedpick figure vs the headless
+OpenCV/Agg path (funcs_qaplot) on a merged port/star sonogram chunk.
+
+    python -m pingmapper.benchmarks.bench_qaplot --rows 500 --cols 2000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import matplotlib
+matplotlib.use('agg')
+import matplotlib.pyplot as plt
+
+from pingmapper.benchmarks.common import best_time
+import pingmapper.funcs_qaplot as qa
+
+
+def _make_chunk(rows, cols, seed=0):
+    """Merged sonogram (pings x samples) with port/star bedpicks."""
+    rng = np.random.default_rng(seed)
+    son = rng.integers(0, 255, (rows, cols)).astype('uint8')
+    depth = 80 + 20 * np.sin(np.linspace(0, 6, rows))
+    c = cols // 2
+    return son, c - depth, c + depth
+
+
+def _pyplot(son, port, star, outFile):
+    y = np.arange(son.shape[0])
+    plt.imshow(son, cmap='gray')
+    plt.plot(port, y, 'b-.', lw=1, label='Auto Depth')
+    plt.plot(star, y, 'b-.', lw=1)
+    plt.legend(loc='lower right', prop={'size': 4})
+    plt.savefig(outFile, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def _headless(son, port, star, outFile):
+    img = qa.gray_image(son)
+    qa.draw_trace(img, port, 'blue')
+    qa.draw_trace(img, star, 'blue')
+    legend = qa.legend_image(('Auto Depth',), ('blue',), styles=('-.',), fontsize=4)
+    qa.save_image(outFile, qa.paste(img, legend))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500, help='pings per chunk (nchunk)')
+    parser.add_argument('--cols', type=int, default=2000, help='port + star samples')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    son, port, star = _make_chunk(args.rows, args.cols)
+    tmp = tempfile.mkdtemp()
+    try:
+        tp = best_time(_pyplot, son, port, star, os.path.join(tmp, 'pyplot.jpg'), repeat=args.repeat)
+        th = best_time(_headless, son, port, star, os.path.join(tmp, 'headless.jpg'), repeat=args.repeat)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print('chunk: {} pings x {} samples'.format(args.rows, args.cols))
+    print('{:<16s} pyplot {:8.1f} ms   headless {:8.1f} ms   x{:.1f}'.format('bedpick', tp * 1e3, th * 1e3, tp / th))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark random ping-range reads through sonObj._getScanSlice(): parsing the
+metadata csv for every read (what the chunk loader did) vs selecting rows
+from the binary ping index, with pings decoded from the son file or read
+from the sonar cube.
+
+    python -m pingmapper.benchmarks.bench_scan_slice --pings 20000 --samples 1000 --span 300
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.common import best_time
+from pingmapper.benchmarks.synthetic import HUM_PING_DTYPE, write_humminbird
+from pingmapper.class_sonObj import sonObj
+
+
+def _make_son(tmp, n, samples, extra_cols=30):
+    write_humminbird(tmp, n_pings=n, n_beams=2, samples=samples)
+    rec_size = HUM_PING_DTYPE.itemsize + samples
+    rng = np.random.default_rng(0)
+    meta = pd.DataFrame({
+        'record_num': np.arange(n),
+        'index': np.arange(n) * rec_size,
+        'son_offset': HUM_PING_DTYPE.itemsize,
+        'ping_cnt': samples,
+        'transect': 0,
+        'chunk_id': np.arange(n) // 500,
+        'dep_m': rng.uniform(1, 3, n),
+        'pixM': 0.02,
+        'date': '2025-01-01',
+    })
+    # Typical metadata csvs carry many more columns than a read needs
+    for c in range(extra_cols):
+        meta['col{}'.format(c)] = rng.random(n)
+    metaFile = os.path.join(tmp, 'B002_ss_port_meta.csv')
+    meta.to_csv(metaFile, index=False)
+
+    son = sonObj.__new__(sonObj)
+    son.sonFile = os.path.join(tmp, 'R00001', 'B002.SON')
+    son.sonMetaFile = metaFile
+    son.projDir = tmp
+    son.beamName = 'ss_port'
+    son.son8bit = True
+    son.flip_port = False
+    son.nchunk = 500
+    son.egn = False
+    return son
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pings', type=int, default=20000)
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--span', type=int, default=300, help='pings per random read')
+    parser.add_argument('--reads', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        son = _make_son(tmp, args.pings, args.samples)
+        rng = np.random.default_rng(1)
+        starts = rng.integers(0, args.pings - args.span, args.reads)
+
+        def csv_reads():
+            for s in starts:
+                sonMetaAll = pd.read_csv(son.sonMetaFile)
+                sonMeta = son._sanitize_chunk_sonmeta(sonMetaAll.iloc[s:s + args.span].reset_index())
+                son._setPingReads(sonMeta)
+                son._loadSonChunk()
+                son._clearPingReads()
+
+        def slice_reads():
+            for s in starts:
+                son._getScanSlice(0, s, s + args.span)
+
+        t = best_time(csv_reads, repeat=args.repeat)
+        print('{} reads of {} pings:  csv + son file    {:.3f} s'.format(args.reads, args.span, t))
+        ts = best_time(slice_reads, repeat=args.repeat)
+        print('{} reads of {} pings:  index + son file  {:.3f} s  (x{:.1f})'.format(args.reads, args.span, ts, t / ts))
+
+        son._exportCube()
+        tc = best_time(slice_reads, repeat=args.repeat)
+        print('{} reads of {} pings:  index + cube      {:.3f} s  (x{:.1f})'.format(args.reads, args.span, tc, t / tc))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark import (startup) time of PINGMapper entry points.
+
+Each entry module is imported in a fresh interpreter; the best wall time is
+reported along with the heavy libraries the import pulled in.  Libraries
+that a stage does not use should not appear for the reader (doWork /
+main_readFiles) entry points.
+
+    python -m pingmapper.benchmarks.bench_startup --repeat 3 --top 10
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+ENTRY_POINTS = (
+    'pingmapper.doWork',
+    'pingmapper.main_readFiles',
+    'pingmapper.main_rectify',
+    'pingmapper.main_mapSubstrate',
+)
+
+HEAVY = (
+    'tensorflow', 'transformers', 'doodleverse_utils', 'osgeo.gdal',
+    'geopandas', 'matplotlib.pyplot', 'matplotlib.figure', 'scipy.signal',
+    'scipy.stats', 'skimage.io', 'skimage.morphology', 'skimage.transform',
+)
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t
+print(json.dumps({{'seconds': dt, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _probe(module):
+    out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError('import {} failed:\n{}'.format(module, out.stderr.strip().splitlines()[-1]))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _importtime(module, top):
+    """Slowest `top` modules (cumulative) from python -X importtime."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                         capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=0, help='show the slowest imports per entry point')
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        try:
+            runs = [_probe(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print('{:<32s} {}'.format(module, e))
+            continue
+        best = min(r['seconds'] for r in runs)
+        print('{:<32s} {:6.2f} s   heavy: {}'.format(module, best, ', '.join(runs[-1]['heavy']) or '-'))
+        for us, name in _importtime(module, args.top):
+            print('    {:8.1f} ms  {}'.format(us / 1000.0, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark tile export: per-codec encode throughput, and a chunk loop that
+computes a product then writes it, either inline with skimage.io.imsave (the
+previous path) or through the background TileWriter.
+
+    python -m pingmapper.benchmarks.bench_tilewriter --samples 4000 --pings 500 --chunks 16
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import rasterio
+from scipy import ndimage
+from skimage.io import imsave
+
+from pingmapper.benchmarks.common import make_tile
+from pingmapper.funcs_tilewriter import TileWriter, format_stats, geotiff_options, write_image
+
+
+def _compute(tile):
+    """Stand-in for a chunk's processing (speed correction, enhancement)."""
+    return ndimage.uniform_filter(tile, 5)
+
+
+def _rasterio_writer(codec, level):
+    def write(f, data):
+        with rasterio.open(f, 'w', driver='GTiff', height=data.shape[0], width=data.shape[1], count=1,
+                           dtype=data.dtype, crs='EPSG:32616', transform=rasterio.Affine(0.5, 0, 0, 0, -0.5, 0),
+                           **geotiff_options(codec, level, dtype=data.dtype)) as dst:
+            dst.write(data, 1)
+        return os.path.getsize(f)
+    return write
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=4000)
+    parser.add_argument('--pings', type=int, default=500)
+    parser.add_argument('--chunks', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    shape = (args.samples, args.pings)
+    tile = make_tile(shape)
+    mb = tile.nbytes / 2 ** 20
+    tmp = tempfile.mkdtemp()
+    print('tile of {} samples x {} pings ({:.1f} MB)'.format(*shape, mb))
+
+    try:
+        codecs = [
+            ('png skimage', lambda f, d: (imsave(f, d, check_contrast=False), os.path.getsize(f))[1], '.png'),
+            ('png level 6', lambda f, d: write_image(f, d, png_level=6), '.png'),
+            ('png level 1', lambda f, d: write_image(f, d, png_level=1), '.png'),
+            ('jpeg skimage', lambda f, d: (imsave(f, d, check_contrast=False), os.path.getsize(f))[1], '.jpg'),
+            ('jpeg q75', lambda f, d: write_image(f, d, jpeg_quality=75), '.jpg'),
+            ('geotiff deflate 9', _rasterio_writer('deflate', 9), '.tif'),
+            ('geotiff deflate 6', _rasterio_writer('deflate', 6), '.tif'),
+            ('geotiff zstd 9', _rasterio_writer('zstd', 9), '.tif'),
+            ('geotiff lerc_zstd', _rasterio_writer('lerc_zstd', 9), '.tif'),
+        ]
+        for label, fn, ext in codecs:
+            f = os.path.join(tmp, 'tile' + ext)
+            t = time.perf_counter()
+            nbytes = fn(f, tile)
+            dt = time.perf_counter() - t
+            print('{:<20s} {:7.3f} s {:7.1f} MB/s  {:6.2f} MB on disk'.format(label, dt, mb / dt, nbytes / 2 ** 20))
+
+        # Chunk loop: compute then write, inline vs background
+        def inline():
+            for k in range(args.chunks):
+                imsave(os.path.join(tmp, 'a{}.png'.format(k)), _compute(tile), check_contrast=False)
+
+        def pooled():
+            with TileWriter(threads=args.threads) as writer:
+                for k in range(args.chunks):
+                    writer.write(os.path.join(tmp, 'b{}.png'.format(k)), _compute(tile))
+                return writer.flush()
+
+        t = time.perf_counter()
+        inline()
+        ti = time.perf_counter() - t
+        t = time.perf_counter()
+        stats = pooled()
+        tp = time.perf_counter() - t
+        print('{} chunks: inline {:.2f} s   writer pool {:.2f} s   x{:.1f}'.format(args.chunks, ti, tp, ti / tp))
+        print(format_stats(stats))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Shared pieces of the micro-benchmarks: a best-of-N timer, peak allocation
+measurement, synthetic inputs, and the reference (pre-vectorization)
+implementations the kernels are timed against.  The unit tests use the same
+inputs and references to check the kernels reproduce the old results.
+'''
+
+#########
+# Imports
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage
+
+
+# =========================================================
+# Measurement
+# =========================================================
+
+def best_time(fn, *args, repeat=3):
+    '''Best wall time (s) of `repeat` calls of fn(*args).'''
+    best = np.inf
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def peak_mb(fn, *args):
+    '''Peak Python allocation (MB) during fn(*args).'''
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+# =========================================================
+# Synthetic inputs
+# =========================================================
+
+def make_sonogram(h=600, w=400, seed=0):
+    '''Speckled returns fading with range, over a dark water column.'''
+    rng = np.random.default_rng(seed)
+    arr = rng.gamma(2.0, 0.1, (h, w)) * np.linspace(1.0, 0.3, h)[:, None]
+    arr[:40] = 0
+    return np.clip(arr, 0, 1).astype(np.float32)
+
+
+def make_samples(dtype, shape=(300, 80), seed=0):
+    '''Integer samples spanning the dtype's range, zero in the first rows.'''
+    rng = np.random.default_rng(seed)
+    top = np.iinfo(dtype).max
+    arr = np.minimum(rng.gamma(2.0, top / 12, shape), top).astype(dtype)
+    arr[:20] = 0
+    return arr
+
+
+def make_tile(shape, seed=0):
+    '''Speckled, smoothly varying sonogram-like uint8 tile.'''
+    rng = np.random.default_rng(seed)
+    base = ndimage.gaussian_filter(rng.random(shape), 8)
+    base = (base - base.min()) / np.ptp(base)
+    return (base * rng.gamma(2.0, 0.5, shape) * 120).clip(0, 255).astype(np.uint8)
+
+
+def make_intervals(n_pings, n_intervals, seed=0):
+    '''Ping times with NaNs plus overlapping, reversed and zero-length clips.'''
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0, 1000, n_pings))
+    times[rng.choice(n_pings, n_pings // 50, replace=False)] = np.nan
+    starts = rng.uniform(0, 1000, n_intervals)
+    ends = starts + rng.exponential(5, n_intervals)
+    flip = rng.random(n_intervals) < 0.2
+    starts[flip], ends[flip] = ends[flip], starts[flip].copy()
+    ends[:3] = starts[:3]
+    starts[3:6] = times[[10, 20, 30]]  # intervals starting exactly on a ping
+    ends[6:9] = times[[40, 50, 60]]  # and ending exactly on one
+    return times, starts, ends
+
+
+# =========================================================
+# Reference implementations
+# =========================================================
+
+def loop_interval_mask(times, starts, ends):
+    '''Mask built the way _filterTime used to, one interval at a time.'''
+    times = pd.Series(times)
+    mask = pd.Series(False, index=times.index)
+    for start, end in zip(starts, ends):
+        if end < start:
+            start, end = end, start
+        mask[(times >= start) & (times <= end)] = True
+    return mask.to_numpy()
+
+
+def loop_colorize(norm_data, valid_mask, cmap_name, scale_max, out_dtype):
+    '''Colorization the way _colorize_array_batched built it from RGBA floats.'''
+    import matplotlib.pyplot as plt
+
+    colored = plt.get_cmap(cmap_name)(norm_data)
+    rgb = np.clip(colored[:, :, :3] * scale_max, 0, scale_max).astype(out_dtype)
+    rgb[valid_mask] = np.maximum(rgb[valid_mask], 1)
+    return rgb
+
+
+def array_db_transform(sonDat):
+    '''dB transform the way _apply_display_db_transform did it per sample.'''
+    arr = np.asarray(sonDat, dtype=np.float32)
+    valid = arr > 0
+    if not np.any(valid):
+        return arr
+    floor = float(np.nanmin(arr[valid]))
+    arr = np.maximum(arr, floor)
+    arr = 20.0 * np.log10(arr)
+    arr = arr - np.nanmin(arr)
+    arr[~valid] = 0.0
+    return arr
+
+
+def array_to_uint8(sonDat):
+    '''16- to 8-bit reduction the way _convert_son_dat_to_uint8 did it.'''
+    dat = np.clip(sonDat, 0, 65535).astype(np.uint16)
+    nz = dat[dat > 0]
+    if nz.size == 0:
+        return np.zeros(dat.shape, dtype=np.uint8)
+    if np.mean((nz & 0x00FF) == 0) > 0.95:
+        if int(nz.max()) <= 4095:
+            return (dat >> 4).astype(np.uint8)
+        return (dat >> 8).astype(np.uint8)
+    return dat.astype(np.uint8)
+
+
+def loop_fill_span(label, bedPick):
+    '''Per-ping loop previously in portstarObj._mapSubstrate().'''
+    label = label.copy()
+    for p in range(label.shape[1]):
+        d = int(bedPick[p])
+        ping_below = label[d:, p]
+        zero_idx = np.where(ping_below == 0)[0]
+        if len(zero_idx) == 0:
+            continue
+        f, l = int(zero_idx[0]), int(zero_idx[-1])
+        if d + l + 1 < label.shape[0]:
+            label[d + f : d + l + 1, p] = ping_below[l + 1]
+    return label
+
+
+def loop_fill_runs(objects_filled, bedPick):
+    '''Per-ping loop previously in mapSubObj._filterLabel().'''
+    objects_filled = objects_filled.copy()
+    for p in range(objects_filled.shape[1]):
+        d = bedPick[p]
+        ping = objects_filled[:, p]
+        wc = ping[:d]
+        ping = ping[d:]
+        zero = np.where(ping == 0)[0]
+        if len(zero) > 0:
+            zero = np.split(zero, np.where(np.diff(zero) != 1)[0] + 1)
+            for z in zero:
+                f, l = z[0], z[-1]
+                if len(z) < ping.shape[0] and len(z) > 1:
+                    if f == 0:
+                        c = ping[l + 1]
+                    else:
+                        c = ping[f - 1]
+                    ping[f:l + 1] = c
+                elif len(z) == 1:
+                    f = z[0]
+                    try:
+                        c = ping[f + 1]
+                    except IndexError:
+                        c = ping[f - 1]
+                    ping[f] = c
+                else:
+                    break
+            ping = list(wc) + list(ping)
+            objects_filled[:, p] = ping
+    return objects_filled
@@ -0,0 +1,386 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Offline end-to-end benchmark suite.
+
+Generates a synthetic Humminbird or JSF recording (see synthetic.py), runs it
+through doWork() under cProfile and records per-stage inclusive times as one
+JSON line per run, keyed by git commit, so runs can be compared across
+commits:
+
+    python -m pingmapper.benchmarks.suite run --format hum --pings 20000 --beams 4
+    python -m pingmapper.benchmarks.suite run --format jsf --pings 20000
+    python -m pingmapper.benchmarks.suite compare --threshold 0.1
+
+Stage times are cumulative cProfile times of the functions listed in STAGES,
+so they are only complete when work stays in-process (threadCnt=1, the
+default here); with more threads only the phase totals and wall time are
+meaningful.  Substrate prediction needs the segmentation models, so only the
+label post-processing kernels are timed, on synthetic labels.
+'''
+
+import argparse
+import cProfile
+import datetime
+import json
+import os
+import platform
+import pstats
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from pingmapper.benchmarks.synthetic import write_recording
+
+SCHEMA = 1
+
+# Stage name -> functions whose inclusive time makes up the stage
+STAGES = {
+    'ingest': ('hum2pingmapper', 'jsf2pingmapper'),
+    'load_son_chunk': ('_loadSonChunk',),
+    'egn': ('_egnCalcChunkMeans', '_egnCalcMinMax', '_egnCalcHist', '_egn_wcp'),
+    'wcr_src': ('_WCR_SRC',),
+    'tiles': ('_writeTiles',),
+    'rect_rubber': ('_rectSonRubber',),
+    'mosaic': ('_createMosaic',),
+    'read_total': ('read_master_func',),
+    'rectify_total': ('rectify_master_func',),
+    'map_total': ('map_master_func',),
+}
+
+# Pipeline parameters (same keys as nonGui_main.py); override with --param
+DEFAULT_PARAMS = {
+    'project_mode': 1,
+    'threadCnt': 1,
+    'tempC': 10.0,
+    'nchunk': 500,
+    'cropRange': 0,
+    'exportUnknown': False,
+    'fixNoDat': False,
+    'aoi': False,
+    'max_heading_deviation': 0,
+    'max_heading_distance': 0,
+    'min_speed': 0,
+    'max_speed': 0,
+    'time_table': False,
+    'pix_res_son': 0.1,
+    'pix_res_map': 0,
+    'x_offset': 0.0,
+    'y_offset': 0.0,
+    'egn': True,
+    'egn_stretch': 1,
+    'egn_stretch_factor': 0.5,
+    'wcp': True,
+    'wcm': False,
+    'wcr': True,
+    'wco': False,
+    'sonogram_colorMap': 'Greys_r',
+    'mask_shdw': False,
+    'tileFile': '.png',
+    'spdCor': False,
+    'maxCrop': False,
+    'remShadow': 0,
+    'detectDep': 0,
+    'smthDep': False,
+    'adjDep': 0.0,
+    'pltBedPick': False,
+    'rect_wcp': True,
+    'rect_wcr': False,
+    'rubberSheeting': True,
+    'rectMethod': 'Heading',
+    'rectInterpDist': 50,
+    'son_colorMap': 'Greys',
+    'mosaic_nchunk': 0,
+    'pred_sub': False,
+    'pltSubClass': False,
+    'map_sub': False,
+    'export_poly': False,
+    'map_class_method': 'max',
+    'map_predict': 0,
+    'mosaic': 1,
+    'map_mosaic': 0,
+    'banklines': False,
+    'coverage': False,
+}
+
+
+# =========================================================
+def _git(*args):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        return subprocess.check_output(('git',) + args, cwd=root, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _revision():
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'subject': _git('log', '-1', '--format=%s'),
+        'dirty': bool(status) if status is not None else None,
+    }
+
+
+def stage_times(stats, stages=STAGES):
+    '''
+    Sum inclusive (cumulative) time and call counts per stage.
+
+    `stats` is a pstats.Stats; only functions defined in pingmapper or
+    pingverter are matched, so unrelated functions sharing a name are ignored.
+    '''
+    out = {k: {'seconds': 0.0, 'calls': 0} for k in stages}
+    for (filename, _, funcname), (_, nc, _, ct, _) in stats.stats.items():
+        if 'pingmapper' not in filename and 'pingverter' not in filename:
+            continue
+        for stage, funcs in stages.items():
+            if funcname in funcs:
+                out[stage]['seconds'] += ct
+                out[stage]['calls'] += nc
+    for v in out.values():
+        v['seconds'] = round(v['seconds'], 4)
+    return out
+
+
+def _substrate_post(samples, nchunk, n_chunks, seed=0, repeat=3):
+    '''Best-of-`repeat` time of the label post-processing used by _mapSubstrate().'''
+    from pingmapper.funcs_label import fill_zero_runs, fill_zero_span
+
+    rng = np.random.default_rng(seed)
+    label = np.kron(rng.integers(0, 9, (samples // 20 + 1, nchunk // 20 + 1)),
+                    np.ones((20, 20), dtype='uint8'))[:samples, :nchunk]
+    label[rng.random(label.shape) < 0.05] = 0
+    bedPick = rng.integers(samples // 20, samples // 5, nchunk)
+
+    best = np.inf
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(n_chunks):
+            fill_zero_span(label, bedPick, clear_value=8)
+            fill_zero_runs(label, bedPick)
+        best = min(best, time.perf_counter() - t)
+    return {'seconds': round(best, 4), 'calls': n_chunks}
+
+
+def run(fmt='hum', pings=5000, beams=2, samples=1500, work_dir='pingmapper_bench',
+        results=None, params=None, label='', keep=False, seed=0):
+    '''
+    Generate a recording, process it and append the timings to `results`.
+
+    -------
+    Returns
+    -------
+    the result record (dict)
+    '''
+    from pingmapper.doWork import doWork
+
+    run_params = dict(DEFAULT_PARAMS)
+    run_params.update(params or {})
+    results = results or os.path.join(work_dir, 'results.jsonl')
+
+    recDir = os.path.join(work_dir, 'recordings')
+    name = 'B{}_{}_{}x{}'.format(fmt, beams if fmt == 'hum' else 2, pings, samples)
+    inFile = os.path.join(recDir, name + ('.DAT' if fmt == 'hum' else '.jsf'))
+
+    t = time.perf_counter()
+    if not os.path.exists(inFile):
+        write_recording(fmt, recDir, name=name, n_pings=pings, n_beams=beams,
+                        samples=samples, seed=seed)
+    gen_s = time.perf_counter() - t
+
+    outDir = os.path.join(work_dir, 'projects')
+    prof = cProfile.Profile()
+    t = time.perf_counter()
+    prof.enable()
+    try:
+        res = doWork(in_file=inFile, out_dir=outDir, proj_name=name, params=run_params)
+    finally:
+        prof.disable()
+    wall_s = time.perf_counter() - t
+
+    stages = stage_times(pstats.Stats(prof))
+    n_chunks = max(1, int(np.ceil(pings / float(run_params['nchunk']))))
+    stages['substrate_post'] = _substrate_post(samples, int(run_params['nchunk']), n_chunks, seed=seed)
+
+    record = {
+        'schema': SCHEMA,
+        'label': label,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {'format': fmt, 'pings': pings, 'beams': beams,
+                   'samples': samples, 'params': run_params},
+        'ok': bool(res and res[0].get('success')),
+        'generate_s': round(gen_s, 4),
+        'wall_s': round(wall_s, 4),
+        'stages': stages,
+    }
+    record.update(_revision())
+
+    os.makedirs(os.path.dirname(os.path.abspath(results)), exist_ok=True)
+    with open(results, 'a') as f:
+        f.write(json.dumps(record, sort_keys=True) + '\n')
+
+    if not keep:
+        shutil.rmtree(os.path.join(outDir, name), ignore_errors=True)
+
+    return record
+
+
+# =========================================================
+def load_results(results):
+    with open(results) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _config_key(record):
+    return json.dumps(record['config'], sort_keys=True)
+
+
+def _pick(records, rev):
+    '''Latest record for commit prefix `rev`.'''
+    hits = [r for r in records if r.get('commit') and r['commit'].startswith(rev)]
+    if not hits:
+        raise ValueError('No benchmark results for revision {}'.format(rev))
+    return hits[-1]
+
+
+def compare(records, base=None, head=None, threshold=0.1, min_seconds=0.05):
+    '''
+    Compare per-stage times of two runs with the same configuration.
+
+    Defaults to the latest run (head) against the previous run with the same
+    configuration (base).  A stage regresses when it is slower by more than
+    `threshold` (fraction) and by more than `min_seconds`.
+
+    -------
+    Returns
+    -------
+    (base, head, rows) with rows of (stage, base_s, head_s, ratio, regressed)
+    '''
+    head = _pick(records, head) if head else records[-1]
+    if base:
+        base = _pick(records, base)
+    else:
+        same = [r for r in records if r is not head and _config_key(r) == _config_key(head)]
+        if not same:
+            raise ValueError('No earlier run with the same configuration to compare against')
+        base = same[-1]
+
+    rows = []
+    for stage in head['stages']:
+        if stage not in base['stages']:
+            continue
+        b = base['stages'][stage]['seconds']
+        h = head['stages'][stage]['seconds']
+        ratio = h / b if b > 0 else (np.inf if h > 0 else 1.0)
+        regressed = (h - b) > max(threshold * b, min_seconds)
+        rows.append((stage, b, h, ratio, regressed))
+    return base, head, rows
+
+
+def _print_record(record):
+    print('{} {} ok={} wall {:.2f} s'.format(
+        (record.get('commit') or 'unknown')[:10], record.get('label', ''),
+        record['ok'], record['wall_s']))
+    for stage, v in record['stages'].items():
+        print('  {:<16s} {:9.3f} s  {:6d} calls'.format(stage, v['seconds'], v['calls']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('generate', help='write a synthetic recording')
+    p.add_argument('out_dir')
+    p.add_argument('--format', choices=('hum', 'jsf'), default='hum')
+    p.add_argument('--name', default='R00001')
+    p.add_argument('--pings', type=int, default=5000)
+    p.add_argument('--beams', type=int, default=2, help='Humminbird beams (2-5)')
+    p.add_argument('--samples', type=int, default=1500, help='side-scan samples per ping')
+    p.add_argument('--seed', type=int, default=0)
+
+    p = sub.add_parser('run', help='process a synthetic recording and record timings')
+    p.add_argument('--format', choices=('hum', 'jsf'), default='hum')
+    p.add_argument('--pings', type=int, default=5000)
+    p.add_argument('--beams', type=int, default=2, help='Humminbird beams (2-5)')
+    p.add_argument('--samples', type=int, default=1500, help='side-scan samples per ping')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--work-dir', default='pingmapper_bench')
+    p.add_argument('--results', default=None, help='JSON lines file [<work-dir>/results.jsonl]')
+    p.add_argument('--param', action='append', default=[], metavar='KEY=VALUE',
+                   help='override a pipeline parameter (VALUE parsed as JSON)')
+    p.add_argument('--label', default='')
+    p.add_argument('--keep', action='store_true', help='keep the project outputs')
+
+    p = sub.add_parser('compare', help='compare two recorded runs')
+    p.add_argument('--results', default=os.path.join('pingmapper_bench', 'results.jsonl'))
+    p.add_argument('--base', default=None, help='commit (prefix) [previous run]')
+    p.add_argument('--head', default=None, help='commit (prefix) [latest run]')
+    p.add_argument('--threshold', type=float, default=0.1)
+    p.add_argument('--min-seconds', type=float, default=0.05)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'generate':
+        print(write_recording(args.format, args.out_dir, name=args.name, n_pings=args.pings,
+                              n_beams=args.beams, samples=args.samples, seed=args.seed))
+        return 0
+
+    if args.cmd == 'run':
+        params = {}
+        for kv in args.param:
+            k, v = kv.split('=', 1)
+            try:
+                params[k] = json.loads(v)
+            except ValueError:
+                params[k] = v
+        record = run(args.format, args.pings, args.beams, args.samples, args.work_dir,
+                     args.results, params, args.label, args.keep, args.seed)
+        _print_record(record)
+        return 0 if record['ok'] else 1
+
+    base, head, rows = compare(load_results(args.results), args.base, args.head,
+                               args.threshold, args.min_seconds)
+    print('base {}  head {}'.format((base.get('commit') or '?')[:10], (head.get('commit') or '?')[:10]))
+    for stage, b, h, ratio, regressed in rows:
+        print('  {:<16s} {:9.3f} s -> {:9.3f} s  x{:5.2f} {}'.format(stage, b, h, ratio, 'REGRESSED' if regressed else ''))
+    return 1 if any(r[-1] for r in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Synthetic sonar recordings for offline benchmarks.
+
+Writes Humminbird-style `.DAT` + `<name>/B00?.SON` recordings (Helix layout:
+64-byte DAT, 67-byte big-endian ping headers, uint8 returns) and Edgetech
+JSF recordings (message type 80, uint16 envelope samples) that PINGVerter
+decodes like real files.  Pings are generated block-wise from a simple
+seabed model (water column noise, bottom return, textured decaying
+backscatter and speckle), so recordings of any length stay cheap to make.
+'''
+
+import os
+import struct
+
+import numpy as np
+
+# Humminbird beam files -> beam number, in the order beams are added
+HUM_BEAMS = (('B002', 2), ('B003', 3), ('B001', 1), ('B000', 0), ('B004', 4))
+
+HUM_HEAD_START = 3235818273
+HUM_HEAD_END = 33
+
+# 67-byte Helix ping header (see PINGVerter humminbird._getHeadStruct)
+HUM_PING_DTYPE = np.dtype([
+    ('head_start', '>u4'), ('SP128', '>u1'), ('record_num', '>u4'),
+    ('SP129', '>u1'), ('time_s', '>u4'), ('SP130', '>u1'), ('utm_e', '>i4'),
+    ('SP131', '>u1'), ('utm_n', '>i4'), ('SP132', '>u1'), ('gps1', '>u2'),
+    ('instr_heading', '>u2'), ('SP133', '>u1'), ('gps2', '>u2'),
+    ('speed_ms', '>u2'), ('SP135', '>u1'), ('inst_dep_m', '>u4'),
+    ('SP80', '>u1'), ('beam', '>u1'), ('SP81', '>u1'), ('volt_scale', '>u1'),
+    ('SP146', '>u1'), ('f', '>u4'), ('SP83', '>u1'), ('unknown_83', '>u1'),
+    ('SP84', '>u1'), ('unknown_84', '>u1'), ('SP149', '>u1'),
+    ('unknown_149', '>u4'), ('SP86', '>u1'), ('e_err_m', '>u1'),
+    ('SP87', '>u1'), ('n_err_m', '>u1'), ('SP160', '>u1'), ('ping_cnt', '>u4'),
+    ('head_end', '>u1'),
+])
+
+# Humminbird positions are World Mercator on the International 1924 spheroid
+_HUM_R = 6378388.0
+_HUM_K = 1.0067642927
+
+JSF_MARKER = 0x1601
+JSF_MSG80_SIZE = 240
+JSF_SUBSYSTEM = 20  # low-frequency side scan
+
+
+# =========================================================
+def trackline(n_pings, ping_rate=10.0, speed_ms=1.5, heading=45.0,
+              lat=30.5, lon=-88.0, depth=(3.0, 8.0), seed=0):
+    '''
+    Gently meandering survey line.
+
+    -------
+    Returns
+    -------
+    dict of per-ping arrays: time_s, lat, lon, heading (deg), speed_ms,
+    depth_m.
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_pings) / float(ping_rate)
+    hdg = heading + 15.0 * np.sin(2 * np.pi * t / 600.0)
+    step = speed_ms / float(ping_rate)
+
+    rad = np.deg2rad(hdg)
+    north = np.cumsum(step * np.cos(rad))
+    east = np.cumsum(step * np.sin(rad))
+    lat_p = lat + np.rad2deg(north / 6371000.0)
+    lon_p = lon + np.rad2deg(east / (6371000.0 * np.cos(np.deg2rad(lat))))
+
+    lo, hi = depth
+    dep = lo + (hi - lo) * (0.5 + 0.5 * np.sin(2 * np.pi * t / 300.0))
+    dep += rng.normal(0, 0.02, n_pings)
+
+    return {'time_s': t, 'lat': lat_p, 'lon': lon_p, 'heading': hdg % 360,
+            'speed_ms': np.full(n_pings, float(speed_ms)), 'depth_m': dep}
+
+
+def returns(depth_px, samples, seed=0, first_ping=0):
+    '''
+    Sonar returns (float32 in [0, 1]) for a block of pings.
+
+    `depth_px` is the bottom range (samples) per ping.  Seabed texture is a
+    function of ping number, so blocks generated separately join seamlessly.
+    '''
+    rng = np.random.default_rng((seed, first_ping))
+    n = len(depth_px)
+    r = np.arange(samples, dtype='float32')[np.newaxis, :]
+    d = np.asarray(depth_px, dtype='float32')[:, np.newaxis]
+    p = (first_ping + np.arange(n, dtype='float32'))[:, np.newaxis]
+
+    # Patchy seabed: along-track and across-track banding
+    texture = 0.55 + 0.25 * np.sin(p / 37.0) * np.cos(r / 53.0) + 0.15 * np.sin((p + r) / 11.0)
+    beyond = np.clip(r - d, 0, None)
+    bed = texture * np.exp(-beyond / (0.6 * samples)) * (r >= d)
+    bed += 0.9 * np.exp(-((r - d) ** 2) / 8.0)  # first bottom return
+
+    speckle = rng.rayleigh(0.8, (n, samples)).astype('float32')
+    water = 0.04 * rng.random((n, samples), dtype='float32')
+    return np.clip(bed * speckle + water, 0, 1)
+
+
+# =========================================================
+def _hum_mercator(lat, lon):
+    '''Inverse of the Humminbird lat/lon decoding in PINGVerter.'''
+    x = np.arctan(np.tan(np.deg2rad(lat)) / _HUM_K)
+    n = _HUM_R * np.log(np.tan(x / 2.0 + np.pi / 4.0))
+    e = _HUM_R * np.deg2rad(lon)
+    return np.round(e).astype('int64'), np.round(n).astype('int64')
+
+
+def write_humminbird(outDir, name='R00001', n_pings=5000, n_beams=2,
+                     samples=1500, block=2000, unix_time=1700000000, seed=0,
+                     **track_kw):
+    '''
+    Write a synthetic Humminbird recording.
+
+    `n_beams` (2-5) adds beams in the order port, star, high, low and very
+    high frequency down-looking.  Down-looking beams carry half the samples.
+
+    -------
+    Returns
+    -------
+    path to the `.DAT` file
+    '''
+    if not 2 <= n_beams <= len(HUM_BEAMS):
+        raise ValueError('n_beams must be between 2 and {}'.format(len(HUM_BEAMS)))
+
+    os.makedirs(os.path.join(outDir, name), exist_ok=True)
+    trk = trackline(n_pings, seed=seed, **track_kw)
+    utm_e, utm_n = _hum_mercator(trk['lat'], trk['lon'])
+
+    # Helix DAT (64 bytes, big endian)
+    dat = bytearray(64)
+    dat[0], dat[1], dat[2], dat[3] = 195, 0, 226, 1  # spacer, fresh water, spacer, gps
+    struct.pack_into('>i', dat, 4, 1199)
+    struct.pack_into('>i', dat, 20, unix_time)
+    struct.pack_into('>i', dat, 24, int(utm_e[0]))
+    struct.pack_into('>i', dat, 28, int(utm_n[0]))
+    dat[32:42] = (name + '.DAT').encode('ascii')[:10].ljust(10, b'\0')
+    struct.pack_into('>i', dat, 44, n_pings)
+    struct.pack_into('>i', dat, 48, int(trk['time_s'][-1] * 1000))
+    struct.pack_into('>i', dat, 52, samples)
+    datFile = os.path.join(outDir, name + '.DAT')
+    with open(datFile, 'wb') as f:
+        f.write(bytes(dat))
+
+    beams = HUM_BEAMS[:n_beams]
+    for b, (beamFile, beam) in enumerate(beams):
+        ss = beam in (2, 3)
+        nSamp = samples if ss else samples // 2
+        pixM = 0.02 if ss else 0.04
+
+        with open(os.path.join(outDir, name, beamFile + '.SON'), 'wb') as f:
+            for s in range(0, n_pings, block):
+                e = min(n_pings, s + block)
+                head = np.zeros(e - s, dtype=HUM_PING_DTYPE)
+                for field in HUM_PING_DTYPE.names:
+                    if field.startswith('SP'):
+                        head[field] = int(field[2:])
+                head['head_start'] = HUM_HEAD_START
+                head['head_end'] = HUM_HEAD_END
+                head['record_num'] = np.arange(s, e) * len(beams) + b
+                head['time_s'] = np.round(trk['time_s'][s:e] * 1000)
+                head['utm_e'] = utm_e[s:e]
+                head['utm_n'] = utm_n[s:e]
+                head['instr_heading'] = np.round(trk['heading'][s:e] * 10)
+                head['speed_ms'] = np.round(trk['speed_ms'][s:e] * 10)
+                head['inst_dep_m'] = np.round(trk['depth_m'][s:e] * 10)
+                head['beam'] = beam
+                head['f'] = 455 if ss else 200
+                head['e_err_m'] = 10
+                head['n_err_m'] = 10
+                head['ping_cnt'] = nSamp
+
+                depth_px = trk['depth_m'][s:e] / pixM
+                pings = (returns(depth_px, nSamp, seed=seed + beam, first_ping=s) * 255).astype('uint8')
+
+                rec = np.empty((e - s, HUM_PING_DTYPE.itemsize + nSamp), dtype='uint8')
+                rec[:, :HUM_PING_DTYPE.itemsize] = head.view('uint8').reshape(e - s, -1)
+                rec[:, HUM_PING_DTYPE.itemsize:] = pings
+                f.write(rec.tobytes())
+
+    return datFile
+
+
+# =========================================================
+def _jsf_message(trk, i, channel, samples, sample_ns, sound_speed, data):
+    '''One JSF message type 80 record (16-byte header + 240 + samples).'''
+    size = JSF_MSG80_SIZE + 2 * samples
+    head = bytearray(16)
+    struct.pack_into('<H', head, 0, JSF_MARKER)
+    head[2] = 11  # protocol version
+    struct.pack_into('<H', head, 4, 80)
+    head[7] = JSF_SUBSYSTEM
+    head[8] = channel
+    struct.pack_into('<i', head, 12, size)
+
+    t = trk['time_s'][i]
+    whole = int(np.floor(t))
+    m = bytearray(JSF_MSG80_SIZE)
+    struct.pack_into('<i', m, 0, 1700000000 + whole)
+    struct.pack_into('<I', m, 8, i)
+    struct.pack_into('<H', m, 16, (samples >> 16) << 8)
+    validity = (1 << 9) | (1 << 8)
+    struct.pack_into('<H', m, 30, validity)
+    struct.pack_into('<h', m, 34, 0)  # envelope, one uint16 per sample
+    struct.pack_into('<i', m, 80, int(round(trk['lon'][i] * 600000)))
+    struct.pack_into('<i', m, 84, int(round(trk['lat'][i] * 600000)))
+    struct.pack_into('<h', m, 88, 2)  # lat/lon in minutes * 10000
+    struct.pack_into('<H', m, 114, samples & 0xFFFF)
+    struct.pack_into('<I', m, 116, sample_ns)
+    struct.pack_into('<H', m, 126, 40000)  # 400 kHz (decahertz)
+    struct.pack_into('<H', m, 128, 40000)
+    struct.pack_into('<i', m, 136, int(round(trk['depth_m'][i] * 1000)))
+    struct.pack_into('<f', m, 148, sound_speed)
+    struct.pack_into('<H', m, 172, int(round(trk['heading'][i] * 100)) % 36000)
+    struct.pack_into('<h', m, 192, int(round(trk['heading'][i] * 10)) % 3600)
+    struct.pack_into('<h', m, 194, int(round(trk['speed_ms'][i] / 0.514444 * 10)))
+    struct.pack_into('<I', m, 200, int(round((t - whole) * 1000)) + 1)
+    struct.pack_into('<h', m, 226, 120)  # 12.0 C
+
+    return bytes(head) + bytes(m) + data.astype('<u2').tobytes()
+
+
+def write_jsf(outFile, n_pings=5000, samples=2000, block=2000,
+              sound_speed=1500.0, sample_ns=20000, seed=0, **track_kw):
+    '''
+    Write a synthetic two-channel (port/star) JSF side-scan recording.
+
+    -------
+    Returns
+    -------
+    path to the `.jsf` file
+    '''
+    os.makedirs(os.path.dirname(os.path.abspath(outFile)), exist_ok=True)
+    trk = trackline(n_pings, seed=seed, **track_kw)
+    pixM = sound_speed * (sample_ns / 1e9) / 2.0
+
+    with open(outFile, 'wb') as f:
+        for s in range(0, n_pings, block):
+            e = min(n_pings, s + block)
+            depth_px = trk['depth_m'][s:e] / pixM
+            port = (returns(depth_px, samples, seed=seed, first_ping=s) * 65535).astype('uint16')
+            star = (returns(depth_px, samples, seed=seed + 1, first_ping=s) * 65535).astype('uint16')
+            for k, i in enumerate(range(s, e)):
+                f.write(_jsf_message(trk, i, 0, samples, sample_ns, sound_speed, port[k]))
+                f.write(_jsf_message(trk, i, 1, samples, sample_ns, sound_speed, star[k]))
+
+    return outFile
+
+
+def write_recording(fmt, outDir, name='R00001', **kw):
+    '''Write a `hum` or `jsf` synthetic recording and return its path.'''
+    if fmt == 'hum':
+        return write_humminbird(outDir, name=name, **kw)
+    if fmt == 'jsf':
+        kw.pop('n_beams', None)
+        return write_jsf(os.path.join(outDir, name + '.jsf'), **kw)
+    raise ValueError('Unknown synthetic format: {}'.format(fmt))
@@ -44,12 +44,14 @@ sys.path.append(PACKAGE_DIR)
 from pingmapper.funcs_common import *
 from pingmapper.funcs_model import *
 from pingmapper.class_rectObj import rectObj
+from pingmapper.funcs_softmax import save_softmax, load_softmax, SOFTMAX_EXT
+from pingmapper.funcs_label import fill_zero_runs
+import pingmapper.funcs_qaplot as qa
 
-from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 import matplotlib
 matplotlib.use('agg')
-import matplotlib.pyplot as plt
+plt = lazy_import('matplotlib.pyplot')
 
 # from skimage.filters import threshold_otsu
 from osgeo import gdal, ogr, osr
@@ -166,7 +168,7 @@ class mapSubObj(rectObj):
 
         ###########################
         # Get moving window indices
-        movWinInd = self._getMovWinInd(winO, son3Chunk)
+        movWinInd = self._getMovWinInd(winO, son3Chunk, lOff)
 
         #################################
         # Make prediction for each window
@@ -563,10 +565,13 @@ class mapSubObj(rectObj):
         return son, w, e
 
     #=======================================================================
-    def _getMovWinInd(self, o, arr):
+    def _getMovWinInd(self, o, arr, lOff=None):
 
         '''
-        Get moving window indices based on window overlap (o) and arr size
+        Get moving window indices based on window overlap (o) and arr size.
+        With the center chunk's column offsets (lOff), windows cover the
+        center chunk whatever the neighboring chunks' widths (adaptive chunk
+        sizes); with nchunk-wide chunks the windows are the same.
 
         ----------
         Parameters
@@ -600,6 +605,12 @@ class mapSubObj(rectObj):
         # Calculate first window index
         i = (c + s) - c
 
+        if lOff is not None:
+            # Windows starting from one window before the center chunk until
+            # the center chunk's end
+            i = max(0, lOff[0] - c + s)
+            tWin = max(1, int(np.ceil((lOff[1] - i) / s - 1e-9)))
+
         # Get all indices
         winInd = np.arange(i,W,s, dtype=int)
 
@@ -611,23 +622,30 @@ class mapSubObj(rectObj):
     #=======================================================================
     def _saveSubstrateNpz(self, arr, k, classes):
         '''
-        Save substrate prediction to npz
+        Save substrate prediction (softmax scores) to a compact, chunked
+        HDF5 store (see funcs_softmax).
 
         ----------
         Parameters
         ----------
+        arr : (H, W, nclasses) softmax scores
+        k : chunk id
+        classes : dict of class names
 
         ----------------------------
         Required Pre-processing step
         ----------------------------
+        self._predSubstrate()
 
         -------
         Returns
         -------
+        projName_substrateSoftmax_beam_chunk.h5
 
         --------------------
         Next Processing Step
         --------------------
+        portstarObj._mapSubstrate()
         '''
 
         ###################
@@ -638,22 +656,21 @@ class mapSubObj(rectObj):
         # Out directory
         outDir = self.outDir
 
-        #projName_substrate_beam_chunk.npz
+        #projName_substrate_beam_chunk.h5
         channel = self.beamName #ss_port, ss_star, etc.
         projName = os.path.split(self.projDir)[-1] #to append project name to filename
 
         # Prepare file name
-        f = projName+'_'+'substrateSoftmax'+'_'+channel+'_'+addZero+str(k)+'.npz'
+        f = projName+'_'+'substrateSoftmax'+'_'+channel+'_'+addZero+str(k)+SOFTMAX_EXT
         f = os.path.join(outDir, f)
 
-        # Create dict to store output
-        datadict = dict()
-        datadict['substrate'] = arr
-
-        datadict['classes'] = list(classes.values())
+        # Save compressed store
+        save_softmax(f, arr, list(classes.values()), dtype=getattr(self, 'softmax_dtype', 'float16'))
 
-        # Save compressed npz
-        np.savez_compressed(f, **datadict)
+        # Remove stale npz from a previous run so it is not mapped twice
+        oldNpz = f.replace(SOFTMAX_EXT, '.npz')
+        if os.path.exists(oldNpz):
+            os.remove(oldNpz)
 
         del arr
         return
@@ -701,7 +718,8 @@ class mapSubObj(rectObj):
         projName = os.path.split(self.projDir)[-1] #to append project name to filename
 
         # Get sonMeta df
-        if not hasattr(self, "sonMetaDF"):
+        loaded = not hasattr(self, "sonMetaDF")
+        if loaded:
             self._loadSonMeta()
         df = self.sonMetaDF
 
@@ -724,12 +742,8 @@ class mapSubObj(rectObj):
             self._doSpdCor(chunk, son=False, spdCor=spdCor, maxCrop=maxCrop)
             son = self.sonDat.copy()
 
-        # Open substrate softmax scores
-        npz = np.load(npz)
-        softmax = npz['substrate'].astype('float32')
-
-        # Get classes
-        classes = npz['classes']
+        # Open substrate softmax scores and classes
+        softmax, classes = load_softmax(npz)
 
 
         #####################
@@ -755,36 +769,16 @@ class mapSubObj(rectObj):
         # Set colormap
         class_label_colormap = ['#3366CC','#DC3912', '#FF9900', '#109618', '#990099', '#0099C6', '#DD4477', '#66AA00', '#B82E2E', '#316395', '#000000']
 
-        # Convert labels to colors
-        color_label = label_to_colors(label, son[:,:]==0, alpha=128, colormap=class_label_colormap, color_class_offset=0, do_alpha=False)
-
-        # Do plot
-        fig = plt.figure()
-        ax = plt.subplot(111)
-
-        # Plot overlay
-        ax.imshow(son, cmap='gray')
-        ax.imshow(color_label, alpha=0.5)
-        ax.axis('off')
-
-        # Shrink plot
-        box = ax.get_position()
-        ax.set_position([box.x0, box.y0 + box.height * 0.1, box.width, box.height * 0.9])
+        # Sonar and classification overlay, drawn directly into image arrays
+        sonImg = qa.gray_image(son)
+        classImg = qa.blend_labels(sonImg, label, class_label_colormap, mask=son==0, alpha=0.5)
 
         # Legend
         colors = class_label_colormap[:len(classes)]
-        l=dict()
-        for i, (n, c) in enumerate(zip(classes,colors)):
-            l[str(i)+' '+n]=c
-
-        markers = [plt.Line2D([0,0],[0,0],color=color, marker='o', linestyle='') for color in l.values()]
-        ax.legend(markers, l.keys(), numpoints=1, ncol=int(len(colors)/3),
-                  markerscale=0.5, prop={'size': 5}, loc='upper center',
-                  bbox_to_anchor=(0.5, -0.05), fancybox=True, shadow=True,
-                  columnspacing=0.75, handletextpad=0.25)
+        names = [str(i)+' '+n for i, n in enumerate(classes)]
+        legend = qa.legend_image(tuple(names), tuple(colors), ncol=max(1, int(len(colors)/3)))
 
-        plt.savefig(f, dpi=200, bbox_inches='tight')
-        plt.close()
+        qa.save_image(f, qa.stack([classImg, legend], axis=0))
 
 
         ##############
@@ -795,12 +789,9 @@ class mapSubObj(rectObj):
         else:
             sigma = 2
 
-        # Number of rows
-        rows=len(classes)
-
         # Convert to probabilities????
         if probs:
-            softmax = tf.nn.softmax(softmax).numpy()
+            softmax = qa.softmax(softmax)
 
         # Calculate stats and prepare labels
         meanSoft = round(np.nanmean(softmax), 1)
@@ -828,35 +819,18 @@ class mapSubObj(rectObj):
             meanL = '$\mu$' +' ('+str(meanSoft)+')'
             maxL = str(sigma)+'$\sigma$'+' ('+str(maxSoft)+')'
 
-        # Create subplots
-        plt.figure(figsize=(16,12))
-        plt.subplots_adjust(hspace=0.25)
-        nrows = 3
-        ncols = int(np.ceil((softmax.shape[-1]+2)/nrows))
-
         # Prepare Title
         if probs:
             title = 'Substrate Probabilities\n'
         else:
             title = 'Substrate Logits\n'
         title = title+minL + '$\leq$' + meanL + '$\leq$' + maxL
-        plt.suptitle(title, fontsize=18, y=0.95)
-
-        # Plot substrate in first position
-        ax = plt.subplot(nrows, ncols, 1)
-        ax.set_title('Sonar')
-        ax.imshow(son, cmap='gray')
-        ax.axis('off')
-
-        # Plot classification in second position
-        ax = plt.subplot(nrows, ncols, 2)
-        ax.set_title('Classification: '+ map_class_method)
-        # Plot overlay
-        ax.imshow(son, cmap='gray')
-        ax.imshow(color_label, alpha=0.5)
-        ax.axis('off')
-
-        # Loop through axes
+
+        # Sonar and classification in the first two panels
+        panels = [qa.title_bar(sonImg, 'Sonar'),
+                  qa.title_bar(classImg, 'Classification: '+ map_class_method)]
+
+        # One panel per class
         for i in range(softmax.shape[-1]):
 
             # Get class
@@ -873,48 +847,50 @@ class mapSubObj(rectObj):
                 # Store sonar back in sonDat just in case
                 self.sonDat = son
 
-            # Do plot
-            ax = plt.subplot(nrows, ncols, i+3)
-            ax.set_title(cname, backgroundcolor=class_label_colormap[i], color='white')
+            panel = qa.blend_scalar(sonImg, c, minSoft, maxSoft, cmap='viridis', alpha=0.5)
+            panels.append(qa.title_bar(panel, cname, bg=qa.to_bgr(class_label_colormap[i]), fg=(255, 255, 255)))
 
-            ax.imshow(son, cmap='gray')
+        nrows = 3
+        ncols = int(np.ceil((softmax.shape[-1]+2)/nrows))
+        fig = qa.grid(panels, ncols)
 
-            # Prepare color map
-            color_map = plt.get_cmap('viridis')
+        # Shared colorbar labels
+        meanL = '$\mu$'
+        if probs:
+            minL = str(minSoft) if minSoft == 0 else '-'+str(sigma)+'$\sigma$'
+            maxL = str(maxSoft) if maxSoft == 1 else str(sigma)+'$\sigma$'
+        else:
+            minL = '-'+str(sigma)+'$\sigma$'
+            maxL = str(sigma)+'$\sigma$'
 
-            im = ax.imshow(c, cmap=color_map, alpha=0.5, vmin=minSoft, vmax=maxSoft)
-            ax.axis('off')
+        cbar = qa.colorbar_image(minSoft, maxSoft, (minSoft, meanSoft, maxSoft), (minL, meanL, maxL),
+                                 width=min(fig.shape[1], 800))
+        fig = qa.stack([qa.text_image(title, fontsize=18), fig, cbar], axis=0)
 
-            divider = make_axes_locatable(ax)
-            cax = divider.append_axes('right', size='5%', pad=0.05)
-            cbar = plt.colorbar(im, ticks=[minSoft, meanSoft, maxSoft], cax=cax)
+        if probs:
+            f = f.replace('classified_'+map_class_method, 'probability')
+        else:
+            f = f.replace('classified_'+map_class_method, 'logits')
+        qa.save_image(f, fig)
 
-            # Prepare colorbar labels
-            meanL = '$\mu$'
-            if probs:
-                if minSoft == 0:
-                    minL = str(minSoft)
-                else:
-                    minL = '-'+str(sigma)+'$\sigma$'
+        if loaded:
+            del self.sonMetaDF
 
-                if maxSoft == 1:
-                    maxL = str(maxSoft)
-                else:
-                    maxL = str(sigma)+'$\sigma$'
 
-            else:
-                minL = '-'+str(sigma)+'$\sigma$'
-                meanL = '$\mu$'
-                maxL = str(sigma)+'$\sigma$'
+    #=======================================================================
+    def _pltSubClassBatch(self, map_class_method, items, spdCor=1, maxCrop=0, probs=True):
+        '''
+        Export substrate plots for several (chunk, softmax file) pairs,
+        loading sonar metadata once.
+        '''
+        self._loadSonMeta()
 
-            cbar.ax.set_yticklabels([minL, meanL, maxL])
+        for chunk, npz in items:
+            self._pltSubClass(map_class_method, chunk, npz, spdCor=spdCor, maxCrop=maxCrop, probs=probs)
 
-        if probs:
-            f = f.replace('classified_'+map_class_method, 'probability')
-        else:
-            f = f.replace('classified_'+map_class_method, 'logits')
-        plt.savefig(f, dpi=200, bbox_inches='tight')
-        plt.close()
+        del self.sonMetaDF
+        gc.collect()
+        return
 
 
     ############################################################################
@@ -999,22 +975,16 @@ class mapSubObj(rectObj):
         # Mask Water column
         if mask_wc:
             self._WC_mask(i)
-            wc_mask = self.wcMask
 
-            label = (label*wc_mask).astype('uint8') # Zero-out water column
-            wc_mask = np.where(wc_mask==0,9,wc_mask) # Set water column mask value to 9
-            wc_mask = np.where(wc_mask==1,0,wc_mask) # Set non-water column mask value to 0
-            label = (label+wc_mask).astype('uint8') # Add mask to label to get water column classified in plt
+            # Set water column to 9 so it is classified in plt
+            label = np.where(self.wcMask == 1, label, 9).astype('uint8')
 
         # Mask Shadows
         if mask_shw:
             self._SHW_mask(i, son=False)
-            shw_mask = self.shadowMask
 
-            label = (label*shw_mask).astype('uint8') # Zero-out shadows (based on binary shadow model, not substrate model)
-            shw_mask = np.where(shw_mask==0,8,shw_mask) # Set shadow mask value to 8
-            shw_mask = np.where(shw_mask==1,0,shw_mask) # Set non-shadow mask value to 0
-            label = (label+shw_mask).astype('uint8') # Add mask to label to get shadows classified in plt
+            # Set shadows to 8 (based on binary shadow model, not substrate model)
+            label = np.where(self.shadowMask == 1, label, 8).astype('uint8')
 
         label -= 1
         # Filter small regions
@@ -1058,8 +1028,9 @@ class mapSubObj(rectObj):
         # Get npz dir
         npzDir = os.path.join(self.substrateDir, 'predict_npz')
 
-        # Get npz files belonging to current son
+        # Get npz files belonging to current son (legacy npz first so h5 wins)
         npzs = sorted(glob(os.path.join(npzDir, '*'+self.beamName+'*.npz')))
+        npzs += sorted(glob(os.path.join(npzDir, '*'+self.beamName+'*'+SOFTMAX_EXT)))
 
         # Dictionary to store {chunkID:NPZFilePath}
         toMap = defaultdict()
@@ -1131,77 +1102,8 @@ class mapSubObj(rectObj):
         # Recover classification with holes filled
         objects_filled = watershed(binary_filled, l, mask=binary_filled)
 
-        # Get rid of 0's
-        # Iterate each ping
-
-        for p in range(l.shape[1]):
-            # Get depth
-            d = self.bedPick[p]
-
-            # Get ping returns
-            ping = objects_filled[:, p]
-
-            # Get water column
-            wc = ping[:d]
-
-            # Remove water column
-            ping = ping[d:]
-
-            ##############
-            # Remove zeros
-            # Find zeros. Should be grouped in contiguous arrays (array[0, 1, 2], array[100, 101, 102], ...
-            zero = np.where(ping==0)[0]
-
-            if len(zero) > 0:
-                # Group sequential zeros [array([0, 1, 2, 3, ..]), array([1100, 1101, 1102, ..])]
-                zero = np.split(zero, np.where(np.diff(zero) != 1)[0]+1)
-
-                # Iterate each zero sequence
-                for z in zero:
-                    # Get index of first and last zero
-                    f, l = z[0], z[-1]
-
-                    # If len(zero) not entire ping AND not 1
-                    if len(z) < ping.shape[0] and len(z)>1:
-                        # if f at top (ie == 0)
-                        if f == 0:
-                            # Set c to l+1
-                            c = ping[l+1]
-                        # if l at bottom (ie == ping.shape[0]-1 -> so we don't go off edge)
-                        elif l == ping.shape[0]:
-                            # Set c to f-1
-                            c = ping[f-1]
-                        # zero region somewhere in the middle
-                        else:
-                            # Set to f-1
-                            c = ping[f-1]
-
-                        # Fill zero recion with c
-                        ping[f:l+1] = c
-
-                    # Only one zero
-                    elif len(z)==1:
-                        # Get index
-                        f = z[0]
-
-                        # Get next value
-                        try:
-                            c = ping[f+1]
-                        # at end of array, get previous value
-                        except:
-                            c = ping[f-1]
-
-                        # Fill zero with c
-                        ping[f] = c
-
-                    # Else len(zero) entire ping
-                    else:
-                        break
-
-                # Add water column back in
-                ping = list(wc)+list(ping)
-
-                # Update objects filled with ping
-                objects_filled[:, p] = ping
+        # Get rid of 0's below the bed, filling each zero region from the
+        ## adjacent class
+        objects_filled = fill_zero_runs(objects_filled, self.bedPick)
 
         return objects_filled
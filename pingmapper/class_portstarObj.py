@@ -46,52 +46,28 @@ from pingmapper.funcs_common import *
 from pingmapper.funcs_model import *
 
 # import gdal
-from osgeo import gdal, ogr, osr
-from scipy.signal import savgol_filter
-from scipy import stats
-from skimage.transform import PiecewiseAffineTransform, warp
+gdal = lazy_import('osgeo.gdal')
+ogr = lazy_import('osgeo.ogr')
+osr = lazy_import('osgeo.osr')
+savgol_filter = lazy_attr('scipy.signal', 'savgol_filter')
+stats = lazy_import('scipy.stats')
+warp = lazy_attr('skimage.transform', 'warp')
 from rasterio.transform import from_origin
 # from rasterio.enums import Resampling
 from PIL import ImageColor
 
 import matplotlib
 matplotlib.use('agg')
-import matplotlib.pyplot as plt
+plt = lazy_import('matplotlib.pyplot')
 
 import inspect
 
-quiet_tensorflow_warnings()
-
-try:
-    with suppress_stdout_stderr():
-        from doodleverse_utils.imports import *
-        from doodleverse_utils.model_imports import *
-        from doodleverse_utils.prediction_imports import *
-except ImportError as e:
-    import traceback
-    print('\n' + '='*80)
-    print('Could not import Doodleverse Utils. Please install these packages to use PING-Mapper.')
-    print('They are not needed for GhostVision. Trying to continue...')
-    print('\nDetailed error information:')
-    print('-'*80)
-    print(f'Error Type: {type(e).__name__}')
-    print(f'Error Message: {str(e)}')
-    print('-'*80)
-    traceback.print_exc()
-    print('='*80 + '\n')
-except Exception as e:
-    import traceback
-    print('\n' + '='*80)
-    print('Unexpected error while importing Doodleverse Utils.')
-    print('Detailed error information:')
-    print('-'*80)
-    print(f'Error Type: {type(e).__name__}')
-    print(f'Error Message: {str(e)}')
-    print('-'*80)
-    traceback.print_exc()
-    print('='*80 + '\n')
-
-import geopandas as gpd
+gpd = lazy_import('geopandas')
+import shapely
+from pingmapper.funcs_spatial import polygonize_tiled, StreamingMosaic, raster_footprint, cascaded_union, load_chunk_index, chunk_bounds
+from pingmapper.funcs_softmax import load_softmax
+from pingmapper.funcs_label import fill_zero_span
+import pingmapper.funcs_qaplot as qa
 
 class portstarObj(object):
     '''
@@ -1899,19 +1875,23 @@ class portstarObj(object):
             # Prepare depth detection dictionaries
             portFinal = []
             starFinal = []
+
+            # Pings per chunk (chunks need not be nchunk long)
+            portCnt = portDF.groupby('chunk_id').size()
+            starCnt = starDF.groupby('chunk_id').size()
             for i in sorted(chunks):
 
                 if i in self.portDepDetect:
                     portDep = self.portDepDetect[i]
                 # For chunks completely filled with NoData
                 else:
-                    portDep = [0]*self.port.nchunk
+                    portDep = [0]*int(portCnt.get(i, 0))
 
                 if i in self.starDepDetect:
                     starDep = self.starDepDetect[i]
                 # For chunks completely filled with NoData
                 else:
-                    starDep = [0]*self.star.nchunk
+                    starDep = [0]*int(starCnt.get(i, 0))
 
                 portFinal.extend(portDep)
                 starFinal.extend(starDep)
@@ -2108,7 +2088,8 @@ class portstarObj(object):
                      acousticBed = True,
                      autoBed = True,
                      autoBank = False,
-                     tileFile = '.jpg'):
+                     tileFile = '.jpg',
+                     loadMeta = True):
 
         '''
         Export a plot of bedpicks on sonogram for a given chunk.
@@ -2125,6 +2106,10 @@ class portstarObj(object):
         autoBed : bool : [Default=True]
             DESCRIPTION - Plot the automated bedpick on sonogram.
 
+        loadMeta : bool : [Default=True]
+            DESCRIPTION - Load (and release) the sonar metadata; False when
+                          the caller already loaded it.
+
         ----------------------------
         Required Pre-processing step
         ----------------------------
@@ -2133,7 +2118,8 @@ class portstarObj(object):
         -------
         Returns
         -------
-        Plot of bedpicks overlaying sonogram.
+        Image of bedpicks drawn over the sonogram (rendered with funcs_qaplot,
+        no pyplot figure).
 
         --------------------
         Next Processing Step
@@ -2147,11 +2133,11 @@ class portstarObj(object):
 
         ####################
         # Prepare depth data
-        # Load sonar metadata file
-        self.port._loadSonMeta()
+        # Load sonar metadata file (already loaded by _plotBedPickBatch)
+        if loadMeta:
+            self.port._loadSonMeta()
+            self.star._loadSonMeta()
         portDF = self.port.sonMetaDF
-
-        self.star._loadSonMeta()
         starDF = self.star.sonMetaDF
 
         def _depth_to_pixels(df, depth_col):
@@ -2276,43 +2262,59 @@ class portstarObj(object):
         projName = os.path.split(self.port.projDir)[-1]
         outFile = os.path.join(outDir, projName+'_Bedpick_'+addZero+str(i)+tileFile)
 
-        plt.imshow(mergeSon, cmap='gray')
+        img = qa.gray_image(mergeSon)
+        traces = []
         if detectDepMode == 0:
             if acousticBed:
-                portInstGood = np.where(~portInterp, portInst, np.nan)
-                starInstGood = np.where(~starInterp, starInst, np.nan)
-                portInstBad = np.where(portInterp, portInst, np.nan)
-                starInstBad = np.where(starInterp, starInst, np.nan)
-                portInterpDepth = np.where(portInterp, portAuto, np.nan)
-                starInterpDepth = np.where(starInterp, starAuto, np.nan)
-
-                plt.plot(portInstGood, y, '-.', color='lime', lw=1, label='Instrument Depth (Good)')
-                plt.plot(starInstGood, y, '-.', color='lime', lw=1)
-                plt.plot(portInstBad, y, '-.', color='red', lw=1, label='Instrument Depth (Flagged)')
-                plt.plot(starInstBad, y, '-.', color='red', lw=1)
-                plt.plot(portInterpDepth, y, '-.', color='yellow', lw=1, label='Interpolated Depth')
-                plt.plot(starInterpDepth, y, '-.', color='yellow', lw=1)
-                del portInstGood, starInstGood, portInstBad, starInstBad, portInterpDepth, starInterpDepth
+                traces.append((np.where(~portInterp, portInst, np.nan), np.where(~starInterp, starInst, np.nan), 'lime', 'Instrument Depth (Good)'))
+                traces.append((np.where(portInterp, portInst, np.nan), np.where(starInterp, starInst, np.nan), 'red', 'Instrument Depth (Flagged)'))
+                traces.append((np.where(portInterp, portAuto, np.nan), np.where(starInterp, starAuto, np.nan), 'yellow', 'Interpolated Depth'))
         else:
             if acousticBed:
-                plt.plot(portInst, y, 'r-.', lw=1, label='Instrument Depth')
-                plt.plot(starInst, y, 'r-.', lw=1)
+                traces.append((portInst, starInst, 'red', 'Instrument Depth'))
             if autoBed:
-                plt.plot(portAuto, y, 'b-.', lw=1, label='Auto Depth')
-                plt.plot(starAuto, y, 'b-.', lw=1)
+                traces.append((portAuto, starAuto, 'blue', 'Auto Depth'))
+
+        for portX, starX, color, _ in traces:
+            qa.draw_trace(img, portX, color, y)
+            qa.draw_trace(img, starX, color, y)
 
         del portInst, starInst, portAuto, starAuto, portRaw, starRaw, portInterp, starInterp
 
-        plt.legend(loc = 'lower right', prop={'size':4}) # create the plot legend
-        plt.savefig(outFile, dpi=300, bbox_inches='tight')
-        plt.close()
+        if traces:
+            legend = qa.legend_image(tuple(t[3] for t in traces), tuple(t[2] for t in traces),
+                                     styles=('-.',) * len(traces), fontsize=4)
+            img = qa.paste(img, legend, corner='lower right')
+        qa.save_image(outFile, img)
 
-        del self.mergeSon, self.port.sonMetaDF, self.star.sonMetaDF, y
+        del self.mergeSon, y
+        if loadMeta:
+            del self.port.sonMetaDF, self.star.sonMetaDF
 
         gc.collect()
         return #self
 
 
+    #=======================================================================
+    def _plotBedPickBatch(self,
+                          chunks,
+                          acousticBed = True,
+                          autoBed = True,
+                          tileFile = '.jpg'):
+        '''
+        Export bedpick plots for several chunks, loading sonar metadata once.
+        '''
+        self.port._loadSonMeta()
+        self.star._loadSonMeta()
+
+        for i in chunks:
+            self._plotBedPick(int(i), acousticBed, autoBed, tileFile=tileFile, loadMeta=False)
+
+        del self.port.sonMetaDF, self.star.sonMetaDF
+        gc.collect()
+        return
+
+
     ############################################################################
     # Shadow Removal                                                           #
     ############################################################################
@@ -2489,19 +2491,22 @@ class portstarObj(object):
     ############################################################################
 
     #=======================================================================
-    def _mapSubstrate(self, map_class_method, chunk, npzs):
+    def _mapSubstrate(self, map_class_method, chunk, npzs, write_chunk=True, return_label=False):
         '''
+        Classify, mask and rectify one port/star substrate chunk.
+
+        Writes the chunk GeoTIFF when write_chunk. With return_label, the
+        rectified label raster is returned as [(label, transform, epsg)] (or
+        the per-beam GeoTIFF paths when port/star must be rectified
+        separately) so it can be streamed into a mosaic.
         '''
         # Set output directory
         self.outDir = self.port.outDir
 
-        # Load npz's
+        # Load softmax scores
         # Port is always first
-        portSub = np.load(npzs[0])
-        starSub = np.load(npzs[1])
-
-        self.port.sonDat = portSub['substrate'].astype('float32')
-        self.star.sonDat = starSub['substrate'].astype('float32')
+        self.port.sonDat, _ = load_softmax(npzs[0])
+        self.star.sonDat, _ = load_softmax(npzs[1])
 
         ####################################
         # Do shadow and water column removal
@@ -2528,25 +2533,12 @@ class portstarObj(object):
             label = son._classifySoftmax(chunk, son.sonDat, map_class_method, mask_wc=True, mask_shw=True)
             del son.sonDat
 
-            # Get rid of zeros along water column area
-            # Vectorized: replace class-8 (water column) labels in non-WC area with 0
-            dep_arr = np.asarray(son.bedPick, dtype=int)  # (W,)
-            row_idx = np.arange(label.shape[0])[:, np.newaxis]  # (H, 1)
-            below_wc = row_idx >= dep_arr[np.newaxis, :]  # (H, W)
-            label = np.where(below_wc & (label == 8), 0, label)
-
-            # Zero-fill per ping: propagate the class at the edge of any zero region
-            # into that region. Zeros should form at most one contiguous block per ping
-            # (the comment in the original confirms this). Skip pings with no zeros.
-            for p in range(label.shape[1]):
-                d = int(son.bedPick[p])
-                ping_below = label[d:, p]
-                zero_idx = np.where(ping_below == 0)[0]
-                if len(zero_idx) == 0:
-                    continue
-                f, l = int(zero_idx[0]), int(zero_idx[-1])
-                if d + l + 1 < label.shape[0]:
-                    label[d + f : d + l + 1, p] = ping_below[l + 1]
+            # Get rid of zeros along water column area: class-8 (water column)
+            ## labels below the bed are set to 0, then each ping is filled from
+            ## the first to the last zero below the bed with the class just
+            ## below the zero region. Zeros should form at most one contiguous
+            ## block per ping.
+            label = fill_zero_span(label, son.bedPick, clear_value=8)
 
             son.sonDat = label
 
@@ -2583,9 +2575,12 @@ class portstarObj(object):
             del portSub, starSub
 
             # Do rectification
-            self._rectify(mergeSub, chunk, 'map_substrate')
+            rect = self._rectify(mergeSub, chunk, 'map_substrate', return_label=return_label, write=write_chunk)
             del mergeSub
 
+            if return_label:
+                rect = [rect]
+
         else:
             # Rectify each individually
             # Port
@@ -2598,11 +2593,105 @@ class portstarObj(object):
             self.star.rect_wcr = True
             self.star._rectSonRubber(chunk, son=False)
 
+            if return_label:
+                projName = os.path.split(self.port.projDir)[-1]
+                addZero = self.port._addZero(chunk)
+                rect = [os.path.join(son.outDir, projName+'_map_substrate_'+son.beamName+'_'+addZero+str(int(chunk))+'.tif') for son in [self.port, self.star]]
+
         gc.collect()
 
+        if return_label:
+            return rect
+
         return
 
 
+    #=======================================================================
+    def _mapSubstrateMosaic(self, map_class_method, toMap, threadCnt, maxChunk=50, overview=True, write_chunk=False):
+        '''
+        Map substrate and stream each rectified chunk directly into GeoTIFF
+        mosaic(s), instead of writing per-chunk GeoTIFFs and mosaicking them
+        afterwards through a VRT.
+
+        Chunks are processed in parallel but pasted in ascending chunk order,
+        so where chunks overlap the later chunk wins (same as the VRT source
+        order). Mosaics are split every `maxChunk` chunks like _createMosaic().
+        Per-chunk GeoTIFFs are still written if write_chunk.
+        '''
+        chunks = sorted(toMap.keys())
+        if (len(chunks) > maxChunk) and (maxChunk != 0):
+            groups = [chunks[i:i+maxChunk] for i in range(0, len(chunks), maxChunk)]
+        else:
+            groups = [chunks]
+
+        outDir = os.path.join(self.port.substrateDir, 'map_substrate_mosaic')
+        if not os.path.exists(outDir):
+            os.makedirs(outDir)
+        filePrefix = os.path.split(self.port.projDir)[-1]
+
+        outMosaic = []
+        for i, group in enumerate(groups):
+            outTIF = os.path.join(outDir, filePrefix+'_map_substrate_raster_mosaic_'+str(i)+'.tif')
+            mosaic = self._openSubstrateMosaic(outTIF, group)
+
+            r = Parallel(n_jobs=safe_n_jobs(len(group), threadCnt), return_as='generator')(delayed(self._mapSubstrate)(map_class_method, c, toMap[c], write_chunk=write_chunk, return_label=True) for c in group)
+
+            for rect in tqdm(r, total=len(group)):
+                for item in rect:
+                    if isinstance(item, str):
+                        if not os.path.exists(item):
+                            continue
+                        with rasterio.open(item) as src:
+                            mosaic.paste(src.read(1), src.transform)
+                        if not write_chunk:
+                            os.remove(item)
+                    else:
+                        mosaic.paste(item[0], item[1])
+                del rect
+
+            outMosaic.append(mosaic.close(overview=overview))
+            gc.collect()
+
+        return outMosaic
+
+    #=======================================================================
+    def _openSubstrateMosaic(self, outTIF, chunks):
+        '''
+        Open a StreamingMosaic covering the range extent of `chunks` on the
+        map resolution grid (pix_res_map, or the most common chunk pixel size).
+        The extent comes from the persisted chunk footprints (meta/chunk_index.gpkg)
+        when they cover `chunks`, otherwise from the smoothed trackline csv.
+        '''
+        if not hasattr(self.port, 'sonMetaDF') or self.port.sonMetaDF is None:
+            self.port._loadSonMeta()
+
+        sonMeta = self.port.sonMetaDF
+        pixM = sonMeta.loc[sonMeta['chunk_id'].isin(chunks), 'pixM']
+
+        res = self.port.pix_res_map
+        if res == 0:
+            res = pixM.mode()[0]
+
+        bounds = []
+        for son in [self.port, self.star]:
+            b = chunk_bounds(load_chunk_index(son.metaDir, son.beamName), chunks)
+            if b is not None:
+                bounds.append(b)
+                continue
+
+            if not hasattr(son, '_trkMetaDF') or son._trkMetaDF is None:
+                son._trkMetaDF = pd.read_csv(os.path.join(son.metaDir, "Trackline_Smth_"+son.beamName+".csv"))
+            trk = son._trkMetaDF
+            trk = trk[trk['chunk_id'].isin(chunks)]
+            bounds.append([trk['range_es'].min(), trk['range_ns'].min(), trk['range_es'].max(), trk['range_ns'].max()])
+        bounds = np.array(bounds)
+
+        # Pad by a couple of source pixels for the half-pixel origin shift in _rectify()
+        pad = 2 * max(res, pixM.max())
+        bounds = (bounds[:, 0].min()-pad, bounds[:, 1].min()-pad, bounds[:, 2].max()+pad, bounds[:, 3].max()+pad)
+
+        return StreamingMosaic(outTIF, bounds, res, self.port.humDat['epsg'], colormap=self._substrateColormap())
+
     #=======================================================================
     def _mapPredictions(self, map_predict, imgOutPrefix, chunk, npzs):
         '''
@@ -2619,15 +2708,10 @@ class portstarObj(object):
         # Get leading zeros for output name
         addZero = self.port._addZero(chunk)
 
-        # Load npz's
+        # Load softmax scores
         # Port is always first
-        portSub = np.load(npzs[0])
-        starSub = np.load(npzs[1])
-
-        self.port.sonDat = portSub['substrate'].astype('float32')
-        self.star.sonDat = starSub['substrate'].astype('float32')
-
-        del portSub, starSub
+        self.port.sonDat, _ = load_softmax(npzs[0])
+        self.star.sonDat, _ = load_softmax(npzs[1])
 
         # For debugging
         # self.port.sonDat = portSub['substrate'].astype('float32')[:,:,1:3]
@@ -2858,8 +2942,13 @@ class portstarObj(object):
         self.port._loadSonMeta()   # populates self.port.sonMetaDF
 
     #=======================================================================
-    def _rectify(self, dat, chunk, imgOutPrefix, filt=50, wgs=False, return_rect=False):
+    def _rectify(self, dat, chunk, imgOutPrefix, filt=50, wgs=False, return_rect=False, return_label=False, write=True):
         '''
+        Rectify a merged port/star label array for one chunk.
+
+        return_rect returns the raw warped array. Otherwise the cleaned label
+        raster is exported (if write) and, if return_label, returned as
+        (label, transform, epsg) for streaming into a mosaic.
         '''
 
         pix_res = self.port.pix_res_map
@@ -3069,20 +3158,8 @@ class portstarObj(object):
             out = out.astype('uint8')
             del binary_filled, binary_objects, l
 
-            # Prepare colors
-            class_colormap = {0: '#3366CC',
-                              1: '#DC3912',
-                              2: '#FF9900',
-                              3: '#109618',
-                              4: '#990099', 
-                              5: '#0099C6',
-                              6: '#DD4477',
-                              7: '#66AA00',
-                              8: '#B82E2E'}
-            
-            for k, v in class_colormap.items():
-                rgb = ImageColor.getcolor(v, 'RGB')
-                class_colormap[k] = rgb
+            if not write:
+                return out, transform, epsg
 
             #########################
             # Export Rectified Raster
@@ -3109,44 +3186,82 @@ class portstarObj(object):
                 ) as dst:
                     dst.nodata=0
                     dst.write(out,1)
-                    dst.write_colormap(1, class_colormap)
+                    dst.write_colormap(1, self._substrateColormap())
                     dst=None
 
-            del out
-
             if pix_res != 0:
                 self.port._pixresResize(gtiff, son=False)
 
             gc.collect()
 
+            if return_label:
+                return out, transform, epsg
+
+            del out
+
             return
 
 
     #=======================================================================
-    def _rasterToPoly(self, mosaic, threadCnt, mosaic_nchunk):
+    def _substrateColormap(self):
         '''
+        Colormap (class id -> RGB) written to substrate map rasters.
+        '''
+        class_colormap = {0: '#3366CC',
+                          1: '#DC3912',
+                          2: '#FF9900',
+                          3: '#109618',
+                          4: '#990099',
+                          5: '#0099C6',
+                          6: '#DD4477',
+                          7: '#66AA00',
+                          8: '#B82E2E'}
+
+        return {k: ImageColor.getcolor(v, 'RGB') for k, v in class_colormap.items()}
+
+    #=======================================================================
+    def _rasterToPoly(self, mosaic, threadCnt, mosaic_nchunk, vector_format='shp'):
         '''
+        Convert substrate map mosaic(s) to polygons.
 
-        # if mosaic != 2:
-        print("\n\tCreating vrt...")
-        self._createMosaic(mosaic=2, overview=False, threadCnt=threadCnt, son=False, maxChunk=mosaic_nchunk)
+        When there is a single mosaic, its tiles are polygonized in parallel;
+        otherwise mosaics are processed in parallel, one worker each.
+        '''
 
         inDir = os.path.join(self.port.substrateDir, 'map_substrate_mosaic')
-        rasterFiles = glob(os.path.join(inDir, '*map_sub*vrt'))
+        chunkDir = os.path.join(self.port.substrateDir, 'map_substrate_raster')
+
+        if len(glob(os.path.join(chunkDir, '*.tif'))) > 0:
+            # if mosaic != 2:
+            print("\n\tCreating vrt...")
+            self._createMosaic(mosaic=2, overview=False, threadCnt=threadCnt, son=False, maxChunk=mosaic_nchunk)
+            rasterFiles = glob(os.path.join(inDir, '*map_sub*vrt'))
+        else:
+            # No chunk rasters, use mosaics streamed by _mapSubstrateMosaic()
+            rasterFiles = glob(os.path.join(inDir, '*map_sub*mosaic*.tif'))
 
         outDir = os.path.join(self.port.substrateDir, 'map_substrate_polygon')
 
         if not os.path.exists(outDir):
             os.mkdir(outDir)
 
-        print("\n\tExporting to shapefile...")
-        _ = Parallel(n_jobs=safe_n_jobs(len(rasterFiles), threadCnt), verbose=10)(delayed(self._createPolygon)(f, outDir) for f in rasterFiles)
+        print("\n\tExporting to {}...".format(self.port._vectorDriver(vector_format)))
+        if len(rasterFiles) == 1:
+            self._createPolygon(rasterFiles[0], outDir, n_jobs=threadCnt, vector_format=vector_format)
+        else:
+            _ = Parallel(n_jobs=safe_n_jobs(len(rasterFiles), threadCnt), verbose=10)(delayed(self._createPolygon)(f, outDir, vector_format=vector_format) for f in rasterFiles)
 
         return
 
     #=======================================================================
-    def _createPolygon(self, f, outDir):
+    def _createPolygon(self, f, outDir, n_jobs=1, vector_format='shp', tile_size=4096):
         '''
+        Polygonize a substrate map raster and write it with Substrate, Name
+        and Area_m attributes.
+
+        The raster is polygonized in tiles (seam polygons are dissolved), only
+        valid substrate classes are kept, attributes are computed in bulk and
+        the layer is written in a single call.
         '''
         # Get class names from json
         # Open model configuration file
@@ -3154,73 +3269,31 @@ class portstarObj(object):
             config = json.load(file)
         globals().update(config)
 
-        # https://gis.stackexchange.com/questions/340284/converting-raster-pixels-to-polygons-with-gdal-python
-        # Open raster
-        src_ds = gdal.Open(f)
-
+        valid_sub_ids = [int(k) for k in MY_CLASS_NAMES.keys() if int(k) != 0]
 
         ####################
         # Polygon Conversion
-        # Set spatial reference
-        srs = osr.SpatialReference()
-        srs.ImportFromWkt(src_ds.GetProjection())
+        gdf, unexpected = polygonize_tiled(f, valid_values=valid_sub_ids, tile_size=tile_size, n_jobs=n_jobs)
+
+        for subID in unexpected:
+            print("\n\tWARNING: Unexpected substrate value '{}' found in raster. "
+                  "This value is not in the model config and will be removed from output.".format(int(subID)))
 
         # Prepare layerfile
-        dst_layername = os.path.basename(f).replace('.vrt', '')
+        dst_layername = os.path.splitext(os.path.basename(f))[0]
         dst_layername = dst_layername.replace('_raster_mosaic', '')
         dst_layername = os.path.join(outDir, dst_layername)
 
-        srcband = src_ds.GetRasterBand(1)
-        drv = ogr.GetDriverByName("ESRI Shapefile")
-        dst_ds = drv.CreateDataSource(dst_layername+'.shp')
-        dst_layer = dst_ds.CreateLayer(dst_layername, srs = srs, geom_type=ogr.wkbMultiPolygon)
-        newField = ogr.FieldDefn('Substrate', ogr.OFTReal)
-        dst_layer.CreateField(newField)
-        gdal.Polygonize(srcband, None, dst_layer, 0, [], callback=None)
-
-        # Set substrate name
-        newField = ogr.FieldDefn('Name', ogr.OFTString)
-        newField.SetWidth(20)
-        dst_layer.CreateField(newField)
-
-        for feature in dst_layer:
-            subID = str(int(feature.GetField('Substrate')))
-            subName = MY_CLASS_NAMES.get(subID)
-            if subName is None:
-                print("\n\tWARNING: Unexpected substrate value '{}' found in raster. "
-                      "This value is not in the model config and will be removed from output.".format(subID))
-                subName = 'Unknown'
-            feature.SetField('Name', subName)
-            dst_layer.SetFeature(feature)
-
-        # Calculate Area
-        # https://gis.stackexchange.com/questions/169186/calculate-area-of-polygons-using-ogr-in-python-script
-        # Create field to store area
-        newField = ogr.FieldDefn('Area_m', ogr.OFTReal)
-        newField.SetWidth(32)
-        newField.SetPrecision(2)
-        dst_layer.CreateField(newField)
-
-        # Calculate Area
-        for feature in dst_layer:
-            geom = feature.GetGeometryRef()
-            area = geom.GetArea()
-            feature.SetField("Area_m", area)
-            dst_layer.SetFeature(feature)
-
-        # Delete NoData and any unexpected-value polygons
-        # https://gis.stackexchange.com/questions/254444/deleting-selected-features-from-vector-ogr-in-gdal-python
-        valid_sub_ids = [int(k) for k in MY_CLASS_NAMES.keys() if int(k) != 0]
-        invalid_filter = "Substrate NOT IN ({})".format(','.join(str(v) for v in valid_sub_ids))
-        layer = dst_ds.GetLayer()
-        layer.SetAttributeFilter(invalid_filter)
-
-        for feat in layer:
-            layer.DeleteFeature(feat.GetFID())
-
+        # Set substrate name and area
+        subNames = {int(k): v for k, v in MY_CLASS_NAMES.items()}
+        gdf = gdf.rename(columns={'value': 'Substrate'})
+        gdf['Name'] = gdf['Substrate'].astype(int).map(subNames).astype(str)
+        gdf['Area_m'] = gdf.geometry.area.round(2)
+        gdf = gdf[['Substrate', 'Name', 'Area_m', 'geometry']]
 
-        dst_ds.SyncToDisk()
-        dst_ds=None
+        outFile = self.port._vectorOutFile(dst_layername, vector_format)
+        if len(gdf) > 0:
+            gdf.to_file(outFile, driver=self.port._vectorDriver(vector_format))
 
         return
     
@@ -3253,25 +3326,20 @@ class portstarObj(object):
             os.mkdir(outDir)
 
         print("\n\tExporting to shapefile...")
-        # r = Parallel(n_jobs= np.min([len(rasterFiles), threadCnt]), verbose=10)(delayed(self._createBanklinePolygon)(f, outDir) for f in rasterFiles)
-        r = []
-        for f in rasterFiles:
-            ds = self._createBanklinePolygon(f, outDir)
-            r.append(ds)
+        r = Parallel(n_jobs=safe_n_jobs(len(rasterFiles), threadCnt), verbose=10)(delayed(self._createBanklinePolygon)(f) for f in rasterFiles)
 
+        geoms = [geom for geom, _ in r if geom is not None]
+        crs = next((crs for _, crs in r if crs is not None), None)
 
-        for ds in r:
-
-            if not 'outDS' in locals():
-                outDS = ds
-            else:
-                outDS = pd.concat([outDS, ds], ignore_index=True)
+        if len(geoms) == 0:
+            print("\n\tNo imagery found for bankline export.")
+            return
 
-        # Dissolve
-        outDS['geometry'] = outDS.simplify(0.1)
-        outDS['geometry'] = outDS.buffer(0.1, join_style=2)
-        outDS = outDS.dissolve()
-        outDS['geometry'] = outDS.buffer(-0.1, join_style=2)
+        # Dissolve: chunk polygons are simplified and buffered in the workers,
+        # then merged with a spatial-tree guided cascaded union
+        geom = cascaded_union(geoms)
+        geom = shapely.buffer(geom, -0.1, join_style='mitre')
+        outDS = gpd.GeoDataFrame(geometry=[geom], crs=crs)
 
         # Save
         projName = os.path.split(self.port.projDir)[-1] 
@@ -3287,88 +3355,26 @@ class portstarObj(object):
 
 
     #=======================================================================
-    def _createBanklinePolygon(self, f, outDir):
-
-        # https://gis.stackexchange.com/questions/340284/converting-raster-pixels-to-polygons-with-gdal-python
-        # Open raster
-        src_ds = gdal.Open(f)
-
-        ####################
-        # Polygon Conversion
-        # Set spatial reference
-        srs = osr.SpatialReference()
-        srs.ImportFromWkt(src_ds.GetProjection())
-
-        # Prepare layerfile
-        dst_layername = os.path.basename(f).replace('.tif', '')
-        # dst_layername = dst_layername.replace('rect_wcr_mosaic', 'bankline')
-        dst_layername = dst_layername.replace('rect_wcr', 'bankline')
-        dst_layername = os.path.join(outDir, dst_layername)
+    def _createBanklinePolygon(self, f):
+        '''
+        Polygonize the imaged (nonzero) extent of one rectified chunk.
 
-        # Get raster data and reclass
-        srcband = src_ds.GetRasterBand(1)
-        # mask = np.where(srcband.ReadAsArray()>0, 254, 0)
-        mask = np.where(srcband.ReadAsArray()>0, 1, 0)
-        del srcband
-
-        tmp_ds = gdal.GetDriverByName('MEM').CreateCopy('', src_ds, 0)
-        tmp_ds.GetRasterBand(1).WriteArray(mask)
-        t = tmp_ds.GetRasterBand(1).ReadAsArray()
-        temp = os.path.join(os.path.dirname(dst_layername), 'temp.tif')
-        dst_ds1 = gdal.GetDriverByName('GTiff').CreateCopy(temp, tmp_ds, 0)
-        srcband = dst_ds1.GetRasterBand(1)
-
-        drv = ogr.GetDriverByName("ESRI Shapefile")
-        dst_ds = drv.CreateDataSource(dst_layername+'temp.shp')
-        dst_layer = dst_ds.CreateLayer(dst_layername, srs = srs, geom_type=ogr.wkbMultiPolygon)
-
-        # Try storing pixel value in field
-        fd = ogr.FieldDefn("Value", ogr.OFTInteger)
-        dst_layer.CreateField(fd)
-        dst_field = dst_layer.GetLayerDefn().GetFieldIndex('Value')
-
-        # Create Polygon
-        # gdal.Polygonize(srcband, None, dst_layer, 0, [], callback=None)
-        gdal.Polygonize(srcband, None, dst_layer, dst_field, [], callback=None)
-
-        # # Delete NoData poly (last feature)
-        # ft_cnt = dst_layer.GetFeatureCount()-1
-        # layer = dst_ds.GetLayer()
-        # layer.SetAttributeFilter("FID = {}".format(ft_cnt))
-
-        # Delete NoData poly (Value = 0)
-        layer = dst_ds.GetLayer()
-        layer.SetAttributeFilter("Value = 0")
-
-        for feat in layer:
-            layer.DeleteFeature(feat.GetFID())
-
-        dst_ds.SyncToDisk()
-        dst_ds=None
-        dst_ds1=None
-        tmp_ds=None
-        src_ds=None
-        temp=None
-
-        # Open in geopandas
-        ds = gpd.read_file(dst_layername+'temp.shp')
-        # Dissolve all polygons
-        ds = ds.dissolve()
-        # # Save
-        # ds.to_file(dst_layername+'.shp', index=False)
-
-        # Delete temp files
-        outDir = os.path.join(self.port.projDir, 'banklines')
-        tempFiles = glob(os.path.join(outDir, '*temp*'))
+        The polygon is simplified and buffered by 0.1 m here so the expensive
+        part of the final dissolve runs in parallel, per chunk.
 
-        for f in tempFiles:
-            try:
-                os.remove(f)
-            except:
-                pass
+        ----------------------------
+        Returns
+        ----------------------------
+        (shapely geometry or None, raster crs)
+        '''
+        geom, crs = raster_footprint(f)
+        if geom is None:
+            return None, crs
 
+        geom = shapely.simplify(geom, 0.1)
+        geom = shapely.buffer(geom, 0.1, join_style='mitre')
 
-        return ds
+        return geom, crs
 
 
     #=======================================================================
@@ -42,6 +42,10 @@ sys.path.append(PACKAGE_DIR)
 
 from pingmapper.funcs_common import *
 from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_spatial import load_chunk_index, chunk_footprints
+from pingmapper.funcs_intensity import QuantileSketch, merge_sketches, save_intensity_stats, intensity_stats_path
+from pingmapper.funcs_colormap import colormap_palette, level_colormap_lut, level_index_lut
+from pingmapper.funcs_tilewriter import GEOTIFF_COMPRESSION, GEOTIFF_LEVEL, geotiff_options
 
 from osgeo import gdal, ogr, osr
 from osgeo_utils.gdal_sieve import gdal_sieve
@@ -62,6 +66,7 @@ from skimage.draw import polygon
 from shapely.geometry import Polygon, Point, MultiPoint, LineString
 from shapely.ops import unary_union
 from shapely.vectorized import contains
+import shapely
 
 import rasterio.features
 from shapely.geometry import mapping
@@ -105,15 +110,16 @@ class rectObj(sonObj):
         '''
         Initialize an empty rectObj() class, child of sonObj() class.  All sonObj()
         parameters initialized to `None` so that they can be loaded from a
-        previously created pickle file.
+        previously saved sonObj() manifest.
 
         ----------
         Parameters
         ----------
         metaFile : str
-        DESCRIPTION - Path to pickled sonObj() file containing sonObj() attribute
-                      values.
-        EXAMPLE -     metaFile = './PINGMapperTest/meta/B002_ss_port_meta.meta'
+        DESCRIPTION - Path to saved sonObj() manifest (or legacy pickled .meta)
+                      containing sonObj() attribute values.  Large attributes
+                      are attached lazily on first use.
+        EXAMPLE -     metaFile = './PINGMapperTest/meta/B002_ss_port_meta.manifest.json'
 
         -------
         Returns
@@ -122,10 +128,7 @@ class rectObj(sonObj):
         '''
         sonObj.__init__(self, sonFile=None, humFile=None, projDir=None, tempC=None, nchunk=None)
 
-        metaFile = pickle.load(open(metaFile, 'rb')) # Load sonObj() pickle file into memory
-
-        for attr, value in metaFile.__dict__.items(): # Store sonObj() attributes in self
-            setattr(self, attr, value)
+        self._loadManifest(metaFile) # Store saved sonObj() attributes in self
 
         if not hasattr(self, 'rect_wcp'):
             self.rect_wcp = False
@@ -139,6 +142,9 @@ class rectObj(sonObj):
         if not hasattr(self, 'export_colormap_uint8'):
             self.export_colormap_uint8 = True
 
+        if not hasattr(self, 'export_colormap_palette'):
+            self.export_colormap_palette = False
+
         if not hasattr(self, 'son_colorMap_name'):
             self.son_colorMap_name = 'Greys_r'
 
@@ -195,6 +201,41 @@ class rectObj(sonObj):
         norm = np.clip(norm, 0.0, 1.0)
         return norm.astype(np.float32)
 
+    #=======================================================================
+    def _colorize_rect_uint16(self, raw16, source_scale_bounds=None):
+        '''
+        Apply the sonar colormap to a rectified uint16 chunk.  Every uint16
+        level is colored once and the chunk in a single gather.  With
+        export_colormap_palette, a uint8 colormap index is returned with its
+        palette instead of RGB.
+
+        Returns (data, palette); palette is None for RGB.
+        '''
+        name = self.son_colorMap_name
+        if source_scale_bounds is None:
+            norm_levels = None
+        else:
+            levels = np.arange(65536, dtype=np.uint16)
+            lo, hi = source_scale_bounds
+            if np.isfinite(lo) and np.isfinite(hi) and hi > lo:
+                norm_levels = self._normalize_with_bounds(levels, lo, hi)
+            else:
+                norm_levels = self._normalize_for_colormap(raw16, bit_depth=16, levels=levels)
+
+        if bool(getattr(self, 'export_colormap_palette', False)):
+            palette = colormap_palette(name)
+            if palette is not None:
+                if norm_levels is None:
+                    norm_levels = np.clip(np.arange(65536, dtype=np.float32) / 65535.0, 0.0, 1.0)
+                return level_index_lut(norm_levels, len(palette))[raw16], palette
+
+        use_uint8_rgb = self._export_colormap_as_uint8()
+        if norm_levels is None:
+            return self._colorize_pre_normalized_uint16(raw16, name, rgb_uint8=use_uint8_rgb), None
+        if use_uint8_rgb:
+            return level_colormap_lut(name, norm_levels, 255.0, np.uint8)[raw16], None
+        return level_colormap_lut(name, norm_levels, 65535.0, np.uint16)[raw16], None
+
     #=======================================================================
     def _get_rect_global_colormap_bounds(self, img_prefix, son=True):
         if not son:
@@ -264,7 +305,7 @@ class rectObj(sonObj):
         return out.astype(np.uint16)
 
     #=======================================================================
-    def _prime_rect_global_colormap_bounds(self, img_prefix, max_samples=64):
+    def _prime_rect_global_colormap_bounds(self, img_prefix, max_samples=64, threadCnt=1):
         if str(img_prefix) not in ['rect_wcp', 'rect_wcr']:
             return None
 
@@ -273,96 +314,101 @@ class rectObj(sonObj):
         if existing is not None and existing_median is not None:
             return existing
 
-        if not hasattr(self, 'sonMetaDF'):
-            self._loadSonMeta()
+        # Statistics saved by an earlier run are reused; rect_wcr intensities
+        # also depend on whether rect_wcp is exported (EGN is applied once)
+        stats_key = str(img_prefix)
+        if stats_key == 'rect_wcr' and not bool(getattr(self, 'rect_wcp', False)):
+            stats_key = 'rect_wcr_egn'
+        sketch = self._getIntensityStats().get(stats_key)
+
+        if sketch is None:
+            if not hasattr(self, 'sonMetaDF'):
+                self._loadSonMeta()
+
+            sonMetaAll = getattr(self, 'sonMetaDF', None)
+            if sonMetaAll is None or len(sonMetaAll) == 0 or 'chunk_id' not in sonMetaAll.columns:
+                return None
+
+            chunk_ids = np.sort(pd.to_numeric(sonMetaAll['chunk_id'], errors='coerce').dropna().astype(int).unique())
+            if len(chunk_ids) == 0:
+                return None
+
+            if len(chunk_ids) > int(max_samples):
+                step = int(np.ceil(len(chunk_ids) / float(max_samples)))
+                sampled_chunks = chunk_ids[::step]
+                if sampled_chunks[-1] != chunk_ids[-1]:
+                    sampled_chunks = np.append(sampled_chunks, chunk_ids[-1])
+            else:
+                sampled_chunks = chunk_ids
 
-        sonMetaAll = getattr(self, 'sonMetaDF', None)
-        if sonMetaAll is None or len(sonMetaAll) == 0 or 'chunk_id' not in sonMetaAll.columns:
-            return None
+            chunk_stats = Parallel(n_jobs=safe_n_jobs(len(sampled_chunks), threadCnt))(delayed(self._rectCalcChunkStats)(int(chunk), img_prefix) for chunk in sampled_chunks)
 
-        chunk_ids = np.sort(pd.to_numeric(sonMetaAll['chunk_id'], errors='coerce').dropna().astype(int).unique())
-        if len(chunk_ids) == 0:
+            sketch = merge_sketches(chunk_stats)
+            if sketch.n == 0:
+                return None
+            save_intensity_stats(intensity_stats_path(self.sonMetaFile), {stats_key: sketch})
+
+        bounds = sketch.bounds(1.0, 99.5)
+        if bounds is None:
             return None
 
-        if len(chunk_ids) > int(max_samples):
-            step = int(np.ceil(len(chunk_ids) / float(max_samples)))
-            sampled_chunks = chunk_ids[::step]
-            if sampled_chunks[-1] != chunk_ids[-1]:
-                sampled_chunks = np.append(sampled_chunks, chunk_ids[-1])
-        else:
-            sampled_chunks = chunk_ids
+        med = sketch.percentile(50.0)
+        self._set_rect_global_colormap_bounds(img_prefix, bounds, son=True)
+        if np.isfinite(med) and med > 0:
+            self._set_rect_global_target_median(img_prefix, med, son=True)
+        return bounds
 
-        sampled_vals = []
-        max_vals_per_chunk = 20000
+    #=======================================================================
+    def _rectCalcChunkStats(self, chunk, img_prefix):
+        '''
+        Sketch of a chunk's non-zero 16-bit export intensities, processed the
+        way rectification will (shadows, EGN, slant range correction).
+        '''
+        sonMetaAll = self.sonMetaDF
+        sonMeta = sonMetaAll[sonMetaAll['chunk_id'] == chunk].reset_index(drop=True)
+        if len(sonMeta) == 0:
+            return None
 
-        for chunk in sampled_chunks:
-            isChunk = sonMetaAll['chunk_id'] == int(chunk)
-            sonMeta = sonMetaAll[isChunk].reset_index(drop=True)
-            if len(sonMeta) == 0:
-                continue
+        try:
+            self._getScanChunkSingle(chunk)
+        except Exception:
+            return None
 
+        if self.remShadow:
             try:
-                self._getScanChunkSingle(int(chunk))
+                self._SHW_mask(chunk)
+                self.sonDat = self.sonDat * self.shadowMask
+                del self.shadowMask
             except Exception:
-                continue
-
-            if self.remShadow:
-                try:
-                    self._SHW_mask(int(chunk))
-                    self.sonDat = self.sonDat * self.shadowMask
-                    del self.shadowMask
-                except Exception:
-                    pass
-
-            if str(img_prefix) == 'rect_wcp':
-                if self.egn:
-                    self._egn_wcp(int(chunk), sonMeta)
-                    if self.egn_stretch > 0:
-                        self._egnDoStretch()
-            else:
-                self._WCR_SRC(sonMeta)
-                if (not bool(getattr(self, 'rect_wcp', False))) and self.egn:
-                    self._egn()
-                    self.sonDat = np.nan_to_num(self.sonDat, nan=0)
-                    if self.egn_stretch > 0:
-                        self._egnDoStretch()
-
-            img = self._reserve_zero_for_nodata(self.sonDat, preserve_zeros=True)
-            img = self._prepare_export_uint16(img)
-            vals = img[img > 0]
-            if vals.size == 0:
-                continue
-
-            if vals.size > max_vals_per_chunk:
-                idx = np.linspace(0, vals.size - 1, num=max_vals_per_chunk, dtype=np.int64)
-                vals = vals[idx]
-
-            sampled_vals.append(vals.astype(np.float64, copy=False))
-
-        if len(sampled_vals) == 0:
-            return None
-
-        pooled = np.concatenate(sampled_vals)
-        lo = float(np.nanpercentile(pooled, 1.0))
-        hi = float(np.nanpercentile(pooled, 99.5))
-        med = float(np.nanpercentile(pooled, 50.0))
-
-        if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
-            lo = float(np.nanmin(pooled))
-            hi = float(np.nanmax(pooled))
+                pass
 
-        if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
-            return None
+        if str(img_prefix) == 'rect_wcp':
+            if self.egn:
+                self._egn_wcp(chunk, sonMeta)
+                if self.egn_stretch > 0:
+                    self._egnDoStretch()
+        else:
+            self._WCR_SRC(sonMeta)
+            if (not bool(getattr(self, 'rect_wcp', False))) and self.egn:
+                self._egn()
+                self.sonDat = np.nan_to_num(self.sonDat, nan=0)
+                if self.egn_stretch > 0:
+                    self._egnDoStretch()
 
-        bounds = (lo, hi)
-        self._set_rect_global_colormap_bounds(img_prefix, bounds, son=True)
-        if np.isfinite(med) and med > 0:
-            self._set_rect_global_target_median(img_prefix, med, son=True)
-        return bounds
+        img = self._reserve_zero_for_nodata(self.sonDat, preserve_zeros=True)
+        img = self._prepare_export_uint16(img)
+        return QuantileSketch().update(img[img > 0])
 
     #=======================================================================
     def _write_rect_geotiff(self, gtiff, data, epsg, transform, colormap=None):
         arr = np.asarray(data)
+        opts = geotiff_options(
+            getattr(self, 'rect_tiff_compression', GEOTIFF_COMPRESSION),
+            getattr(self, 'rect_tiff_level', GEOTIFF_LEVEL),
+            predictor=getattr(self, 'rect_tiff_predictor', True),
+            dtype=arr.dtype,
+            max_z_error=getattr(self, 'rect_lerc_max_z_error', 0.0),
+        )
 
         if arr.ndim == 2:
             with rasterio.open(
@@ -375,19 +421,14 @@ class rectObj(sonObj):
                 dtype=arr.dtype,
                 crs=epsg,
                 transform=transform,
-                compress='deflate',
-                zlevel=9,
-                predictor=2,
-                tiled=True,
-                blockxsize=256,
-                blockysize=256,
                 resampling=Resampling.bilinear,
+                **opts,
             ) as dst:
                 dst.nodata = 0
                 if colormap is not None and arr.dtype == np.uint8:
                     dst.write_colormap(1, colormap)
                 dst.write(arr, 1)
-            return
+            return os.path.getsize(gtiff)
 
         if arr.ndim == 3 and arr.shape[2] in [3, 4]:
             band_count = arr.shape[2]
@@ -401,22 +442,32 @@ class rectObj(sonObj):
                 dtype=arr.dtype,
                 crs=epsg,
                 transform=transform,
-                compress='deflate',
-                zlevel=9,
-                predictor=2,
-                tiled=True,
-                blockxsize=256,
-                blockysize=256,
                 photometric='RGB',
                 resampling=Resampling.bilinear,
+                **opts,
             ) as dst:
                 dst.nodata = 0
                 for band_idx in range(band_count):
                     dst.write(arr[:, :, band_idx], band_idx + 1)
-            return
+            return os.path.getsize(gtiff)
 
         raise ValueError(f'Unsupported rectified data shape: {arr.shape}')
 
+    #=======================================================================
+    def _submit_rect_geotiff(self, gtiff, data, epsg, transform, colormap=None, resize=False, son=True):
+        '''
+        Queue a rectified chunk on the background writer, followed by the
+        pixel size warp when `resize` is set.  The chunk task flushes the
+        writer before returning.
+        '''
+        def _write():
+            nbytes = self._write_rect_geotiff(gtiff, data, epsg, transform, colormap=colormap)
+            if resize:
+                self._pixresResize(gtiff, son=son)
+            return nbytes
+
+        self._tile_writer().submit(_write)
+
     ############################################################################
     # Smooth GPS trackpoint coordinates                                        #
     ############################################################################
@@ -608,9 +659,8 @@ class rectObj(sonObj):
         x_interp = splev(u_interp, tck) # Use u_interp to get smoothed x/y coordinates from spline
 
         u, indices, c = np.unique(u_interp, return_index= True,return_counts=True)
-        for val in zip(c, u, indices):
-            if val[0] > 1:
-                print(val)
+        for val in zip(c[c > 1], u[c > 1], indices[c > 1]):
+            print(val)
 
         # Store smoothed trackpoints in a dictionary
         smooth = {'chunk_id': dfOrig['chunk_id'],
@@ -812,7 +862,8 @@ class rectObj(sonObj):
     def _getRangeCoords(self,
                         flip = False,
                         filt = 25,
-                        cog = True):
+                        cog = True,
+                        sons = None):
         '''
         Humminbird SSS store one set geographic coordinates where each ping
         orriginates from (assuming GPS is located directly above sonar transducer).
@@ -828,6 +879,9 @@ class rectObj(sonObj):
         A spline is then fit to filtered range coordinates, the same as the trackpoints,
         to help ensure no pings overlapm, resulting in higher quality sonar imagery.
 
+        All beams in `sons` share the smoothed trackline, so their range
+        extents are stacked and computed, smoothed and reprojected together.
+
         ----------
         Parameters
         ----------
@@ -836,6 +890,12 @@ class rectObj(sonObj):
                           was facing backwards duing survey).
         filt : int : [Default=25]
             DESCRIPTION - Every `filt` ping will be used to fit a spline.
+        cog : bool : [Default=True]
+            DESCRIPTION - Use COG [True] or instrument heading [False] for
+                          ping bearing.
+        sons : list : [Default=None]
+            DESCRIPTION - Side-scan rectObj's (i.e. port and starboard) to
+                          process together.  If `None`, only self is processed.
 
         ----------------------------
         Required Pre-processing step
@@ -864,66 +924,55 @@ class rectObj(sonObj):
         range_ = 'range'
         chunk_id = 'chunk_id'
 
-        self._loadSonMeta() # Load ping metadata
-        sonMetaDF = self.sonMetaDF
+        if sons is None:
+            sons = [self]
 
-        # Get smoothed trackline
-        if not hasattr(self, 'smthTrk'):
-            self.smthTrk = pd.read_csv(self.smthTrkFile)
-        else:
-            pass
-        sDF = self.smthTrk
+        sides = []
+        for side, son in enumerate(sons):
+            son._loadSonMeta() # Load ping metadata
+            sonMetaDF = son.sonMetaDF
 
-        ########################
-        # Calculate ping bearing
-        # Determine ping bearing.  Ping bearings are perpendicular to COG.
-        if str(self.beamName).startswith('ss_port'):
-            rotate = -90  # Rotate COG by 90 degrees to the left
-        else:
-            rotate = 90 # Rotate COG by 90 degrees to the right
-        if flip: # Flip rotation factor if True
-            rotate *= -1
+            # Get smoothed trackline
+            if not hasattr(son, 'smthTrk'):
+                son.smthTrk = pd.read_csv(son.smthTrkFile)
+            else:
+                pass
+            sDF = son.smthTrk
 
-        # Calculate ping bearing and normalize to range 0-360
-        # cog = False
-        if cog:
-            sDF[ping_bearing] = (sDF['cog']+rotate) % 360
-        else:
-            sDF[ping_bearing] = (sDF['instr_heading']+rotate) % 360
-
-        ############################################
-        # Calculate range (in meters) for each chunk
-        # Calculate max range for each chunk to ensure none of the sonar image
-        ## is cut off due to changing the range setting during the survey.
-        # chunk = sDF.groupby(chunk_id) # Group dataframe by chunk_id
-
-        # Old method
-        # maxPing = chunk[ping_cnt].max() # Find max ping count for each chunk
-        # New method to find maxPing based on most numerous ping count
-        maxPing = []
-        pixM_all = []
-        for name, group in sDF.groupby(chunk_id):
-            rangeCnt = np.unique(group[ping_cnt], return_counts=True)
-            pingMaxi = np.argmax(rangeCnt[1])
-            maxPing.append(int(rangeCnt[0][pingMaxi]))
-
-            # Get pixM from sonMetaDF
-            pixM = sonMetaDF.loc[sonMetaDF['chunk_id']==name, 'pixM'] # Get pixel size for each chunk
-            # Find most common pixel size
-            if len(pixM.unique()) > 1:
-                pixM = pixM.mode()[0]
+            ########################
+            # Calculate ping bearing
+            # Determine ping bearing.  Ping bearings are perpendicular to COG.
+            if str(son.beamName).startswith('ss_port'):
+                rotate = -90  # Rotate COG by 90 degrees to the left
+            else:
+                rotate = 90 # Rotate COG by 90 degrees to the right
+            if flip: # Flip rotation factor if True
+                rotate *= -1
+
+            # Calculate ping bearing and normalize to range 0-360
+            if cog:
+                sDF[ping_bearing] = (sDF['cog']+rotate) % 360
             else:
-                pixM = pixM.iloc[0]
-            pixM_all.append(pixM)
+                sDF[ping_bearing] = (sDF['instr_heading']+rotate) % 360
 
+            ############################################
+            # Calculate range (in meters) for each chunk
+            # Calculate max range for each chunk to ensure none of the sonar image
+            ## is cut off due to changing the range setting during the survey.
+            # Most numerous ping count and most common pixM, computed for all
+            ## chunks at once
+            maxPing = son._chunkMode(sDF, chunk_id, ping_cnt)
+            pixM_all = son._chunkMode(sonMetaDF, chunk_id, 'pixM')
 
-        # Convert maxPing i to pd series
-        maxPing = pd.Series(maxPing)
+            # Calculate range in meters for each chunk
+            sDF[range_] = sDF[chunk_id].map(maxPing.astype(int) * pixM_all)
+            sDF['side'] = side
 
-        # pix_m = chunk['pix_m'].min() # Get pixel size for each chunk
-        # pix_m = self.pixM # Get pixel size for each chunk
-        for i in maxPing.index: # Calculate range (in meters) for each chunk
-            sDF.loc[sDF[chunk_id]==i, range_] = maxPing[i]* pixM_all[i] # Calculate range in meters for each chunk
+            sides.append(sDF)
+
+        # Stack all sides so the geometry is computed in one pass
+        sDF = pd.concat(sides)
+        del sides
 
         ##################################################
         # Calculate range extent coordinates for each ping
@@ -960,446 +1009,188 @@ class rectObj(sonObj):
         sDF[re] = e_smth
         sDF[rn] = n_smth
         sDF = sDF.dropna(subset=[lons, lats, range_, rlon, rlat, re, rn, ping_bearing]) # Keep rows with valid range geometry
-        self.smthTrk = sDF # Store df in class attribute
 
         ##########################################
         # Smooth and interpolate range coordinates
         if cog:
-            self._interpRangeCoords(filt)
-        else:
-            sDF = sDF[['record_num', 'chunk_id', 'ping_cnt', 'time_s', 'lons', 'lats', 'utm_es', 'utm_ns', 'instr_heading', 'cog', 'dep_m', 'range', 'range_lon', 'range_lat', 'range_e', 'range_n', ping_bearing, 'transect', 'pixM']].copy()
-            sDF.rename(columns={'lons': 'trk_lons', 'lats': 'trk_lats', 'utm_es': 'trk_utm_es', 'utm_ns': 'trk_utm_ns', 'cog': 'trk_cog', 'range_lat':'range_lats', 'range_lon':'range_lons', 'range_e':'range_es', 'range_n':'range_ns'}, inplace=True)
-            sDF['chunk_id_2'] = sDF.index.astype(int)
-
-            ###########################################
-            # Overwrite Trackline_Smth_son.beamName.csv
-            # outCSV = os.path.join(self.metaDir, "Trackline_Smth_"+self.beamName+".csv")
-            outCSV = self.smthTrkFile
-            sDF.to_csv(outCSV, index=True, float_format='%.14f')
-
-        # sys.exit()
-        gc.collect()
-        self._pickleSon()
-        return #self
-
-    #===========================================
-    def _interpRangeCoords(self,
-                           filt = 25):
-        '''
-        This function fits a spline to the range extent coordinates.  Before fitting
-        the spline, overlapping pings are identified and removed to ensure spline
-        does not have any loops.  A spline is then fit for each individual chunk
-        to avoid undesirable rectification effects caused by changing the range
-        during a survey.  The spline is used to reinterpolate range extent
-        coordinates, ensuring no overlap between pings.
-
-        ----------
-        Parameters
-        ----------
-        filt : int : [Default=25]
-            DESCRIPTION - Every `filt` ping will be used to fit a spline.
-
-        ----------------------------
-        Required Pre-processing step
-        ----------------------------
-        Called from self._interpRangeCoords()
-
-        -------
-        Returns
-        -------
-        A Pandas dataframe stored in self.rangeExt with smoothed trackline and
-        range extent coordinates.  This DataFrame is exported to .csv and overwrites
-        Trackline_Smth_BXXX.csv.
-
-        --------------------
-        Next Processing Step
-        --------------------
-        Returns smoothed coordinates to self._interpRangeCoords().
-        '''
-        # Store necessary dataframe column names in variables
-        rlon = 'range_lon'
-        rlons = rlon+'s'
-        rlat = 'range_lat'
-        rlats = rlat+'s'
-        re = 'range_e'
-        res = re+'s'
-        rn = 'range_n'
-        rns = rn+'s'
-
-        sDF = self.smthTrk # Load smoothed trackline coordinates
-        rDF = sDF.copy() # Make a copy to work on
-
-        rs_chunks = []
+            rsDF = sDF[['record_num', 'chunk_id', 'ping_cnt', 'time_s', 'lons', 'lats', 'utm_es', 'utm_ns', 'instr_heading', 'cog', 'dep_m', 'transect', 'pixM']].copy()
+            rsDF.rename(columns={'lons': 'trk_lons', 'lats': 'trk_lats', 'utm_es': 'trk_utm_es', 'utm_ns': 'trk_utm_ns', 'cog': 'trk_cog'}, inplace=True)
 
-        # Work on one chunk at a time
-        for chunk, chunkDF in rDF.groupby('chunk_id'):
-            chunkDF.reset_index(drop=True, inplace=True)
+            rsDF['range_lons'], rsDF['range_lats'], rsDF['range_cog'] = self._interpRangeCoords(sDF, filt)
 
-            # Extract every `filt` recording, including last value
-            last = chunkDF.iloc[-1].to_frame().T
-            chunkDF = chunkDF.iloc[::filt]
-            chunkDF = pd.concat([chunkDF, last]).reset_index(drop=True)
-
-            if len(chunkDF) == 0:
-                continue
-
-            idx = chunkDF.index.tolist() # Store ping index in list
-            maxIdx = max(idx) # Find last record index value
-
-            drop = np.empty((len(chunkDF)), dtype=bool) # Bool numpy array to flag which sonar records overlap and should be dropped
-            drop[:] = False # Prepopulate array w/ `False` (i.e. False==don't drop)
-
-            #########################################
-            # Find and drop overlapping sonar records
-            for i in idx: # Iterate each ping if filtered dataframe
-                if i == maxIdx: # Break loop once we reach the last ping
-                    break
-                else:
-                    if drop[i] != True: # If current ping flagged to drop, don't need to check it
-                        dropping = self._checkPings(i, chunkDF) # Find subsequent sonar records that overlap current record
-                        if maxIdx in dropping.keys(): # Make sure we don't drop last ping in chunk
-                            del dropping[maxIdx]
-                            dropping[i]=True # Drop current ping instead
-                        else:
-                            pass
-                        if len(dropping) > 0: # We have overlapping sonar records we need to drop
-                            for k, v in dropping.items(): # Flag records to drop
-                                drop[k] = True
-                        else:
-                            pass
-                    else:
-                        pass
-
-            ######################################################
-            # Drop all overlapping sonar records for current chunk
-            chunkDF = chunkDF[~drop]
-
-            rchunkDF = chunkDF.copy() # Make copy of df w/ no overlapping sonar records for current chunk
-            schunkDF = sDF[sDF['chunk_id']==chunk].copy() # Get original df for current chunk
-
-            if len(rchunkDF) == 0:
-                continue
-
-            #################################################
-            # Smooth and interpolate range extent coordinates
-            smthChunk = self._interpTrack(df=rchunkDF, dfOrig=schunkDF, xlon=rlon,
-                                          ylat=rlat, xutm=re, yutm=rn, filt=0, deg=1)
-
-            if smthChunk is not None and len(smthChunk) > 0:
-                if 'range_lons' not in smthChunk.columns and 'range_lon' in smthChunk.columns:
-                    smthChunk = smthChunk.rename(columns={'range_lon': 'range_lons'})
-                if 'range_lats' not in smthChunk.columns and 'range_lat' in smthChunk.columns:
-                    smthChunk = smthChunk.rename(columns={'range_lat': 'range_lats'})
-
-                required_cols = {'record_num', 'range_lons', 'range_lats'}
-                if not required_cols.issubset(smthChunk.columns):
-                    if {'record_num', 'range_lon', 'range_lat'}.issubset(schunkDF.columns):
-                        smthChunk = schunkDF[['record_num', 'range_lon', 'range_lat', 'cog']].copy()
-                        smthChunk.rename(columns={'range_lon': 'range_lons', 'range_lat': 'range_lats'}, inplace=True)
-                    else:
-                        continue
-
-                rs_chunks.append(smthChunk.copy())
-
-        ##################################################
-        # Join smoothed trackline to smoothed range extent
-        # sDF = sDF[['record_num', 'chunk_id', 'ping_cnt', 'time_s', 'pix_m', 'lons', 'lats', 'utm_es', 'utm_ns', 'cog', 'dep_m']].copy()
-        sDF = sDF[['record_num', 'chunk_id', 'ping_cnt', 'time_s', 'lons', 'lats', 'utm_es', 'utm_ns', 'instr_heading', 'cog', 'dep_m', 'transect', 'pixM']].copy()
-        sDF.rename(columns={'lons': 'trk_lons', 'lats': 'trk_lats', 'utm_es': 'trk_utm_es', 'utm_ns': 'trk_utm_ns', 'cog': 'trk_cog'}, inplace=True)
-        if len(rs_chunks) == 0:
-            src_df = self.smthTrk.copy()
-
-            lon_src = None
-            for candidate in ['range_lons', 'range_lon', 'lons', 'trk_lons']:
-                if candidate in src_df.columns:
-                    lon_src = candidate
-                    break
-
-            lat_src = None
-            for candidate in ['range_lats', 'range_lat', 'lats', 'trk_lats']:
-                if candidate in src_df.columns:
-                    lat_src = candidate
-                    break
-
-            cog_src = None
-            for candidate in ['range_cog', 'cog', 'trk_cog']:
-                if candidate in src_df.columns:
-                    cog_src = candidate
-                    break
-
-            rsDF = sDF[['record_num', 'trk_lons', 'trk_lats', 'trk_cog']].copy()
-            rsDF.rename(columns={'trk_lons': 'range_lons', 'trk_lats': 'range_lats', 'trk_cog': 'range_cog'}, inplace=True)
-
-            if lon_src is not None:
-                lon_map = src_df[['record_num', lon_src]].drop_duplicates(subset=['record_num'], keep='last').set_index('record_num')
-                rsDF = rsDF.set_index('record_num')
-                rsDF['range_lons'] = lon_map[lon_src]
-                rsDF = rsDF.reset_index()
-
-            if lat_src is not None:
-                lat_map = src_df[['record_num', lat_src]].drop_duplicates(subset=['record_num'], keep='last').set_index('record_num')
-                rsDF = rsDF.set_index('record_num')
-                rsDF['range_lats'] = lat_map[lat_src]
-                rsDF = rsDF.reset_index()
-
-            if cog_src is not None:
-                cog_map = src_df[['record_num', cog_src]].drop_duplicates(subset=['record_num'], keep='last').set_index('record_num')
-                rsDF = rsDF.set_index('record_num')
-                rsDF['range_cog'] = cog_map[cog_src]
-                rsDF = rsDF.reset_index()
+            # Calculate easting/northing for smoothed range extent
+            e_smth, n_smth = self.trans(rsDF['range_lons'].to_numpy(), rsDF['range_lats'].to_numpy())
+            rsDF['range_es'] = e_smth # Store smoothed easting range extent in rsDF
+            rsDF['range_ns'] = n_smth # Store smoothed northing range extent in rsDF
+            rsDF = rsDF.set_index('record_num')
         else:
-            rsDF = pd.concat(rs_chunks, axis=0).reset_index(drop=True)
-            rsDF.rename(columns={'cog': 'range_cog'}, inplace=True)
-            rsDF = rsDF[['record_num', 'range_lons', 'range_lats', 'range_cog']]
-
-        rsDF = sDF.set_index('record_num').join(rsDF.set_index('record_num'))
+            rsDF = sDF[['record_num', 'chunk_id', 'ping_cnt', 'time_s', 'lons', 'lats', 'utm_es', 'utm_ns', 'instr_heading', 'cog', 'dep_m', 'range', 'range_lon', 'range_lat', 'range_e', 'range_n', ping_bearing, 'transect', 'pixM']].copy()
+            rsDF.rename(columns={'lons': 'trk_lons', 'lats': 'trk_lats', 'utm_es': 'trk_utm_es', 'utm_ns': 'trk_utm_ns', 'cog': 'trk_cog', 'range_lat':'range_lats', 'range_lon':'range_lons', 'range_e':'range_es', 'range_n':'range_ns'}, inplace=True)
+            rsDF['chunk_id_2'] = rsDF.index.astype(int)
 
-        # Calculate easting/northing for smoothed range extent
-        e_smth, n_smth = self.trans(rsDF[rlons].to_numpy(), rsDF[rlats].to_numpy())
-        rsDF[res] = e_smth # Store smoothed easting range extent in rsDF
-        rsDF[rns] = n_smth # Store smoothed northing range extent in rsDF
-
-        ###########################################
-        # Overwrite Trackline_Smth_son.beamName.csv
-        # outCSV = os.path.join(self.metaDir, "Trackline_Smth_"+self.beamName+".csv")
-        outCSV = self.smthTrkFile
-        rsDF.to_csv(outCSV, index=True, float_format='%.14f')
-
-        self.rangeExt = rsDF # Store smoothed range extent in rectObj
+        ##########################################
+        # Split sides and overwrite Trackline_Smth_son.beamName.csv
+        side = sDF['side'].to_numpy()
+        for i, son in enumerate(sons):
+            son.smthTrk = sDF[side == i].drop(columns='side') # Store df in class attribute
+            outDF = rsDF[side == i]
+            outDF.to_csv(son.smthTrkFile, index=True, float_format='%.14f')
+            if cog:
+                son.rangeExt = outDF # Store smoothed range extent in rectObj
+            son._saveSon()
+
+        del sDF, rsDF
+        gc.collect()
         return #self
 
-    #===========================================================================
-    def _checkPings(self,
-                    i,
-                    df):
-        '''
-        On sinuous survey transects (i.e. river bends), it is possible for range
-        extent coordinates to overlap with each other.  Overlapping sonar records
-        will produce issues during the georectification process and need to be
-        removed.  This function checks subsequent sonar records from the current
-        index i and determines if the sonar records overlap with the current record.
-        If they do, they are flagged for removal.
-
-        ----------
-        Parameters
-        ----------
-        i : int
-            DESCRIPTION - Current index of ping which will be compared
-                          against subsequent sonar records.
-        df : Pandas DataFrame
-            DESCRIPTION - DataFrame containing range extent coordinates of sonar
-                          records.
-
-        ----------------------------
-        Required Pre-processing step
-        ----------------------------
-        Called from self._interpRangeCoords()
-
-        -------
-        Returns
-        -------
-        A dictionary containing dataframe index as key and bool value indicating
-        if dataframe ping should be dropped or not.
-
-        --------------------
-        Next Processing Step
-        --------------------
-        Returns dictionary to self._interpRangeCoords()
+    #===========================================
+    def _chunkMode(self, df, chunkCol, valCol):
         '''
-        range = 'range' # range distance
-        x = 'range_e' # range easting extent coordinate
-        y = 'range_n' # range northing extent coordinate
-        dThresh = 'distThresh' # max distance to check for overlap
-        tDist = 'track_dist' # straight line distance from ping i to subsequent sonar records
-        toCheck = 'toCheck' # Flag indicating subsequent ping is close enough to i to check for potential overlap
-        toDrop = 'toDrop' # Flag indicating ping overlaps with i
-        es = 'utm_es' #Trackline smoothed easting
-        ns = 'utm_ns' #Trackline smoothed northing
-
-        ###########
-        # Filter df
-        rowI = df.loc[i] # Get current df row to compare against
-        df = df.copy() # Make copy of dataframe
-        df = df.iloc[df.index > i] # Filter out first (i.e. current) row
-
-        #########################
-        # Calc distance threshold
-        ## We only need to check sonar records which are close enough to the
-        ## current ping to potentially overlap.
-        df[dThresh] = rowI[range] + df[range]
-
-        # Calc straight line distance along the track from current ping
-        ## to all other sonar records.  It is impossible for overlap to occur for
-        ## subsequent sonar records to overlap current ping if they are
-        ## further then the threshold distance.
-        rowIx, rowIy = rowI[x], rowI[y] # Get current ping range extent coordinates
-        # dfx, dfy = df[x].to_numpy(), df[y].to_numpy() # Get subsequent ping range extent coordinates
-        dfx, dfy = df[x].values.astype(np.float64), df[y].values.astype(np.float64)
-        dist = self._getDist(rowIx, rowIy, dfx, dfy) # Calculate distance from current ping
-
-        # Check if dist < distThresh. True==Check for possible overlap; False==No need to check
-        df[tDist] = dist # Store distance calculation
-        df.loc[df[tDist] <= df[dThresh], toCheck] = True # Check for overlap
-        df.loc[df[tDist] > df[dThresh], toCheck] = False # Don't check for overlap
-        df[toCheck]=df[toCheck].astype(bool) # Make sure toCheck column is type bool
-
-        # Determine which sonar records overlap with current ping
-        line1 = ((rowI[es],rowI[ns]), (rowI[x], rowI[y])) # Store current ping coordinates as tuple
-        dfFilt = df[df[toCheck]==True].copy() # Get sonar records that could overlap with current
-        dropping = {} # Dictionary to store ping index to drop
-        for i, row in dfFilt.iterrows(): # Iterate subsequent sonar records
-            line2=((row[es], row[ns]), (row[x], row[y])) # Store ping coordinates to check in tuple
-            isIntersect = self._lineIntersect(line1, line2, row[range]) # Determine if line1 intersects line2
-            dfFilt.loc[i, toDrop] = isIntersect # Store bool in dataframe (don't need this but keeping in case)
-            if isIntersect == True: # If line2 intersects line1, flag ping for dropping
-                dropping[i]=isIntersect
-
-        return dropping
-
-    #===========================================================================
-    def _getDist(self,
-                 aX,
-                 aY,
-                 bX,
-                 bY):
+        Most common `valCol` value in each chunk (smallest value on ties),
+        returned as a Series indexed by chunk id.
         '''
-        Determine distance between two points `a` and `b`.  `a` and `b` can also
-        be numpy arrays of coordinates.  This function is used to calculate distance
-        between a single point `a` and a series of points `b` stored in numpy arrays.
-
-        ----------
-        Parameters
-        ----------
-        aX : float or numpy array of floats
-            DESCRIPTION - X coordinate of point `a`
-        aY : float or numpy array of floats
-            DESCRIPTION - Y coordinate of point `a`
-        bX : float or numpy array of floats
-            DESCRIPTION - X coordinate of point `b`
-        bY : float or numpy array of floats
-            DESCRIPTION - Y coordinate of point `b`
+        cnt = df.groupby([chunkCol, valCol]).size().reset_index(name='n')
+        cnt = cnt.sort_values([chunkCol, 'n', valCol], ascending=[True, False, True])
+        cnt = cnt.drop_duplicates(subset=[chunkCol], keep='first')
+        return cnt.set_index(chunkCol)[valCol]
 
-        ----------------------------
-        Required Pre-processing step
-        ----------------------------
-        Called from self._checkPings() or self._lineIntersect()
-
-        -------
-        Returns
-        -------
-        A numpy array with distances calculated
-
-        --------------------
-        Next Processing Step
-        --------------------
-        Returns numpy array to self._checkPings() or self._lineIntersect()
+    #===========================================
+    def _interpRangeCoords(self,
+                           sDF,
+                           filt = 25):
         '''
-        dist = np.sqrt( (bX - aX)**2 + (bY - aY)**2) # Calculate distance
-        return dist
+        This function fits a linear spline to the range extent coordinates of
+        each individual chunk (and side) to avoid undesirable rectification
+        effects caused by changing the range during a survey.  Every `filt`
+        ping, plus the last ping, of a chunk is used as a knot and the range
+        extent of every ping is reinterpolated along the spline, the same as
+        self._interpTrack(df, dfOrig, filt=0, deg=1) called on each chunk.
 
-    #===========================================================================
-    def _lineIntersect(self,
-                       line1,
-                       line2,
-                       range):
-        '''
-        Determines if two lines intersect.  Helper functions are included in this
-        method to aid in computation:
-
-        self._lineIntersect.line() : function
-            DESCRIPTION - Determines coeficients describing line connecting two
-                          points.
-        self._lineIntersect.intersection() : function
-            DESCRIPTION - Determines if two (infinite) lines intersect and returns
-                          x, y coordinates of the intersection.
-        self._lineIntersect.isBetween() : function
-            DESCRIPTION - Determines if intersecting point falls on the line
-                          segments.
+        The knots of all chunks are concatenated and every ping is
+        interpolated between its chunk's bracketing knots in one pass, so no
+        spline is fit per chunk.
 
         ----------
         Parameters
         ----------
-        line1 : tuple
-            DESCRIPTION - Two sets of points describing a line ((x1, y1), (x2, y2))
-        line2 : tuple
-            DESCRIPTION - Two sets of points describing a line ((x1, y1), (x2, y2))
-        range : float
-            DESCRIPTION - Range (length) of line2
+        sDF : DataFrame
+            DESCRIPTION - Smoothed trackline with range extent coordinates.
+                          Chunks are grouped by `side` and `chunk_id`.
+        filt : int : [Default=25]
+            DESCRIPTION - Every `filt` ping will be used to fit a spline.
 
         ----------------------------
         Required Pre-processing step
         ----------------------------
-        Called from self._checkPings()
+        Called from self._getRangeCoords()
 
         -------
         Returns
         -------
-        Bool flag indicating if line2 intersects line1
+        Smoothed range extent longitude, latitude and COG as numpy arrays
+        aligned with rows of `sDF`.
 
         --------------------
         Next Processing Step
         --------------------
-        Returns flag to self._checkPings()
+        Returns smoothed coordinates to self._getRangeCoords().
         '''
+        # Order rows by chunk, keeping ping order within each chunk
+        group = ['side', 'chunk_id'] if 'side' in sDF.columns else ['chunk_id']
+        rank = sDF.groupby(group, sort=True).ngroup().to_numpy()
+        order = np.argsort(rank, kind='stable')
+        rank = rank[order]
+
+        x = sDF['range_lon'].to_numpy(dtype='float64')[order]
+        y = sDF['range_lat'].to_numpy(dtype='float64')[order]
+        time_s = sDF['time_s'].to_numpy(dtype='float64')[order]
+        record = sDF['record_num'].to_numpy(dtype='float64')[order]
+        trk_cog = sDF['cog'].to_numpy(dtype='float64')[order]
+
+        n = len(rank)
+        nChunk = int(rank[-1]) + 1 if n > 0 else 0
+        start = np.searchsorted(rank, np.arange(nChunk), side='left')
+        size = np.searchsorted(rank, np.arange(nChunk), side='right') - start
+        pos = np.arange(n) - start[rank]
+        last = pos == size[rank] - 1
+
+        # Force unique parameter by multiplying time ellapsed and record number
+        ## in chunks with duplicate times
+        dups = pd.DataFrame({'c': rank, 't': time_s}).duplicated(keep=False).to_numpy()
+        dups = np.bincount(rank, weights=dups, minlength=nChunk) > 0
+        t = np.where(dups[rank], time_s * record, time_s)
+
+        # Extract every `filt` ping, including last, then drop duplicate and
+        ## non-finite coordinates
+        knot = np.flatnonzero((pos % filt == 0) | last)
+        dup = pd.DataFrame({'c': rank[knot], 'x': x[knot], 'y': y[knot]}).duplicated().to_numpy()
+        knot = knot[~dup]
+        knot = knot[np.isfinite(x[knot]) & np.isfinite(y[knot])]
+
+        def _increasing(t):
+            # Chunks where the finite parameter values are strictly increasing
+            k = knot[np.isfinite(t[knot])]
+            kr = rank[k]
+            same = kr[1:] == kr[:-1]
+            bad = np.bincount(kr[1:][same & (np.diff(t[k]) <= 0)], minlength=nChunk) > 0
+            return ~bad
+
+        # Time is messed up (negative time offset), parameterize with record
+        ## num instead
+        ok = _increasing(t)
+        t = np.where(ok[rank], t, record)
+        ok = _increasing(t)
+
+        # Need at least two knots per chunk, else fall back to unsmoothed
+        ## coordinates
+        knot = knot[np.isfinite(t[knot])]
+        knot = knot[ok[rank[knot]]]
+        kr = rank[knot]
+        ok &= np.bincount(kr, minlength=nChunk) >= 2
+        knot = knot[ok[kr]]
+        kr = rank[knot]
+
+        xs = x.copy()
+        ys = y.copy()
+        cog = trk_cog.copy()
+
+        if len(knot) > 0:
+            tk = t[knot]
+            kStart = np.searchsorted(kr, np.arange(nChunk), side='left')
+            kEnd = np.searchsorted(kr, np.arange(nChunk), side='right')
+            fit = np.flatnonzero(ok[rank])
+            fr = rank[fit]
+
+            # Normalize parameter to [0, 1] per chunk and offset by chunk so
+            ## all knots can be searched at once
+            t0 = np.zeros(nChunk)
+            span = np.ones(nChunk)
+            t0[ok] = tk[kStart[ok]]
+            span[ok] = tk[kEnd[ok]-1] - t0[ok]
+            key = kr * 4.0 + (tk - t0[kr]) / span[kr]
+            u = fr * 4.0 + np.clip((t[fit] - t0[fr]) / span[fr], -1.0, 2.0)
+
+            # Bracketing knots, extrapolating past the chunk's first/last knot
+            j = np.searchsorted(key, u, side='right')
+            j = np.clip(j, kStart[fr]+1, kEnd[fr]-1)
+            w = (t[fit] - tk[j-1]) / (tk[j] - tk[j-1])
+            xs[fit] = x[knot][j-1] + w * (x[knot][j] - x[knot][j-1])
+            ys[fit] = y[knot][j-1] + w * (y[knot][j] - y[knot][j-1])
+
+            # Calculate COG from smoothed range extent, duplicating the
+            ## second to last value for the last ping of each chunk
+            if n > 1:
+                brng = self._getBearing(pd.DataFrame({'lons': xs, 'lats': ys}))
+                brng = np.append(brng, brng[-1])
+                prev = np.flatnonzero(last)
+                brng[prev] = brng[prev-1]
+                cog[fit] = brng[fit]
+
+        # Return in original row order
+        out = np.empty((3, n))
+        out[:, order] = np.vstack((xs, ys, cog))
+        return out[0], out[1], out[2]
 
-        #https://stackoverflow.com/questions/20677795/how-do-i-compute-the-intersection-point-of-two-lines
-        def line(p1, p2):
-            # Find general equation (normal form) coeficients to describe a line
-            ## connecting two points: Ay + Bx = C
-            A = (p1[1] - p2[1])
-            B = (p2[0] - p1[0])
-            C = (p1[0]*p2[1] - p2[0]*p1[1])
-            return A, B, -C
-
-        def intersection(L1, L2):
-            # Following Cramer's rules
-            D  = L1[0] * L2[1] - L1[1] * L2[0] # Determinant using x, y values
-            Dx = L1[2] * L2[1] - L1[1] * L2[2] # Determinant using x, c values
-            Dy = L1[0] * L2[2] - L1[2] * L2[0] # Determinant using y, c values
-            if D != 0: # Check if divisor == 0
-                x=Dx/D
-                y=Dy/D
-                return x,y # Coordinate of intersection
-            else:
-                return False # No intersection found
-
-        def isBetween(line1, line2, c):
-            ax, ay = line1[0][0], line1[0][1] # Get x,y for line1
-            bx, by = line1[1][0], line2[1][1] # Get x,y for line2
-            cx, cy = c[0], c[1] # Get x,y for intersection
-            xIntersect=yIntersect=False # Set flags
-
-            # Check if cx,cy falls between either lines coordinates with a small
-            ## buffer of +-5.  If it does, we will need to check distance between
-            ## line2 origin and (cx,cy).
-            if (cx >= min(ax,bx)-5) and (cx <= max(ax,bx)+5) and \
-               (cy >= min(ay,by)-5) and (cy <= max(ay,by)+5):
-               checkDist = True
-            else:
-               checkDist = isIntersect = False
-
-            # Check distance between line2 origin and (cx,cy). If the distance is
-            ## shorter then the range, then intersecting point falls on line
-            ## segments and the two lines do intersect.
-            if checkDist is True:
-                x,y = line2[0][0], line2[0][1]
-                dist = self._getDist(x, y, cx, cy)
-                if range < dist:
-                    isIntersect = False
-                else:
-                    isIntersect = True
-
-            return isIntersect
-
-        L1 = line(line1[0], line1[1]) # Get coefficients for line1
-        L2 = line(line2[0], line2[1]) # Get coefficients for line1
-        c = intersection(L1, L2) # Determine if infinite lines could intersect
-        if c is True:
-            I = isBetween(line1, line2, c) # Determine if intersect occurs on line segments
-        else:
-            I = False
-        return I
-    
     ############################################################################
     # Rectify sonar imagery - Ping-wise (heading)                              #
     ############################################################################
@@ -1449,7 +1240,9 @@ class rectObj(sonObj):
         t3 = round(time.time() - start_time, ndigits=1)
         # print("Chunk {}: {} - {} - {}".format(chunk, t1, t2, t3))
         # return dfAll
-        return
+
+        # Wait for this chunk's GeoTIFFs; returns encode stats for the progress line
+        return self._tile_writer().flush()
     
     #===========================================================================
     def _calcSonReturnCoords(self, row, heading):
@@ -1965,30 +1758,15 @@ class rectObj(sonObj):
                 if apply_post_rect_colormap:
                     sonRect_raw16 = self._match_rect_chunk_global_median(sonRect_raw16, imgOutPrefix, son=son)
                 if apply_post_rect_colormap:
-                    use_uint8_rgb = self._export_colormap_as_uint8()
-                    if source_scale_bounds is not None:
-                        norm_data = self._normalize_with_bounds(sonRect_raw16, source_scale_bounds[0], source_scale_bounds[1])
-                        cmap = plt.get_cmap(self.son_colorMap_name)(norm_data)
-                        if use_uint8_rgb:
-                            sonRect_out = np.clip(cmap[:, :, :3] * 255.0, 0, 255).astype(np.uint8)
-                        else:
-                            sonRect_out = np.clip(cmap[:, :, :3] * 65535.0, 0, 65535).astype(np.uint16)
-                        valid_mask = sonRect_raw16 > 0
-                        sonRect_out[valid_mask] = np.maximum(sonRect_out[valid_mask], 1)
-                    else:
-                        sonRect_out = self._colorize_pre_normalized_uint16(sonRect_raw16, self.son_colorMap_name, rgb_uint8=use_uint8_rgb)
+                    sonRect_out, palette = self._colorize_rect_uint16(sonRect_raw16, source_scale_bounds)
                 else:
-                    sonRect_out = sonRect_raw16
-                self._write_rect_geotiff(gtiff, sonRect_out, epsg, transform, colormap=None)
+                    sonRect_out, palette = sonRect_raw16, None
             else:
                 sonRect_out = np.clip(sonRect, 0, 255).astype(np.uint8)
-                colormap = self.son_colorMap if son else None
-                self._write_rect_geotiff(gtiff, sonRect_out, epsg, transform, colormap=colormap)
+                palette = self.son_colorMap if son else None
 
-            #############
-            # Do resizing
-            if do_resize:
-                self._pixresResize(gtiff)
+            # Write (and resize) in the background
+            self._submit_rect_geotiff(gtiff, sonRect_out, epsg, transform, colormap=palette, resize=do_resize)
 
         return df
 
@@ -2120,10 +1898,12 @@ class rectObj(sonObj):
 
     def _exportTrkShp(self,
                       wgs=False,
+                      vector_format='shp',
                       ):
         
         '''
-        
+        Export smoothed trackline/range extent points for every ping.  Point
+        geometries are built in bulk and written with a single call.
         '''
 
         # Create output directory if it doesn't exist
@@ -2139,15 +1919,11 @@ class rectObj(sonObj):
         # Use WGS 1984 coordinates and set variables as needed
         if wgs is True:
             epsg = self.humDat['wgs']
-            xRange = 'range_lons'
-            yRange = 'range_lats'
             xTrk = 'trk_lons'
             yTrk = 'trk_lats'
         ## Use projected coordinates and set variables as needed
         else:
             epsg = self.humDat['epsg']
-            xRange = 'range_es'
-            yRange = 'range_ns'
             xTrk = 'trk_utm_es'
             yTrk = 'trk_utm_ns'
 
@@ -2156,15 +1932,14 @@ class rectObj(sonObj):
         trkMeta = self._sanitizeProjectedTrackMeta(trkMeta, wgs=wgs)
 
         # Create geodataframe
-        gdf = gpd.GeoDataFrame(
-            trkMeta, geometry=gpd.points_from_xy(trkMeta[xTrk], trkMeta[yTrk], crs=epsg)
-        )
-        del trkMeta
-
-        # Save to shp
-        trkMetaShp = os.path.basename(trkMetaFile).replace('csv', 'shp')
-        trkMetaShp = os.path.join(outDir, trkMetaShp)
-        gdf.to_file(trkMetaShp)
+        pnts = shapely.points(trkMeta[xTrk].to_numpy(dtype='float64'), trkMeta[yTrk].to_numpy(dtype='float64'))
+        gdf = gpd.GeoDataFrame(trkMeta, geometry=pnts, crs=epsg)
+        del trkMeta, pnts
+
+        # Save to vector file
+        trkMetaShp = os.path.basename(trkMetaFile).replace('.csv', '')
+        trkMetaShp = self._vectorOutFile(os.path.join(outDir, trkMetaShp), vector_format)
+        gdf.to_file(trkMetaShp, driver=self._vectorDriver(vector_format))
         del trkMetaFile        
 
         return
@@ -2228,8 +2003,15 @@ class rectObj(sonObj):
     def _exportCovShp(self,
                       dissolve=False,
                       filt=10,
-                      wgs=False
+                      wgs=False,
+                      vector_format='shp',
                       ):
+        '''
+        Export one coverage polygon per chunk.  Polygons for all chunks are
+        built at once from the smoothed trackline/range extent (see
+        funcs_spatial.chunk_footprints()), or reused from the persisted chunk
+        index when exporting projected coordinates.
+        '''
         
         beam = self.beamName
         
@@ -2240,6 +2022,14 @@ class rectObj(sonObj):
         except:
             pass
 
+        # Reuse persisted chunk footprints when available
+        if not wgs:
+            gdf = load_chunk_index(self.metaDir, beam)
+            if gdf is not None:
+                gdf = gdf[['chunk_id', 'geometry']]
+                self._saveCovShp(gdf, dissolve, vector_format)
+                return
+
         # Use WGS 1984 coordinates and set variables as needed
         if wgs is True:
             epsg = self.humDat['wgs']
@@ -2255,89 +2045,30 @@ class rectObj(sonObj):
             xTrk = 'trk_utm_es'
             yTrk = 'trk_utm_ns'
 
-        # max chunks
-        chunkMax = self.chunkMax
-
-        # Get df's
-        # df1 = pd.read_csv(covFiles[0])
-        # df2 = pd.read_csv(covFiles[1])
-
-        # # Filter
-        # if filt > 0:
-        #     df1 = df1[::filt]
-        #     df2 = df2[::filt]
-
-        # dfs = [df1, df2]
-
-        df1 = pd.read_csv(self.smthTrkFile)
-        df1 = self._sanitizeProjectedTrackMeta(df1, wgs=wgs)
-        dfs = [df1]
-
-        filt = 0
-
-        # Iterate chunks
-        for chunk in range(0, chunkMax+1):
-            lat_list = []
-            lon_list = []
-
-            # Iterate dfs
-            for df in dfs:
-                # Get chunk
-                isChunk = df['chunk_id'] == chunk
-                df = df[isChunk].reset_index()
-
-                if len(df) == 0:
-                    continue
-
-                # Get last row
-                dfLast = df.iloc[-1]
-
-                if filt > 0:
-                    df = df[::filt]
-                    df = pd.concat([df, dfLast])
+        df = pd.read_csv(self.smthTrkFile)
+        df = self._sanitizeProjectedTrackMeta(df, wgs=wgs)
 
-                # if 'lat_list' not in locals():
-                #     lat_list = df[yRange].tolist()
-                #     lon_list = df[xRange].tolist()
-                # else:
-                #     lat_list += df[yRange].tolist()[::-1] #reverse order
-                #     lon_list += df[xRange].tolist()[::-1]
+        # Build all chunk polygons at once
+        gdf = chunk_footprints(df, xRange, yRange, xTrk, yTrk, crs=epsg)
+        del df
 
-                lat_list = df[yRange].tolist()
-                lon_list = df[xRange].tolist()
-
-                lat_list += df[yTrk].tolist()[::-1]
-                lon_list += df[xTrk].tolist()[::-1]
-
-                del df
-
-            if len(lat_list) < 3 or len(lon_list) < 3:
-                continue
-
-            # Create polygon from points
-            chunk_geom = Polygon(zip(lon_list, lat_list))
-            chunk_geom = gpd.GeoDataFrame(index=[chunk], crs=epsg, geometry=[chunk_geom])
-            del lat_list, lon_list
-
-            # # Do buffer to help fix geometry issues
-            # chunk_geom['geometry'] = chunk_geom.buffer(10, join_style=2)
-            # chunk_geom['geometry'] = chunk_geom.buffer(-10, join_style=2)
-
-
-            # Append to final geodataframe
-            if 'gdf' not in locals():
-                gdf = chunk_geom.copy()
-            else:
-                gdf = pd.concat([gdf, chunk_geom])
-            del chunk_geom
-
-        if 'gdf' not in locals() or len(gdf) == 0:
+        if len(gdf) == 0:
             return
 
-        gdf['chunk_id'] = gdf.index
+        gdf = gdf[['chunk_id', 'geometry']]
 
         # gdf['geometry'] = gdf.buffer(10, join_style=2)
 
+        self._saveCovShp(gdf, dissolve, vector_format)
+        del gdf
+
+        return
+
+    #===========================================================================
+    def _saveCovShp(self, gdf, dissolve=False, vector_format='shp'):
+        '''
+        Optionally dissolve chunk coverage polygons and save to vector file.
+        '''
         if dissolve:
             try:
                 gdf = gdf.dissolve()
@@ -2347,13 +2078,32 @@ class rectObj(sonObj):
 
         # gdf['geometry'] = gdf.buffer(-10, join_style=2)
 
-        # Save to shapefile
+        # Save to vector file
         projName = os.path.basename(self.projDir)
-        outFile = os.path.join(self.metaDir, 'shapefiles', projName+"_"+beam+"_coverage.shp")
-        gdf.to_file(outFile)
-        del gdf
+        outFile = os.path.join(self.metaDir, 'shapefiles', projName+"_"+self.beamName+"_coverage")
+        outFile = self._vectorOutFile(outFile, vector_format)
+        gdf.to_file(outFile, driver=self._vectorDriver(vector_format))
 
         return
+
+    #===========================================================================
+    def _vectorDriver(self, vector_format='shp'):
+        '''
+        OGR driver name for vector exports: 'shp', 'gpkg' or 'fgb'.
+        '''
+        drivers = {'shp': 'ESRI Shapefile', 'gpkg': 'GPKG', 'fgb': 'FlatGeobuf'}
+        vector_format = str(vector_format).lower().lstrip('.')
+        if vector_format not in drivers:
+            raise ValueError("vector_format must be one of {}, got '{}'".format(list(drivers.keys()), vector_format))
+        return drivers[vector_format]
+
+    #===========================================================================
+    def _vectorOutFile(self, outFile, vector_format='shp'):
+        '''
+        Append extension for `vector_format` to `outFile` (no extension).
+        '''
+        self._vectorDriver(vector_format)
+        return outFile + '.' + str(vector_format).lower().lstrip('.')
             
     ############################################################################
     # Rectify sonar imagery - Rubbersheeting                                   #
@@ -2725,7 +2475,7 @@ class rectObj(sonObj):
             if son:
                 img = self._reserve_zero_for_nodata(img, preserve_zeros=True)
                 if bool(getattr(self, 'sonar_db_transform', False)) or bool(getattr(self, 'sonar_clahe', False)):
-                    img = self._apply_display_enhancements(img)
+                    img = self._apply_display_enhancements(img, chunk)
             apply_post_rect_colormap = use_16bit and self._rect_colormap_selected(son=son)
             source_scale_bounds = None
             if apply_post_rect_colormap:
@@ -2769,32 +2519,19 @@ class rectObj(sonObj):
                 if apply_post_rect_colormap:
                     out16_raw = self._match_rect_chunk_global_median(out16_raw, imgOutPrefix, son=son)
                 if apply_post_rect_colormap:
-                    use_uint8_rgb = self._export_colormap_as_uint8()
-                    if source_scale_bounds is not None:
-                        norm_data = self._normalize_with_bounds(out16_raw, source_scale_bounds[0], source_scale_bounds[1])
-                        if use_uint8_rgb:
-                            out16 = np.clip(plt.get_cmap(self.son_colorMap_name)(norm_data)[:, :, :3] * 255.0, 0, 255).astype(np.uint8)
-                        else:
-                            out16 = np.clip(plt.get_cmap(self.son_colorMap_name)(norm_data)[:, :, :3] * 65535.0, 0, 65535).astype(np.uint16)
-                        valid_mask = out16_raw > 0
-                        out16[valid_mask] = np.maximum(out16[valid_mask], 1)
-                    else:
-                        out16 = self._colorize_pre_normalized_uint16(out16_raw, self.son_colorMap_name, rgb_uint8=use_uint8_rgb)
+                    out16, palette = self._colorize_rect_uint16(out16_raw, source_scale_bounds)
                 else:
-                    out16 = out16_raw
-                self._write_rect_geotiff(gtiff, out16, epsg, transform, colormap=None)
+                    out16, palette = out16_raw, None
+                self._submit_rect_geotiff(gtiff, out16, epsg, transform, colormap=palette, resize=do_resize, son=son)
             else:
                 if bool(getattr(self, 'sonar_db_transform', False)) or bool(getattr(self, 'sonar_clahe', False)):
                     out8 = self._convert_son_dat_to_uint8(out)
                 else:
                     out8 = np.clip(out, 0, 255).astype(np.uint8)
-                self._write_rect_geotiff(gtiff, out8, epsg, transform, colormap=self.son_colorMap)
+                self._submit_rect_geotiff(gtiff, out8, epsg, transform, colormap=self.son_colorMap, resize=do_resize, son=son)
 
             del out, img
 
-            if do_resize:
-                self._pixresResize(gtiff, son=son)
-
         if self.rect_wcr:
             if son:
                 imgOutPrefix = 'rect_wcr'
@@ -2823,7 +2560,7 @@ class rectObj(sonObj):
             if son:
                 img = self._reserve_zero_for_nodata(img, preserve_zeros=True)
                 if bool(getattr(self, 'sonar_db_transform', False)) or bool(getattr(self, 'sonar_clahe', False)):
-                    img = self._apply_display_enhancements(img)
+                    img = self._apply_display_enhancements(img, chunk)
             apply_post_rect_colormap = son and use_16bit and self._rect_colormap_selected(son=son)
             source_scale_bounds = None
             if apply_post_rect_colormap:
@@ -2921,40 +2658,28 @@ class rectObj(sonObj):
                 if apply_post_rect_colormap:
                     out16_raw = self._match_rect_chunk_global_median(out16_raw, imgOutPrefix, son=son)
                 if apply_post_rect_colormap:
-                    use_uint8_rgb = self._export_colormap_as_uint8()
-                    if source_scale_bounds is not None:
-                        norm_data = self._normalize_with_bounds(out16_raw, source_scale_bounds[0], source_scale_bounds[1])
-                        if use_uint8_rgb:
-                            out16 = np.clip(plt.get_cmap(self.son_colorMap_name)(norm_data)[:, :, :3] * 255.0, 0, 255).astype(np.uint8)
-                        else:
-                            out16 = np.clip(plt.get_cmap(self.son_colorMap_name)(norm_data)[:, :, :3] * 65535.0, 0, 65535).astype(np.uint16)
-                        valid_mask = out16_raw > 0
-                        out16[valid_mask] = np.maximum(out16[valid_mask], 1)
-                    else:
-                        out16 = self._colorize_pre_normalized_uint16(out16_raw, self.son_colorMap_name, rgb_uint8=use_uint8_rgb)
+                    out16, palette = self._colorize_rect_uint16(out16_raw, source_scale_bounds)
                 else:
-                    out16 = out16_raw
-                self._write_rect_geotiff(gtiff, out16, epsg, transform, colormap=None)
+                    out16, palette = out16_raw, None
+                self._submit_rect_geotiff(gtiff, out16, epsg, transform, colormap=palette, resize=do_resize, son=son)
             else:
                 colormap = self.son_colorMap if son else class_colormap
                 if son and (bool(getattr(self, 'sonar_db_transform', False)) or bool(getattr(self, 'sonar_clahe', False))):
                     out8 = self._convert_son_dat_to_uint8(out)
                 else:
                     out8 = np.clip(out, 0, 255).astype(np.uint8)
-                self._write_rect_geotiff(gtiff, out8, epsg, transform, colormap=colormap)
+                self._submit_rect_geotiff(gtiff, out8, epsg, transform, colormap=colormap, resize=do_resize, son=son)
 
             del out
 
-            if do_resize:
-                self._pixresResize(gtiff, son=son)
-
         gc.collect()
 
         # DON"T RETURN SELF
         # Unnecessary here and leads to massive memory leaks
         # Also very slow
 
-        return
+        # Wait for this chunk's GeoTIFFs; returns encode stats for the progress line
+        return self._tile_writer().flush()
 
     #===========================================================================
     def _getSonColorMap(self, name):
@@ -30,7 +30,6 @@
 # SOFTWARE.
 
 import os, sys
-from skimage import exposure
 
 # Add 'pingmapper' to the path, may not need after pypi package...
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -38,8 +37,23 @@ PACKAGE_DIR = os.path.dirname(SCRIPT_DIR)
 sys.path.append(PACKAGE_DIR)
 
 from pingmapper.funcs_common import *
-
-class sonObj(object):
+from pingmapper.funcs_spatial import aoi_mask
+from pingmapper.funcs_clahe import CLAHE_TILE_GRID, clahe, clahe_lut, level_histogram
+from pingmapper.funcs_colormap import colorize, level_colormap_lut, uint16_colormap_lut
+from pingmapper.funcs_lut import apply_lut, db_lut, has_lut, level_counts, sample_storage_dtype, uint8_lut
+from pingmapper.funcs_intervals import event_lookup, interval_mask, parse_datetimes
+from pingmapper.funcs_intensity import (DB_RESOLUTION, QuantileSketch, intensity_stats_path,
+                                       load_intensity_stats, merge_sketches, save_intensity_stats)
+from pingmapper.funcs_label import bed_mask
+from pingmapper.funcs_manifest import ManifestState, manifest_path
+from pingmapper.funcs_chunking import CHUNK_TARGET_M, CHUNK_TARGET_MB, adaptive_chunk_ids
+from pingmapper.funcs_cube import CUBE_NAME, create_cube, cube_coords, open_cube, ping_index
+from pingmapper.funcs_tilewriter import JPEG_QUALITY, PNG_LEVEL, TIFF_COMPRESSION, shared_writer
+
+# Processed views returned by sonObj._getScanSlice()
+SCAN_SLICE_VIEWS = ('raw', 'egn', 'src')
+
+class sonObj(ManifestState):
     '''
     Python class to store everything related to reading and exporting data from
     Humminbird sonar recordings.
@@ -119,8 +133,8 @@ class sonObj(object):
     self.sonMetaFile : str
         DESCRIPTION - Path to .SON metadata file (.csv).
 
-    self.sonMetaPickle : str
-        DESCRIPTION - Path to .SON metadata pickle file (.meta).
+    self.sonMetaManifest : str
+        DESCRIPTION - Path to saved sonObj state (.manifest.json).
 
     self.wcr : bool
         DESCRIPTION - Flag to export non-rectified sonar tiles w/ water column
@@ -403,21 +417,13 @@ class sonObj(object):
         else:
             sonTimes = sonTimes + offset
 
-        sonMerge = pd.DataFrame({
-            '_son_idx': sonDF.index,
-            '_son_ts': sonTimes,
-        })
-        sonMerge = sonMerge[sonMerge['_son_ts'].notna()].copy()
-
-        dqDF['_dq_keep'] = dqDF[dq_flag_field].map(self._normalizeDQValue).isin(keep_vals)
-
-        event_state = dqDF[[dqTimeCol, '_dq_keep']].copy()
-        event_state.sort_values(dqTimeCol, inplace=True)
-        event_state = event_state.groupby(dqTimeCol, as_index=False)['_dq_keep'].last()
+        dq_keep = dqDF[dq_flag_field].map(self._normalizeDQValue).isin(keep_vals).to_numpy()
 
-        keep_idx = self._applyDQEventState(sonMerge, event_state, dqTimeCol)
+        # Each ping inherits the state of the most recent DQ event at or
+        # before it; pings before the first event are removed.
+        state, found = event_lookup(sonTimes.to_numpy(), dqDF[dqTimeCol].to_numpy(), dq_keep)
 
-        sonDF.loc[keep_idx, filtDQCol] = True
+        sonDF[filtDQCol] = found & state
         sonDF[filtCol] = sonDF[filtCol] & sonDF[filtDQCol]
 
         return sonDF
@@ -502,10 +508,8 @@ class sonObj(object):
     def _getSonarFilterTimestamp(self, sonDF):
 
         if 'date' in sonDF.columns and 'time' in sonDF.columns:
-            dt = pd.to_datetime(
-                sonDF['date'].astype(str).str.strip() + ' ' + sonDF['time'].astype(str).str.strip(),
-                errors='coerce',
-                format='mixed',
+            dt = parse_datetimes(
+                sonDF['date'].astype(str).str.strip() + ' ' + sonDF['time'].astype(str).str.strip()
             )
             if dt.notna().any():
                 try:
@@ -516,7 +520,7 @@ class sonObj(object):
                 return dt, 'datetime'
 
         if 'time' in sonDF.columns:
-            dt = pd.to_datetime(sonDF['time'], errors='coerce', format='mixed')
+            dt = parse_datetimes(sonDF['time'])
             if dt.notna().any():
                 try:
                     if dt.dt.tz is not None:
@@ -533,32 +537,6 @@ class sonObj(object):
         raise ValueError('Unable to determine sonar timestamps for dqLog filtering.')
 
 
-    # ======================================================================
-    def _applyDQEventState(self, son, event_state, dqTimeCol):
-        '''
-        Return the subset of sonar indices whose ping timestamp falls within a
-        "keep" state block as defined by the DQ event log.
-
-        Uses np.searchsorted so each ping inherits the state of the most-recent
-        event that preceded it.  Pings before the first event are excluded.
-        '''
-
-        event_times = event_state[dqTimeCol].to_numpy()
-        event_keep  = event_state['_dq_keep'].to_numpy(dtype=bool)
-        son_times   = son['_son_ts'].to_numpy()
-
-        # searchsorted(side='right') - 1 gives index of last event <= ping time
-        event_idx = np.searchsorted(event_times, son_times, side='right') - 1
-
-        # Pings before the first event get event_idx == -1 → exclude
-        valid_idx = event_idx >= 0
-
-        keep_mask = np.zeros(len(son), dtype=bool)
-        keep_mask[valid_idx] = event_keep[event_idx[valid_idx]]
-
-        return son.loc[keep_mask, '_son_idx']
-
-
     # ======================================================================
     def _filterHeading(self,
                        df,
@@ -582,11 +560,6 @@ class sonObj(object):
         # Get max distance
         max_dist = df[trk_dist].max()
 
-        # Set counters
-        win = 1                     # stride of moving window
-        dist_start = 0              # Counter for beginning of current window
-        dist_end = dist_start + d   # Counbter for end of current window
-
         df = df.copy()
         df[filtCol] = False
 
@@ -595,9 +568,9 @@ class sonObj(object):
             df[filtCol] = True
             return df
 
-        # If heading distance window covers the entire recording,
-        # evaluate the complete record once.
-        if max_dist <= d:
+        # If heading distance window covers the entire recording (or no
+        # window size is set), evaluate the complete record once.
+        if max_dist <= d or d <= 0:
             head_vals = df[head].to_numpy(copy=True)
             head_vals = head_vals[np.isfinite(head_vals)]
 
@@ -614,52 +587,52 @@ class sonObj(object):
 
             return df
 
-        ##############################
-        # Iterator through each window
-
-        # Compare heading deviation across each window
-        while dist_start < max_dist:
-
-            # Filter df by window
-            if dist_end < max_dist:
-                window_mask = (df[trk_dist] >= dist_start) & (df[trk_dist] < dist_end)
-            else:
-                window_mask = (df[trk_dist] >= dist_start) & (df[trk_dist] <= max_dist)
-            dfFilt = df.loc[window_mask]
-
-            if len(dfFilt) > 1:
-
-                head_vals = dfFilt[head].to_numpy(copy=True)
-                head_vals = head_vals[np.isfinite(head_vals)]
-
-                if len(head_vals) > 1:
-                    head_vals = np.deg2rad(head_vals)
-                    # Unwrap the heading because heading is circular
-                    head_vals = np.unwrap(head_vals)
-
-                    # Get total heading spread in the window
-                    vessel_dev = np.ptp(head_vals)
-
-                    # Compare vessel deviation to threshold deviation
-                    if vessel_dev < dev:
-                        # Keep these pings
-                        df.loc[dfFilt.index, filtCol] = True
-
-                    # dist_start += win
-                    # dist_start = dist_end
-
-                else:
-                    # dist_start = dist_end
+        ###########################
+        # Assign pings to windows
+
+        # Window edges advance by repeated addition of d, exactly as a
+        # start += d loop would, so pings on an edge land in the same window.
+        # Only windows starting before max_dist exist; the last one is closed
+        # at max_dist.
+        n_win = int(np.ceil(max_dist / d)) + 1
+        edges = np.cumsum(np.concatenate(([0.0], np.full(n_win, d, dtype='float64'))))
+        starts = edges[edges < max_dist]
+
+        dist_vals = df[trk_dist].to_numpy(dtype='float64')
+        win_id = np.searchsorted(starts, dist_vals, side='right') - 1
+        win_id[~(dist_vals >= 0)] = -1  # before the first window, or NaN
+
+        # Windows are evaluated on their finite headings, in ping order
+        head_vals = df[head].to_numpy(dtype='float64')
+        valid = (win_id >= 0) & np.isfinite(head_vals)
+        valid_idx = np.flatnonzero(valid)
+        order = valid_idx[np.argsort(win_id[valid_idx], kind='stable')]
+        grp = win_id[order]
+        head_vals = np.deg2rad(head_vals[order])
+
+        if len(grp) == 0:
+            keep_win = np.zeros(len(starts), dtype=bool)
+        else:
+            grp_start = np.flatnonzero(np.r_[True, grp[1:] != grp[:-1]])
+            grp_len = np.diff(np.r_[grp_start, len(grp)])
 
-                    # df[filtCol].loc[dfFilt.index] = False
+            # Heading spread per window.  Windows whose consecutive headings
+            # never jump by pi or more are unaffected by unwrapping, so their
+            # spread is a plain max - min; the few that cross north are
+            # unwrapped one at a time.
+            vessel_dev = np.maximum.reduceat(head_vals, grp_start) - np.minimum.reduceat(head_vals, grp_start)
 
-                    # dist_start += win
+            jump = np.abs(np.diff(head_vals)) >= np.pi
+            jump[grp_start[1:] - 1] = False
+            for g in np.unique(np.searchsorted(grp_start, np.flatnonzero(jump), side='right') - 1):
+                i = grp_start[g]
+                vessel_dev[g] = np.ptp(np.unwrap(head_vals[i:i + grp_len[g]]))
 
-                    pass
-                
+            # Keep windows with more than one heading and a spread under dev
+            keep_win = np.zeros(len(starts), dtype=bool)
+            keep_win[grp[grp_start]] = (grp_len > 1) & (vessel_dev < dev)
 
-            dist_start = dist_end
-            dist_end = dist_start + d
+        df[filtCol] = (win_id >= 0) & keep_win[np.maximum(win_id, 0)]
 
         # Explicitly reject discontinuities where adjacent pings are farther
         # apart than the heading-distance window. These boundaries can otherwise
@@ -730,16 +703,10 @@ class sonObj(object):
 
         offset = float(son_min) if use_relative_seconds else 0.0
 
-        for i, row in time_table.iterrows():
-
-            start = float(row['start_seconds']) + offset
-            end = float(row['end_seconds']) + offset
-
-            if end < start:
-                start, end = end, start
-
-            # dfFilt = sonDF[(sonDF['time_s'] >= start) & (sonDF['time_s'] <= end)]
-            sonDF.loc[(sonDF[time_col] >= start) & (sonDF[time_col] <= end) & (sonDF[filtCol] == True), filtTimeCol] = True
+        in_clip = interval_mask(son_time.to_numpy(),
+                                time_table['start_seconds'].to_numpy(dtype=float) + offset,
+                                time_table['end_seconds'].to_numpy(dtype=float) + offset)
+        sonDF[filtTimeCol] = in_clip & (sonDF[filtCol] == True).to_numpy()
 
         sonDF[filtCol] *= sonDF[filtTimeCol]
 
@@ -892,15 +859,11 @@ class sonObj(object):
         aoiOut = os.path.join(aoi_dir, aoiOut)
         aoi_poly.to_file(aoiOut)
 
-        # Convert to geodataframe
-        epsg = int(self.humDat['epsg'].split(':')[-1])
-        sonDF = gpd.GeoDataFrame(sonDF, geometry=gpd.points_from_xy(sonDF.e, sonDF.n), crs=epsg)
-
         # Get polygon
         aoi_poly = aoi_poly.geometry[0]
 
-        # Subset
-        mask = sonDF.within(aoi_poly)
+        # Subset with prepared polygon (no per-ping geometries needed)
+        mask = aoi_mask(aoi_poly, sonDF['e'].to_numpy(), sonDF['n'].to_numpy())
         sonDF[filtCol] *= mask
 
         return sonDF
@@ -933,6 +896,10 @@ class sonObj(object):
             transect += 1
 
         # Set chunks
+        if getattr(self, 'adaptive_chunks', False):
+            sonDF['chunk_id'] = self._adaptiveChunkIds(sonDF, sonDF['transect'])
+            return sonDF
+
         lastChunk = 0
         newChunk = []
         for name, group in sonDF.groupby('transect'):
@@ -962,6 +929,39 @@ class sonObj(object):
 
         return sonDF
 
+    # ======================================================================
+    def _adaptiveChunkIds(self, sonDF, transect=None):
+        '''
+        chunk_id per ping of sonDF, sized by sonar bytes and along-track
+        distance instead of a fixed ping count (see funcs_chunking).
+
+        Targets come from self.chunk_target_mb and self.chunk_target_m, and
+        chunk lengths are bounded by self.chunk_min_pings and
+        self.chunk_max_pings (default nchunk/4 and nchunk*4).  Chunks break
+        where `transect` changes (one transect if None).
+        '''
+        nchunk = int(getattr(self, 'nchunk', 500))
+        min_pings = getattr(self, 'chunk_min_pings', None) or max(1, nchunk // 4)
+        max_pings = getattr(self, 'chunk_max_pings', None) or nchunk * 4
+
+        ping_cnt = pd.to_numeric(sonDF['ping_cnt'], errors='coerce').to_numpy(dtype=float)
+        if 'bytes_per_sample' in sonDF.columns:
+            bytes_per_sample = pd.to_numeric(sonDF['bytes_per_sample'], errors='coerce').to_numpy(dtype=float)
+        else:
+            bytes_per_sample = np.dtype(self._pingStorageDtype(sonDF)).itemsize
+
+        dist = None
+        if 'trk_dist' in sonDF.columns:
+            dist = pd.to_numeric(sonDF['trk_dist'], errors='coerce').to_numpy(dtype=float)
+
+        if transect is None:
+            transect = np.zeros(len(sonDF), dtype=np.int64)
+
+        return adaptive_chunk_ids(np.asarray(transect), ping_cnt * bytes_per_sample, dist,
+                                  target_bytes=float(getattr(self, 'chunk_target_mb', CHUNK_TARGET_MB)) * 2**20,
+                                  target_dist=float(getattr(self, 'chunk_target_m', CHUNK_TARGET_M)),
+                                  min_pings=min_pings, max_pings=max_pings)
+
 
     ############################################################################
     # Fix corrupt recording w/ missing pings                                   #
@@ -1120,29 +1120,16 @@ class sonObj(object):
                 self._writeTiles(chunk, imgOutPrefix='wcr', tileFile=tileFile) # Save image
 
             gc.collect()
+        self._tile_writer().flush()
         return #self
 
 
     # ==========================================================================
-    def _loadSonChunk(self):
+    def _readSonPings(self):
         '''
-        Reads ping returns into memory based on byte index location in son file
-        and number of pings to return.
-
-        ----------------------------
-        Required Pre-processing step
-        ----------------------------
-        Called from self._getScanChunkALL() or self._getScanChunkSingle()
-
-        -------
-        Returns
-        -------
-        2-D numpy array containing sonar intensity
-
-        --------------------
-        Next Processing Step
-        --------------------
-        Return numpy array to self._getScanChunkALL() or self._getScanChunkSingle()
+        Decodes the pings described by self.headIdx, self.son_offset and
+        self.pingCnt (see self._setPingReads()) from the son file into a
+        (pingMax, n_pings) array, before TVG and display scaling.
         '''
 
         use_jsf_weighting = bool(getattr(self, '_use_jsf_weighting', False))
@@ -1158,18 +1145,8 @@ class sonObj(object):
         if crop_samples_after_flip is not None and crop_samples_after_flip <= 0:
             crop_samples_after_flip = None
 
-        sample_dtype = getattr(self, 'sample_dtype', None)
-        sample_is_float = False
-        if sample_dtype is not None:
-            try:
-                sample_is_float = np.dtype(sample_dtype).kind == 'f'
-            except Exception:
-                sample_is_float = False
-
-        if use_jsf_weighting or use_tvg or sample_is_float:
-            sonDat = np.zeros((int(self.pingMax), len(self.pingCnt)), dtype=np.float32)
-        else:
-            sonDat = np.zeros((int(self.pingMax), len(self.pingCnt))).astype(int) # Initialize array to hold sonar returns
+        # Initialize array to hold sonar returns, in the samples' own bit depth
+        sonDat = np.zeros((int(self.pingMax), len(self.pingCnt)), dtype=self._pingStorageDtype(tvg=use_tvg))
         file = open(self.sonFile, 'rb') # Open .SON file
         file_size = os.path.getsize(self.sonFile)
         skipped_reads = 0
@@ -1295,23 +1272,80 @@ class sonObj(object):
         if crop_samples_after_flip is not None and sonDat.shape[0] > crop_samples_after_flip:
             sonDat = sonDat[:crop_samples_after_flip, :]
 
+        return sonDat
+
+    # ==========================================================================
+    def _pingStorageDtype(self, sonMeta=None, tvg=False):
+        '''
+        Dtype _readSonPings() decodes into: float32 for JSF weighting, TVG or
+        float samples, otherwise the samples' own bit depth.  The weighting
+        flag comes from `sonMeta`'s columns when given.
+        '''
+        if sonMeta is not None:
+            use_jsf_weighting = 'weighting_factor' in sonMeta.columns
+        else:
+            use_jsf_weighting = bool(getattr(self, '_use_jsf_weighting', False))
+
+        sample_dtype = getattr(self, 'sample_dtype', None)
+        sample_is_float = False
+        if sample_dtype is not None:
+            try:
+                sample_is_float = np.dtype(sample_dtype).kind == 'f'
+            except Exception:
+                sample_is_float = False
+
+        if use_jsf_weighting or tvg or sample_is_float:
+            return np.float32
+        return sample_storage_dtype(self.son8bit, sample_dtype)
+
+    # ==========================================================================
+    def _loadSonChunk(self, sonDat=None):
+        '''
+        Reads ping returns into memory based on byte index location in son file
+        and number of pings to return.  Pings already decoded by
+        self._readSonPings() (or read from the sonar cube) can be passed as
+        sonDat to only apply TVG and display scaling.
+
+        ----------------------------
+        Required Pre-processing step
+        ----------------------------
+        Called from self._getScanChunkALL() or self._getScanChunkSingle()
+
+        -------
+        Returns
+        -------
+        2-D numpy array containing sonar intensity
+
+        --------------------
+        Next Processing Step
+        --------------------
+        Return numpy array to self._getScanChunkALL() or self._getScanChunkSingle()
+        '''
+        use_tvg = bool(getattr(self, 'tvg', False))
+        if sonDat is None:
+            sonDat = self._readSonPings()
+
         if use_tvg:
             sonDat = self._apply_tvg(sonDat)
 
         if bool(getattr(self, 'export_16bit', False)) and not bool(getattr(self, 'son8bit', True)):
-            self.sonDat16 = np.clip(sonDat, 0, 65535).astype(np.uint16, copy=False)
+            if sonDat.dtype == np.uint16:
+                self.sonDat16 = sonDat
+            else:
+                self.sonDat16 = np.clip(sonDat, 0, 65535).astype(np.uint16, copy=False)
         else:
             self.sonDat16 = None
 
         self.sonDat = self._convert_son_dat_to_uint8(sonDat)
         return
 
-    def _apply_display_enhancements(self, sonDat):
+    def _apply_display_enhancements(self, sonDat, chunk=None):
         """Optional display-stage intensity transforms before uint8 mapping.
 
         These transforms are intended to improve perceptual contrast of exported
         sonograms while keeping the processing pipeline opt-in and backward-
-        compatible by default.
+        compatible by default.  `chunk` limits CLAHE seam blending to ends
+        that border another chunk.
         """
         use_db = bool(getattr(self, 'sonar_db_transform', False))
         use_clahe = bool(getattr(self, 'sonar_clahe', False))
@@ -1333,30 +1367,73 @@ class sonObj(object):
                 clip_limit = 0.01
 
             global_bounds = None
+            seam_lut = None
             if bool(getattr(self, 'sonar_clahe_global', True)):
                 global_bounds = self._ensure_clahe_global_bounds()
 
             if global_bounds is not None:
-                arr01 = self._normalize_with_bounds(arr, global_bounds[0], global_bounds[1])
+                lo, hi = global_bounds
+                arr01 = np.clip((arr - lo) / (hi - lo), 0.0, 1.0)
+
+                # Chunk ends blend toward the recording-wide equalization
+                global_hist = getattr(self, '_sonar_clahe_global_hist', None)
+                if global_hist is not None:
+                    seam_lut = clahe_lut(global_hist, clip_limit)
             else:
                 max_val = float(np.nanmax(arr))
                 if not (np.isfinite(max_val) and max_val > 0):
                     return arr
                 arr01 = np.clip(arr / max_val, 0.0, 1.0)
 
-            try:
-                arr01 = exposure.equalize_adapthist(arr01, clip_limit=clip_limit)
-                arr = np.asarray(arr01, dtype=np.float32) * 255.0
-            except MemoryError:
-                arr = self._apply_clahe_chunked(arr01, clip_limit)
-            except np.core._exceptions._ArrayMemoryError:
-                arr = self._apply_clahe_chunked(arr01, clip_limit)
+            tile_grid = CLAHE_TILE_GRID
+            n_tiles = int(getattr(self, 'sonar_clahe_tile_grid', tile_grid[0]))
+            if n_tiles > 0:
+                tile_grid = (n_tiles, n_tiles)
+            blend_start, blend_end = True, True
+            if seam_lut is not None:
+                blend_start, blend_end = self._clahe_seam_ends(chunk)
+            arr = clahe(arr01, clip_limit, tile_grid=tile_grid, seam_lut=seam_lut,
+                        blend_start=blend_start, blend_end=blend_end)
+            arr *= 255.0
 
         # Preserve no-data convention for empty samples.
         arr[~valid] = 0.0
         return arr
 
-    def _apply_display_db_transform(self, sonDat):
+    def _clahe_seam_ends(self, chunk):
+        '''
+        Whether the start and end of `chunk` border the previous and next
+        chunk of the same transect, i.e. are seams to blend.  Both are
+        assumed when the chunk is unknown.
+        '''
+        if chunk is None or not hasattr(self, 'sonMetaFile'):
+            return True, True
+
+        index = self._pingIndex()
+        chunk_id = index['chunk_id']
+        isChunk = np.flatnonzero(chunk_id == chunk)
+        if len(isChunk) == 0:
+            return True, True
+
+        before = chunk_id == chunk-1
+        after = chunk_id == chunk+1
+        if 'transect' in index.dtype.names:
+            transect = index['transect']
+            before &= transect == transect[isChunk[0]]
+            after &= transect == transect[isChunk[-1]]
+        return bool(np.any(before)), bool(np.any(after))
+
+    def _apply_display_db_transform(self, sonDat, db_transform=None):
+        if db_transform is None:
+            db_transform = bool(getattr(self, 'sonar_db_transform', False))
+
+        if db_transform and has_lut(sonDat):
+            # 8/16-bit samples: one dB value per level
+            lut = db_lut(level_counts(sonDat))
+            if lut is None:
+                return np.zeros(sonDat.shape, dtype=np.float32)
+            return apply_lut(lut, sonDat)
+
         arr = np.asarray(sonDat, dtype=np.float32)
         if arr.size == 0:
             return arr
@@ -1368,7 +1445,7 @@ class sonObj(object):
         if not np.any(valid):
             return arr
 
-        if bool(getattr(self, 'sonar_db_transform', False)):
+        if db_transform:
             # Use the smallest positive intensity as the log floor to avoid
             # collapsing zeros to -inf and to preserve relative low amplitudes.
             floor = float(np.nanmin(arr[valid]))
@@ -1381,92 +1458,140 @@ class sonObj(object):
         arr[~valid] = 0.0
         return arr
 
-    def _ensure_clahe_global_bounds(self):
+    def _ensure_clahe_global_bounds(self, threadCnt=1):
+        '''
+        Recording-wide CLAHE bounds and level histogram, cached on the
+        object.  Call before dispatching chunks so workers receive the cache;
+        projects without saved statistics decode the beam here, once.
+        '''
         if not bool(getattr(self, 'sonar_clahe_global', True)):
             return None
 
         cache = getattr(self, '_sonar_clahe_global_bounds', None)
-        if isinstance(cache, tuple) and len(cache) == 2:
+        if isinstance(cache, (tuple, list)) and len(cache) == 2 and hasattr(self, '_sonar_clahe_global_hist'):
             lo, hi = cache
             if np.isfinite(lo) and np.isfinite(hi) and hi > lo:
-                return cache
+                return tuple(cache)
 
-        if not hasattr(self, 'sonMetaDF'):
-            self._loadSonMeta()
+        key = 'db' if bool(getattr(self, 'sonar_db_transform', False)) else 'raw'
+        stats = self._getIntensityStats()
+        if key not in stats:
+            # Not gathered during ingest (e.g. older project); do it once now
+            stats = self._calcIntensityStats(threadCnt=threadCnt)
 
-        if not hasattr(self, 'sonMetaDF') or self.sonMetaDF is None or len(self.sonMetaDF) == 0:
+        sketch = stats.get(key)
+        bounds = sketch.bounds(1.0, 99.5) if sketch is not None else None
+        if bounds is None:
             return None
 
-        saved_sonDat = getattr(self, 'sonDat', None)
-        saved_sonDat16 = getattr(self, 'sonDat16', None)
-        saved_pingMax = getattr(self, 'pingMax', None)
+        # Recording-wide histogram over the CLAHE levels, for chunk seams
+        centers = (np.arange(len(sketch.counts)) + 0.5) * sketch.width
+        self._sonar_clahe_global_hist = level_histogram(centers, sketch.counts, *bounds)
 
-        chunk_ids = pd.unique(self.sonMetaDF['chunk_id'])
-        sample_cap = int(getattr(self, 'sonar_clahe_global_sample_cap', 200000))
-        if sample_cap <= 0:
-            sample_cap = 200000
+        self._sonar_clahe_global_bounds = bounds
+        return self._sonar_clahe_global_bounds
 
-        sampled_vals = []
-        for chunk in chunk_ids:
-            self._getScanChunkSingle(int(chunk))
-            arr = self._apply_display_db_transform(self.sonDat)
-            valid = arr > 0
-            if not np.any(valid):
-                continue
+    def _intensityCalcChunkStats(self, chunk):
+        '''
+        Decode one chunk and sketch its intensities.
+        '''
+        self._getScanChunkSingle(int(chunk))
+        return self._intensitySketchChunk(self.sonDat)
 
-            vals = arr[valid].astype(np.float32, copy=False)
-            if vals.size > sample_cap:
-                idx = np.linspace(0, vals.size - 1, sample_cap, dtype=np.int64)
-                vals = vals[idx]
-            sampled_vals.append(vals)
+    def _intensitySketchChunk(self, sonDat):
+        '''
+        Sketch a decoded chunk's non-zero intensities: 'raw' (as decoded)
+        and 'db' (display dB transform).
+        '''
+        if has_lut(sonDat):
+            # Sketch the level histogram rather than the samples
+            counts = level_counts(sonDat)
+            levels = np.arange(len(counts))
+            stats = {'raw': QuantileSketch().update(levels[1:], counts[1:])}
 
-        if len(sampled_vals) == 0:
-            self.sonDat = saved_sonDat
-            self.sonDat16 = saved_sonDat16
-            self.pingMax = saved_pingMax
-            return None
+            stats['db'] = QuantileSketch(resolution=DB_RESOLUTION)
+            lut = db_lut(counts)
+            if lut is not None:
+                stats['db'].update(lut[lut > 0], counts[lut > 0])
+        else:
+            stats = {'raw': QuantileSketch().update(sonDat[sonDat > 0])}
 
-        pooled = np.concatenate(sampled_vals)
-        lo = float(np.nanpercentile(pooled, 1.0))
-        hi = float(np.nanpercentile(pooled, 99.5))
-        if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
-            lo = float(np.nanmin(pooled))
-            hi = float(np.nanmax(pooled))
+            arr = self._apply_display_db_transform(sonDat, db_transform=True)
+            stats['db'] = QuantileSketch(resolution=DB_RESOLUTION).update(arr[arr > 0])
 
-        if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
-            self.sonDat = saved_sonDat
-            self.sonDat16 = saved_sonDat16
-            self.pingMax = saved_pingMax
-            return None
+        return stats
+
+    def _intensityCalcGlobalStats(self, chunk_stats):
+        '''
+        Merge per-chunk sketches and save them with the beam's intensity
+        statistics.
+        '''
+        stats = {}
+        for key in ('raw', 'db'):
+            sketches = [c[key] for c in chunk_stats if c is not None and key in c]
+            if len(sketches) > 0:
+                stats[key] = merge_sketches(sketches, resolution=sketches[0].resolution)
+
+        save_intensity_stats(intensity_stats_path(self.sonMetaFile), stats)
+
+        # Bounds derived from earlier statistics are stale
+        for attr in ('_sonar_clahe_global_bounds', '_sonar_clahe_global_hist'):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        return stats
+
+    def _calcIntensityStats(self, threadCnt=0, decode=True):
+        '''
+        Resolve the beam's global intensity statistics once.  The JSF scale
+        maximum comes from metadata; with `decode`, every chunk is also
+        decoded once in parallel to build the intensity sketches (see
+        funcs_intensity).  Tile export otherwise sketches each chunk from the
+        decode it already does, so this pass is only needed when bounds are
+        required before export or the project predates the statistics.
+        '''
+        sonMetaAll = pd.read_csv(self.sonMetaFile)
+        if 'weighting_factor' in sonMetaAll.columns:
+            # Resolved here so workers don't each re-read the paired beam's
+            # metadata; saved with the sonObj state.
+            self._ensure_jsf_global_scale_max(sonMetaAll)
+
+        chunks = pd.unique(sonMetaAll['chunk_id'])
+        del sonMetaAll
+        if not decode or len(chunks) == 0:
+            return {}
+
+        saved_sonDat = getattr(self, 'sonDat', None)
+        saved_sonDat16 = getattr(self, 'sonDat16', None)
+        saved_pingMax = getattr(self, 'pingMax', None)
+
+        chunk_stats = Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(self._intensityCalcChunkStats)(int(c)) for c in chunks)
 
-        self._sonar_clahe_global_bounds = (lo, hi)
         self.sonDat = saved_sonDat
         self.sonDat16 = saved_sonDat16
         self.pingMax = saved_pingMax
-        return self._sonar_clahe_global_bounds
 
-    def _apply_clahe_chunked(self, arr01, clip_limit):
-        """Apply CLAHE in row-wise stripes to reduce peak memory usage."""
-        src = np.asarray(arr01, dtype=np.float32)
-        h, w = src.shape
-        if h == 0 or w == 0:
-            return src
-
-        # Keep per-stripe working set bounded. equalize_adapthist promotes to
-        # float64 internally, so we target moderate stripe sizes.
-        stripe_rows = int(getattr(self, 'sonar_clahe_rows_per_chunk', 512))
-        if stripe_rows <= 0:
-            stripe_rows = 512
-        stripe_rows = min(stripe_rows, h)
-
-        out = np.empty_like(src, dtype=np.float32)
-        for start in range(0, h, stripe_rows):
-            end = min(start + stripe_rows, h)
-            stripe = src[start:end, :]
-            stripe_eq = exposure.equalize_adapthist(stripe, clip_limit=clip_limit)
-            out[start:end, :] = np.asarray(stripe_eq, dtype=np.float32) * 255.0
+        return self._intensityCalcGlobalStats(chunk_stats)
 
-        return out
+    def _getIntensityStats(self):
+        '''
+        Saved intensity statistics for this beam, as name -> QuantileSketch.
+        '''
+        if not hasattr(self, 'sonMetaFile'):
+            return {}
+        return load_intensity_stats(intensity_stats_path(self.sonMetaFile))
+
+    def _resetIntensityStats(self):
+        '''
+        Remove saved intensity statistics so they are recomputed with the
+        current settings.
+        '''
+        for attr in ('_sonar_clahe_global_bounds', '_sonar_clahe_global_hist', '_float_global_scale_max'):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        if hasattr(self, 'sonMetaFile'):
+            path = intensity_stats_path(self.sonMetaFile)
+            if os.path.exists(path):
+                os.remove(path)
 
     def _apply_tvg(self, sonDat):
         sonDat = np.asarray(sonDat, dtype=np.float32)
@@ -1515,8 +1640,8 @@ class sonObj(object):
 
             vals = arr[valid]
 
-            lo = float(np.nanpercentile(vals, 1.0))
-            hi = float(np.nanpercentile(vals, 99.5))
+            # Non-finite samples were zeroed above; one partition for both
+            lo, hi = (float(v) for v in np.percentile(vals, [1.0, 99.5]))
 
             max_val = None
             if bool(getattr(self, '_use_jsf_weighting', False)):
@@ -1532,32 +1657,30 @@ class sonObj(object):
             if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
                 return np.zeros(arr.shape, dtype=np.uint8)
 
-            scaled = (arr - lo) * (255.0 / (hi - lo))
-            return np.clip(scaled, 0, 255).astype(np.uint8)
+            scaled = np.subtract(arr, lo, dtype=np.float32)
+            scaled *= 255.0 / (hi - lo)
+            np.clip(scaled, 0, 255, out=scaled)
+            return scaled.astype(np.uint8)
 
         if self.son8bit:
+            if sonDat.dtype == np.uint8:
+                return sonDat
             return np.clip(sonDat, 0, 255).astype(np.uint8)
 
-        dat_uint16 = np.clip(sonDat, 0, 65535).astype(np.uint16, copy=False)
+        if sonDat.dtype == np.uint16:
+            dat_uint16 = sonDat
+        else:
+            dat_uint16 = np.clip(sonDat, 0, 65535).astype(np.uint16, copy=False)
 
         # Detect high-byte packing using only non-zero samples so ping padding
         # (zeros below each ping length) does not trigger false detection.
-        nz = dat_uint16[dat_uint16 > 0]
-        if nz.size == 0:
-            return np.zeros(dat_uint16.shape, dtype=np.uint8)
-
-        max_val = int(nz.max())
-        low_byte_zero_ratio = np.mean((nz & 0x00FF) == 0)
-
         # Some XTF chunks appear as 12-bit amplitudes packed in high-byte-aligned
         # 16-bit words (e.g., 0..15 represented as 0, 256, 512, ...). In that case,
         # shift by 4 (not 8) to recover usable 8-bit contrast.
-        if low_byte_zero_ratio > 0.95:
-            if max_val <= 4095:
-                return (dat_uint16 >> 4).astype(np.uint8)
-            return (dat_uint16 >> 8).astype(np.uint8)
-
-        return dat_uint16.astype(np.uint8)
+        lut = uint8_lut(level_counts(dat_uint16))
+        if lut is None:
+            return np.zeros(dat_uint16.shape, dtype=np.uint8)
+        return apply_lut(lut, dat_uint16)
 
     def _sanitize_chunk_sonmeta(self, sonMeta):
         if sonMeta is None or len(sonMeta) == 0 or 'ping_cnt' not in sonMeta.columns:
@@ -1752,8 +1875,9 @@ class sonObj(object):
         '''
 
         '''
-        # Get sonMeta
-        if not hasattr(self, 'sonMetaDF'):
+        # Get sonMeta; keep it if the caller already loaded it
+        loaded = not hasattr(self, 'sonMetaDF')
+        if loaded:
             self._loadSonMeta()
 
         if son:
@@ -1770,14 +1894,12 @@ class sonObj(object):
         bedPick = round(sonMeta['dep_m'] / sonMeta['pixM'], 0).astype(int)
         minDep = min(bedPick)
 
-        del sonMeta, self.sonMetaDF
-
-        # Make zero mask
-        wc_mask = np.zeros((self.sonDat.shape))
+        del sonMeta
+        if loaded:
+            del self.sonMetaDF
 
-        # Fill non-wc pixels with 1
-        for p, s in enumerate(bedPick):
-            wc_mask[s:, p] = 1
+        # Mask with non-wc pixels set to 1
+        wc_mask = bed_mask(bedPick, self.sonDat.shape).astype('float64')
 
         self.wcMask = wc_mask
         self.minDep = minDep
@@ -2038,15 +2160,22 @@ class sonObj(object):
         return np.clip(arr, 0, 65535).astype(np.uint16)
 
     # ======================================================================
-    def _normalize_for_colormap(self, data, bit_depth=8):
+    def _normalize_for_colormap(self, data, bit_depth=8, levels=None):
+        '''
+        Scale `data` to [0, 1] between its 1st and 99.5th percentiles.  With
+        `levels`, the bounds still come from `data` but `levels` (e.g. every
+        uint8/uint16 value) are what gets scaled.
+        '''
         arr = np.asarray(data, dtype=np.float32)
         arr[~np.isfinite(arr)] = 0.0
 
         valid = arr > 0
-        if not np.any(valid):
+        vals = arr[valid]
+        if levels is not None:
+            arr = np.asarray(levels, dtype=np.float32)
+        if vals.size == 0:
             return np.zeros(arr.shape, dtype=np.float32)
 
-        vals = arr[valid]
         lo = float(np.nanpercentile(vals, 1.0))
         hi = float(np.nanpercentile(vals, 99.5))
 
@@ -2072,44 +2201,29 @@ class sonObj(object):
         return out
 
     def _colorize_array_batched(self, norm_data, valid_mask, cmap_name, scale_max, out_dtype):
-        cmap = plt.get_cmap(cmap_name)
-        height, width = norm_data.shape
-        out = np.zeros((height, width, 3), dtype=out_dtype)
-
-        target_batch_bytes = 256 * 1024 * 1024
-        bytes_per_row = max(width * 4 * 8, 1)
-        rows_per_batch = max(1, int(target_batch_bytes // bytes_per_row))
-
-        for start in range(0, height, rows_per_batch):
-            end = min(start + rows_per_batch, height)
-            colored = cmap(norm_data[start:end])
-            rgb = np.clip(colored[:, :, :3] * scale_max, 0, scale_max).astype(out_dtype)
-            valid = valid_mask[start:end]
-            rgb[valid] = np.maximum(rgb[valid], 1)
-            out[start:end] = rgb
-
-        return out
+        # Colormap table gather (see funcs_colormap); no float RGBA copies
+        return colorize(norm_data, valid_mask, cmap_name, scale_max, out_dtype)
 
     # ======================================================================
     def _colorize_sonar_array(self, data, cmap_name, bit_depth=8, rgb_uint8=False):
+        # Color every level once, then the image in one gather
         if bit_depth >= 16:
             arr = self._prepare_export_uint16(data)
-            norm_data = self._normalize_for_colormap(arr, bit_depth=16)
+            norm_levels = self._normalize_for_colormap(arr, bit_depth=16, levels=np.arange(65536))
             if rgb_uint8:
-                return self._colorize_array_batched(norm_data, arr > 0, cmap_name, 255.0, np.uint8)
-            return self._colorize_array_batched(norm_data, arr > 0, cmap_name, 65535.0, np.uint16)
+                return level_colormap_lut(cmap_name, norm_levels, 255.0, np.uint8)[arr]
+            return level_colormap_lut(cmap_name, norm_levels, 65535.0, np.uint16)[arr]
 
         arr = np.clip(np.asarray(data), 0, 255).astype(np.uint8)
-        norm_data = self._normalize_for_colormap(arr, bit_depth=8)
-        return self._colorize_array_batched(norm_data, arr > 0, cmap_name, 255.0, np.uint8)
+        norm_levels = self._normalize_for_colormap(arr, bit_depth=8, levels=np.arange(256))
+        return level_colormap_lut(cmap_name, norm_levels, 255.0, np.uint8)[arr]
 
     # ======================================================================
     def _colorize_pre_normalized_uint16(self, data, cmap_name, rgb_uint8=False):
-        arr = self._prepare_export_uint16(data).astype(np.float32, copy=False)
-        norm_data = np.clip(arr / 65535.0, 0.0, 1.0)
+        arr = self._prepare_export_uint16(data)
         if rgb_uint8:
-            return self._colorize_array_batched(norm_data, arr > 0, cmap_name, 255.0, np.uint8)
-        return self._colorize_array_batched(norm_data, arr > 0, cmap_name, 65535.0, np.uint16)
+            return uint16_colormap_lut(cmap_name, 255.0, np.uint8)[arr]
+        return uint16_colormap_lut(cmap_name, 65535.0, np.uint16)[arr]
 
     # ======================================================================
     def _is_colormap_selected(self, cmap_name):
@@ -2146,33 +2260,23 @@ class sonObj(object):
         return out
 
     # ======================================================================
-    def _save_tile_image(self, outfile, data):
-        ext = os.path.splitext(outfile)[1].lower()
-
-        if ext in ['.tif', '.tiff']:
-            try:
-                import tifffile
-
-                if data.ndim == 3 and data.shape[-1] in [3, 4]:
-                    tifffile.imwrite(
-                        outfile,
-                        data,
-                        compression='deflate',
-                        predictor=True,
-                        photometric='rgb',
-                    )
-                else:
-                    tifffile.imwrite(
-                        outfile,
-                        data,
-                        compression='deflate',
-                        predictor=True,
-                    )
-                return
-            except Exception:
-                pass
+    def _tile_writer(self):
+        '''
+        This process's background tile writer (see funcs_tilewriter).  Set
+        tile_writer_threads=0 to encode on the calling thread.
+        '''
+        return shared_writer(int(getattr(self, 'tile_writer_threads', 2)),
+                             getattr(self, 'tile_writer_queue', None))
 
-        imsave(outfile, data, check_contrast=False)
+    # ======================================================================
+    def _save_tile_image(self, outfile, data):
+        self._tile_writer().write(
+            outfile,
+            data,
+            png_level=getattr(self, 'tile_png_level', PNG_LEVEL),
+            jpeg_quality=getattr(self, 'tile_jpeg_quality', JPEG_QUALITY),
+            tiff_compression=getattr(self, 'tile_tiff_compression', TIFF_COMPRESSION),
+        )
 
     # ======================================================================
     def _writeTiles(self,
@@ -2219,7 +2323,7 @@ class sonObj(object):
         else:
             arr = self.sonDat
             if apply_display_enhancement and (bool(getattr(self, 'sonar_db_transform', False)) or bool(getattr(self, 'sonar_clahe', False))):
-                arr = self._apply_display_enhancements(arr)
+                arr = self._apply_display_enhancements(arr, k)
 
             if np.issubdtype(np.asarray(arr).dtype, np.floating):
                 data = self._convert_son_dat_to_uint8(arr)
@@ -2289,7 +2393,7 @@ class sonObj(object):
         else:
             arr = self.sonDat
             if apply_display_enhancement and (bool(getattr(self, 'sonar_db_transform', False)) or bool(getattr(self, 'sonar_clahe', False))):
-                arr = self._apply_display_enhancements(arr)
+                arr = self._apply_display_enhancements(arr, k)
 
             if np.issubdtype(np.asarray(arr).dtype, np.floating):
                 data = self._convert_son_dat_to_uint8(arr)
@@ -2352,9 +2456,13 @@ class sonObj(object):
                         spdCor = False, 
                         mask_shdw = False,
                         maxCrop = False,
-                        tileFile='.jpg'):
+                        tileFile='.jpg',
+                        sketch = False):
         '''
-
+        Exports the chunk's sonogram tiles.  With `sketch`, the chunk's
+        intensity sketches are taken from its first decode and returned with
+        the tile writer stats, for the parent to merge with
+        self._intensityCalcGlobalStats().
         '''
         # Make sonar imagery directory for each beam if it doesn't exist
         try:
@@ -2362,6 +2470,10 @@ class sonObj(object):
         except:
             pass
 
+        # Set by self._doSpdCor() on the chunk's first decode
+        self._sketchNextDecode = bool(sketch)
+        self._chunkSketch = None
+
         if self.wcp:
             # Do speed correction
             export_16bit = bool(getattr(self, 'export_16bit', False)) and not bool(getattr(self, 'son8bit', False))
@@ -2407,6 +2519,75 @@ class sonObj(object):
                 pass
 
         gc.collect()
+
+        chunkSketch = self._chunkSketch
+        del self._sketchNextDecode, self._chunkSketch
+
+        # Wait for this chunk's tiles; returns encode stats for the progress line
+        return self._tile_writer().flush(), chunkSketch
+
+
+    ############################################################################
+    # Sonar cube                                                               #
+    ############################################################################
+
+    # ======================================================================
+    def _cubePath(self):
+        return os.path.join(self.projDir, self.beamName, CUBE_NAME)
+
+    # ======================================================================
+    def _exportCube(self, threadCnt=1, level=0):
+        '''
+        Writes the beam's decoded pings to a (ping, sample) cube (see
+        funcs_cube) at projDir/beamName/cube.zarr, as an alternative to
+        re-reading exported tiles.  Rows follow the metadata csv (filtered
+        pings included) with transect, chunk_id, etc. as coordinates; values
+        are the decoded samples before TVG and display scaling.  Each parallel
+        task writes one store chunk of nchunk pings.
+
+        Stored uncompressed by default (about the size of the son file) so a
+        ping span read only touches its own rows; level > 0 uses zlib.
+        '''
+        self._loadSonMeta()
+        sonMeta = self.sonMetaDF
+        del self.sonMetaDF
+
+        ping_cnt = pd.to_numeric(sonMeta['ping_cnt'], errors='coerce')
+        ping_cnt = ping_cnt[np.isfinite(ping_cnt) & (ping_cnt > 0) & (ping_cnt < 1_000_000)]
+        n_samples = int(ping_cnt.max()) if len(ping_cnt) > 0 else 0
+
+        if 'weighting_factor' in sonMeta.columns:
+            self._ensure_jsf_global_scale_max(sonMeta)
+
+        cubeFile = self._cubePath()
+        cube = create_cube(cubeFile, len(sonMeta), n_samples, self._pingStorageDtype(sonMeta),
+                           chunk_pings=getattr(self, 'nchunk', 500), coords=cube_coords(sonMeta),
+                           attrs={'beam': self.beamName, 'sonFile': os.path.basename(self.sonFile)},
+                           level=level)
+
+        ranges = cube.chunk_ranges()
+        Parallel(n_jobs=safe_n_jobs(len(ranges), threadCnt))(delayed(self._writeCubeBlock)(cubeFile, sonMeta.iloc[s:e].reset_index(drop=True), s) for s, e in tqdm(ranges))
+
+        self.cubeFile = cubeFile
+        return cube
+
+    # ======================================================================
+    def _writeCubeBlock(self, cubeFile, sonMeta, start):
+        '''
+        Decodes the pings in sonMeta and writes them to the cube from ping
+        `start`, padding each ping with zeros to the cube's sample count.
+        '''
+        cube = open_cube(cubeFile)
+        n_samples = cube.shape[1]
+
+        self._setPingReads(sonMeta, pingMax=n_samples)
+        sonDat = self._readSonPings()
+        self._clearPingReads()
+
+        pings = np.zeros((len(sonMeta), n_samples), dtype=cube.dtype)
+        n = min(sonDat.shape[0], n_samples)
+        pings[:, :n] = sonDat[:n].T
+        cube.write(start, pings)
         return
 
 
@@ -2442,6 +2623,11 @@ class sonObj(object):
                 # self._loadSonChunk()
                 self._getScanChunkSingle(chunk)
 
+                if getattr(self, '_sketchNextDecode', False):
+                    # Intensity statistics piggyback on the first decode
+                    self._chunkSketch = self._intensitySketchChunk(self.sonDat)
+                    self._sketchNextDecode = False
+
             export_16bit = bool(getattr(self, 'export_16bit', False)) and not bool(getattr(self, 'son8bit', False))
             if export_16bit and getattr(self, 'sonDat16', None) is not None:
                 self.sonDat = self.sonDat16.astype(np.float32, copy=False)
@@ -2472,7 +2658,7 @@ class sonObj(object):
             sonDat = self.sonDat
 
             if pre_spd_enhance and not export_16bit:
-                sonDat = self._apply_display_enhancements(sonDat)
+                sonDat = self._apply_display_enhancements(sonDat, chunk)
                 self.sonDat = sonDat
 
             if spdCor == 0:
@@ -2594,22 +2780,46 @@ class sonObj(object):
         --------------------
         Return to child class c_rectObj._rectSon() to complete rectification
         '''
-        # Open sonar metadata file to df
-        sonMetaAll = pd.read_csv(self.sonMetaFile)
+        # Numeric metadata, memory-mapped (see funcs_cube.ping_index)
+        index = self._pingIndex()
 
-        # Filter df by chunk
+        # Filter by chunk
         if cog:
-            isChunk = sonMetaAll['chunk_id']==chunk
+            isChunk = index['chunk_id']==chunk
         else:
-            isChunk = sonMetaAll['chunk_id_2']==chunk
-            isChunk.iloc[chunk+1] = True
-        sonMeta = sonMetaAll[isChunk].reset_index()
+            isChunk = index['chunk_id_2']==chunk
+            isChunk[chunk+1] = True
+        sonMeta = self._pingIndexRows(np.flatnonzero(isChunk)).reset_index()
         sonMeta = self._sanitize_chunk_sonmeta(sonMeta)
 
         # Update class attributes based on current chunk
-        rangeCnt = np.unique(sonMeta['ping_cnt'], return_counts=True)
-        pingMaxi = np.argmax(rangeCnt[1])
-        self.pingMax = int(rangeCnt[0][pingMaxi])
+        self._setPingReads(sonMeta, self._pingIndexAll())
+
+        # Load chunk's sonar data into memory
+        self._loadSonChunk()
+        # Do PPDRC filter
+        if filterIntensity:
+            self._doPPDRC()
+        # Remove water if exporting wcr imagery
+        if remWater:
+            self._WCR_SRC(sonMeta)
+
+        self._clearPingReads()
+
+        return
+
+    # ======================================================================
+    def _setPingReads(self, sonMeta, sonMetaAll=None, pingMax=None):
+        '''
+        Sets the per-ping read attributes (byte offsets, ping counts, sample
+        sizes, JSF/Cerulean scaling) that self._loadSonChunk() decodes, from
+        the rows of sonMeta.  pingMax defaults to the most common ping count.
+        '''
+        if pingMax is None:
+            rangeCnt = np.unique(sonMeta['ping_cnt'], return_counts=True)
+            pingMaxi = np.argmax(rangeCnt[1])
+            pingMax = rangeCnt[0][pingMaxi]
+        self.pingMax = int(pingMax)
 
         self.headIdx = sonMeta['index']#.astype(int) # store byte offset per ping
         self.son_offset = sonMeta['son_offset']
@@ -2643,7 +2853,7 @@ class sonObj(object):
         if 'weighting_factor' in sonMeta.columns:
             self.weightingFactor = pd.to_numeric(sonMeta['weighting_factor'], errors='coerce').to_numpy(dtype=float)
             self._use_jsf_weighting = True
-            self._ensure_jsf_global_scale_max(sonMetaAll)
+            self._ensure_jsf_global_scale_max(sonMeta if sonMetaAll is None else sonMetaAll)
 
         self._use_cerulean_power_scale = False
         if 'min_pwr_db' in sonMeta.columns and 'max_pwr_db' in sonMeta.columns:
@@ -2651,15 +2861,13 @@ class sonObj(object):
             self.maxPwrDb = pd.to_numeric(sonMeta['max_pwr_db'], errors='coerce').to_numpy(dtype=float)
             self._use_cerulean_power_scale = True
 
-        # Load chunk's sonar data into memory
-        self._loadSonChunk()
-        # Do PPDRC filter
-        if filterIntensity:
-            self._doPPDRC()
-        # Remove water if exporting wcr imagery
-        if remWater:
-            self._WCR(sonMeta)     
+        return
 
+    # ======================================================================
+    def _clearPingReads(self):
+        '''
+        Drops the attributes set by self._setPingReads().
+        '''
         del self.headIdx, self.pingCnt
         if hasattr(self, 'bytesPerSample'):
             del self.bytesPerSample
@@ -2671,81 +2879,150 @@ class sonObj(object):
             del self.maxPwrDb
         self._use_jsf_weighting = False
         self._use_cerulean_power_scale = False
-
         return
     
-    def _getScanSlice(self, transect, start_idx, end_idx, remWater = False):
+    # ======================================================================
+    def _pingIndex(self):
         '''
-        
+        Memory-mapped numeric metadata of the beam, one record per csv row
+        (see funcs_cube.ping_index()).
         '''
+        return ping_index(self.sonMetaFile)
 
-        # Open sonar metadata file to df
-        sonMetaAll = pd.read_csv(self.sonMetaFile)
-        sonMetaAll_full = sonMetaAll
+    # ======================================================================
+    def _pingIndexRows(self, rows):
+        '''
+        DataFrame of ping index `rows` (positions in the csv), labelled by
+        their csv row.
+        '''
+        rows = np.asarray(rows, dtype=np.int64)
+        return pd.DataFrame(np.asarray(self._pingIndex()[rows]), index=rows)
 
-        # Filter by transect
-        sonMetaAll = sonMetaAll[sonMetaAll['transect'] == transect].reset_index(drop=True)
-        
-        # Filter sonMeta
-        # sonMeta = sonMeta[(sonMeta['index'] >= start_idx) & (sonMeta['index'] <= end_idx)]
-        sonMeta = sonMeta.iloc[start_idx:end_idx]
-        sonMeta = sonMeta.reset_index()
+    # ======================================================================
+    def _pingIndexAll(self):
+        '''
+        All rows of the ping index when the beam needs them for read scaling
+        (JSF global scale), otherwise None.
+        '''
+        index = self._pingIndex()
+        if 'weighting_factor' not in index.dtype.names:
+            return None
+        return pd.DataFrame(np.asarray(index))
+
+    # ======================================================================
+    def _getScanSlice(self, transect, start_idx, end_idx, remWater=False, view=None):
+        '''
+        Loads pings [start_idx, end_idx) of a transect into self.sonDat,
+        independent of chunk boundaries, e.g. for variable-size chunks,
+        sliding windows or viewers.
+
+        Rows are selected from the binary ping index (no csv parsing), and
+        pings come from the sonar cube when one was exported and matches the
+        read (see self._exportCube()), otherwise from the son file.
+
+        ----------
+        Parameters
+        ----------
+        transect : int or None
+            DESCRIPTION - Transect number; None indexes all pings of the beam.
+        start_idx, end_idx : int
+            DESCRIPTION - Ping positions within the transect, in metadata
+                          order, with python slice semantics.
+        view : str
+            DESCRIPTION - 'raw' : decoded intensities as self._loadSonChunk()
+                                  scales them (default);
+                          'egn' : water column present with empirical gain
+                                  normalization and stretch (requires egn
+                                  statistics);
+                          'src' : water column removed and slant range
+                                  corrected, normalized when self.egn, as
+                                  for wcr tiles.
+        remWater : bool
+            DESCRIPTION - Same as view='src'.
+
+        -------
+        Returns
+        -------
+        Metadata of the loaded pings (invalid pings dropped, as for chunks),
+        one row per column of self.sonDat; 'ping_row' is the csv row.
+        '''
+        if view is None:
+            view = 'src' if remWater else 'raw'
+        view = str(view).lower()
+        if view not in SCAN_SLICE_VIEWS:
+            raise ValueError("Unknown scan slice view '{}', expected one of {}".format(view, SCAN_SLICE_VIEWS))
+        if view == 'egn' and not hasattr(self, 'egn_bed_means'):
+            raise ValueError("view='egn' needs the beam's egn statistics (run with egn=True)")
+
+        # Transect's rows from the binary index
+        index = self._pingIndex()
+        if transect is None:
+            rows = np.arange(len(index))
+        else:
+            if 'transect' not in index.dtype.names:
+                raise ValueError('{} has no transect column'.format(self.sonMetaFile))
+            rows = np.flatnonzero(index['transect'] == transect)
+        rows = rows[start_idx:end_idx]
+
+        sonMeta = self._pingIndexRows(rows).rename_axis('ping_row').reset_index()
         sonMeta = self._sanitize_chunk_sonmeta(sonMeta)
+        if len(sonMeta) == 0:
+            self.sonDat = np.zeros((0, 0), dtype=np.uint8)
+            self.sonDat16 = None
+            return sonMeta
 
-        # Update class attributes based on current chunk
-        rangeCnt = np.unique(sonMeta['ping_cnt'], return_counts=True)
-        pingMaxi = np.argmax(rangeCnt[1])
-        self.pingMax = int(rangeCnt[0][pingMaxi])
+        # Decode
+        self._setPingReads(sonMeta, self._pingIndexAll())
+        self._loadSonChunk(self._readCubePings(sonMeta['ping_row'].to_numpy()))
+        self._clearPingReads()
 
-        self.headIdx = sonMeta['index']#.astype(int) # store byte offset per ping
-        self.son_offset = sonMeta['son_offset']
-        self.pingCnt = sonMeta['ping_cnt']#.astype(int) # store ping count per ping
-        if 'bytes_per_sample' in sonMeta.columns:
-            self.bytesPerSample = sonMeta['bytes_per_sample']
-        elif hasattr(self, 'bytesPerSample'):
-            del self.bytesPerSample
+        if view == 'egn':
+            self._egn_wcp(None, sonMeta)
+            if self.egn_stretch > 0:
+                self._egnDoStretch()
 
-        if 'pixM' in sonMeta.columns:
-            chunk_pix_m = pd.to_numeric(sonMeta['pixM'], errors='coerce').to_numpy(dtype=float)
-            if np.any(np.isfinite(chunk_pix_m)):
-                self._chunk_pixM = float(np.nanmedian(chunk_pix_m[np.isfinite(chunk_pix_m)]))
-            elif hasattr(self, '_chunk_pixM'):
-                del self._chunk_pixM
-        elif hasattr(self, '_chunk_pixM'):
-            del self._chunk_pixM
+        elif view == 'src':
+            self._WCR_SRC(sonMeta)
+            if getattr(self, 'egn', False):
+                self._egn()
+                self.sonDat = np.nan_to_num(self.sonDat, nan=0)
+                if self.egn_stretch > 0:
+                    self._egnDoStretch()
 
-        self._use_jsf_weighting = False
-        if 'weighting_factor' in sonMeta.columns:
-            self.weightingFactor = pd.to_numeric(sonMeta['weighting_factor'], errors='coerce').to_numpy(dtype=float)
-            self._use_jsf_weighting = True
-            self._ensure_jsf_global_scale_max(sonMetaAll_full)
+        return sonMeta
 
-        self._use_cerulean_power_scale = False
-        if 'min_pwr_db' in sonMeta.columns and 'max_pwr_db' in sonMeta.columns:
-            self.minPwrDb = pd.to_numeric(sonMeta['min_pwr_db'], errors='coerce').to_numpy(dtype=float)
-            self.maxPwrDb = pd.to_numeric(sonMeta['max_pwr_db'], errors='coerce').to_numpy(dtype=float)
-            self._use_cerulean_power_scale = True
+    # ======================================================================
+    def _readCubePings(self, rows):
+        '''
+        Pings at csv `rows` from the sonar cube, shaped like
+        self._readSonPings() output for the current read attributes, or None
+        when there is no cube or it cannot reproduce the son file read (stale
+        cube, range crop, or flipped pings longer than pingMax).
+        '''
+        cube = open_cube(getattr(self, 'cubeFile', None) or self._cubePath())
+        if cube is None or cube.shape[0] != len(self._pingIndex()):
+            return None
+        if getattr(self, '_range_crop_samples_after_flip', None) is not None:
+            return None
 
-        # Load chunk's sonar data into memory
-        self._loadSonChunk()
+        dtype = self._pingStorageDtype()
+        if cube.dtype != dtype:
+            return None
 
-        # Remove water if exporting wcr imagery
-        if remWater:
-            self._WCR(sonMeta)     
+        # son file reads keep the first pingMax samples before flipping
+        pingCnt = pd.to_numeric(self.pingCnt, errors='coerce').to_numpy(dtype=float)
+        if getattr(self, 'flip_port', False) and np.nanmax(pingCnt) > self.pingMax:
+            return None
 
-        del self.headIdx, self.pingCnt
-        if hasattr(self, 'bytesPerSample'):
-            del self.bytesPerSample
-        if hasattr(self, 'weightingFactor'):
-            del self.weightingFactor
-        if hasattr(self, 'minPwrDb'):
-            del self.minPwrDb
-        if hasattr(self, 'maxPwrDb'):
-            del self.maxPwrDb
-        self._use_jsf_weighting = False
-        self._use_cerulean_power_scale = False
+        lo, hi = int(rows.min()), int(rows.max()) + 1
+        pings = cube.read(lo, hi)[rows - lo]
 
-        return
+        sonDat = np.zeros((self.pingMax, len(rows)), dtype=dtype)
+        n = min(self.pingMax, pings.shape[1])
+        sonDat[:n] = pings[:, :n].T
+        if bool(getattr(self, 'tvg', False)):
+            sonDat = sonDat.astype(np.float32)
+        return sonDat
 
     # ======================================================================
     def _loadSonMeta(self):
@@ -2840,18 +3117,13 @@ class sonObj(object):
                 pass
 
     # ======================================================================
-    def _pickleSon(self):
+    def _saveSon(self):
         '''
-        Pickle sonObj so we can reload later if needed.
+        Save sonObj state (JSON manifest + array sidecars) so we can reload
+        later if needed.
         '''
-        if not hasattr(self, 'sonMetaPickle'):
-            outFile = self.sonMetaFile.replace(".csv", ".meta")
-            self.sonMetaPickle = outFile
-        else:
-            outFile = self.sonMetaPickle
-
-        with open(outFile, 'wb') as sonFile:
-            pickle.dump(self, sonFile)
+        self.sonMetaManifest = manifest_path(self.sonMetaFile)
+        self._saveManifest(self.sonMetaManifest)
 
         return
 
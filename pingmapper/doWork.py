@@ -13,8 +13,9 @@ from pingmapper.funcs_common import (
     unableToProcessError,
 )
 from pingmapper.main_readFiles import read_master_func
-from pingmapper.main_rectify import rectify_master_func
-from pingmapper.main_mapSubstrate import map_master_func
+
+# Rectification and substrate mapping (and their GIS / ML dependencies) are
+# imported only when a run reaches those stages.
 
 
 SUPPORTED_EXTS = ('.DAT', '.sl2', '.sl3', '.RSD', '.svlog', '.jsf', '.xtf', '.sdf')
@@ -322,6 +323,7 @@ def doWork(
                     print('\n===========================================')
                     print('===========================================')
                     print('***** RECTIFYING *****')
+                    from pingmapper.main_rectify import rectify_master_func
                     rectify_master_func(**run_params)
 
                 if pred_sub or map_sub or export_poly or plt_subclass:
@@ -329,6 +331,7 @@ def doWork(
                     print('===========================================')
                     print('***** MAPPING SUBSTRATE *****')
                     print('working on ' + proj_dir)
+                    from pingmapper.main_mapSubstrate import map_master_func
                     map_master_func(**run_params)
 
             gc.collect()
@@ -0,0 +1,127 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Adaptive chunk sizing.
+
+With a fixed `nchunk`, a chunk's memory and rectified raster size scale with
+ping length and vessel speed: 500 pings of 4,000 samples are eight times the
+data of 500 pings of 500 samples.  `adaptive_chunk_ids()` instead closes a
+chunk once it holds `target_bytes` of sonar samples or spans `target_dist`
+meters along track, within [min_pings, max_pings] pings, so workers get
+similarly sized work units.
+
+Chunks never span transects, and ids are consecutive integers in ping order,
+as with fixed-size chunks, so chunk_id consumers are unaffected.
+'''
+
+import numpy as np
+
+CHUNK_TARGET_MB = 8
+CHUNK_TARGET_M = 100
+
+
+# =========================================================
+def chunk_lengths(nbytes, dist=None, target_bytes=CHUNK_TARGET_MB * 2**20,
+                  target_dist=CHUNK_TARGET_M, min_pings=1, max_pings=None):
+    '''
+    Ping counts of consecutive chunks covering one transect.
+
+    nbytes : bytes per ping (NaN counts as 0)
+    dist : cumulative along-track distance per ping (m), or None
+    target_bytes, target_dist : close a chunk before it exceeds either
+        target; 0/None disables a target
+    min_pings, max_pings : bounds on a chunk's ping count; a short last chunk
+        is merged into the previous one (split evenly if that would exceed
+        max_pings)
+    '''
+    n = len(nbytes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    min_pings = max(1, int(min_pings))
+    max_pings = n if not max_pings else max(min_pings, int(max_pings))
+
+    cum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(np.asarray(nbytes, dtype=float), nan=0.0))))
+
+    if dist is not None and target_dist:
+        # Non-decreasing distance; missing values hold the last known one
+        dist = np.asarray(dist, dtype=float)
+        dist = np.maximum.accumulate(np.where(np.isfinite(dist), dist, -np.inf))
+        dist[~np.isfinite(dist)] = 0.0
+    else:
+        dist = None
+
+    lengths = []
+    s = 0
+    while s < n:
+        e = n
+        if target_bytes:
+            # Last ping that keeps the chunk within target_bytes
+            e = min(e, int(np.searchsorted(cum, cum[s] + target_bytes, side='right')) - 1)
+        if dist is not None:
+            e = min(e, int(np.searchsorted(dist, dist[s] + target_dist, side='left')))
+        e = min(max(e, s + min_pings), s + max_pings, n)
+        lengths.append(e - s)
+        s = e
+
+    if len(lengths) > 1 and lengths[-1] < min_pings:
+        last = lengths.pop() + lengths.pop()
+        if last > max_pings:
+            lengths += [last - last // 2, last // 2]
+        else:
+            lengths.append(last)
+
+    return np.asarray(lengths, dtype=np.int64)
+
+
+# =========================================================
+def adaptive_chunk_ids(transect, nbytes, dist=None, first_chunk=0, **kwargs):
+    '''
+    chunk_id per ping, numbered from `first_chunk` in ping order, with chunk
+    sizes from chunk_lengths() applied to each run of equal `transect`
+    values.
+    '''
+    transect = np.asarray(transect)
+    nbytes = np.asarray(nbytes, dtype=float)
+    if dist is not None:
+        dist = np.asarray(dist, dtype=float)
+
+    bounds = np.flatnonzero(transect[1:] != transect[:-1]) + 1
+    bounds = np.concatenate(([0], bounds, [len(transect)]))
+
+    lengths = [chunk_lengths(nbytes[s:e], None if dist is None else dist[s:e], **kwargs)
+               for s, e in zip(bounds[:-1], bounds[1:]) if e > s]
+    if len(lengths) == 0:
+        return np.zeros(0, dtype=np.int64)
+    lengths = np.concatenate(lengths)
+    return np.repeat(np.arange(len(lengths), dtype=np.int64) + int(first_chunk), lengths)
@@ -0,0 +1,168 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Contrast limited adaptive histogram equalization (CLAHE) for sonograms.
+
+Built on OpenCV's 16-bit CLAHE, which works on integer images in place of
+the float64 copies made by skimage's equalize_adapthist, so a full chunk is
+equalized in one call without striping.  Intensities normalized to [0, 1]
+are quantized to 256 levels (spaced 257 apart in uint16) so `clip_limit`
+keeps skimage's meaning: the fraction of a tile allowed in any one of the
+256 histogram bins.  Output is float32 in [0, 1] with 16-bit precision.
+
+Sonograms are enhanced one chunk at a time, and CLAHE tiles at a chunk's
+first and last pings only see that chunk, which leaves a visible seam between
+neighbouring chunks.  Given the histogram of the whole recording (see
+funcs_intensity), `clahe()` blends from the local result toward the
+recording-wide equalization over one tile width at both ends of the chunk.
+Neighbouring chunks then meet with the same mapping at their shared edge.
+'''
+
+import numpy as np
+
+from pingmapper.funcs_lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+
+CLAHE_LEVELS = 256
+
+# Tiles along (samples, pings); skimage's default kernel is 1/8 of each axis
+CLAHE_TILE_GRID = (8, 8)
+
+_STEP = 65535 // (CLAHE_LEVELS - 1)
+
+
+# =========================================================
+def to_clahe_levels(arr01):
+    '''
+    Quantize [0, 1] intensities to the 256 CLAHE levels as uint16.
+    '''
+    arr = np.asarray(arr01, dtype=np.float32)
+    levels = np.rint(np.clip(arr, 0.0, 1.0) * np.float32(CLAHE_LEVELS - 1))
+    return levels.astype(np.uint16) * np.uint16(_STEP)
+
+
+# =========================================================
+def level_histogram(values, counts, lo, hi):
+    '''
+    Histogram over the 256 CLAHE levels of `values` (weighted by `counts`)
+    after normalizing with display bounds (lo, hi).
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    arr01 = np.clip((values - lo) / (hi - lo), 0.0, 1.0)
+    levels = np.rint(arr01 * (CLAHE_LEVELS - 1)).astype(np.int64)
+    return np.bincount(levels, weights=counts, minlength=CLAHE_LEVELS)
+
+
+# =========================================================
+def clahe_lut(hist, clip_limit):
+    '''
+    Equalization lookup table (256 entries in [0, 1]) for a histogram over
+    the CLAHE levels, clipped and redistributed as OpenCV does for one tile.
+    '''
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if not total > 0:
+        return np.linspace(0.0, 1.0, CLAHE_LEVELS, dtype=np.float32)
+
+    limit = max(np.floor(float(clip_limit) * total), 1.0)
+    clipped = np.minimum(hist, limit)
+    excess = total - clipped.sum()
+
+    # Excess goes to all 65536 uint16 bins: an even share each, and the
+    # remainder one count at a time every `step` bins from bin 0
+    batch = np.floor(excess / 65536.0)
+    residual = excess - batch * 65536.0
+    step = max(np.floor(65536.0 / residual), 1.0) if residual > 0 else 65536.0
+    bins = np.arange(CLAHE_LEVELS) * _STEP
+    spread = batch * (bins + 1) + np.minimum(np.floor(bins / step) + 1, residual)
+
+    cdf = np.cumsum(clipped) + spread
+    return np.clip(cdf / total, 0.0, 1.0).astype(np.float32)
+
+
+# =========================================================
+def seam_weights(n_pings, width, blend_start=True, blend_end=True):
+    '''
+    Per-ping weight of the local CLAHE result: 0 on a chunk's first and last
+    ping, rising linearly to 1 one `width` inside.  Ends that don't border
+    another chunk (`blend_start`/`blend_end` False) keep weight 1.
+    '''
+    if n_pings == 0:
+        return np.zeros(0, dtype=np.float32)
+    idx = np.arange(n_pings, dtype=np.float32)
+    edge = np.full(n_pings, np.inf, dtype=np.float32)
+    if blend_start:
+        edge = np.minimum(edge, idx)
+    if blend_end:
+        edge = np.minimum(edge, idx[::-1])
+    return np.clip(edge / max(float(width), 1.0), 0.0, 1.0)
+
+
+# =========================================================
+def clahe(arr01, clip_limit=0.01, tile_grid=CLAHE_TILE_GRID, seam_lut=None, seam_width=None,
+          blend_start=True, blend_end=True):
+    '''
+    CLAHE of a [0, 1] sonogram chunk (samples x pings) with an explicit
+    `tile_grid` of (sample tiles, ping tiles).
+
+    With `seam_lut` (the recording-wide `clahe_lut()`), pings within
+    `seam_width` (default: one tile) of the chunk's start and end are blended
+    toward it; `blend_start`/`blend_end` False skip an end with no
+    neighbouring chunk.  Returns float32 in [0, 1].
+    '''
+    levels = to_clahe_levels(arr01)
+    if levels.ndim != 2 or levels.size == 0:
+        return levels.astype(np.float32)
+
+    h, w = levels.shape
+    tiles_y = int(min(max(int(tile_grid[0]), 1), h))
+    tiles_x = int(min(max(int(tile_grid[1]), 1), w))
+
+    # OpenCV clips each of its 65536 bins at clipLimit * tile / 65536 counts
+    engine = cv2.createCLAHE(clipLimit=float(clip_limit) * 65536.0, tileGridSize=(tiles_x, tiles_y))
+    out = engine.apply(levels).astype(np.float32)
+    out *= np.float32(1.0 / 65535.0)
+
+    if seam_lut is not None:
+        if seam_width is None:
+            seam_width = -(-w // tiles_x)
+        weight = seam_weights(w, seam_width, blend_start, blend_end)
+        edge = weight < 1
+        if np.any(edge):
+            glob = np.asarray(seam_lut, dtype=np.float32)[levels[:, edge] // _STEP]
+            wt = weight[edge]
+            out[:, edge] = out[:, edge] * wt + glob * (1.0 - wt)
+
+    return out
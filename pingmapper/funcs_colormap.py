@@ -0,0 +1,159 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Colormap lookup tables for colorized sonar exports.
+
+A matplotlib colormap is a table of N colors (N=256 for the bundled maps)
+and `cmap(x)` returns entry min(int(x * N), N - 1).  Exports here reproduce
+that exactly with integer gathers instead of building float64 RGBA arrays:
+
+- `colorize()` maps normalized float data through the colormap's table,
+  already scaled to the output dtype.
+- `level_colormap_lut()` goes one step further for 8/16-bit data.  Each
+  input level is normalized and colored once, so a whole image is colored
+  by a single `lut[data]` gather.
+- `colormap_index()` / `colormap_palette()` give a uint8 index image and its
+  palette, for palette-indexed GeoTIFFs in place of RGB.
+
+Non-zero (valid) samples never map to an all-zero color, which is reserved
+for no-data.  Tables are cached per process.
+'''
+
+from functools import lru_cache
+
+import numpy as np
+
+from pingmapper.funcs_lazy import lazy_attr
+
+colormaps = lazy_attr('matplotlib', 'colormaps')
+
+
+# =========================================================
+@lru_cache(maxsize=64)
+def _rgb_table(name, scale_max, dtype):
+    cmap = colormaps.get_cmap(name)
+    rgb = cmap(np.arange(cmap.N))[:, :3]
+    table = np.clip(rgb * scale_max, 0, scale_max).astype(dtype)
+
+    # Rows N.. are the same colors for valid samples, never all-zero
+    table = np.concatenate([table, np.maximum(table, 1)])
+    table.flags.writeable = False
+    return table
+
+
+def rgb_table(name, scale_max=255.0, dtype=np.uint8):
+    '''
+    (2N, 3) table of colormap `name` scaled to [0, scale_max] as `dtype`.
+    Rows N.. hold the colors for valid (non-zero) samples, raised to at
+    least 1 per channel.
+    '''
+    return _rgb_table(str(name), float(scale_max), np.dtype(dtype))
+
+
+def colormap_size(name):
+    '''Number of colors N in colormap `name`.'''
+    return len(rgb_table(name)) // 2
+
+
+# =========================================================
+def colormap_index(norm, n):
+    '''
+    Colormap entry of normalized data in [0, 1], as matplotlib picks it for
+    an `n`-color map (float32 arithmetic, x == 1 -> n - 1).
+    '''
+    x = np.multiply(norm, np.float32(n), dtype=np.float32)
+    np.minimum(x, np.float32(n - 1), out=x)
+    return x.astype(np.uint16)
+
+
+def colorize(norm, valid, name, scale_max=255.0, dtype=np.uint8):
+    '''
+    RGB image (H, W, 3) of normalized data `norm` through colormap `name`,
+    equal to clip(cmap(norm)[..., :3] * scale_max).astype(dtype) with
+    `valid` samples raised to at least 1.
+    '''
+    table = rgb_table(name, scale_max, dtype)
+    idx = colormap_index(norm, len(table) // 2)
+    idx[np.asarray(valid, dtype=bool)] += np.uint16(len(table) // 2)
+    return table[idx]
+
+
+# =========================================================
+def level_colormap_lut(name, norm_levels, scale_max=255.0, dtype=np.uint8):
+    '''
+    Color of every input level (256 or 65536 rows) given each level's
+    normalized value.  Level 0 is no-data; every other level is valid.
+    '''
+    valid = np.arange(len(norm_levels)) > 0
+    return colorize(norm_levels, valid, name, scale_max, dtype)
+
+
+@lru_cache(maxsize=16)
+def _uint16_colormap_lut(name, scale_max, dtype):
+    levels = np.arange(65536, dtype=np.float32)
+    norm_levels = np.clip(levels / 65535.0, 0.0, 1.0)
+    lut = level_colormap_lut(name, norm_levels, scale_max, dtype)
+    lut.flags.writeable = False
+    return lut
+
+
+def uint16_colormap_lut(name, scale_max=255.0, dtype=np.uint8):
+    '''
+    Colors of all uint16 levels for data already scaled to the full 16-bit
+    range (level / 65535).  Cached per process.
+    '''
+    return _uint16_colormap_lut(str(name), float(scale_max), np.dtype(dtype))
+
+
+# =========================================================
+def level_index_lut(norm_levels, n):
+    '''
+    uint8 palette index of every input level: the colormap entry, with 0
+    kept for no-data (level 0) and valid levels on entry 0 moved to 1.
+    '''
+    idx = colormap_index(norm_levels, n).astype(np.uint8)
+    idx[1:] = np.maximum(idx[1:], 1)
+    idx[0] = 0
+    return idx
+
+
+def colormap_palette(name):
+    '''
+    {index: (r, g, b, 255)} palette of colormap `name` in 8 bit, for
+    GeoTIFF color tables.  None if the colormap has more than 256 colors.
+    '''
+    table = rgb_table(name)
+    n = len(table) // 2
+    if n > 256:
+        return None
+    return {i: tuple(int(c) for c in table[i]) + (255,) for i in range(n)}
@@ -44,7 +44,11 @@ sys.path.append(PACKAGE_DIR)
 
 from joblib import Parallel, delayed, cpu_count
 from glob import glob
-import requests, zipfile
+import zipfile
+
+# Heavy libraries are imported on first use (see funcs_lazy)
+from pingmapper.funcs_lazy import lazy_import, lazy_attr, module_available
+requests = lazy_import('requests')
 
 ################################################################################
 import warnings
@@ -54,7 +58,7 @@ warnings.simplefilter("ignore")
 import numpy as np
 from array import array as arr
 
-from osgeo import gdal
+gdal = lazy_import('osgeo.gdal')
 import pyproj
 
 if 'GDAL_DATA' not in os.environ:
@@ -69,7 +73,7 @@ if 'GDAL_DATA' not in os.environ:
             break
 
 import rasterio
-import geopandas as gpd
+gpd = lazy_import('geopandas')
 from rasterio.enums import Resampling
 from shapely.geometry import Polygon
 from numpy.lib.stride_tricks import as_strided as ast
@@ -87,16 +91,20 @@ import datetime
 
 # from skimage.filters import median
 # from skimage.morphology import square
-from skimage.io import imsave, imread
-from skimage.measure import label, regionprops
-from skimage.segmentation import watershed
-from skimage.transform import resize
-from skimage.filters import threshold_otsu, gaussian
-from skimage.morphology import remove_small_holes, remove_small_objects
+imsave = lazy_attr('skimage.io', 'imsave')
+imread = lazy_attr('skimage.io', 'imread')
+label = lazy_attr('skimage.measure', 'label')
+regionprops = lazy_attr('skimage.measure', 'regionprops')
+watershed = lazy_attr('skimage.segmentation', 'watershed')
+resize = lazy_attr('skimage.transform', 'resize')
+threshold_otsu = lazy_attr('skimage.filters', 'threshold_otsu')
+gaussian = lazy_attr('skimage.filters', 'gaussian')
+remove_small_holes = lazy_attr('skimage.morphology', 'remove_small_holes')
+remove_small_objects = lazy_attr('skimage.morphology', 'remove_small_objects')
 
-from skimage.transform import PiecewiseAffineTransform
+FastPiecewiseAffineTransform = lazy_attr('pingmapper.funcs_warp', 'FastPiecewiseAffineTransform')
 
-import matplotlib.pyplot as plt
+plt = lazy_import('matplotlib.pyplot')
 
 import psutil
 import json
@@ -156,7 +164,8 @@ def safe_n_jobs(task_count, thread_count=0):
 def quiet_tensorflow_warnings():
     '''
     Reduce TensorFlow/absl informational and warning output.
-    Safe to call even if TensorFlow is not installed.
+    Safe to call even if TensorFlow is not installed; TensorFlow itself is
+    only configured once something has imported it.
     '''
     os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
     os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
@@ -172,8 +181,11 @@ def quiet_tensorflow_warnings():
     except Exception:
         pass
 
+    tf = sys.modules.get('tensorflow')
+    if tf is None:
+        return
+
     try:
-        import tensorflow as tf
         tf.get_logger().setLevel('ERROR')
         try:
             tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
@@ -525,31 +537,3 @@ def unableToProcessError(logfilename):
         error_logger.removeHandler(handler)
         handler.close()
 
-
-# =========================================================
-class FastPiecewiseAffineTransform(PiecewiseAffineTransform):
-    def __call__(self, coords):
-        coords = np.asarray(coords)
-        n = coords.shape[0]
-
-        # Build per-simplex affine lookup once — shape (n_simplices, 3, 3), small.
-        all_affines = np.array(
-            [self.affines[i].params for i in range(len(self._tesselation.simplices))]
-        )
-
-        result = np.empty((n, 3), dtype=np.float32)
-
-        # Process in batches to avoid large allocations in find_simplex and the
-        # affine einsum, both of which scale with n_coords and can exceed several GiB.
-        _BATCH = 500_000
-        for start in range(0, n, _BATCH):
-            end = min(start + _BATCH, n)
-            batch_coords = coords[start:end]
-            s = self._tesselation.find_simplex(batch_coords)
-            pts = np.c_[batch_coords, np.ones(end - start)]
-            batch_result = np.einsum("ij,ikj->ik", pts, all_affines[s])
-            batch_result[s == -1] = -1
-            result[start:end] = batch_result
-
-        return result
-
@@ -0,0 +1,405 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Per-beam sonar cube: decoded ping returns as one (ping, sample) array on disk.
+
+The store is a Zarr (v2) directory group, written with numpy and zlib only,
+so zarr/xarray are not needed to write or read it but can open it when
+installed:
+
+    cube.zarr/
+        .zgroup, .zattrs
+        sonar/      (n_pings, n_samples) intensities, chunked along pings
+        record_num/, transect/, chunk_id/, ...   per-ping coordinates
+
+Ping rows follow the order of the beam's metadata CSV, so row i is
+sonMetaDF.iloc[i].  Samples past a ping's length hold the fill value (0).
+Each store chunk is a separate file written atomically (temp file +
+os.replace); writers that own whole chunks (see `chunk_ranges()`) can run in
+parallel processes.  `read(start, end)` returns any ping span, independent of
+the store chunking and of the project's chunk_id boundaries.
+
+`ping_index()` is the matching view of the metadata: the csv's numeric
+columns as one structured .npy next to it, rebuilt when the csv changes and
+opened memory-mapped, so ping-range readers select rows without parsing the
+csv.
+'''
+
+import json
+import os
+import zlib
+
+import numpy as np
+
+CUBE_NAME = 'cube.zarr'
+SONAR_ARRAY = 'sonar'
+CUBE_COORDS = ('record_num', 'transect', 'chunk_id', 'ping_cnt', 'pixM', 'time_s')
+PING_INDEX_EXT = '.pings.npy'
+
+
+# =========================================================
+def _write_json(f, obj):
+    tmp = '{}.tmp{}'.format(f, os.getpid())
+    with open(tmp, 'w') as fh:
+        json.dump(obj, fh, indent=2)
+    os.replace(tmp, f)
+
+
+def _read_json(f):
+    with open(f) as fh:
+        return json.load(fh)
+
+
+def _fill_json(fill, dtype):
+    if np.dtype(dtype).kind == 'f' and not np.isfinite(fill):
+        return 'NaN' if np.isnan(fill) else ('Infinity' if fill > 0 else '-Infinity')
+    return fill.item() if hasattr(fill, 'item') else fill
+
+
+def _fill_value(meta):
+    fill = meta['fill_value']
+    if isinstance(fill, str):
+        return float(fill.replace('Infinity', 'inf'))
+    return 0 if fill is None else fill
+
+
+# =========================================================
+class ZarrArray(object):
+    '''
+    A Zarr v2 array chunked along its first axis only, with zlib or no
+    compression.  Use `create()` / `ZarrArray(path)`.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        meta = _read_json(os.path.join(path, '.zarray'))
+        if meta.get('zarr_format') != 2 or meta.get('order', 'C') != 'C' or meta.get('filters'):
+            raise ValueError('Unsupported zarr array: {}'.format(path))
+        if list(meta['chunks'][1:]) != list(meta['shape'][1:]):
+            raise ValueError('Array must be chunked along its first axis only: {}'.format(path))
+        compressor = meta.get('compressor')
+        if compressor is not None and compressor.get('id') != 'zlib':
+            raise ValueError('Unsupported compressor {}: {}'.format(compressor.get('id'), path))
+
+        self.shape = tuple(meta['shape'])
+        self.dtype = np.dtype(meta['dtype'])
+        self.chunk_len = int(meta['chunks'][0])
+        self.fill_value = _fill_value(meta)
+        self.compressed = compressor is not None
+        self._level = compressor.get('level', 1) if compressor else None
+        self._sep = meta.get('dimension_separator', '.')
+
+    @classmethod
+    def create(cls, path, shape, dtype, chunk_len, level=1, fill_value=0, dims=None):
+        '''
+        New array at `path`.  `level` is the zlib level; 0 or None stores
+        chunks uncompressed, which lets `read()` fetch only the rows it needs.
+        '''
+        os.makedirs(path, exist_ok=True)
+        dtype = np.dtype(dtype)
+        chunk_len = max(1, min(int(chunk_len), max(int(shape[0]), 1)))
+        meta = {
+            'zarr_format': 2,
+            'shape': [int(s) for s in shape],
+            'chunks': [chunk_len] + [int(s) for s in shape[1:]],
+            'dtype': dtype.str,
+            'compressor': {'id': 'zlib', 'level': int(level)} if level else None,
+            'fill_value': _fill_json(np.asarray(fill_value, dtype=dtype), dtype),
+            'order': 'C',
+            'filters': None,
+            'dimension_separator': '.',
+        }
+        _write_json(os.path.join(path, '.zarray'), meta)
+        if dims is not None:
+            _write_json(os.path.join(path, '.zattrs'), {'_ARRAY_DIMENSIONS': list(dims)})
+        return cls(path)
+
+    @property
+    def n_chunks(self):
+        return -(-self.shape[0] // self.chunk_len)
+
+    def chunk_ranges(self):
+        '''[(start, end)] row spans of the store chunks, for parallel writers.'''
+        n = self.shape[0]
+        return [(s, min(s + self.chunk_len, n)) for s in range(0, n, self.chunk_len)]
+
+    def _key(self, c):
+        return os.path.join(self.path, self._sep.join([str(c)] + ['0'] * (len(self.shape) - 1)))
+
+    def _chunk_shape(self):
+        return (self.chunk_len,) + self.shape[1:]
+
+    def _load_chunk(self, c, lo=0, hi=None):
+        '''Rows [lo, hi) of store chunk c, or None if it was never written.'''
+        hi = self.chunk_len if hi is None else hi
+        f = self._key(c)
+        if not os.path.exists(f):
+            return None
+
+        if self.compressed:
+            with open(f, 'rb') as fh:
+                buf = zlib.decompress(fh.read())
+            return np.frombuffer(buf, dtype=self.dtype).reshape(self._chunk_shape())[lo:hi]
+
+        row = int(np.prod(self.shape[1:], dtype=np.int64))
+        arr = np.fromfile(f, dtype=self.dtype, count=(hi - lo) * row, offset=lo * row * self.dtype.itemsize)
+        return arr.reshape((hi - lo,) + self.shape[1:])
+
+    def write(self, start, data):
+        '''
+        Write rows [start, start + len(data)).  The span must cover whole store
+        chunks (the last chunk may end at the array end), so concurrent
+        writers never share a chunk file.
+        '''
+        data = np.asarray(data)
+        end = start + len(data)
+        if start % self.chunk_len or (end % self.chunk_len and end != self.shape[0]) or end > self.shape[0]:
+            raise ValueError('Rows [{}, {}) are not aligned to {}-row chunks of {} rows'.format(
+                start, end, self.chunk_len, self.shape[0]))
+        if data.shape[1:] != self.shape[1:]:
+            raise ValueError('Expected rows of shape {}, got {}'.format(self.shape[1:], data.shape[1:]))
+
+        for s in range(start, end, self.chunk_len):
+            block = data[s - start:s - start + self.chunk_len].astype(self.dtype, copy=False)
+            if len(block) < self.chunk_len:
+                # Zarr stores edge chunks at full size
+                full = np.full(self._chunk_shape(), self.fill_value, dtype=self.dtype)
+                full[:len(block)] = block
+                block = full
+            buf = np.ascontiguousarray(block).tobytes()
+            if self.compressed:
+                buf = zlib.compress(buf, self._level)
+
+            f = self._key(s // self.chunk_len)
+            tmp = '{}.tmp{}'.format(f, os.getpid())
+            with open(tmp, 'wb') as fh:
+                fh.write(buf)
+            os.replace(tmp, f)
+
+    def read(self, start=0, end=None):
+        '''Rows [start, end) as a new array; unwritten chunks read as fill.'''
+        n = self.shape[0]
+        end = n if end is None else end
+        start, end, _ = slice(start, end).indices(n)
+        end = max(start, end)
+
+        out = np.empty((end - start,) + self.shape[1:], dtype=self.dtype)
+        for c in range(start // self.chunk_len, -(-end // self.chunk_len)):
+            c0 = c * self.chunk_len
+            lo, hi = max(start, c0), min(end, c0 + self.chunk_len)
+            rows = self._load_chunk(c, lo - c0, hi - c0)
+            if rows is None:
+                out[lo - start:hi - start] = self.fill_value
+            else:
+                out[lo - start:hi - start] = rows
+        return out
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        rows = key[0]
+        if isinstance(rows, (int, np.integer)):
+            rows = int(rows) + self.shape[0] if rows < 0 else int(rows)
+            return self.read(rows, rows + 1)[(0,) + key[1:]]
+        if not isinstance(rows, slice) or rows.step not in (None, 1):
+            raise IndexError('Rows must be an integer or a contiguous slice')
+        start, end, _ = rows.indices(self.shape[0])
+        return self.read(start, end)[(slice(None),) + key[1:]]
+
+    def __len__(self):
+        return self.shape[0]
+
+
+# =========================================================
+class SonarCube(object):
+    '''
+    (ping, sample) intensities of one beam plus per-ping coordinates.
+    Open with `open_cube()`, create with `create_cube()`.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.sonar = ZarrArray(os.path.join(path, SONAR_ARRAY))
+        self.attrs = _read_json(os.path.join(path, '.zattrs')) if os.path.exists(os.path.join(path, '.zattrs')) else {}
+        self._coords = {}
+
+    @property
+    def shape(self):
+        return self.sonar.shape
+
+    @property
+    def dtype(self):
+        return self.sonar.dtype
+
+    @property
+    def chunk_pings(self):
+        return self.sonar.chunk_len
+
+    def coord_names(self):
+        return [c for c in self.attrs.get('coords', []) if os.path.isdir(os.path.join(self.path, c))]
+
+    def coord(self, name):
+        '''Per-ping coordinate `name` (e.g. transect, chunk_id) as an array.'''
+        if name not in self._coords:
+            self._coords[name] = ZarrArray(os.path.join(self.path, name)).read()
+        return self._coords[name]
+
+    def chunk_ranges(self):
+        '''Ping spans that parallel writers can own (see ZarrArray.write).'''
+        return self.sonar.chunk_ranges()
+
+    def write(self, start, pings):
+        '''Write (n, n_samples) pings starting at ping `start`.'''
+        self.sonar.write(start, pings)
+
+    def read(self, start=0, end=None):
+        '''(end - start, n_samples) intensities of pings [start, end).'''
+        return self.sonar.read(start, end)
+
+    def ping_range(self, **coords):
+        '''
+        [start, end) span of the pings matching every coord=value given, e.g.
+        ping_range(transect=2) or ping_range(chunk_id=14).  (0, 0) if none.
+        '''
+        mask = np.ones(self.shape[0], dtype=bool)
+        for name, value in coords.items():
+            mask &= self.coord(name) == value
+        idx = np.flatnonzero(mask)
+        if len(idx) == 0:
+            return 0, 0
+        return int(idx[0]), int(idx[-1]) + 1
+
+    def __getitem__(self, key):
+        return self.sonar[key]
+
+    def __len__(self):
+        return self.shape[0]
+
+
+# =========================================================
+def create_cube(path, n_pings, n_samples, dtype, chunk_pings=500, coords=None, attrs=None, level=1):
+    '''
+    New cube at `path` (a `cube.zarr` directory), replacing the metadata of
+    any existing one.
+
+    coords : optional {name: 1D array of length n_pings}, written whole
+    attrs : optional JSON-serializable group attributes
+    level : zlib level for the intensities (0 stores them uncompressed)
+    '''
+    os.makedirs(path, exist_ok=True)
+    _write_json(os.path.join(path, '.zgroup'), {'zarr_format': 2})
+
+    coords = coords or {}
+    for name, values in coords.items():
+        values = np.asarray(values)
+        if len(values) != n_pings:
+            raise ValueError("Coordinate '{}' has {} values for {} pings".format(name, len(values), n_pings))
+        fill = np.nan if values.dtype.kind == 'f' else 0
+        arr = ZarrArray.create(os.path.join(path, name), (n_pings,), values.dtype,
+                               max(n_pings, 1), level=1, fill_value=fill, dims=('ping',))
+        arr.write(0, values)
+
+    ZarrArray.create(os.path.join(path, SONAR_ARRAY), (n_pings, n_samples), dtype,
+                     chunk_pings, level=level, dims=('ping', 'sample'))
+
+    group_attrs = dict(attrs or {})
+    group_attrs['coords'] = list(coords)
+    _write_json(os.path.join(path, '.zattrs'), group_attrs)
+    return SonarCube(path)
+
+
+def open_cube(path):
+    '''The cube at `path`, or None if there is none.'''
+    if not os.path.exists(os.path.join(path, SONAR_ARRAY, '.zarray')):
+        return None
+    return SonarCube(path)
+
+
+def cube_coords(sonMeta, names=CUBE_COORDS):
+    '''Per-ping coordinate arrays from the metadata columns that exist.'''
+    coords = {}
+    for name in names:
+        if name in sonMeta.columns:
+            values = sonMeta[name].to_numpy()
+            if values.dtype == object:
+                continue
+            coords[name] = values
+    return coords
+
+
+# =========================================================
+_index_cache = {}
+
+
+def ping_index_path(sonMetaFile):
+    '''Binary index path for a beam's metadata csv.'''
+    return os.path.splitext(sonMetaFile)[0] + PING_INDEX_EXT
+
+
+def _csv_stamp(sonMetaFile):
+    st = os.stat(sonMetaFile)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def ping_index(sonMetaFile):
+    '''
+    The numeric columns of `sonMetaFile` as a read-only, memory-mapped
+    structured array (one record per csv row).  The csv's mtime and size
+    are stored next to the index file (.pings.json); the index is rebuilt
+    unless both match exactly, and cached per process on the same stamp.
+    '''
+    import pandas as pd
+
+    f = ping_index_path(sonMetaFile)
+    stampFile = f[:-len('.npy')] + '.json'
+    stamp = _csv_stamp(sonMetaFile)
+    cached = _index_cache.get(f)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        fresh = os.path.exists(f) and _read_json(stampFile).get('csv') == stamp
+    except (OSError, ValueError):
+        fresh = False
+
+    if not fresh:
+        df = pd.read_csv(sonMetaFile)
+        df = df[[c for c in df.columns if df[c].dtype.kind in 'biuf']]
+        tmp = '{}.tmp{}.npy'.format(f, os.getpid())
+        np.save(tmp, df.to_records(index=False))
+        os.replace(tmp, f)
+        _write_json(stampFile, {'csv': stamp})
+
+    index = np.load(f, mmap_mode='r')
+    _index_cache[f] = (stamp, index)
+    return index
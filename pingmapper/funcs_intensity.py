@@ -0,0 +1,253 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Global intensity statistics for a beam, gathered in one pass and persisted.
+
+Display scaling (CLAHE bounds, 16-bit colormap bounds) needs percentiles over
+the whole recording.  Each chunk's intensities are summarized in a
+`QuantileSketch`; sketches from parallel workers merge exactly, and the
+merged statistics are saved next to the beam's metadata
+(`<beam>_intensity.npz`) so later stages read them instead of decoding the
+recording again.
+
+The sketch is a histogram over non-negative values whose bin width starts at
+`resolution` and doubles whenever a value would exceed `max_bins` bins.  It
+is deterministic and independent of update/merge order.  With the default
+resolution of 1, integer intensities (8- and 16-bit) are stored exactly and
+percentiles match np.percentile; other values are resolved to one bin width.
+'''
+
+import os
+
+import numpy as np
+
+INTENSITY_STATS_SUFFIX = '_intensity.npz'
+
+# Bin width for dB-transformed intensities
+DB_RESOLUTION = 2.0 ** -8
+
+
+# =========================================================
+class QuantileSketch(object):
+    '''
+    Mergeable histogram sketch of non-negative intensities.
+    '''
+
+    def __init__(self, resolution=1.0, max_bins=65536):
+        self.resolution = float(resolution)
+        self.max_bins = int(max_bins)
+        self.level = 0                                 # bin width = resolution * 2**level
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.vmin = np.inf
+        self.vmax = -np.inf
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    @property
+    def width(self):
+        return self.resolution * 2.0 ** self.level
+
+    def _coarsen(self, level):
+        if level <= self.level:
+            return
+        group = 2 ** (level - self.level)
+        counts = np.zeros(-(-len(self.counts) // group) * group, dtype=np.int64)
+        counts[:len(self.counts)] = self.counts
+        self.counts = counts.reshape(-1, group).sum(axis=1)
+        self.level = level
+
+    def _add(self, counts):
+        if len(counts) > len(self.counts):
+            counts = counts.copy()
+            counts[:len(self.counts)] += self.counts
+            self.counts = counts
+        else:
+            self.counts[:len(counts)] += counts
+
+    def update(self, values, counts=None):
+        '''
+        Add values, each `counts` times if given (e.g. a level histogram);
+        NaN, inf and negative values are ignored.
+        '''
+        v = np.asarray(values, dtype=np.float64).ravel()
+        keep = np.isfinite(v) & (v >= 0)
+        if counts is not None:
+            counts = np.asarray(counts, dtype=np.int64).ravel()
+            keep &= counts > 0
+            counts = counts[keep]
+        v = v[keep]
+        if v.size == 0:
+            return self
+
+        idx = np.floor(v / self.resolution).astype(np.int64)
+        top = int(idx.max())
+        level = self.level
+        while (top >> level) >= self.max_bins:
+            level += 1
+        self._coarsen(level)
+
+        self._add(np.bincount(idx >> self.level, weights=counts).astype(np.int64))
+        self.vmin = min(self.vmin, float(v.min()))
+        self.vmax = max(self.vmax, float(v.max()))
+        return self
+
+    def merge(self, other):
+        '''
+        Add another sketch with the same resolution.
+        '''
+        if other is None or other.n == 0:
+            return self
+        if other.resolution != self.resolution:
+            raise ValueError('Cannot merge sketches with resolution {} and {}'.format(self.resolution, other.resolution))
+
+        other_counts = other.counts
+        if other.level < self.level:
+            other = QuantileSketch.from_arrays(*other.to_arrays())
+            other._coarsen(self.level)
+            other_counts = other.counts
+        else:
+            self._coarsen(other.level)
+
+        self._add(other_counts)
+        self.vmin = min(self.vmin, other.vmin)
+        self.vmax = max(self.vmax, other.vmax)
+        return self
+
+    def percentile(self, q):
+        '''
+        Approximate np.percentile(values, q) (linear interpolation).
+        '''
+        n = self.n
+        if n == 0:
+            return np.nan
+
+        rank = float(q) / 100.0 * (n - 1)
+        lo_rank = int(np.floor(rank))
+        hi_rank = min(lo_rank + 1, n - 1)
+
+        # Value at a rank is its bin's lower edge; the extremes are known
+        cum = np.cumsum(self.counts)
+        edges = np.searchsorted(cum, [lo_rank, hi_rank], side='right') * self.width
+        edges = np.clip(edges, self.vmin, self.vmax)
+        edges[np.array([lo_rank, hi_rank]) == n - 1] = self.vmax
+        lo, hi = edges
+        return float(lo + (rank - lo_rank) * (hi - lo))
+
+    def bounds(self, lo_pct=1.0, hi_pct=99.5):
+        '''
+        (lo, hi) display bounds, falling back to (min, max) when the
+        percentiles collapse.  None if the sketch cannot give hi > lo.
+        '''
+        if self.n == 0:
+            return None
+
+        lo = self.percentile(lo_pct)
+        hi = self.percentile(hi_pct)
+        if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
+            lo, hi = self.vmin, self.vmax
+
+        if (not np.isfinite(lo)) or (not np.isfinite(hi)) or hi <= lo:
+            return None
+        return (float(lo), float(hi))
+
+    def to_arrays(self):
+        meta = np.array([self.resolution, self.max_bins, self.level, self.vmin, self.vmax], dtype=np.float64)
+        return meta, self.counts
+
+    @classmethod
+    def from_arrays(cls, meta, counts):
+        sketch = cls(resolution=meta[0], max_bins=int(meta[1]))
+        sketch.level = int(meta[2])
+        sketch.vmin, sketch.vmax = float(meta[3]), float(meta[4])
+        sketch.counts = np.array(counts, dtype=np.int64)
+        return sketch
+
+
+# =========================================================
+def merge_sketches(sketches, resolution=1.0):
+    '''
+    Merge an iterable of sketches (None entries skipped).
+    '''
+    merged = QuantileSketch(resolution=resolution)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+# =========================================================
+def intensity_stats_path(sonMetaFile):
+    '''
+    Statistics file stored next to a beam's metadata csv.
+    '''
+    stem = os.path.splitext(str(sonMetaFile))[0]
+    if stem.endswith('_meta'):
+        stem = stem[:-len('_meta')]
+    return stem + INTENSITY_STATS_SUFFIX
+
+
+# =========================================================
+def load_intensity_stats(path):
+    '''
+    Dict of name -> QuantileSketch; empty if the file does not exist.
+    '''
+    if not os.path.exists(path):
+        return {}
+
+    stats = {}
+    with np.load(path) as f:
+        for key in f.files:
+            if key.endswith('__meta'):
+                name = key[:-len('__meta')]
+                stats[name] = QuantileSketch.from_arrays(f[key], f[name + '__counts'])
+    return stats
+
+
+# =========================================================
+def save_intensity_stats(path, stats, replace=False):
+    '''
+    Write sketches to `path`, keeping other sketches already stored there
+    unless `replace` is set.
+    '''
+    merged = {} if replace else load_intensity_stats(path)
+    merged.update({k: v for k, v in stats.items() if v is not None})
+
+    arrays = {}
+    for name, sketch in merged.items():
+        arrays[name + '__meta'], arrays[name + '__counts'] = sketch.to_arrays()
+
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
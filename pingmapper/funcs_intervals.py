@@ -0,0 +1,137 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Vectorized time-interval lookups shared by the sonar time and DQ filters.
+
+Both sides are sorted once and membership is resolved with `searchsorted`,
+so the cost is O((pings + intervals) log intervals) instead of one
+full-table mask per interval.  Timestamps may be numeric seconds or
+datetime64; missing values (NaN/NaT) never match.
+'''
+
+import numpy as np
+import pandas as pd
+
+
+# =========================================================
+def _as_sortable(values):
+    '''
+    Times as a float64 or int64 array plus a validity mask.  datetime64
+    values are compared as integer nanoseconds.
+    '''
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'M':
+        valid = ~np.isnat(arr)
+        return arr.astype('datetime64[ns]').view('int64'), valid
+    if arr.dtype.kind == 'm':
+        valid = ~np.isnat(arr)
+        return arr.astype('timedelta64[ns]').view('int64'), valid
+    arr = arr.astype('float64')
+    return arr, np.isfinite(arr)
+
+
+# =========================================================
+def interval_mask(times, starts, ends):
+    '''
+    True where `times[i]` falls inside any closed interval [starts, ends].
+
+    Reversed intervals (end < start) are swapped and intervals with a
+    missing bound are ignored.  Overlapping intervals need no merging: after
+    sorting by start, a time is covered if the largest end among intervals
+    starting at or before it reaches it.
+    '''
+    t, t_valid = _as_sortable(times)
+    s, s_valid = _as_sortable(starts)
+    e, e_valid = _as_sortable(ends)
+
+    keep = s_valid & e_valid
+    s, e = np.minimum(s[keep], e[keep]), np.maximum(s[keep], e[keep])
+
+    mask = np.zeros(len(t), dtype=bool)
+    if len(s) == 0:
+        return mask
+
+    order = np.argsort(s, kind='stable')
+    s = s[order]
+    reach = np.maximum.accumulate(e[order])
+
+    idx = np.searchsorted(s, t, side='right') - 1
+    hit = t_valid & (idx >= 0)
+    mask[hit] = reach[idx[hit]] >= t[hit]
+    return mask
+
+
+# =========================================================
+def event_lookup(times, event_times, event_values):
+    '''
+    Value of the most recent event at or before each time (a step function).
+
+    Events are sorted once, stably, so when several share a timestamp the
+    last one in input order wins.  Returns (values, found); `found` is False
+    for times before the first event or missing times, where `values` holds
+    the first event's value as a placeholder.
+    '''
+    t, t_valid = _as_sortable(times)
+    ev, ev_valid = _as_sortable(event_times)
+    event_values = np.asarray(event_values)[ev_valid]
+    ev = ev[ev_valid]
+
+    if len(ev) == 0:
+        return np.zeros(len(t), dtype=event_values.dtype), np.zeros(len(t), dtype=bool)
+
+    order = np.argsort(ev, kind='stable')
+    ev = ev[order]
+    event_values = event_values[order]
+
+    idx = np.searchsorted(ev, t, side='right') - 1
+    found = t_valid & (idx >= 0)
+    return event_values[np.maximum(idx, 0)], found
+
+
+# =========================================================
+def parse_datetimes(series):
+    '''
+    pd.to_datetime(series, errors='coerce', format='mixed') with a fast path.
+
+    ISO 8601 strings (what PINGMapper writes for ping dates and times) are
+    parsed by pandas' vectorized parser; anything else falls back to the
+    element-by-element 'mixed' parser.
+    '''
+    series = pd.Series(series)
+    try:
+        dt = pd.to_datetime(series, errors='coerce', format='ISO8601')
+    except (ValueError, TypeError):
+        dt = None
+    if dt is None or (dt.isna() & series.notna()).any():
+        dt = pd.to_datetime(series, errors='coerce', format='mixed')
+    return dt
@@ -0,0 +1,180 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Vectorized post-processing kernels for classified substrate labels.
+
+Labels are (rows, pings) arrays with the water column above `bedPick[p]` in
+each ping.  These kernels replace per-ping Python loops with whole-chunk
+array operations and reproduce the loop results exactly.
+'''
+
+import numpy as np
+
+
+# =========================================================
+def _clip_bed(bedPick, H):
+    '''
+    Bed pick as int array, negative picks indexing from the bottom like a
+    slice start would (label[s:, p]).
+    '''
+    d = np.asarray(bedPick, dtype=np.int64)
+    d = np.where(d < 0, np.maximum(H + d, 0), d)
+    return np.minimum(d, H)
+
+
+# =========================================================
+def bed_mask(bedPick, shape):
+    '''
+    Boolean mask, True at and below the bed pick in each ping (column).
+
+    Same as setting mask[bedPick[p]:, p] = 1 for every ping. Extra trailing
+    dimensions (e.g. classes) are broadcast.
+    '''
+    H = shape[0]
+    d = _clip_bed(bedPick, H)
+    mask = np.arange(H)[:, np.newaxis] >= d[np.newaxis, :]
+    if len(shape) > 2:
+        mask = np.broadcast_to(mask.reshape(mask.shape + (1,) * (len(shape) - 2)), shape)
+    return mask
+
+
+# =========================================================
+def _zero_runs(label, d):
+    '''
+    Runs of zeros below the bed, found on the ping-major (transposed) label.
+
+    -------
+    Returns
+    -------
+    (labelT, ping, first row, last row) of each run, ordered by ping then row
+    '''
+    H, W = label.shape
+    labelT = np.ascontiguousarray(label.T)
+
+    idx = np.flatnonzero(labelT.ravel() == 0)
+    ping, row = np.divmod(idx, H)
+    keep = row >= d[ping]
+    idx, ping, row = idx[keep], ping[keep], row[keep]
+
+    if len(idx) == 0:
+        e = np.array([], dtype=np.int64)
+        return labelT, e, e, e
+
+    # New run where the flat index jumps or the ping changes
+    brk = np.flatnonzero((np.diff(idx) != 1) | (np.diff(ping) != 0)) + 1
+    starts = np.concatenate(([0], brk))
+    ends = np.concatenate((brk, [len(idx)])) - 1
+
+    return labelT, ping[starts], row[starts], row[ends]
+
+
+# =========================================================
+def _fill_runs(labelT, ping, first, last, value):
+    '''
+    Write `value` into rows first..last of each ping and return (rows, pings).
+    '''
+    H = labelT.shape[1]
+    runLen = last - first + 1
+    if len(runLen) > 0:
+        # Flat indices of every pixel in every run
+        offs = np.repeat(ping * H + first - np.cumsum(np.concatenate(([0], runLen[:-1]))), runLen)
+        flat = offs + np.arange(runLen.sum())
+        labelT.ravel()[flat] = np.repeat(value, runLen)
+    return labelT.T
+
+
+# =========================================================
+def fill_zero_span(label, bedPick, clear_value=None):
+    '''
+    Per ping, fill from the first to the last zero below the bed with the
+    label just below the last zero (if there is one).
+
+    If `clear_value` is given, that class is first set to zero below the bed
+    (e.g. water column class 8 predicted under the bed pick).
+
+    Vectorized form of the per-ping loop in portstarObj._mapSubstrate():
+    zero spans are located on the whole chunk at once and written with a
+    single flat-index assignment.
+    '''
+    label = np.asarray(label)
+    H, W = label.shape
+    d = _clip_bed(bedPick, H)
+
+    # Work ping-major so each ping is contiguous
+    labelT = np.array(label.T, order='C')
+    below = np.arange(H)[np.newaxis, :] >= d[:, np.newaxis]
+
+    if clear_value is not None:
+        labelT[below & (labelT == clear_value)] = 0
+
+    zero = (labelT == 0) & below
+
+    hasZero = zero.any(axis=1)
+    first = np.argmax(zero, axis=1)
+    last = H - 1 - np.argmax(zero[:, ::-1], axis=1)
+    doFill = hasZero & (last + 1 < H)
+
+    value = labelT[np.arange(W), np.minimum(last + 1, H - 1)]
+    ping = np.flatnonzero(doFill)
+    return _fill_runs(labelT, ping, first[ping], last[ping], value[ping])
+
+
+# =========================================================
+def fill_zero_runs(label, bedPick):
+    '''
+    Fill each run of zeros below the bed from an adjacent label.
+
+    Rules (per ping, below the bed only):
+      - single zero: take the value below, or above if at the bottom
+      - run at the top of the bed: take the value below the run
+      - any other run: take the value above the run
+      - a ping that is zero all the way down is left as is
+
+    Vectorized form of the per-ping loop in mapSubObj._filterLabel().
+    '''
+    label = np.asarray(label)
+    H, W = label.shape
+    d = _clip_bed(bedPick, H)
+
+    labelT, ping, first, last = _zero_runs(label, d)
+    if len(ping) == 0:
+        return label
+
+    runLen = last - first + 1
+    src = np.where(first == d[ping], last + 1, first - 1)
+    src = np.where(runLen == 1, np.where(first + 1 < H, first + 1, first - 1), src)
+
+    doFill = runLen < H - d[ping]
+    ping, first, last, src = ping[doFill], first[doFill], last[doFill], src[doFill]
+    value = labelT[ping, np.clip(src, 0, H - 1)]
+
+    return _fill_runs(labelT, ping, first, last, value)
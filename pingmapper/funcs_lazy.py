@@ -0,0 +1,160 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Deferred imports for heavy libraries.
+
+`lazy_import('matplotlib.pyplot')` returns a stand-in that imports the real
+module on first attribute access, and `lazy_attr('scipy.signal',
+'savgol_filter')` does the same for a single function or class.  Modules keep
+their module-level names (including those re-exported through
+`from pingmapper.funcs_common import *`), but a library is only imported once
+a processing stage actually uses it, so short runs (ingest only, waterfall
+only) do not pay for plotting, GIS or machine learning stacks.
+
+Note that a lazy class cannot be subclassed or used with isinstance() before
+it is resolved; import such classes normally.
+'''
+
+import importlib
+import importlib.util
+import threading
+
+_lock = threading.RLock()
+
+
+# =========================================================
+def module_available(name):
+    '''True if `name` can be imported, without importing it.'''
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule(object):
+    '''
+    Module imported on first attribute access.
+
+    `setup` (optional) is called once, just before the import, e.g. to
+    quiet a library's logging or import companion packages.
+    '''
+
+    def __init__(self, name, setup=None):
+        object.__setattr__(self, '_lazy_name', name)
+        object.__setattr__(self, '_lazy_setup', setup)
+        object.__setattr__(self, '_lazy_module', None)
+
+    def _load(self):
+        module = self._lazy_module
+        if module is None:
+            with _lock:
+                module = self._lazy_module
+                if module is None:
+                    if self._lazy_setup is not None:
+                        self._lazy_setup()
+                    module = importlib.import_module(self._lazy_name)
+                    object.__setattr__(self, '_lazy_module', module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __reduce__(self):
+        return (LazyModule, (self._lazy_name, self._lazy_setup))
+
+    def __repr__(self):
+        if self._lazy_module is None:
+            return "<lazy module '{}'>".format(self._lazy_name)
+        return repr(self._lazy_module)
+
+
+class LazyAttr(object):
+    '''
+    Function or class `name` from module `module`, imported on first call or
+    attribute access.
+    '''
+
+    def __init__(self, module, name, setup=None):
+        self._lazy_module = LazyModule(module, setup)
+        self._lazy_name = name
+        self._lazy_obj = None
+
+    def _load(self):
+        if self._lazy_obj is None:
+            self._lazy_obj = getattr(self._lazy_module._load(), self._lazy_name)
+        return self._lazy_obj
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_lazy_'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    # Special methods bypass __getattr__; forward the container protocol
+    # for registries such as matplotlib.colormaps
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __reduce__(self):
+        return (LazyAttr, (self._lazy_module._lazy_name, self._lazy_name, self._lazy_module._lazy_setup))
+
+    def __repr__(self):
+        if self._lazy_obj is None:
+            return "<lazy '{}.{}'>".format(self._lazy_module._lazy_name, self._lazy_name)
+        return repr(self._lazy_obj)
+
+
+def lazy_import(name, setup=None):
+    '''Module `name`, imported on first use.'''
+    return LazyModule(name, setup)
+
+
+def lazy_attr(module, name, setup=None):
+    '''`module.name`, imported on first use.'''
+    return LazyAttr(module, name, setup)
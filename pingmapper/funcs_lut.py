@@ -0,0 +1,137 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Lookup-table intensity transforms for integer sonar samples.
+
+8- and 16-bit samples take at most 65536 distinct values, so per-sample
+transforms (display dB, 16- to 8-bit reduction) are evaluated once per level
+and applied with a single gather into the output array.  Statistics the
+transforms need (smallest non-zero sample, bit packing) and the intensity
+sketches come from the chunk's level histogram instead of masked float
+copies of the data.
+
+LUT entries are computed with the same float32 operations as the array code
+they replace, so results are identical.
+'''
+
+import numpy as np
+
+LUT_DTYPES = (np.dtype(np.uint8), np.dtype(np.uint16))
+
+
+# =========================================================
+def has_lut(arr):
+    '''True if `arr` holds 8- or 16-bit unsigned samples.'''
+    return isinstance(arr, np.ndarray) and arr.dtype in LUT_DTYPES
+
+
+def sample_storage_dtype(son8bit, sample_dtype=None):
+    '''
+    Smallest array dtype holding decoded integer samples: uint8 or uint16
+    for unsigned 8/16-bit samples, int64 otherwise.
+    '''
+    if son8bit:
+        return np.uint8
+    if sample_dtype is None:
+        return np.uint16
+    try:
+        dtype = np.dtype(sample_dtype)
+    except TypeError:
+        return np.int64
+    if dtype.kind == 'u' and dtype.itemsize <= 2:
+        return np.uint16
+    return np.int64
+
+
+# =========================================================
+def level_counts(arr, block=2 ** 18):
+    '''
+    Histogram of every level of an 8- or 16-bit array (256 or 65536 bins).
+    np.bincount casts its input to int64, so it is fed `block` samples at a
+    time to keep that copy small.
+    '''
+    n_levels = 256 if arr.dtype == np.uint8 else 65536
+    flat = np.ravel(arr)
+    counts = np.zeros(n_levels, dtype=np.int64)
+    for start in range(0, flat.size, block):
+        counts += np.bincount(flat[start:start + block], minlength=n_levels)
+    return counts
+
+
+def apply_lut(lut, arr):
+    '''
+    Map every sample of `arr` through `lut` (one output allocation).
+    Indexing converts indices in small buffers; lut.take() would copy `arr`
+    to int64 first.
+    '''
+    return lut[arr]
+
+
+# =========================================================
+def db_lut(counts):
+    '''
+    Display dB transform per level: 20*log10 relative to the smallest
+    non-zero level present, with 0 kept as no-data.  None if there are no
+    non-zero samples.
+    '''
+    levels = np.flatnonzero(counts[1:])
+    if len(levels) == 0:
+        return None
+
+    floor = float(levels[0] + 1)
+    lut = np.maximum(np.arange(len(counts), dtype=np.float32), floor)
+    lut = 20.0 * np.log10(lut)
+    lut = lut - np.nanmin(lut)
+    lut[0] = 0.0
+    return lut
+
+
+def uint8_lut(counts):
+    '''
+    16- to 8-bit reduction per level.  Samples packed in the high byte
+    (low byte zero) are shifted down: by 4 for 12-bit amplitudes, by 8
+    otherwise.  Anything else keeps its low byte.  None if there are no
+    non-zero samples.
+    '''
+    nz = counts[1:]
+    n = int(nz.sum())
+    if n == 0:
+        return None
+
+    max_val = int(np.flatnonzero(nz)[-1] + 1)
+    low_byte_zero_ratio = counts[256::256].sum() / n
+
+    shift = 0
+    if low_byte_zero_ratio > 0.95:
+        shift = 4 if max_val <= 4095 else 8
+    return (np.arange(len(counts), dtype=np.uint16) >> shift).astype(np.uint8)
@@ -0,0 +1,265 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Versioned on-disk state for sonObj and its children.
+
+An object is saved as a small JSON manifest of its scalar attributes
+(`<name>.manifest.json`) plus one sidecar file per large attribute:
+numeric arrays as `.npy` (reopened memory-mapped, read-only) and anything
+else (DataFrames, shadow dicts, projections, ...) as a pickle.  Reopening
+only parses the JSON; sidecars are attached the first time an attribute is
+accessed, so workers receive the paths instead of the data.
+
+Projects written before manifests existed keep their pickled `.meta` files,
+which still load.
+'''
+
+import json
+import os
+import pickle
+import shutil
+from glob import escape, glob
+
+import numpy as np
+
+MANIFEST_FORMAT = 'pingmapper-son-manifest'
+MANIFEST_VERSION = 1
+MANIFEST_EXT = '.manifest.json'
+LEGACY_EXT = '.meta'
+
+# Bookkeeping attributes that are never written to a manifest
+_STATE_ATTRS = ('_lazy_attrs', '_sidecar_arrays')
+
+
+# =========================================================
+def manifest_path(sonMetaFile):
+    '''Manifest path for a beam's metadata CSV (meta/B002_ss_port_meta.csv).'''
+    return os.path.splitext(sonMetaFile)[0] + MANIFEST_EXT
+
+
+def find_meta_files(metaDir, pattern='*', recursive=False):
+    '''
+    Saved sonObj states in `metaDir`: manifests, plus legacy `.meta` pickles
+    that have no manifest next to them.
+    '''
+    root = os.path.join(metaDir, '**') if recursive else metaDir
+    manifests = glob(os.path.join(root, pattern + MANIFEST_EXT), recursive=recursive)
+    have = {m[:-len(MANIFEST_EXT)] for m in manifests}
+    legacy = [m for m in glob(os.path.join(root, pattern + LEGACY_EXT), recursive=recursive)
+              if m[:-len(LEGACY_EXT)] not in have]
+    return sorted(manifests + legacy)
+
+
+def _is_json(value):
+    '''True if `value` survives a JSON round trip unchanged.'''
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+    if isinstance(value, list):
+        return all(_is_json(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_json(v) for k, v in value.items())
+    return False
+
+
+def _to_json(value):
+    '''Numpy scalars become Python scalars; other values are returned as is.'''
+    if isinstance(value, np.generic) and value.dtype.kind in 'biufUS':
+        return value.item()
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def _replace(tmp, outFile):
+    os.replace(tmp, outFile)
+    return outFile
+
+
+# =========================================================
+def save_manifest(obj, outFile):
+    '''
+    Write `obj.__dict__` to `outFile` (a manifest) and its sidecars.
+
+    Sidecars not yet attached are carried over without being loaded, and
+    arrays still mapped from their own sidecar are not rewritten.
+
+    -------
+    Returns
+    -------
+    outFile
+    '''
+    outDir = os.path.dirname(os.path.abspath(outFile))
+    stem = os.path.basename(outFile)[:-len(MANIFEST_EXT)]
+    state = obj.__dict__
+    lazy = state.get('_lazy_attrs') or {}
+    mapped = state.get('_sidecar_arrays') or {}
+
+    attrs, sidecars = {}, {}
+    for name, value in state.items():
+        if name in _STATE_ATTRS:
+            continue
+        value = _to_json(value)
+        if _is_json(value):
+            attrs[name] = value
+            continue
+
+        if isinstance(value, np.ndarray) and value.dtype.kind in 'biufcmM':
+            sidecar = {'kind': 'npy', 'file': '{}.{}.npy'.format(stem, name),
+                       'dtype': value.dtype.str, 'shape': list(value.shape)}
+            target = os.path.join(outDir, sidecar['file'])
+            # Arrays mapped read-only from this very sidecar are unchanged
+            if mapped.get(name) is not value or os.path.abspath(value.filename) != target:
+                np.save(target + '.tmp.npy', np.ascontiguousarray(value))
+                _replace(target + '.tmp.npy', target)
+        else:
+            sidecar = {'kind': 'pickle', 'file': '{}.{}.pkl'.format(stem, name)}
+            target = os.path.join(outDir, sidecar['file'])
+            with open(target + '.tmp', 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            _replace(target + '.tmp', target)
+        sidecars[name] = sidecar
+
+    for name, (path, sidecar) in lazy.items():
+        if name in state:
+            continue
+        sidecar = dict(sidecar, file='{}.{}{}'.format(stem, name, os.path.splitext(path)[1]))
+        target = os.path.join(outDir, sidecar['file'])
+        if os.path.abspath(path) != os.path.abspath(target):
+            shutil.copyfile(path, target)
+        sidecars[name] = sidecar
+
+    manifest = {'format': MANIFEST_FORMAT, 'version': MANIFEST_VERSION,
+                'class': type(obj).__name__, 'attrs': attrs, 'sidecars': sidecars}
+    with open(outFile + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    _replace(outFile + '.tmp', outFile)
+
+    # Drop sidecars of attributes that no longer exist
+    keep = {s['file'] for s in sidecars.values()}
+    for f in glob(os.path.join(escape(outDir), escape(stem) + '.*')):
+        name = os.path.basename(f)
+        if name.endswith(('.npy', '.pkl')) and name not in keep:
+            try:
+                os.remove(f)
+            except OSError:
+                pass
+
+    return outFile
+
+
+def read_manifest(metaFile):
+    '''
+    Read a manifest.
+
+    -------
+    Returns
+    -------
+    (attrs, lazy) where `lazy` maps attribute -> (sidecar path, sidecar info)
+    '''
+    with open(metaFile) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError('{} is not a PINGMapper manifest'.format(metaFile))
+    if manifest.get('version', 0) > MANIFEST_VERSION:
+        raise ValueError('{} was written by a newer PINGMapper (manifest version {}, '
+                         'this version reads up to {})'.format(metaFile, manifest['version'], MANIFEST_VERSION))
+
+    metaDir = os.path.dirname(os.path.abspath(metaFile))
+    lazy = {name: (os.path.join(metaDir, s['file']), s) for name, s in manifest['sidecars'].items()}
+    return manifest['attrs'], lazy
+
+
+def load_sidecar(path, sidecar):
+    if sidecar['kind'] == 'npy':
+        return np.load(path, mmap_mode='r')
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+# =========================================================
+class ManifestState(object):
+    '''
+    Mixin that saves an object's attributes as a manifest and reattaches
+    sidecar attributes lazily on first access.
+    '''
+
+    def __getattr__(self, name):
+        # Only reached when normal lookup fails
+        lazy = self.__dict__.get('_lazy_attrs')
+        if not lazy or name not in lazy:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+        path, sidecar = lazy[name]
+        value = load_sidecar(path, sidecar)
+        object.__setattr__(self, name, value)
+        del lazy[name]
+        if sidecar['kind'] == 'npy':
+            self.__dict__.setdefault('_sidecar_arrays', {})[name] = value
+        return value
+
+    def __setattr__(self, name, value):
+        lazy = self.__dict__.get('_lazy_attrs')
+        if lazy:
+            lazy.pop(name, None)
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        lazy = self.__dict__.get('_lazy_attrs')
+        if lazy and name in lazy:
+            del lazy[name]
+            if name not in self.__dict__:
+                return
+        object.__delattr__(self, name)
+
+    def _saveManifest(self, outFile):
+        return save_manifest(self, outFile)
+
+    def _loadManifest(self, metaFile):
+        '''
+        Load saved state into self: a manifest, or a legacy pickled `.meta`.
+        '''
+        if metaFile.endswith(LEGACY_EXT):
+            with open(metaFile, 'rb') as f:
+                saved = pickle.load(f)
+            for attr, value in saved.__dict__.items():
+                setattr(self, attr, value)
+            return
+
+        attrs, lazy = read_manifest(metaFile)
+        for attr, value in attrs.items():
+            setattr(self, attr, value)
+        for attr in lazy:
+            self.__dict__.pop(attr, None)
+        self.__dict__['_lazy_attrs'] = lazy
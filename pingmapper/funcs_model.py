@@ -50,69 +50,66 @@ import numpy as np
 # before launching PINGMapper to achieve the same effect without a code change.
 os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
 os.environ.setdefault("HF_HUB_OFFLINE", "1")
-# import tensorflow as tf
-# import tensorflow.keras.backend as K
-# from tensorflow.python.client import device_lib
-
 import itertools
 
-# from transformers import TFSegformerForSemanticSegmentation
-# from transformers import logging
-# logging.set_verbosity_error()
-
-# # Fixes depth detection warning
-# tf.get_logger().setLevel('ERROR')
-
-# from doodleverse_utils.imports import *
-# from doodleverse_utils.model_imports import *
-# from doodleverse_utils.prediction_imports import *
-
-# Flag to track if depth detection dependencies are available
-DEPTH_DETECTION_AVAILABLE = False
-
-try:
-    import tensorflow as tf
-    import tensorflow.keras.backend as K
-    from tensorflow.python.client import device_lib
+# TensorFlow, Transformers and doodleverse_utils are only needed for depth
+# detection, shadow removal and substrate prediction.  They are imported the
+# first time one of the names below is used, so other workflows start fast.
+DEPTH_DETECTION_AVAILABLE = all(module_available(m) for m in ('tensorflow', 'transformers', 'doodleverse_utils'))
 
-    from transformers import TFSegformerForSemanticSegmentation
-    from transformers import logging
-    logging.set_verbosity_error()
+_ML_STACK_LOADED = False
 
-    # Fixes depth detection warning
-    quiet_tensorflow_warnings()
 
-    with suppress_stdout_stderr():
-        from doodleverse_utils.imports import *
-        from doodleverse_utils.model_imports import *
-        from doodleverse_utils.prediction_imports import *
-    
-    DEPTH_DETECTION_AVAILABLE = True
-except ImportError as e:
-    import traceback
-    print('\n' + '='*80)
-    print('Could not import Tensorflow and/or Transformers. Please install these packages to use PING-Mapper.')
-    print('They are not needed for GhostVision. Trying to continue...')
-    print('\nDetailed error information:')
-    print('-'*80)
-    print(f'Error Type: {type(e).__name__}')
-    print(f'Error Message: {str(e)}')
-    print('-'*80)
-    traceback.print_exc()
-    print('='*80 + '\n')
-    DEPTH_DETECTION_AVAILABLE = False
-except Exception as e:
-    import traceback
-    print('\n' + '='*80)
-    print('Unexpected error while importing depth detection dependencies.')
-    print('Detailed error information:')
-    print('-'*80)
-    print(f'Error Type: {type(e).__name__}')
-    print(f'Error Message: {str(e)}')
-    print('-'*80)
-    traceback.print_exc()
-    print('='*80 + '\n')
-    DEPTH_DETECTION_AVAILABLE = False
+#=======================================================================
+def _load_ml_stack():
+    '''
+    Import TensorFlow, Transformers and doodleverse_utils once, with their
+    logging quieted.  Import errors are reported, then re-raised.
+    '''
+    global _ML_STACK_LOADED
+    if _ML_STACK_LOADED:
+        return
+
+    try:
+        import tensorflow
+        from transformers import logging
+        logging.set_verbosity_error()
+
+        # Fixes depth detection warning
+        quiet_tensorflow_warnings()
+
+        with suppress_stdout_stderr():
+            import doodleverse_utils.imports
+            import doodleverse_utils.model_imports
+            import doodleverse_utils.prediction_imports
+    except Exception as e:
+        import traceback
+        print('\n' + '='*80)
+        print('Could not import Tensorflow, Transformers and/or Doodleverse Utils. Please install these packages to use PING-Mapper.')
+        print('They are not needed for GhostVision.')
+        print('\nDetailed error information:')
+        print('-'*80)
+        print(f'Error Type: {type(e).__name__}')
+        print(f'Error Message: {str(e)}')
+        print('-'*80)
+        traceback.print_exc()
+        print('='*80 + '\n')
+        raise
+
+    _ML_STACK_LOADED = True
+
+
+tf = lazy_import('tensorflow', _load_ml_stack)
+K = lazy_import('tensorflow.keras.backend', _load_ml_stack)
+device_lib = lazy_import('tensorflow.python.client.device_lib', _load_ml_stack)
+
+standardize = lazy_attr('doodleverse_utils.imports', 'standardize', _load_ml_stack)
+label_to_colors = lazy_attr('doodleverse_utils.imports', 'label_to_colors', _load_ml_stack)
+custom_resunet = lazy_attr('doodleverse_utils.model_imports', 'custom_resunet', _load_ml_stack)
+compile_models = lazy_attr('doodleverse_utils.prediction_imports', 'compile_models', _load_ml_stack)
+est_label_multiclass = lazy_attr('doodleverse_utils.prediction_imports', 'est_label_multiclass', _load_ml_stack)
+est_label_binary = lazy_attr('doodleverse_utils.prediction_imports', 'est_label_binary', _load_ml_stack)
+crf_refine = lazy_attr('doodleverse_utils.prediction_imports', 'crf_refine', _load_ml_stack)
 
 ################################################################################
 # model_imports.py from segmentation_gym                                       #
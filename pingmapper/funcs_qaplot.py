@@ -0,0 +1,303 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Headless rendering of per-chunk QA figures (bedpicks, substrate maps).
+
+Overlays are drawn straight into uint8 BGR image arrays with OpenCV/NumPy
+and written with cv2.imwrite.  Matplotlib is only used, through the Agg
+object API (no pyplot state), to render small annotation images such as
+legends, titles and colorbars; static legends are cached per process.
+'''
+
+from functools import lru_cache
+
+import numpy as np
+import cv2
+
+from pingmapper.funcs_lazy import lazy_attr
+
+# Matplotlib is only needed once a plot is drawn
+colormaps = lazy_attr('matplotlib', 'colormaps')
+Normalize = lazy_attr('matplotlib.colors', 'Normalize')
+to_rgb = lazy_attr('matplotlib.colors', 'to_rgb')
+Figure = lazy_attr('matplotlib.figure', 'Figure')
+FigureCanvasAgg = lazy_attr('matplotlib.backends.backend_agg', 'FigureCanvasAgg')
+Line2D = lazy_attr('matplotlib.lines', 'Line2D')
+ScalarMappable = lazy_attr('matplotlib.cm', 'ScalarMappable')
+
+# On/off run lengths (pixels along the trace) approximating matplotlib '-.'
+DASHDOT = (6, 2, 1, 2)
+
+
+# =========================================================
+def to_bgr(color):
+    '''Matplotlib color spec (name or hex) -> BGR uint8 tuple.'''
+    r, g, b = to_rgb(color)
+    return (int(round(b * 255)), int(round(g * 255)), int(round(r * 255)))
+
+
+@lru_cache(maxsize=None)
+def colormap_lut(name, n=256):
+    '''(n, 3) uint8 BGR lookup table for a matplotlib colormap.'''
+    rgb = colormaps[name](np.linspace(0, 1, n))[:, :3]
+    return np.ascontiguousarray((rgb[:, ::-1] * 255).round().astype('uint8'))
+
+
+# =========================================================
+def gray_image(arr, vmin=None, vmax=None):
+    '''
+    Scale an intensity array to a BGR uint8 image the way imshow(cmap='gray')
+    autoscales (finite min/max unless given).
+    '''
+    arr = np.asarray(arr)
+    if arr.dtype == np.uint8 and vmin is None and vmax is None:
+        lo, hi = (int(arr.min()), int(arr.max())) if arr.size else (0, 0)
+        if lo == 0 and hi == 255:
+            return cv2.cvtColor(arr, cv2.COLOR_GRAY2BGR)
+
+    arr = arr.astype('float32')
+    finite = np.isfinite(arr)
+    if vmin is None:
+        vmin = float(arr[finite].min()) if finite.any() else 0.0
+    if vmax is None:
+        vmax = float(arr[finite].max()) if finite.any() else 0.0
+
+    scale = 255.0 / (vmax - vmin) if vmax > vmin else 0.0
+    out = np.clip((arr - vmin) * scale, 0, 255)
+    out[~finite] = 0
+    return cv2.cvtColor(out.astype('uint8'), cv2.COLOR_GRAY2BGR)
+
+
+# =========================================================
+def draw_trace(img, x, color, y=None, thickness=1, dash=DASHDOT):
+    '''
+    Draw a per-row trace (e.g. a bedpick) into `img` in place.
+
+    `x` holds one column position per row (or per `y`); NaN breaks the line.
+    With `dash`, the trace is split into on/off runs along its length.
+    '''
+    x = np.asarray(x, dtype='float64')
+    y = np.arange(len(x), dtype='float64') if y is None else np.asarray(y, dtype='float64')
+
+    keep = np.isfinite(x) & np.isfinite(y)
+    if dash:
+        pattern = np.repeat(np.arange(len(dash)) % 2 == 0, dash)
+        keep &= pattern[np.arange(len(x)) % len(pattern)]
+
+    idx = np.flatnonzero(keep)
+    if len(idx) == 0:
+        return img
+
+    # Split into contiguous runs and draw them in one call
+    breaks = np.flatnonzero(np.diff(idx) > 1) + 1
+    pts = np.round(np.column_stack((x[idx], y[idx]))).astype('int32')
+    runs = np.split(pts, breaks)
+
+    lines = [r.reshape(-1, 1, 2) for r in runs if len(r) > 1]
+    if lines:
+        cv2.polylines(img, lines, False, to_bgr(color), thickness, lineType=cv2.LINE_8)
+
+    dots = [r[0] for r in runs if len(r) == 1]
+    for px, py in dots:
+        cv2.circle(img, (int(px), int(py)), 0, to_bgr(color), thickness)
+
+    return img
+
+
+# =========================================================
+def blend_labels(base, label, colors, mask=None, alpha=0.5):
+    '''
+    Blend class colors over a BGR image.
+
+    `colors` is a list of matplotlib colors indexed by class value; pixels in
+    `mask` are drawn black, like label_to_colors(do_alpha=False).
+    '''
+    lut = np.array([to_bgr(c) for c in colors], dtype='uint8')
+    lbl = np.clip(np.asarray(label).astype('int64'), 0, len(lut) - 1)
+    color = lut[lbl]
+    if mask is not None:
+        color[np.asarray(mask, dtype=bool)] = 0
+
+    return cv2.addWeighted(base, 1 - alpha, color, alpha, 0)
+
+
+# =========================================================
+def blend_scalar(base, values, vmin, vmax, cmap='viridis', alpha=0.5):
+    '''
+    Blend a colormapped scalar field over a BGR image (NaN left unblended).
+    '''
+    lut = colormap_lut(cmap)
+    values = np.asarray(values, dtype='float32')
+    finite = np.isfinite(values)
+
+    scale = (len(lut) - 1) / (vmax - vmin) if vmax > vmin else 0.0
+    idx = np.clip((np.where(finite, values, vmin) - vmin) * scale, 0, len(lut) - 1).astype('int64')
+
+    out = cv2.addWeighted(base, 1 - alpha, lut[idx], alpha, 0)
+    out[~finite] = base[~finite]
+    return out
+
+
+# =========================================================
+def _render_agg(draw, dpi=200, pad=2):
+    '''
+    Render the artist returned by draw(fig) on a tight white canvas.
+    '''
+    fig = Figure(dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    artist = draw(fig)
+
+    canvas.draw()
+    bb = artist.get_window_extent(canvas.get_renderer())
+    fig.set_size_inches((bb.width + 2 * pad) / dpi, (bb.height + 2 * pad) / dpi)
+
+    canvas.draw()
+    rgba = np.asarray(canvas.buffer_rgba())
+    return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+
+
+@lru_cache(maxsize=64)
+def legend_image(labels, colors, styles=None, fontsize=5, ncol=1, dpi=200):
+    '''
+    BGR image of a legend.
+
+    `styles` holds a matplotlib linestyle per entry, or 'o' for a marker-only
+    entry (default).  Arguments must be hashable (tuples) for caching.
+    '''
+    styles = styles or ('o',) * len(labels)
+    handles = []
+    for c, s in zip(colors, styles):
+        if s == 'o':
+            handles.append(Line2D([0], [0], color=c, marker='o', linestyle='', markersize=3))
+        else:
+            handles.append(Line2D([0], [0], color=c, linestyle=s, lw=1))
+
+    def draw(fig):
+        return fig.legend(handles, list(labels), loc='center', ncol=ncol,
+                          prop={'size': fontsize}, numpoints=1,
+                          columnspacing=0.75, handletextpad=0.25)
+
+    return _render_agg(draw, dpi)
+
+
+def text_image(text, fontsize=12, color='black', dpi=100):
+    '''BGR image of a (mathtext-capable) text string.'''
+    def draw(fig):
+        return fig.text(0.5, 0.5, text, ha='center', va='center',
+                        fontsize=fontsize, color=color)
+
+    return _render_agg(draw, dpi)
+
+
+def colorbar_image(vmin, vmax, ticks, ticklabels, width, cmap='viridis', dpi=100):
+    '''Horizontal colorbar image about `width` pixels wide.'''
+    fig = Figure(figsize=(width / float(dpi), 0.6), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    cax = fig.add_axes([0.05, 0.6, 0.9, 0.3])
+    cbar = fig.colorbar(ScalarMappable(Normalize(vmin, vmax), colormaps[cmap]),
+                        cax=cax, orientation='horizontal', ticks=list(ticks))
+    cbar.ax.set_xticklabels(list(ticklabels))
+    canvas.draw()
+    return cv2.cvtColor(np.asarray(canvas.buffer_rgba()), cv2.COLOR_RGBA2BGR)
+
+
+# =========================================================
+def title_bar(img, text, bg=(255, 255, 255), fg=(0, 0, 0), scale=None):
+    '''Prepend a one-line title bar (cv2 Hershey font) to an image.'''
+    w = img.shape[1]
+    if scale is None:
+        scale = max(0.35, min(1.0, w / 600.0))
+    (tw, th), base = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+    bar = np.full((th + base + 8, w, 3), bg, dtype='uint8')
+    cv2.putText(bar, text, (max(2, (w - tw) // 2), th + 4), cv2.FONT_HERSHEY_SIMPLEX,
+                scale, fg, 1, cv2.LINE_AA)
+    return np.vstack((bar, img))
+
+
+def paste(img, overlay, corner='lower right', margin=4):
+    '''
+    Paste `overlay` into a corner of `img`, or append it below when it does
+    not fit.
+    '''
+    h, w = overlay.shape[:2]
+    H, W = img.shape[:2]
+    if h + 2 * margin > H or w + 2 * margin > W:
+        return stack([img, overlay], axis=0)
+
+    out = img.copy()
+    y0 = H - h - margin if 'lower' in corner else margin
+    x0 = W - w - margin if 'right' in corner else margin
+    out[y0:y0 + h, x0:x0 + w] = overlay
+    return out
+
+
+def stack(images, axis=0, fill=255):
+    '''Concatenate BGR images, padding the other axis (centered) with `fill`.'''
+    other = 1 - axis
+    size = max(im.shape[other] for im in images)
+    padded = []
+    for im in images:
+        d = size - im.shape[other]
+        if d > 0:
+            before = d // 2
+            pad = [(0, 0), (0, 0), (0, 0)]
+            pad[other] = (before, d - before)
+            im = np.pad(im, pad, constant_values=fill)
+        padded.append(im)
+    return np.concatenate(padded, axis=axis)
+
+
+def grid(panels, ncols, gap=6, fill=255):
+    '''Arrange equally treated panels in rows of `ncols`.'''
+    rows = []
+    for i in range(0, len(panels), ncols):
+        row = []
+        for p in panels[i:i + ncols]:
+            row.append(p)
+            row.append(np.full((p.shape[0], gap, 3), fill, dtype='uint8'))
+        rows.append(stack(row[:-1], axis=1, fill=fill))
+        rows.append(np.full((gap, 1, 3), fill, dtype='uint8'))
+    return stack(rows[:-1], axis=0, fill=fill)
+
+
+def save_image(path, img):
+    '''Write a BGR image; format from the extension (.png, .jpg, ...).'''
+    if not cv2.imwrite(path, img):
+        raise IOError('Could not write {}'.format(path))
+    return path
+
+
+def softmax(x, axis=-1):
+    '''Numerically stable softmax (NaN propagates per pixel).'''
+    x = np.asarray(x, dtype='float32')
+    e = np.exp(x - np.max(x, axis=axis, keepdims=True))
+    return e / np.sum(e, axis=axis, keepdims=True)
@@ -42,6 +42,8 @@ sys.path.append(PACKAGE_DIR)
 
 from pingmapper.funcs_common import *
 from pingmapper.class_rectObj import rectObj
+from pingmapper.funcs_spatial import chunk_footprints, save_chunk_index
+from pingmapper.funcs_manifest import find_meta_files
 
 
 def _is_sidescan_beam(beam_name):
@@ -49,6 +51,94 @@ def _is_sidescan_beam(beam_name):
     return beam_name.startswith('ss_port') or beam_name.startswith('ss_star')
 
 
+# =========================================================
+def buildChunkIndex(portstar):
+    '''
+    Build chunk footprint polygons from each beam's smoothed trackline/range
+    extent csv and persist them to meta/chunk_index.gpkg.  Footprints are in
+    projected coordinates and are reused by coverage export and chunk lookups.
+    '''
+    footprints = {}
+    for son in portstar:
+        if not hasattr(son, 'smthTrkFile') or not os.path.exists(son.smthTrkFile):
+            continue
+
+        trkMeta = pd.read_csv(son.smthTrkFile)
+        trkMeta = son._sanitizeProjectedTrackMeta(trkMeta, wgs=False)
+
+        if not {'range_es', 'range_ns', 'trk_utm_es', 'trk_utm_ns'}.issubset(trkMeta.columns):
+            continue
+
+        footprints[son.beamName] = chunk_footprints(trkMeta, crs=son.humDat['epsg'])
+        del trkMeta
+
+    if len(footprints) == 0:
+        return None
+
+    return save_chunk_index(portstar[0].metaDir, footprints)
+
+
+# =========================================================
+def _renumberChunks(df):
+    '''
+    Renumber transects and chunks sequentially (0, 1, 2, ...) in transect,
+    chunk order after transects have been removed.
+    '''
+    df = df.copy()
+    df['chunk_id'] = df.groupby(['transect', 'chunk_id'], sort=True).ngroup()
+    df['transect'] = df.groupby('transect', sort=True).ngroup()
+    return df
+
+
+# =========================================================
+def _stitchChunkBoundaries(sDF,
+                           cols=('lons', 'lats', 'utm_es', 'utm_ns', 'cog', 'instr_heading')):
+    '''
+    To remove gap between sonar tiles, the first ping of every chunk takes the
+    coordinates of the previous chunk's second to last ping (last ping if the
+    previous chunk has only one) when both chunks belong to the same transect.
+
+    Chunk boundaries are found once from the sorted chunk ids and all updates
+    are applied with a single positional assignment.
+    '''
+    if len(sDF) == 0 or 'chunk_id' not in sDF.columns:
+        return sDF
+
+    chunk = sDF['chunk_id'].to_numpy().astype('int64')
+    transect = sDF['transect'].to_numpy()
+
+    order = np.argsort(chunk, kind='stable')
+    chunks, start, count = np.unique(chunk[order], return_index=True, return_counts=True)
+    if len(chunks) < 2:
+        return sDF
+
+    first = order[start] # Row of first ping in each chunk
+    src = order[start + count - 1 - (count >= 2)] # Row of second to last (or last) ping
+
+    # Only stitch when the previous chunk exists and shares the transect
+    stitch = np.zeros(len(chunks), dtype=bool)
+    stitch[1:] = (chunks[1:] - 1 == chunks[:-1]) & (transect[first[1:]] == transect[first[:-1]])
+
+    k = np.flatnonzero(stitch)
+    dst = first[k]
+    src = src[k - 1]
+
+    # A previous chunk with <= 2 pings supplies its (already stitched) first
+    # ping, so follow the chain back to the original source row.
+    chained = np.isin(src, dst)
+    if chained.any():
+        dstPos = {d: j for j, d in enumerate(dst)}
+        for j in np.flatnonzero(chained):
+            src[j] = src[dstPos[src[j]]]
+
+    colIdx = [sDF.columns.get_loc(c) for c in cols]
+    vals = sDF.iloc[src, colIdx].to_numpy(dtype='float64')
+    for i, c in enumerate(colIdx):
+        sDF.iloc[dst, c] = vals[:, i]
+
+    return sDF
+
+
 # =========================================================
 def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True, threadCnt=''):
 
@@ -64,10 +154,10 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
         headingCol = 'heading'
 
     ####################################################
-    # Check if sonObj pickle exists, append to metaFiles
+    # Check if saved sonObj state exists, append to metaFiles
     metaDir = os.path.join(projDir, "meta")
     if os.path.exists(metaDir):
-        metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+        metaFiles = find_meta_files(metaDir)
 
         if len(metaFiles) == 0:
             projectMode_2a_inval()
@@ -77,7 +167,7 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
     del metaDir
 
     #############################################
-    # Create a rectObj instance from pickle files
+    # Create a rectObj instance from saved state
     rectObjs = []
     for meta in metaFiles:
         son = rectObj(meta) # Initialize rectObj()
@@ -138,7 +228,7 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
         son0 = portstar[maxRec]
         sonDF = son0.sonMetaDF # Get ping metadata
         # sDF = son._interpTrack(df=sonDF, dropDup=True, filt=filter, deg=3) # Smooth trackline and reinterpolate trackpoints along spline
-        sDF = pd.DataFrame()
+        smoothed_all = []
         transect_dropped = []
 
         for name, group in sonDF.groupby('transect'):
@@ -148,41 +238,32 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
             # if filter > nchunk*0.1:
             #     filter = int(nchunk*0.1)
 
-            # print('\n\n\ntransect:', name, 'filter:', filter)
             smoothed = son._interpTrack(df=group, dropDup=True, filt=filter, deg=3)
 
             # smooth trackline fit
-            # if smoothed is not None:
             if len(smoothed.columns) > 4:
                 smoothed['transect'] = int(name)
-                sDF = pd.concat([sDF, smoothed], ignore_index=False)
+                smoothed_all.append(smoothed)
 
             # Smooth trackline not fit. Need to remove transect from df
             else:
-                # sonDF = sonDF.drop(group.get_group(group).index)
-                # sonDF = sonDF.drop(group.index)
-                sonDF = sonDF[sonDF['transect'] != name]
                 transect_dropped.append(name)
 
             del smoothed
 
+        # Single concat instead of growing sDF per transect
+        if len(smoothed_all) > 0:
+            sDF = pd.concat(smoothed_all, ignore_index=False)
+        else:
+            sDF = pd.DataFrame()
+        del smoothed_all
+
         # Save sonDF
         if len(transect_dropped) > 0:
 
-            # Reassign chunk, save sonDF, update sDF (chunk/transect)
-            # son0._reassignChunks(sonDF)
-            # son0._loadSonMeta()
-            # sonDF = son0.sonMetaDF
-
-            c = 0
-            t = 0
-            for name, group in sonDF.groupby('transect'):
-                for n, g in group.groupby('chunk_id'):
-                    # sonDF.loc[sonDF['chunk_id'] == n]
-                    sonDF.loc[sonDF['chunk_id'] == n, 'chunk_id'] = c
-                    sonDF.loc[sonDF['transect'] == name, 'transect'] = t
-                    c += 1
-                t+=1
+            # Drop unfit transects and renumber chunk/transect sequentially
+            sonDF = sonDF[~sonDF['transect'].isin(transect_dropped)]
+            sonDF = _renumberChunks(sonDF)
 
             sDF['chunk_id'] = sonDF['chunk_id']
             sDF['transect'] = sonDF['transect']
@@ -193,12 +274,6 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
             # Save sonDF
             son0._saveSonMetaCSV(sonDF)
 
-            # print(len(sDF))
-            # print(sDF)
-            # print(len(sonDF))
-            # print(sonDF)
-            # sys.exit()
-
             # Update other son object
             if maxRec == 0:
                 son1 = portstar[1]
@@ -209,24 +284,8 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
             son1._loadSonMeta()
             sonDF = son1.sonMetaDF
 
-            # for name, group in sonDF.groupby('transect'):
-            #     if name in transect_dropped:
-            #         # sonDF = sonDF.drop(group.get_group(group).index)
-            #         # sonDF = sonDF.drop(group.index)
-            #         sonDF = sonDF[sonDF['transect'] != name]
-
-            for name in transect_dropped:
-                sonDF = sonDF[sonDF['transect'] != name]
-
-            c = 0
-            t = 0
-            for name, group in sonDF.groupby('transect'):
-                for n, g in group.groupby('chunk_id'):
-                    # sonDF.loc[sonDF['chunk_id'] == n]
-                    sonDF.loc[sonDF['chunk_id'] == n, 'chunk_id'] = c
-                    sonDF.loc[sonDF['transect'] == name, 'transect'] = t
-                    c += 1
-                t+=1
+            sonDF = sonDF[~sonDF['transect'].isin(transect_dropped)]
+            sonDF = _renumberChunks(sonDF)
 
             # Save sonDF
             son1._saveSonMetaCSV(sonDF)
@@ -238,45 +297,7 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
         # To remove gap between sonar tiles:
         # For chunk > 0, use coords from previous chunks second to last ping
         # and assign as current chunk's first ping coords
-
-        chunks = pd.unique(sDF['chunk_id'])
-        transects = pd.unique(sDF['transect'])
-
-        if len(chunks) > 1:
-            i = 1
-            t = 0
-            max_chunk = int(max(chunks))
-
-            while i <= max_chunk:
-                cur_chunk = sDF[sDF['chunk_id'] == i]
-                if cur_chunk.empty:
-                    i += 1
-                    continue
-
-                cur_row = cur_chunk.iloc[[0]]
-                cur_transect = cur_row['transect'].values[0]
-                cur_idx = cur_row.index[0]
-
-                if cur_transect == t:
-                    prev_chunk = sDF[sDF['chunk_id'] == i - 1]
-                    if not prev_chunk.empty:
-                        # Prefer second-to-last row, but fall back to last row
-                        # when very small datasets have only one ping in chunk.
-                        if len(prev_chunk) >= 2:
-                            last_row = prev_chunk.iloc[-2]
-                        else:
-                            last_row = prev_chunk.iloc[-1]
-
-                        sDF.at[cur_idx, "lons"] = float(last_row["lons"])
-                        sDF.at[cur_idx, "lats"] = float(last_row["lats"])
-                        sDF.at[cur_idx, "utm_es"] = float(last_row["utm_es"])
-                        sDF.at[cur_idx, "utm_ns"] = float(last_row["utm_ns"])
-                        sDF.at[cur_idx, "cog"] = float(last_row["cog"])
-                        sDF.at[cur_idx, "instr_heading"] = float(last_row["instr_heading"])
-                else:
-                    t += 1
-
-                i += 1
+        sDF = _stitchChunkBoundaries(sDF)
 
         son0.smthTrk = sDF # Store smoothed trackline coordinates in rectObj.
         
@@ -301,11 +322,11 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
 
         del son0
 
-        # Save smoothed trackline coordinates to file
+        # Set smoothed trackline file. Smoothed coordinates stay in memory and
+        ## the csv is written once by son._getRangeCoords() with range extents.
         csvNames = {}
         for son in portstar:
             outCSV = os.path.join(son.metaDir, "Trackline_Smth_"+son.beamName+".csv")
-            son.smthTrk.to_csv(outCSV, index=False, float_format='%.14f')
             son.smthTrkFile = outCSV
             csvNames[son.beamName] = outCSV
             son._cleanup()
@@ -325,12 +346,23 @@ def smoothTrackline(projDir='', x_offset='', y_offset='', nchunk ='', cog=True,
             print("\nCalculating, smoothing, and interpolating range extent coordinates...")
         else:
             print("\nCalculating range extent coordinates from vessel heading...")
-        Parallel(n_jobs=safe_n_jobs(len(portstar), threadCnt), verbose=10)(delayed(son._getRangeCoords)(flip, filterRange, cog) for son in portstar)
+        # Port and star share the smoothed trackline, compute them in one pass
+        portstar[0]._getRangeCoords(flip, filterRange, cog, sons=portstar)
         print("Done!")
         print("Time (s):", round(time.time() - start_time, ndigits=1))
         gc.collect()
         printUsage()
 
+        ############################################################################
+        # Build chunk footprint index                                              #
+        ############################################################################
+
+        start_time = time.time()
+        print("\nBuilding chunk footprint index...")
+        buildChunkIndex(portstar)
+        print("Done!")
+        print("Time (s):", round(time.time() - start_time, ndigits=1))
+
         return csvNames
 
     else:
@@ -0,0 +1,109 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Compact on-disk store for substrate model softmax scores.
+
+Predictions are (H, W, nclasses) logits with NaN outside the predicted area.
+They are written to a chunked HDF5 file as float16 (LZF + shuffle filter),
+roughly 4x smaller than the float64 npz and much faster to write/read.  The
+dataset is sliced lazily, so consumers can load only the rows or classes they
+need.  Legacy `substrateSoftmax_*.npz` files are still readable.
+'''
+
+import os
+
+import numpy as np
+import h5py
+
+SOFTMAX_EXT = '.h5'
+SOFTMAX_DTYPES = ('float16', 'float32')
+
+
+# =========================================================
+def save_softmax(f, arr, classes, dtype='float16', chunk_size=256):
+    '''
+    Write softmax scores to a chunked, compressed HDF5 file.
+
+    f : output file (.h5)
+    arr : (H, W, nclasses) array
+    classes : list of class names (stored as an attribute)
+    dtype : 'float16' (default) or 'float32'
+    '''
+    if str(dtype) not in SOFTMAX_DTYPES:
+        raise ValueError("dtype must be one of {}, got '{}'".format(SOFTMAX_DTYPES, dtype))
+
+    arr = np.asarray(arr)
+    H, W, C = arr.shape
+    chunks = (min(H, chunk_size), min(W, chunk_size), C)
+
+    with h5py.File(f, 'w') as h5:
+        dset = h5.create_dataset('substrate', data=arr.astype(dtype), chunks=chunks,
+                                 compression='lzf', shuffle=True)
+        dset.attrs['classes'] = [str(c) for c in classes]
+
+    return f
+
+
+# =========================================================
+def load_softmax(f, rows=None, bands=None):
+    '''
+    Read softmax scores (float32) and class names.
+
+    rows : optional slice of rows (depth samples) to read
+    bands : optional list/slice of class indices to read
+
+    -------
+    Returns
+    -------
+    (softmax, classes)
+    '''
+    rows = slice(None) if rows is None else rows
+    bands = slice(None) if bands is None else bands
+
+    if os.path.splitext(f)[1] == '.npz':
+        npz = np.load(f)
+        arr = npz['substrate'][rows][:, :, bands].astype('float32')
+        return arr, list(npz['classes'])
+
+    with h5py.File(f, 'r') as h5:
+        dset = h5['substrate']
+        if isinstance(bands, slice):
+            arr = dset[rows, :, bands]
+        else:
+            # h5py fancy indexing needs increasing indices
+            bands = np.asarray(bands)
+            order = np.argsort(bands)
+            arr = dset[rows, :, bands[order].tolist()]
+            arr = arr[:, :, np.argsort(order)]
+        classes = [c.decode() if isinstance(c, bytes) else str(c) for c in dset.attrs['classes']]
+
+    return arr.astype('float32'), classes
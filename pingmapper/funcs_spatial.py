@@ -0,0 +1,538 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Spatial indexing helpers shared by filtering, coverage export and mosaicking.
+
+Chunk footprints (range extent -> trackline polygons) are built once after
+the trackline is smoothed and persisted to `meta/chunk_index.gpkg`, one layer
+per side-scan beam.  Coverage export and the substrate mosaic extent reload
+the footprints instead of re-deriving chunk extents from the trackline csv.
+
+Classified rasters are polygonized in tiles with `polygonize_tiled()`, which
+dissolves polygons split by tile seams so the output matches a single pass.
+Large sets of footprints are merged with `cascaded_union()`.
+'''
+
+import os, sys
+
+# Add 'pingmapper' to the path, may not need after pypi package...
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PACKAGE_DIR)
+
+import numpy as np
+import pandas as pd
+import shapely
+import rasterio
+import rasterio.features
+import rasterio.enums
+from rasterio.windows import Window
+from joblib import Parallel, delayed
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from pingmapper.funcs_lazy import lazy_import
+gpd = lazy_import('geopandas')
+
+CHUNK_INDEX_NAME = 'chunk_index.gpkg'
+
+
+# =========================================================
+def chunk_index_path(metaDir):
+    '''
+    Location of the persisted chunk footprint index for a project.
+    '''
+    return os.path.join(metaDir, CHUNK_INDEX_NAME)
+
+
+# =========================================================
+def aoi_mask(aoi_geom, x, y):
+    '''
+    Bulk point-in-polygon test of ping coordinates against an AOI polygon.
+
+    The AOI geometry is prepared once and queried with `contains_xy`, so no
+    per-ping Point objects or GeoDataFrame are created.  Equivalent to
+    `points.within(aoi_geom)`.
+    '''
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    if aoi_geom is None or shapely.is_empty(aoi_geom):
+        return np.zeros(len(x), dtype=bool)
+
+    shapely.prepare(aoi_geom)
+    return shapely.contains_xy(aoi_geom, x, y)
+
+
+# =========================================================
+def chunk_footprints(df,
+                     xRange='range_es',
+                     yRange='range_ns',
+                     xTrk='trk_utm_es',
+                     yTrk='trk_utm_ns',
+                     chunkCol='chunk_id',
+                     crs=None):
+    '''
+    Build one coverage polygon per chunk from a smoothed trackline/range
+    extent DataFrame.
+
+    Each ring follows the range extent coordinates in ping order and returns
+    along the trackline in reverse, matching the polygons previously built
+    chunk-by-chunk in rectObj._exportCovShp().  Chunks with fewer than two
+    valid pings are skipped.
+
+    -------
+    Returns
+    -------
+    GeoDataFrame indexed by chunk_id with `chunk_id`, `transect` (if present),
+    `ping_start`, `ping_end` and `ping_cnt` columns.
+    '''
+    cols = [chunkCol, xRange, yRange, xTrk, yTrk]
+    if 'transect' in df.columns:
+        cols.append('transect')
+    if 'record_num' in df.columns:
+        cols.append('record_num')
+
+    dfFoot = df[cols].copy()
+    for c in [xRange, yRange, xTrk, yTrk]:
+        dfFoot[c] = pd.to_numeric(dfFoot[c], errors='coerce')
+    dfFoot = dfFoot.dropna(subset=[chunkCol, xRange, yRange, xTrk, yTrk])
+
+    empty = gpd.GeoDataFrame({chunkCol: pd.Series(dtype='int64')}, geometry=[], crs=crs)
+    if dfFoot.empty:
+        return empty
+
+    # Keep ping order inside each chunk
+    chunk = dfFoot[chunkCol].to_numpy().astype('int64')
+    order = np.argsort(chunk, kind='stable')
+    chunk = chunk[order]
+
+    chunks, start, count = np.unique(chunk, return_index=True, return_counts=True)
+    keep = count >= 2
+    if not keep.any():
+        return empty
+
+    keepPing = np.repeat(keep, count)
+    order = order[keepPing]
+    chunk = chunk[keepPing]
+    chunks, start, count = np.unique(chunk, return_index=True, return_counts=True)
+
+    rx = dfFoot[xRange].to_numpy()[order]
+    ry = dfFoot[yRange].to_numpy()[order]
+    tx = dfFoot[xTrk].to_numpy()[order]
+    ty = dfFoot[yTrk].to_numpy()[order]
+
+    # Reverse trackline coordinates within each chunk
+    pos = np.arange(len(order)) - np.repeat(start, count)
+    rev = np.repeat(start + count - 1, count) - pos
+
+    # Ring for chunk k: range[start_k:end_k] + track[end_k-1:start_k-1:-1]
+    ringId = np.concatenate([chunk, chunk])
+    ringPos = np.concatenate([pos, pos + np.repeat(count, count)])
+    x = np.concatenate([rx, tx[rev]])
+    y = np.concatenate([ry, ty[rev]])
+    ringOrder = np.lexsort((ringPos, ringId))
+
+    coords = np.column_stack([x[ringOrder], y[ringOrder]])
+    ringIdx = np.searchsorted(chunks, ringId[ringOrder])
+    rings = shapely.linearrings(coords, indices=ringIdx)
+    polys = shapely.polygons(rings)
+
+    gdf = gpd.GeoDataFrame({chunkCol: chunks.astype('int64')}, geometry=polys, index=chunks, crs=crs)
+
+    grouped = dfFoot.iloc[order].groupby(chunkCol, sort=True)
+    if 'transect' in dfFoot.columns:
+        gdf['transect'] = grouped['transect'].first().to_numpy().astype('int64')
+    if 'record_num' in dfFoot.columns:
+        gdf['ping_start'] = grouped['record_num'].min().to_numpy().astype('int64')
+        gdf['ping_end'] = grouped['record_num'].max().to_numpy().astype('int64')
+    gdf['ping_cnt'] = count.astype('int64')
+
+    return gdf
+
+
+# =========================================================
+def save_chunk_index(metaDir, footprints):
+    '''
+    Persist chunk footprints, one GeoPackage layer per beam.
+
+    footprints : dict {beamName: GeoDataFrame}
+    '''
+    outFile = chunk_index_path(metaDir)
+    if os.path.exists(outFile):
+        os.remove(outFile)
+
+    for beam, gdf in footprints.items():
+        if gdf is None or len(gdf) == 0:
+            continue
+        gdf.to_file(outFile, layer=str(beam), driver='GPKG')
+
+    return outFile
+
+
+# =========================================================
+def load_chunk_index(metaDir, beam):
+    '''
+    Load persisted chunk footprints for `beam`.
+
+    -------
+    Returns
+    -------
+    GeoDataFrame indexed by chunk_id, or None if no index exists for the beam.
+    '''
+    inFile = chunk_index_path(metaDir)
+    if not os.path.exists(inFile):
+        return None
+
+    try:
+        gdf = gpd.read_file(inFile, layer=str(beam))
+    except Exception:
+        return None
+
+    if len(gdf) == 0:
+        return None
+
+    gdf.index = gdf['chunk_id'].to_numpy().astype('int64')
+
+    return gdf
+
+
+# =========================================================
+def chunk_bounds(gdf, chunks):
+    '''
+    (minx, miny, maxx, maxy) of the footprints of `chunks`, or None if the
+    index is missing any of them.
+    '''
+    if gdf is None:
+        return None
+
+    chunks = np.unique(np.asarray(chunks, dtype='int64'))
+    if not np.isin(chunks, gdf.index.to_numpy()).all():
+        return None
+
+    return tuple(gdf.loc[chunks].total_bounds)
+
+
+# =========================================================
+def _polygonize_window(rasterFile, window, valid_values=None, bidx=1):
+    '''
+    Polygonize one raster window (4-connected, like gdal.Polygonize).
+
+    Only pixels whose value is in `valid_values` (or != nodata/0 when None)
+    are polygonized, so no polygons are created for background that would be
+    deleted afterwards.
+
+    -------
+    Returns
+    -------
+    (values, geometries, unexpected values found in the window)
+    '''
+    with rasterio.open(rasterFile) as src:
+        arr = src.read(bidx, window=window)
+        transform = src.window_transform(window)
+        nodata = src.nodata
+
+    background = 0 if nodata is None else nodata
+    if valid_values is not None:
+        mask = np.isin(arr, valid_values)
+        present = np.unique(arr[~mask])
+        unexpected = present[(present != 0) & (present != background)].tolist()
+    else:
+        mask = arr != background
+        unexpected = []
+
+    if not mask.any():
+        return np.array([], dtype='float64'), np.array([], dtype=object), unexpected
+
+    values = []
+    geoms = []
+    for geom, val in rasterio.features.shapes(arr, mask=mask, transform=transform):
+        values.append(val)
+        geoms.append(shapely.geometry.shape(geom))
+
+    return np.asarray(values, dtype='float64'), np.asarray(geoms, dtype=object), unexpected
+
+
+# =========================================================
+def polygonize_tiled(rasterFile,
+                     valid_values=None,
+                     tile_size=4096,
+                     n_jobs=1,
+                     bidx=1):
+    '''
+    Polygonize a classified raster tile-by-tile.
+
+    The raster is split into `tile_size` windows which are polygonized
+    independently (in parallel when n_jobs > 1).  Polygons touching an
+    internal tile seam are then dissolved per class and exploded so the
+    result matches polygonizing the whole raster at once.
+
+    -------
+    Returns
+    -------
+    (GeoDataFrame with `value` column, sorted list of unexpected values)
+    '''
+    with rasterio.open(rasterFile) as src:
+        width, height = src.width, src.height
+        crs = src.crs
+        xres, yres = abs(src.transform.a), abs(src.transform.e)
+
+    windows = []
+    for row_off in range(0, height, tile_size):
+        for col_off in range(0, width, tile_size):
+            windows.append(Window(col_off, row_off,
+                                  min(tile_size, width - col_off),
+                                  min(tile_size, height - row_off)))
+
+    if n_jobs > 1 and len(windows) > 1:
+        r = Parallel(n_jobs=min(n_jobs, len(windows)))(delayed(_polygonize_window)(rasterFile, w, valid_values, bidx) for w in windows)
+    else:
+        r = [_polygonize_window(rasterFile, w, valid_values, bidx) for w in windows]
+
+    unexpected = sorted(set(v for _, _, u in r for v in u))
+
+    values = np.concatenate([v for v, _, _ in r]) if r else np.array([], dtype='float64')
+    geoms = np.concatenate([g for _, g, _ in r]) if r else np.array([], dtype=object)
+
+    if len(geoms) == 0:
+        return gpd.GeoDataFrame({'value': values}, geometry=[], crs=crs), unexpected
+
+    if len(windows) > 1:
+        # Interior seams in world coordinates
+        with rasterio.open(rasterFile) as src:
+            t = src.transform
+        seamX = np.array([t.c + c * t.a for c in range(tile_size, width, tile_size)])
+        seamY = np.array([t.f + r * t.e for r in range(tile_size, height, tile_size)])
+        tol = 0.5 * min(xres, yres)
+
+        bounds = shapely.bounds(geoms)
+        onSeam = np.zeros(len(geoms), dtype=bool)
+        for sx in seamX:
+            onSeam |= (np.abs(bounds[:, 0] - sx) < tol) | (np.abs(bounds[:, 2] - sx) < tol)
+        for sy in seamY:
+            onSeam |= (np.abs(bounds[:, 1] - sy) < tol) | (np.abs(bounds[:, 3] - sy) < tol)
+
+        if onSeam.any():
+            keepVal = [values[~onSeam]]
+            keepGeom = [geoms[~onSeam]]
+            seamVal = values[onSeam]
+            seamGeom = geoms[onSeam]
+            for v in np.unique(seamVal):
+                merged = shapely.get_parts(shapely.union_all(seamGeom[seamVal == v]))
+                keepGeom.append(np.asarray(merged, dtype=object))
+                keepVal.append(np.full(len(merged), v, dtype='float64'))
+            values = np.concatenate(keepVal)
+            geoms = np.concatenate(keepGeom)
+
+    gdf = gpd.GeoDataFrame({'value': values}, geometry=geoms, crs=crs)
+    return gdf, unexpected
+
+
+# =========================================================
+def raster_footprint(rasterFile, bidx=1):
+    '''
+    Polygon covering every pixel > 0 in a raster band.
+
+    -------
+    Returns
+    -------
+    (shapely geometry or None when the band is empty, raster crs)
+    '''
+    with rasterio.open(rasterFile) as src:
+        arr = src.read(bidx)
+        transform = src.transform
+        crs = src.crs
+
+    mask = arr > 0
+    if not mask.any():
+        return None, crs
+
+    geoms = [shapely.geometry.shape(geom) for geom, _ in
+             rasterio.features.shapes(mask.view('uint8'), mask=mask, transform=transform)]
+
+    return shapely.union_all(geoms), crs
+
+
+# =========================================================
+def cascaded_union(geoms, group_size=32):
+    '''
+    Union many geometries without one giant dissolve.
+
+    An STRtree splits the geometries into connected groups of intersecting
+    (or touching) members; groups are disjoint so they are never unioned with
+    each other.  Members of each group are ordered along a Hilbert curve and
+    unioned `group_size` at a time, level by level, so every union only
+    merges spatial neighbours.
+
+    -------
+    Returns
+    -------
+    shapely geometry (empty GeometryCollection when there is nothing to union)
+    '''
+    geoms = np.asarray([g for g in geoms if g is not None], dtype=object)
+    if len(geoms) > 0:
+        geoms = geoms[~shapely.is_empty(geoms)]
+    if len(geoms) == 0:
+        return shapely.GeometryCollection()
+
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(geoms, predicate='intersects')
+    graph = coo_matrix((np.ones(len(left), dtype=bool), (left, right)), shape=(len(geoms), len(geoms)))
+    _, labels = connected_components(graph, directed=False)
+
+    parts = []
+    for label in np.unique(labels):
+        members = geoms[labels == label]
+        if len(members) > group_size:
+            order = np.argsort(gpd.GeoSeries(members).hilbert_distance().values, kind='stable')
+            members = members[order]
+        while len(members) > 1:
+            members = np.asarray([shapely.union_all(members[i:i+group_size])
+                                  for i in range(0, len(members), group_size)], dtype=object)
+        parts.append(shapely.get_parts(members[0]))
+
+    parts = np.concatenate(parts)
+    polys = parts[shapely.get_type_id(parts) == 3]
+    if len(polys) == len(parts):
+        return shapely.multipolygons(polys) if len(polys) > 1 else polys[0]
+    return shapely.union_all(parts)
+
+
+# =========================================================
+class StreamingMosaic(object):
+    '''
+    Stream georeferenced, north-up chunk rasters straight into one tiled
+    GeoTIFF mosaic.
+
+    Chunks are pasted into a disk-backed canvas on a fixed grid (nearest
+    neighbour, like the VRT mosaics).  Overlap rule: pixels with data from a
+    later paste overwrite earlier ones, so pasting in ascending chunk order
+    reproduces the VRT source order.  The canvas is written out once on
+    close(), block row by block row, so each tile is compressed exactly once.
+    '''
+
+    def __init__(self, outFile, bounds, res, crs, dtype='uint8', nodata=0, colormap=None):
+        self.outFile = outFile
+        self.res = float(res)
+        self.crs = crs
+        self.dtype = np.dtype(dtype)
+        self.nodata = nodata
+        self.colormap = colormap
+
+        # Align grid to resolution (targetAlignedPixels)
+        minx, miny, maxx, maxy = bounds
+        minx = np.floor(minx / self.res) * self.res
+        miny = np.floor(miny / self.res) * self.res
+        maxx = np.ceil(maxx / self.res) * self.res
+        maxy = np.ceil(maxy / self.res) * self.res
+
+        self.width = max(1, int(round((maxx - minx) / self.res)))
+        self.height = max(1, int(round((maxy - miny) / self.res)))
+        self.transform = rasterio.Affine(self.res, 0, minx, 0, -self.res, maxy)
+
+        self._canvasFile = outFile + '.canvas'
+        self.canvas = np.memmap(self._canvasFile, dtype=self.dtype, mode='w+', shape=(self.height, self.width))
+
+    #=======================================================================
+    def paste(self, arr, transform):
+        '''
+        Resample `arr` (north-up, georeferenced by `transform`) onto the
+        mosaic grid and overwrite canvas pixels where `arr` has data.
+        '''
+        arr = np.asarray(arr)
+        rows, cols = arr.shape
+        sx0, sres_x = transform.c, transform.a
+        sy0, sres_y = transform.f, -transform.e
+
+        # Canvas window covered by the chunk
+        c0 = int(np.floor((sx0 - self.transform.c) / self.res))
+        c1 = int(np.ceil((sx0 + cols * sres_x - self.transform.c) / self.res))
+        r0 = int(np.floor((self.transform.f - sy0) / self.res))
+        r1 = int(np.ceil((self.transform.f - (sy0 - rows * sres_y)) / self.res))
+        c0, r0 = max(c0, 0), max(r0, 0)
+        c1, r1 = min(c1, self.width), min(r1, self.height)
+        if c0 >= c1 or r0 >= r1:
+            return
+
+        # Nearest source pixel for each canvas pixel centre
+        xc = self.transform.c + (np.arange(c0, c1) + 0.5) * self.res
+        yc = self.transform.f - (np.arange(r0, r1) + 0.5) * self.res
+        si = np.floor((sy0 - yc) / sres_y).astype(np.int64)
+        sj = np.floor((xc - sx0) / sres_x).astype(np.int64)
+        vi = (si >= 0) & (si < rows)
+        vj = (sj >= 0) & (sj < cols)
+        if not vi.any() or not vj.any():
+            return
+
+        sub = arr[np.ix_(si[vi], sj[vj])]
+        hasData = sub != self.nodata
+        if np.issubdtype(sub.dtype, np.floating):
+            hasData &= ~np.isnan(sub)
+
+        ri = np.arange(r0, r1)[vi]
+        cj = np.arange(c0, c1)[vj]
+        view = self.canvas[ri[0]:ri[-1]+1, cj[0]:cj[-1]+1]
+        view[hasData] = sub[hasData].astype(self.dtype)
+
+    #=======================================================================
+    def close(self, overview=True, blocksize=512):
+        '''
+        Write the canvas to a tiled, compressed GeoTIFF and build overviews.
+        '''
+        with rasterio.open(self.outFile, 'w', driver='GTiff',
+                           width=self.width, height=self.height, count=1,
+                           dtype=self.dtype, crs=self.crs, transform=self.transform,
+                           nodata=self.nodata, tiled=True,
+                           blockxsize=blocksize, blockysize=blocksize,
+                           compress='lzw', num_threads='all_cpus') as dst:
+            for r in range(0, self.height, blocksize):
+                h = min(blocksize, self.height - r)
+                dst.write(np.asarray(self.canvas[r:r+h]), 1, window=Window(0, r, self.width, h))
+            if self.colormap is not None:
+                dst.write_colormap(1, self.colormap)
+
+        self._discard()
+
+        if overview:
+            factors = [2 ** j for j in range(1, 10) if (2 ** j) < max(self.width, self.height)]
+            if factors:
+                with rasterio.Env(COMPRESS_OVERVIEW='DEFLATE'):
+                    with rasterio.open(self.outFile, 'r+') as dst:
+                        dst.build_overviews(factors, rasterio.enums.Resampling.nearest)
+
+        return self.outFile
+
+    #=======================================================================
+    def _discard(self):
+        self.canvas = None
+        if os.path.exists(self._canvasFile):
+            os.remove(self._canvasFile)
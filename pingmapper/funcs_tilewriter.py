@@ -0,0 +1,329 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Background encoding of sonogram tiles and rectified GeoTIFFs.
+
+Chunk tasks hand finished arrays to a `TileWriter`, which encodes and writes
+them on a small thread pool while the task goes on to compute its next
+product.  The queue is bounded: `submit()` blocks once `max_pending` writes
+are outstanding, so a slow disk throttles compute instead of piling arrays
+up in memory.  cv2 (libpng, libjpeg-turbo), zlib and GDAL release the GIL
+while encoding, so the threads overlap with numpy work in the same process.
+Arrays must not be modified after they are submitted.
+
+joblib runs chunk tasks in separate processes, so each process keeps its own
+writer (`shared_writer()`).  Tasks call `flush()` before returning, so their
+files exist and write errors surface before the parent moves on; `flush()`
+returns the files, bytes and encode time since the last flush, and
+`format_stats()` sums them into a progress line.
+'''
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from pingmapper.funcs_lazy import lazy_attr, lazy_import
+
+cv2 = lazy_import('cv2')
+tifffile = lazy_import('tifffile')
+imsave = lazy_attr('skimage.io', 'imsave')
+
+# Defaults match the previous skimage/Pillow output (zlib level 6, quality 75)
+PNG_LEVEL = 6
+JPEG_QUALITY = 75
+TIFF_COMPRESSION = 'deflate'
+
+GEOTIFF_COMPRESSION = 'deflate'
+GEOTIFF_LEVEL = 9
+GEOTIFF_BLOCK = 256
+GEOTIFF_CODECS = ('none', 'deflate', 'zstd', 'lzw', 'lerc', 'lerc_deflate', 'lerc_zstd')
+
+
+# =========================================================
+def write_image(outfile,
+                data,
+                png_level=PNG_LEVEL,
+                jpeg_quality=JPEG_QUALITY,
+                tiff_compression=TIFF_COMPRESSION,
+                tiff_level=None,
+                predictor=True):
+    '''
+    Encode `data` (2D, or RGB/RGBA in the last axis) to `outfile` with the
+    codec given by its extension and return the file size in bytes.
+
+    PNG and JPEG are encoded with cv2 and TIFF with tifffile, falling back to
+    deflate when the requested TIFF codec needs imagecodecs and it is not
+    installed.  Anything else goes through skimage.io.imsave.
+    '''
+    data = np.asarray(data)
+    ext = os.path.splitext(outfile)[1].lower()
+    rgb = data.ndim == 3 and data.shape[-1] in (3, 4)
+
+    if ext in ('.tif', '.tiff'):
+        written = _write_tiff(outfile, data, rgb, tiff_compression, tiff_level, predictor)
+    else:
+        written = _write_cv2(outfile, data, rgb, ext, png_level, jpeg_quality)
+
+    if not written:
+        imsave(outfile, data, check_contrast=False)
+    return os.path.getsize(outfile)
+
+
+def _write_cv2(outfile, data, rgb, ext, png_level, jpeg_quality):
+    if ext == '.png':
+        params = [cv2.IMWRITE_PNG_COMPRESSION, int(png_level)]
+        dtypes = (np.uint8, np.uint16)
+    elif ext in ('.jpg', '.jpeg'):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        dtypes = (np.uint8,)
+        if rgb and data.shape[-1] == 4:
+            return False
+    else:
+        return False
+
+    if data.dtype not in dtypes or not (data.ndim == 2 or rgb):
+        return False
+
+    if rgb:
+        code = cv2.COLOR_RGB2BGR if data.shape[-1] == 3 else cv2.COLOR_RGBA2BGRA
+        data = cv2.cvtColor(data, code)
+
+    # imencode + tofile rather than imwrite, which cannot open non-ASCII paths on Windows
+    try:
+        ok, buf = cv2.imencode(ext, data, params)
+    except cv2.error:
+        return False
+    if not ok:
+        return False
+    buf.tofile(outfile)
+    return True
+
+
+def _write_tiff(outfile, data, rgb, compression, level, predictor):
+    kwargs = {'photometric': 'rgb'} if rgb else {}
+    codec = str(compression or 'none').lower()
+
+    for codec in dict.fromkeys((codec, TIFF_COMPRESSION)):
+        if codec == 'none':
+            opts = {}
+        else:
+            opts = {'compression': codec, 'predictor': bool(predictor) or None}
+            if level is not None and codec == str(compression).lower():
+                opts['compressionargs'] = {'level': int(level)}
+        try:
+            tifffile.imwrite(outfile, data, **opts, **kwargs)
+            return True
+        except Exception:
+            continue
+    return False
+
+
+# =========================================================
+def geotiff_options(compression=GEOTIFF_COMPRESSION,
+                    level=GEOTIFF_LEVEL,
+                    predictor=True,
+                    dtype='uint8',
+                    max_z_error=0.0):
+    '''
+    rasterio creation options for a tiled GeoTIFF.
+
+    `level` is the deflate (1-12) or zstd (1-22) level and `max_z_error` the
+    LERC error bound (0 is lossless).  The predictor is horizontal
+    differencing for integers and floating point prediction for floats; LERC
+    codecs do their own prediction.
+    '''
+    codec = str(compression or 'none').lower()
+    if codec not in GEOTIFF_CODECS:
+        raise ValueError('Unsupported GeoTIFF compression: {}'.format(compression))
+
+    opts = {'tiled': True, 'blockxsize': GEOTIFF_BLOCK, 'blockysize': GEOTIFF_BLOCK}
+    if codec == 'none':
+        return opts
+
+    opts['compress'] = codec
+    if codec.startswith('lerc'):
+        opts['max_z_error'] = float(max_z_error)
+    elif predictor:
+        opts['predictor'] = 3 if np.issubdtype(np.dtype(dtype), np.floating) else 2
+
+    if level is not None:
+        if codec.endswith('deflate'):
+            opts['zlevel'] = int(level)
+        elif codec.endswith('zstd'):
+            opts['zstd_level'] = int(level)
+    return opts
+
+
+# =========================================================
+class TileWriter(object):
+    '''
+    Thread pool running write jobs in the background.
+
+    `submit(fn, *args)` queues `fn(*args)`, which returns the number of bytes
+    it wrote, and blocks while `max_pending` jobs are queued or running.  With
+    `threads=0` jobs run inline on the caller's thread.
+    '''
+
+    def __init__(self, threads=2, max_pending=None):
+        self.threads = max(int(threads), 0)
+        if max_pending is None:
+            max_pending = 2 * self.threads
+        self.max_pending = max(int(max_pending), 1)
+
+        self._pool = None
+        if self.threads:
+            self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix='tile_writer')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._stats = _empty_stats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, fn, *args, **kwargs):
+        '''Queue `fn(*args, **kwargs)`; returns its future (None when inline).'''
+        t = time.perf_counter()
+        self._slots.acquire()
+        wait = time.perf_counter() - t
+        with self._lock:
+            self._stats['wait_s'] += wait
+
+        if self._pool is None:
+            self._run(fn, args, kwargs)
+            return None
+
+        try:
+            future = self._pool.submit(self._run, fn, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.append(future)
+        return future
+
+    def write(self, outfile, data, **codec):
+        '''Queue write_image(outfile, data, **codec).'''
+        return self.submit(write_image, outfile, data, **codec)
+
+    def _run(self, fn, args, kwargs):
+        try:
+            t = time.perf_counter()
+            nbytes = fn(*args, **kwargs)
+            dt = time.perf_counter() - t
+            with self._lock:
+                self._stats['files'] += 1
+                self._stats['bytes'] += int(nbytes or 0)
+                self._stats['encode_s'] += dt
+        finally:
+            self._slots.release()
+
+    def flush(self):
+        '''
+        Wait for all queued jobs and return their stats since the last flush.
+        The first job error, if any, is re-raised after every job finished.
+        '''
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        error = None
+        for future in pending:
+            exc = future.exception()
+            if exc is not None and error is None:
+                error = exc
+
+        with self._lock:
+            stats, self._stats = self._stats, _empty_stats()
+
+        if error is not None:
+            raise error
+        return stats
+
+    def close(self):
+        '''Flush, then stop the threads.'''
+        try:
+            return self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+def _empty_stats():
+    return {'files': 0, 'bytes': 0, 'encode_s': 0.0, 'wait_s': 0.0}
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_writer(threads=2, max_pending=None):
+    '''
+    This process's writer with the given settings, created on first use.
+    Keyed by process id so a forked worker never uses its parent's threads.
+    '''
+    key = (os.getpid(), int(threads), max_pending)
+    with _shared_lock:
+        writer = _shared.get(key)
+        if writer is None:
+            writer = _shared[key] = TileWriter(threads, max_pending)
+    return writer
+
+
+def format_stats(stats):
+    '''
+    One-line summary of one or more flush() results (None entries, from
+    tasks that wrote nothing, are skipped).  Empty string if nothing was
+    written.
+    '''
+    if isinstance(stats, dict):
+        stats = [stats]
+    total = _empty_stats()
+    for s in stats:
+        if s:
+            for k in total:
+                total[k] += s[k]
+
+    if total['files'] == 0:
+        return ''
+
+    mb = total['bytes'] / 2 ** 20
+    rate = mb / total['encode_s'] if total['encode_s'] > 0 else float('inf')
+    return 'Wrote {} files ({:.1f} MB): encode {:.1f} s ({:.1f} MB/s), compute waited {:.1f} s on the writer'.format(
+        total['files'], mb, total['encode_s'], rate, total['wait_s'])
@@ -0,0 +1,68 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Piecewise affine transform used for rubber-sheet rectification.
+
+Huge speedup over skimage's PiecewiseAffineTransform.__call__, from:
+https://github.com/scikit-image/scikit-image/issues/6864
+'''
+
+import numpy as np
+from skimage.transform import PiecewiseAffineTransform
+
+
+# =========================================================
+class FastPiecewiseAffineTransform(PiecewiseAffineTransform):
+    def __call__(self, coords):
+        coords = np.asarray(coords)
+        n = coords.shape[0]
+
+        # Build per-simplex affine lookup once — shape (n_simplices, 3, 3), small.
+        all_affines = np.array(
+            [self.affines[i].params for i in range(len(self._tesselation.simplices))]
+        )
+
+        result = np.empty((n, 3), dtype=np.float32)
+
+        # Process in batches to avoid large allocations in find_simplex and the
+        # affine einsum, both of which scale with n_coords and can exceed several GiB.
+        _BATCH = 500_000
+        for start in range(0, n, _BATCH):
+            end = min(start + _BATCH, n)
+            batch_coords = coords[start:end]
+            s = self._tesselation.find_simplex(batch_coords)
+            pts = np.c_[batch_coords, np.ones(end - start)]
+            batch_result = np.einsum("ij,ikj->ik", pts, all_affines[s])
+            batch_result[s == -1] = -1
+            result[start:end] = batch_result
+
+        return result
@@ -0,0 +1,948 @@
+# Part of PING-Mapper software
+#
+# GitHub: https://github.com/CameronBodine/PINGMapper
+# Website: https://cameronbodine.github.io/PINGMapper/
+#
+# Co-Developed by Cameron S. Bodine and Dr. Daniel Buscombe
+#
+# Inspired by PyHum: https://github.com/dbuscombe-usgs/PyHum
+#
+# MIT License
+#
+# Copyright (c) 2025 Cameron S. Bodine
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+'''
+Waterfall image/video export from exported sonogram tiles.
+
+Tiles are never concatenated into one in-memory strip.  A layout pass reads
+only tile headers to place each tile (down-imaging) or port/star tile pair
+(side-scan) as a band along the scroll axis.  Bands are decoded on demand
+through a small sliding-window cache while image blocks and video frames are
+produced in scroll order.  Images are written as tiled, pyramided TIFFs and
+video frames are encoded on a background thread.
+'''
+
+import os
+import re
+import queue
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+
+import numpy as np
+import pandas as pd
+import cv2
+from PIL import Image
+import rasterio
+from rasterio.windows import Window
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from joblib import Parallel, delayed
+
+
+def _is_sidescan_beam(beam_name):
+    beam_name = str(beam_name)
+    return beam_name.startswith('ss_port') or beam_name.startswith('ss_star')
+
+
+def _sidescan_group_key(beam_name):
+    beam_name = str(beam_name)
+    if beam_name.startswith('ss_port_'):
+        return beam_name[len('ss_port_'):]
+    if beam_name.startswith('ss_star_'):
+        return beam_name[len('ss_star_'):]
+    if beam_name in {'ss_port', 'ss_star'}:
+        return 'default'
+    return beam_name
+
+
+def _extract_chunk_id_from_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = re.search(r'_(\d+)$', name)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def _sort_tile_paths(paths):
+    def _key(path):
+        chunk_id = _extract_chunk_id_from_path(path)
+        if chunk_id is None:
+            return (1, os.path.basename(path))
+        return (0, chunk_id)
+
+    return sorted(paths, key=_key)
+
+
+def _to_bgr8(img):
+    if img is None:
+        return None
+
+    if img.dtype == np.uint16:
+        img = (img / 257.0).astype(np.uint8)
+    elif img.dtype != np.uint8:
+        arr = np.asarray(img, dtype=np.float32)
+        finite = np.isfinite(arr)
+        if finite.any():
+            lo = arr[finite].min()
+            hi = arr[finite].max()
+            if hi > lo:
+                arr = (arr - lo) / (hi - lo)
+            else:
+                arr = np.zeros_like(arr)
+        else:
+            arr = np.zeros_like(arr)
+        img = (arr * 255.0).clip(0, 255).astype(np.uint8)
+
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+    if img.ndim == 3 and img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+    return img
+
+
+def _resize_height(img, target_h):
+    if img.shape[0] == target_h:
+        return img
+
+    h, w = img.shape[:2]
+    if h <= 0 or w <= 0 or target_h <= 0:
+        return img
+
+    new_w = max(1, int(round(w * (target_h / float(h)))))
+    return cv2.resize(img, (new_w, target_h), interpolation=cv2.INTER_AREA)
+
+
+def _resize_width(img, target_w):
+    if img.shape[1] == target_w:
+        return img
+
+    h, w = img.shape[:2]
+    if h <= 0 or w <= 0 or target_w <= 0:
+        return img
+
+    new_h = max(1, int(round(h * (target_w / float(w)))))
+    return cv2.resize(img, (target_w, new_h), interpolation=cv2.INTER_AREA)
+
+
+def _collect_mode_tile_paths(son, mode):
+    mode_dir = os.path.join(son.projDir, son.beamName, mode)
+    if not os.path.exists(mode_dir):
+        return []
+
+    exts = ['*.png', '*.jpg', '*.jpeg', '*.tif', '*.tiff']
+    paths = []
+    for ext in exts:
+        paths.extend(glob(os.path.join(mode_dir, ext)))
+
+    return _sort_tile_paths(paths)
+
+
+def _get_chunk_range_map(son):
+    chunk_range = {}
+    try:
+        meta_path = getattr(son, 'sonMetaFile', None)
+        if not meta_path or not os.path.exists(meta_path):
+            return chunk_range
+
+        df = pd.read_csv(meta_path, usecols=['chunk_id', 'ping_cnt', 'pixM'])
+        if len(df) == 0:
+            return chunk_range
+
+        df['chunk_id'] = pd.to_numeric(df['chunk_id'], errors='coerce')
+        df['ping_cnt'] = pd.to_numeric(df['ping_cnt'], errors='coerce')
+        df['pixM'] = pd.to_numeric(df['pixM'], errors='coerce')
+        df = df.dropna(subset=['chunk_id', 'ping_cnt', 'pixM'])
+        if len(df) == 0:
+            return chunk_range
+
+        # Approximate chunk range in meters from ping count and pixel size.
+        df['range_m'] = df['ping_cnt'] * df['pixM']
+        grouped = df.groupby('chunk_id', as_index=False)['range_m'].median()
+        for _, row in grouped.iterrows():
+            cid = int(row['chunk_id'])
+            rng = float(row['range_m'])
+            if np.isfinite(rng) and rng > 0:
+                chunk_range[cid] = rng
+    except Exception:
+        return {}
+
+    return chunk_range
+
+
+def _range_reference_m(chunk_range_map):
+    if not chunk_range_map:
+        return None
+    vals = [float(v) for v in chunk_range_map.values() if np.isfinite(v) and float(v) > 0]
+    if len(vals) == 0:
+        return None
+    return float(np.median(vals))
+
+
+def _pad_to_height(img, target_h):
+    h, w = img.shape[:2]
+    if h >= target_h:
+        return img
+    pad_h = target_h - h
+    return cv2.copyMakeBorder(img, 0, pad_h, 0, 0, cv2.BORDER_CONSTANT, value=0)
+
+
+def _pad_to_height_center(img, target_h):
+    h, w = img.shape[:2]
+    if h >= target_h:
+        return img
+    pad_h = target_h - h
+    top = pad_h // 2
+    bottom = pad_h - top
+    return cv2.copyMakeBorder(img, top, bottom, 0, 0, cv2.BORDER_CONSTANT, value=0)
+
+
+def _pad_to_width(img, target_w):
+    h, w = img.shape[:2]
+    if w >= target_w:
+        return img
+    pad_w = target_w - w
+    return cv2.copyMakeBorder(img, 0, 0, 0, pad_w, cv2.BORDER_CONSTANT, value=0)
+
+
+def _scale_tile_by_range(img, tile_path, chunk_range_map=None, ref_range_m=None, base_h=None):
+    if img is None:
+        return None
+    if not (chunk_range_map and ref_range_m and base_h):
+        return img
+
+    chunk_id = _extract_chunk_id_from_path(tile_path)
+    if chunk_id is None:
+        return img
+
+    rng = chunk_range_map.get(chunk_id, None)
+    if rng is None or (not np.isfinite(rng)) or rng <= 0:
+        return img
+
+    scale = float(rng) / float(ref_range_m)
+    scale = max(0.25, min(4.0, scale))
+    target_h = max(1, int(round(base_h * scale)))
+    return _resize_height(img, target_h)
+
+
+def _window_positions(length, window_size, stride, reverse=False):
+    if length <= window_size:
+        positions = [0]
+    else:
+        positions = list(range(0, length - window_size + 1, stride))
+        if positions[-1] != (length - window_size):
+            positions.append(length - window_size)
+
+    if reverse:
+        positions = list(reversed(positions))
+
+    return positions
+
+
+
+def _tile_size(path):
+    """(height, width) of a tile from its header, without decoding pixels."""
+    try:
+        with Image.open(path) as im:
+            w, h = im.size
+        return int(h), int(w)
+    except Exception:
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            return None
+        return img.shape[0], img.shape[1]
+
+
+def _scaled_size(size, target_h):
+    """Size after _resize_height(img, target_h)."""
+    h, w = size
+    if h == target_h or h <= 0 or w <= 0 or target_h <= 0:
+        return size
+    return target_h, max(1, int(round(w * (target_h / float(h)))))
+
+
+def _range_target_h(tile_path, chunk_range_map=None, ref_range_m=None, base_h=None):
+    """Range-scaled tile height used by _scale_tile_by_range, or None."""
+    if not (chunk_range_map and ref_range_m and base_h):
+        return None
+
+    chunk_id = _extract_chunk_id_from_path(tile_path)
+    if chunk_id is None:
+        return None
+
+    rng = chunk_range_map.get(chunk_id, None)
+    if rng is None or (not np.isfinite(rng)) or rng <= 0:
+        return None
+
+    scale = float(rng) / float(ref_range_m)
+    scale = max(0.25, min(4.0, scale))
+    return max(1, int(round(base_h * scale)))
+
+
+def _downscale_factor(size, max_dim=20000):
+    """Scale keeping the longest side within max_dim (1.0 if it already fits)."""
+    max_hw = max(size)
+    if max_dim <= 0 or max_hw <= max_dim:
+        return 1.0
+    return float(max_dim) / float(max_hw)
+
+
+class _BandStrip(object):
+    """
+    Virtual image made of bands stacked along its first axis.
+
+    Each band is (length, cross) pixels natively; bands narrower than the
+    widest are zero-padded at the end of the cross axis.  With `scale`, every
+    band is resized on load, so the strip never exists at full size in memory.
+    Only bands overlapping the most recent read are kept decoded.
+    """
+
+    def __init__(self, bands, loader, scale=1.0):
+        self.bands = list(bands)  # [(key, length, cross)]
+        self.loader = loader
+        self.scale = float(scale)
+
+        cross = max(b[2] for b in self.bands)
+        self.cross = max(1, int(round(cross * self.scale)))
+        self._crossNative = cross
+
+        self.lengths = np.array([max(1, int(round(b[1] * self.scale))) for b in self.bands], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        self.length = int(self.offsets[-1])
+        self._cache = {}
+        self._dtype = None
+        self._channels = None
+
+    @property
+    def shape(self):
+        return (self.length, self.cross)
+
+    def _band(self, i):
+        if i in self._cache:
+            return self._cache[i]
+
+        key, length, cross = self.bands[i]
+        img = self.loader(key)
+        if img is None:
+            img = np.zeros((length, cross) + ((self._channels,) if self._channels else ()), dtype=self._dtype or np.uint8)
+        if self._dtype is None:
+            self._dtype = img.dtype
+            self._channels = img.shape[2] if img.ndim == 3 else None
+
+        # Pad cross axis to the widest band, then scale
+        if img.shape[1] < self._crossNative:
+            pad = [(0, 0), (0, self._crossNative - img.shape[1])] + [(0, 0)] * (img.ndim - 2)
+            img = np.pad(img, pad)
+        img = img[:length, :self._crossNative]
+        if img.shape[0] < length:
+            pad = [(0, length - img.shape[0]), (0, 0)] + [(0, 0)] * (img.ndim - 2)
+            img = np.pad(img, pad)
+
+        target = (self.cross, int(self.lengths[i]))
+        if (img.shape[1], img.shape[0]) != target:
+            img = cv2.resize(img, target, interpolation=cv2.INTER_AREA)
+
+        self._cache[i] = img
+        return img
+
+    def read(self, start, stop):
+        """Pixels [start, stop) along the band axis."""
+        start = max(0, int(start))
+        stop = min(self.length, int(stop))
+        first = int(np.searchsorted(self.offsets, start, side='right')) - 1
+        last = int(np.searchsorted(self.offsets, stop, side='left')) - 1
+
+        # Sliding window: drop bands no longer needed
+        for i in list(self._cache.keys()):
+            if i < first or i > last:
+                del self._cache[i]
+
+        parts = []
+        for i in range(first, last + 1):
+            band = self._band(i)
+            a = max(start, self.offsets[i]) - self.offsets[i]
+            b = min(stop, self.offsets[i + 1]) - self.offsets[i]
+            parts.append(band[a:b])
+
+        return np.concatenate(parts, axis=0) if len(parts) > 1 else parts[0]
+
+
+class _TransposedStrip(object):
+    """View of a _BandStrip whose bands are stacked along x (columns)."""
+
+    def __init__(self, strip):
+        self.strip = strip
+
+    @property
+    def shape(self):
+        return (self.strip.cross, self.strip.length)
+
+    def read(self, start, stop):
+        return np.swapaxes(self.strip.read(start, stop), 0, 1)
+
+
+class _VideoWriterThread(object):
+    """Encode frames with cv2.VideoWriter on a background thread."""
+
+    def __init__(self, writer, maxsize=32):
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self.writer.write(frame)
+            except Exception as e:
+                self.error = e
+
+    def write(self, frame):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(frame)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.release()
+        if self.error is not None:
+            raise self.error
+
+
+def _sidescan_layout(port_tiles, star_tiles, port_range_map=None, star_range_map=None, ref_range_m=None):
+    """
+    Bands for the combined side-scan waterfall, newest chunk pair first (top).
+
+    Each band is ((port_path, star_path, port_h, star_h, row_h), row_h, row_w)
+    where port_h/star_h are the range-scaled tile heights (None = unscaled).
+    """
+    if len(port_tiles) == 0 or len(star_tiles) == 0:
+        return []
+
+    def _map_by_chunk(paths):
+        mapped = {}
+        for p in paths:
+            cid = _extract_chunk_id_from_path(p)
+            if cid is not None:
+                mapped[int(cid)] = p
+        return mapped
+
+    port_by_chunk = _map_by_chunk(port_tiles)
+    star_by_chunk = _map_by_chunk(star_tiles)
+
+    # Newest chunk first so newer data sits at the top of the stitched waterfall,
+    # while the oldest chunk remains at the bottom for the initial video frame.
+    common = sorted(set(port_by_chunk.keys()) & set(star_by_chunk.keys()), reverse=True)
+    if len(common) == 0:
+        pair_paths = list(zip(port_tiles, star_tiles))
+        pair_paths = list(reversed(pair_paths))
+    else:
+        pair_paths = [(port_by_chunk[c], star_by_chunk[c]) for c in common]
+
+    sizes = [(_tile_size(p), _tile_size(s)) for p, s in pair_paths]
+
+    # Baseline heights for range-based scaling.
+    base_h_port = next((p[0] for p, _ in sizes if p is not None), None)
+    base_h_star = next((s[0] for _, s in sizes if s is not None), None)
+
+    bands = []
+    for (p_path, s_path), (p_size, s_size) in zip(pair_paths, sizes):
+        if p_size is None or s_size is None:
+            continue
+
+        p_h = _range_target_h(p_path, port_range_map, ref_range_m, base_h_port)
+        s_h = _range_target_h(s_path, star_range_map, ref_range_m, base_h_star)
+        if p_h is not None:
+            p_size = _scaled_size(p_size, p_h)
+        if s_h is not None:
+            s_size = _scaled_size(s_size, s_h)
+
+        # Rotated 90 degrees: tile width becomes row height
+        row_h = max(p_size[1], s_size[1])
+        row_w = p_size[0] + s_size[0]
+        bands.append(((p_path, s_path, p_h, s_h, row_h), row_h, row_w))
+
+    return bands
+
+
+def _load_sidescan_band(key):
+    """Decode one port/star chunk pair into a waterfall row (BGR8)."""
+    p_path, s_path, p_h, s_h, row_h = key
+    p_img = cv2.imread(p_path, cv2.IMREAD_UNCHANGED)
+    s_img = cv2.imread(s_path, cv2.IMREAD_UNCHANGED)
+    if p_img is None or s_img is None:
+        return None
+
+    if p_h is not None:
+        p_img = _resize_height(p_img, p_h)
+    if s_h is not None:
+        s_img = _resize_height(s_img, s_h)
+
+    # Apply side-scan waterfall geometry: rotate both CCW, then flip port to place nadir at center.
+    p_img = cv2.rotate(p_img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    s_img = cv2.rotate(s_img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    p_img = cv2.flip(p_img, 1)
+
+    p_img = _to_bgr8(p_img)
+    s_img = _to_bgr8(s_img)
+
+    # Align each chunk pair on the vertical centerline.
+    p_img = _pad_to_height_center(p_img, row_h)
+    s_img = _pad_to_height_center(s_img, row_h)
+
+    return cv2.hconcat([p_img, s_img])
+
+
+def _strip_layout(tile_paths, chunk_range_map=None, ref_range_m=None):
+    """
+    Bands for a down-imaging waterfall (tiles side by side, oldest first).
+
+    Bands are stored transposed (tile columns along the band axis), each
+    ((path, target_h), width, height).
+    """
+    if ref_range_m is None:
+        ref_range_m = _range_reference_m(chunk_range_map)
+
+    bands = []
+    base_h = None
+    for path in tile_paths:
+        size = _tile_size(path)
+        if size is None:
+            continue
+
+        if base_h is None:
+            base_h = size[0]
+
+        target_h = _range_target_h(path, chunk_range_map, ref_range_m, base_h)
+        if target_h is not None:
+            size = _scaled_size(size, target_h)
+
+        bands.append(((path, target_h), size[1], size[0]))
+
+    return bands
+
+
+def _load_strip_band(key):
+    """Decode one down-imaging tile, transposed so columns run along the band axis."""
+    path, target_h = key
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return None
+    if target_h is not None:
+        img = _resize_height(img, target_h)
+    return np.swapaxes(img, 0, 1)
+
+
+def _write_strip_tiff(strip, out_file, axis='y', block=512):
+    """
+    Stream a strip to a tiled, DEFLATE-compressed TIFF with overviews.
+
+    Bands are read one block at a time along the band axis, so each TIFF tile
+    is written exactly once.
+    """
+    length, cross = strip.length, strip.cross
+    sample = strip.read(0, min(length, 1))
+    count = sample.shape[2] if sample.ndim == 3 else 1
+    dtype = sample.dtype
+
+    if axis == 'y':
+        height, width = length, cross
+    else:
+        height, width = cross, length
+
+    profile = dict(driver='GTiff', width=width, height=height, count=count, dtype=dtype,
+                   tiled=True, blockxsize=block, blockysize=block,
+                   compress='deflate', predictor=2, bigtiff='IF_SAFER')
+    if count == 3:
+        profile['photometric'] = 'RGB'
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', NotGeoreferencedWarning)
+        with rasterio.open(out_file, 'w', **profile) as dst:
+            for start in range(0, length, block):
+                stop = min(length, start + block)
+                arr = strip.read(start, stop)
+                if axis != 'y':
+                    arr = np.swapaxes(arr, 0, 1)
+                    window = Window(start, 0, stop - start, height)
+                else:
+                    window = Window(0, start, width, stop - start)
+
+                if count == 3:
+                    arr = arr[:, :, ::-1]  # BGR -> RGB
+                if arr.ndim == 3:
+                    arr = np.moveaxis(arr, 2, 0)
+                else:
+                    arr = arr[np.newaxis]
+                dst.write(arr, window=window)
+
+        factors = []
+        f = 2
+        while max(width, height) // f >= 256:
+            factors.append(f)
+            f *= 2
+        if factors:
+            with rasterio.Env(COMPRESS_OVERVIEW='DEFLATE'):
+                with rasterio.open(out_file, 'r+') as dst:
+                    dst.build_overviews(factors, Resampling.average)
+
+    return out_file
+
+
+def _render_frame(frame, frame_size):
+    """Convert a window crop to a contiguous BGR8 frame of `frame_size` (w, h)."""
+    frame_bgr = _to_bgr8(frame)
+    if frame_bgr.shape[1] != frame_size[0] or frame_bgr.shape[0] != frame_size[1]:
+        frame_bgr = cv2.resize(frame_bgr, frame_size, interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(frame_bgr)
+
+
+def _export_scrolling_video(
+    img,
+    out_video,
+    axis='x',
+    reverse=False,
+    fps=10,
+    target_size=(1920, 1080),
+    stride=64,
+    n_workers=1,
+):
+    """
+    Slide a target-aspect window over `img` and encode each window as a
+    video frame.  `img` is a numpy image or a strip exposing `shape` and
+    `read(start, stop)` along the scroll axis; frames are then composed from
+    the strip's sliding tile window, rendered by `n_workers` threads and
+    handed to a background encoder in frame order.
+    """
+    os.makedirs(os.path.dirname(out_video), exist_ok=True)
+
+    if isinstance(img, np.ndarray):
+        h, w = img.shape[:2]
+        if axis == 'y':
+            read = lambda a, b: img[a:b]
+        else:
+            read = lambda a, b: img[:, a:b]
+    else:
+        h, w = img.shape[:2]
+        read = img.read
+
+    target_w, target_h = int(target_size[0]), int(target_size[1])
+    target_w = max(64, target_w)
+    target_h = max(64, target_h)
+
+    # Derive crop window from target resolution while preserving aspect ratio.
+    target_aspect = target_w / float(target_h)
+    win_w = min(w, target_w)
+    win_h = min(h, target_h)
+    if win_w <= 0 or win_h <= 0:
+        return
+
+    cur_aspect = win_w / float(win_h)
+    if cur_aspect > target_aspect:
+        win_w = max(1, int(round(win_h * target_aspect)))
+    else:
+        win_h = max(1, int(round(win_w / target_aspect)))
+
+    # If image is larger than target, prefer at least target-sized crop on scroll axis.
+    if axis == 'y' and h >= target_h:
+        win_h = target_h
+        win_w = min(w, max(1, int(round(win_h * target_aspect))))
+    elif axis != 'y' and w >= target_w:
+        win_w = target_w
+        win_h = min(h, max(1, int(round(win_w / target_aspect))))
+
+    # Ensure stride is valid and not too tiny for large windows.
+    stride = int(stride)
+    if stride <= 0:
+        stride = max(1, (win_h if axis == 'y' else win_w) // 10)
+    if axis == 'y':
+        win = min(win_h, h)
+        positions = _window_positions(h, win, stride, reverse=reverse)
+    else:
+        win = min(win_w, w)
+        positions = _window_positions(w, win, stride, reverse=reverse)
+
+    frame_h, frame_w = target_h, target_w
+    writer = cv2.VideoWriter(
+        out_video,
+        cv2.VideoWriter_fourcc(*'mp4v'),
+        max(1, int(fps)),
+        (frame_w, frame_h),
+    )
+
+    if not writer.isOpened():
+        print(f"\n\tWARNING: Could not open video writer for {out_video}")
+        return
+
+    writer = _VideoWriterThread(writer)
+    n_workers = max(1, int(n_workers))
+    pool = ThreadPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    pending = deque()
+    try:
+        for pos in positions:
+            if axis == 'y':
+                frame = read(pos, pos + win)[:, :win_w]
+            else:
+                frame = read(pos, pos + win)[:win_h]
+
+            if pool is None:
+                writer.write(_render_frame(frame, (frame_w, frame_h)))
+                continue
+
+            # Keep a bounded window of frames in flight; futures are drained
+            # in submission order so the encoder sees frames in sequence.
+            pending.append(pool.submit(_render_frame, frame, (frame_w, frame_h)))
+            while len(pending) >= 2 * n_workers:
+                writer.write(pending.popleft().result())
+
+        while pending:
+            writer.write(pending.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+
+
+def _sidescan_products(bands, out_dir, image, video, fps=10, target_size=(1920, 1080),
+                       stride=64, max_video_dim=20000, n_workers=1):
+    """Write the side-scan waterfall image and/or top -> bottom video for one mode."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Ensure both port and star fully fit inside output frame width.
+    full_w = max(b[2] for b in bands)
+    fit = min(1.0, float(target_size[0]) / float(full_w))
+
+    if image:
+        strip = _BandStrip(bands, _load_sidescan_band, scale=fit)
+        _write_strip_tiff(strip, os.path.join(out_dir, 'waterfall.tif'), axis='y')
+
+    if video:
+        strip = _BandStrip(bands, _load_sidescan_band, scale=fit)
+        scale = fit * _downscale_factor(strip.shape, max_video_dim)
+        if scale != fit:
+            strip = _BandStrip(bands, _load_sidescan_band, scale=scale)
+        _export_scrolling_video(
+            strip,
+            os.path.join(out_dir, 'waterfall_scroll_t2b.mp4'),
+            axis='y',
+            reverse=True,
+            fps=fps,
+            target_size=target_size,
+            stride=stride,
+            n_workers=n_workers,
+        )
+
+
+def _down_imaging_products(bands, out_dir, beam, image, video, fps=10, target_size=(1920, 1080),
+                           stride=64, max_video_dim=20000, n_workers=1):
+    """Write one down-imaging beam's waterfall image and/or right -> left video for one mode."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    if image:
+        strip = _BandStrip(bands, _load_strip_band)
+        _write_strip_tiff(strip, os.path.join(out_dir, f'{beam}_waterfall.tif'), axis='x')
+
+    if video:
+        strip = _BandStrip(bands, _load_strip_band)
+        scale = _downscale_factor(strip.shape, max_video_dim)
+        if scale != 1.0:
+            strip = _BandStrip(bands, _load_strip_band, scale=scale)
+        _export_scrolling_video(
+            _TransposedStrip(strip),
+            os.path.join(out_dir, f'{beam}_waterfall_scroll.mp4'),
+            axis='x',
+            reverse=False,
+            fps=fps,
+            target_size=target_size,
+            stride=stride,
+            n_workers=n_workers,
+        )
+
+
+def _export_waterfall_products(
+    sonObjs,
+    wcp,
+    wcm,
+    wcr,
+    wco,
+    mode_selection='auto',
+    ss_image=False,
+    ss_video=False,
+    di_image=False,
+    di_video=False,
+    fps=10,
+    video_resolution='1080p',
+    stride=64,
+    max_video_dim=20000,
+    threadCnt=1,
+):
+    if not (ss_image or ss_video or di_image or di_video):
+        return
+
+    mode_flags = {
+        'wcp': bool(wcp),
+        'wcm': bool(wcm),
+        'src': bool(wcr),
+        'wco': bool(wco),
+    }
+
+    mode_selection = str(mode_selection).strip().lower()
+    if mode_selection in {'wcp', 'src', 'wcp+src'}:
+        if mode_selection == 'wcp':
+            modes = ['wcp']
+        elif mode_selection == 'src':
+            modes = ['src']
+        else:
+            modes = ['wcp', 'src']
+    else:
+        modes = [m for m, enabled in mode_flags.items() if enabled]
+
+    if len(modes) == 0:
+        print('\n\tWaterfall export requested, but no sonogram tile modes are enabled (wcp/wcm/wcr/wco). Skipping.')
+        return
+
+    res_key = str(video_resolution).strip().lower()
+    if res_key in {'4k', '2160p'}:
+        target_size = (3840, 2160)
+    elif res_key in {'1080p', 'fhd'}:
+        target_size = (1920, 1080)
+    elif res_key in {'720p', 'hd'}:
+        target_size = (1280, 720)
+    elif res_key in {'4xxp', '480p'}:
+        target_size = (854, 480)
+    else:
+        target_size = (1920, 1080)
+
+    print('\nGenerating waterfall products...')
+
+    # Group side-scan beams into port/star pairs by suffix key.
+    ss_groups = {}
+    down_beams = []
+    for son in sonObjs:
+        beam = str(getattr(son, 'beamName', ''))
+        if _is_sidescan_beam(beam):
+            key = _sidescan_group_key(beam)
+            group = ss_groups.setdefault(key, {})
+            if beam.startswith('ss_port'):
+                group['port'] = son
+            elif beam.startswith('ss_star'):
+                group['star'] = son
+        else:
+            down_beams.append(son)
+
+    # Collect one job per (group, mode) / (beam, mode); jobs run concurrently
+    # and split the remaining threads between their video frame renderers.
+    jobs = []
+
+    # Side-scan: combine port/star into one waterfall and scroll top -> bottom.
+    if ss_image or ss_video:
+        ss_any = False
+        for group_key, group in sorted(ss_groups.items()):
+            if 'port' not in group or 'star' not in group:
+                continue
+
+            proj_dir = group['port'].projDir
+            port_range_map = _get_chunk_range_map(group['port'])
+            star_range_map = _get_chunk_range_map(group['star'])
+            shared_ref = _range_reference_m(port_range_map)
+            if shared_ref is None:
+                shared_ref = _range_reference_m(star_range_map)
+
+            for mode in modes:
+                port_tiles = _collect_mode_tile_paths(group['port'], mode)
+                star_tiles = _collect_mode_tile_paths(group['star'], mode)
+                if len(port_tiles) == 0 or len(star_tiles) == 0:
+                    continue
+
+                ss_any = True
+
+                bands = _sidescan_layout(
+                    port_tiles,
+                    star_tiles,
+                    port_range_map=port_range_map,
+                    star_range_map=star_range_map,
+                    ref_range_m=shared_ref,
+                )
+                if len(bands) == 0:
+                    continue
+
+                out_dir = os.path.join(proj_dir, 'waterfall_exports', 'sidescan', mode)
+                jobs.append((_sidescan_products, (bands, out_dir, ss_image, ss_video)))
+
+        if not ss_any:
+            print('\n\tNo side-scan tiles found for requested waterfall mode(s).')
+            print('\tEnable or select matching mode(s), e.g., WCP and/or SRC.')
+
+    # Down-imaging: generate per-beam waterfall and scroll right -> left.
+    if di_image or di_video:
+        di_any = False
+        for son in down_beams:
+            beam = str(getattr(son, 'beamName', 'unknown_beam'))
+            proj_dir = son.projDir
+            down_range_map = _get_chunk_range_map(son)
+            down_ref = _range_reference_m(down_range_map)
+
+            for mode in modes:
+                tiles = _collect_mode_tile_paths(son, mode)
+                if len(tiles) == 0:
+                    continue
+
+                di_any = True
+
+                bands = _strip_layout(
+                    tiles,
+                    chunk_range_map=down_range_map,
+                    ref_range_m=down_ref,
+                )
+                if len(bands) == 0:
+                    continue
+
+                out_dir = os.path.join(proj_dir, 'waterfall_exports', 'down_imaging', mode)
+                jobs.append((_down_imaging_products, (bands, out_dir, beam, di_image, di_video)))
+
+        if not di_any:
+            print('\n\tNo down-imaging tiles found for requested waterfall mode(s).')
+            print('\tEnable or select matching mode(s), e.g., WCP and/or SRC.')
+
+    if len(jobs) == 0:
+        return
+
+    threadCnt = max(1, int(threadCnt))
+    n_jobs = min(threadCnt, len(jobs))
+    frame_workers = max(1, threadCnt // n_jobs)
+
+    video_kw = dict(fps=fps, target_size=target_size, stride=stride,
+                    max_video_dim=max_video_dim, n_workers=frame_workers)
+    Parallel(n_jobs=n_jobs, backend='threading')(
+        delayed(func)(*args, **video_kw) for func, args in jobs
+    )
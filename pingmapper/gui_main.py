@@ -12,9 +12,6 @@ PACKAGE_DIR = os.path.dirname(SCRIPT_DIR)
 sys.path.append(PACKAGE_DIR)
 
 from pingmapper.funcs_common import *
-from pingmapper.main_readFiles import read_master_func
-from pingmapper.main_rectify import rectify_master_func
-from pingmapper.main_mapSubstrate import map_master_func
 
 import json
 import textwrap
@@ -283,6 +280,7 @@ def gui(batch: bool):
     tip_db = ml_tip('Apply 20*log10 transform before final 8-bit mapping. Helps reveal low-amplitude detail.')
     tip_clahe = ml_tip('Apply adaptive histogram equalization (CLAHE) after dB transform for local contrast boost.')
     tip_clahe_clip = ml_tip('CLAHE clip limit. Lower values are gentler; higher values increase local contrast.')
+    tip_clahe_grid = ml_tip('CLAHE tiles along each side of a sonogram chunk. More tiles equalize smaller regions.')
     # EGN
     check_egn = sg.Checkbox('Empiracal Gain Normalization (EGN)', key='egn', default=default_params['egn'], tooltip=tip_egn)
 
@@ -334,6 +332,13 @@ def gui(batch: bool):
         size=(10,1),
         tooltip=tip_clahe_clip,
     )
+    text_clahe_grid = sg.Text('CLAHE Tile Grid', size=(20,1))
+    in_clahe_grid = sg.Input(
+        key='sonar_clahe_tile_grid',
+        default_text=default_params.get('sonar_clahe_tile_grid', 8),
+        size=(10,1),
+        tooltip=tip_clahe_grid,
+    )
 
     col_egn_1 = sg.Column(
         [
@@ -343,6 +348,7 @@ def gui(batch: bool):
             [check_sonar_clahe],
             [check_sonar_clahe_global],
             [text_clahe_clip, in_clahe_clip],
+            [text_clahe_grid, in_clahe_grid],
         ],
         pad=0,
     )
@@ -367,11 +373,17 @@ def gui(batch: bool):
         key='export_colormap_uint8',
         default=default_params.get('export_colormap_uint8', True)
     )
+    check_export_colormap_palette = sg.Checkbox(
+        'Colormapped rectified GeoTIFFs use a palette instead of RGB (smallest files)',
+        key='export_colormap_palette',
+        default=default_params.get('export_colormap_palette', False)
+    )
 
     layout.append([sg.HorizontalSeparator()])
     layout.append([text_global_export])
     layout.append([check_export_16bit])
     layout.append([check_export_colormap_uint8])
+    layout.append([check_export_colormap_palette])
 
     #######################
     # Sonogram Tile Exports
@@ -656,6 +668,7 @@ def gui(batch: bool):
         rect_cmap_selected = _is_cmap_selected(values_dict.get('son_colorMap'))
         enable_toggle = use_16bit and (tile_cmap_selected or rect_cmap_selected)
         window['export_colormap_uint8'].update(disabled=not enable_toggle)
+        window['export_colormap_palette'].update(disabled=not (use_16bit and rect_cmap_selected))
 
     initial_values = {
         'export_16bit': default_params.get('export_16bit', False),
@@ -846,6 +859,7 @@ def gui(batch: bool):
             'sonar_clahe':values['sonar_clahe'],
             'sonar_clahe_global':values['sonar_clahe_global'],
             'sonar_clahe_clip_limit':float(values['sonar_clahe_clip_limit']),
+            'sonar_clahe_tile_grid':int(values['sonar_clahe_tile_grid']),
             'wcp':values['wcp'],
             'wcm':values['wcm'],
             'wcr':values['wcr'],
@@ -854,6 +868,7 @@ def gui(batch: bool):
             'mask_shdw':values['mask_shdw'],
             'export_16bit':values['export_16bit'],
             'export_colormap_uint8':values['export_colormap_uint8'],
+            'export_colormap_palette':values['export_colormap_palette'],
             'tileFile':values['tileFile'],
             'spdCor':values['spdCor'],
             'maxCrop':values['maxCrop'],
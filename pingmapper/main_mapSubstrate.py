@@ -38,6 +38,7 @@ sys.path.append(PACKAGE_DIR)
 from pingmapper.funcs_common import *
 from pingmapper.class_mapSubstrateObj import mapSubObj
 from pingmapper.class_portstarObj import portstarObj
+from pingmapper.funcs_manifest import find_meta_files
 from pingmapper.funcs_model import *
 
 import itertools
@@ -111,6 +112,11 @@ def map_master_func(logfilename='',
                     export_16bit=False,
                     export_16bit_colormap=False,
                     export_colormap_uint8=True,
+                    vector_format='shp',
+                    map_direct_mosaic=False,
+                    map_chunk_rasters=True,
+                    softmax_dtype='float16',
+                    qa_plot_every=1,
                     **kwargs):
 
     '''
@@ -159,16 +165,16 @@ def map_master_func(logfilename='',
     ############################################################################
 
     ####################################################
-    # Check if sonObj pickle exists, append to metaFiles
+    # Check if saved sonObj state exists, append to metaFiles
     metaDir = os.path.join(projDir, "meta")
     if os.path.exists(metaDir):
-        metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+        metaFiles = find_meta_files(metaDir)
     else:
         sys.exit("No SON metadata files exist")
     del metaDir
 
     ############################################
-    # Create a mapObj instance from pickle files
+    # Create a mapObj instance from saved state
     sonObjs = []
     for meta in metaFiles:
         son = mapSubObj(meta) # Initialize mapObj()
@@ -237,6 +243,11 @@ def map_master_func(logfilename='',
         mapPath = os.path.join(mapObjs[0].substrateDir, 'map_substrate_raster')
         maps = glob(os.path.join(mapPath, '*.tif'))
 
+        # Mosaics streamed directly from the classification (map_direct_mosaic)
+        if len(maps) == 0:
+            mapPath = os.path.join(mapObjs[0].substrateDir, 'map_substrate_mosaic')
+            maps = glob(os.path.join(mapPath, '*map_sub*mosaic*.tif'))
+
         if len(maps) == 0:
             # if export_poly:
             #     error_noSubMap_poly()
@@ -278,6 +289,9 @@ def map_master_func(logfilename='',
             # Set outDir
             son.outDir = outDir
 
+            # Softmax storage precision
+            son.softmax_dtype = softmax_dtype
+
             # Get chunk id's
             chunks = son._getChunkID()
 
@@ -302,7 +316,7 @@ def map_master_func(logfilename='',
             Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(son._detectSubstrate)(i, USE_GPU) for i in tqdm(chunks))
 
             son._cleanup()
-            son._pickleSon()
+            son._saveSon()
             del chunks
 
         del son
@@ -345,15 +359,17 @@ def map_master_func(logfilename='',
             # Set outDir
             son.outDir = outDir
 
-            # Get Substrate npz's
+            # Get Substrate npz's, optionally every Nth chunk only
             toMap = son._getSubstrateNpz()
+            toPlot = sorted(toMap.items())[::max(1, int(qa_plot_every))]
 
-            print('\n\tExporting substrate plots for', len(toMap), son.beamName, 'chunks:')
+            print('\n\tExporting substrate plots for', len(toPlot), son.beamName, 'chunks:')
 
-            # Plot substrate classification()
-            # sys.exit()
-            Parallel(n_jobs=safe_n_jobs(len(toMap), threadCnt))(delayed(son._pltSubClass)(map_class_method, c, f, spdCor=spdCor, maxCrop=maxCrop, probs=probs) for c, f in tqdm((toMap.items())))
-            son._pickleSon()
+            # Plot substrate classification, one batch of chunks per task
+            nBatch = safe_n_jobs(len(toPlot), threadCnt) * 4
+            batches = [toPlot[i::nBatch] for i in range(nBatch) if len(toPlot[i::nBatch]) > 0]
+            Parallel(n_jobs=safe_n_jobs(len(batches), threadCnt))(delayed(son._pltSubClassBatch)(map_class_method, b, spdCor=spdCor, maxCrop=maxCrop, probs=probs) for b in tqdm(batches))
+            son._saveSon()
             del toMap
 
         del son
@@ -369,6 +385,7 @@ def map_master_func(logfilename='',
 
     # threadCnt = 2
 
+    direct_mosaic = False
     if map_sub > 0:
         start_time = time.time()
 
@@ -415,7 +432,17 @@ def map_master_func(logfilename='',
         # Pre-load CSVs once so each joblib-serialised copy already has the data
         psObj._preloadRectifyCache()
 
-        Parallel(n_jobs=safe_n_jobs(len(toMap), threadCnt))(delayed(psObj._mapSubstrate)(map_class_method, c, f) for c, f in tqdm(toMap.items()))
+        # Stream classified chunks straight into GeoTIFF mosaic(s); only
+        ## applies to GeoTIFF mosaics of the whole survey (not vrt or per transect)
+        direct_mosaic = map_direct_mosaic and map_mosaic == 1 and not aoi
+        if map_direct_mosaic and not direct_mosaic:
+            print('\n\tDirect mosaic requires map_mosaic=1 (GeoTiff) and no AOI, writing chunk rasters instead...')
+
+        if direct_mosaic:
+            print('\n\tStreaming classified chunks into mosaic...')
+            psObj._mapSubstrateMosaic(map_class_method, toMap, threadCnt, maxChunk=mosaic_nchunk, overview=True, write_chunk=map_chunk_rasters)
+        else:
+            Parallel(n_jobs=safe_n_jobs(len(toMap), threadCnt))(delayed(psObj._mapSubstrate)(map_class_method, c, f) for c, f in tqdm(toMap.items()))
 
         del toMap
         print("\nDone!")
@@ -428,7 +455,7 @@ def map_master_func(logfilename='',
     ############################################################################
 
     overview = True # False will reduce overall file size, but reduce performance in a GIS
-    if map_mosaic > 0:
+    if map_mosaic > 0 and not direct_mosaic:
         start_time = time.time()
         print("\nMosaicing GeoTiffs...")
 
@@ -482,7 +509,7 @@ def map_master_func(logfilename='',
          # Make sure map_sub is set to true
          psObj.port.map_sub = True
 
-         psObj._rasterToPoly(map_mosaic, threadCnt, mosaic_nchunk)
+         psObj._rasterToPoly(map_mosaic, threadCnt, mosaic_nchunk, vector_format)
 
          # Revert rect_wcp and rect_wcr
          psObj.port.rect_wcp = rect_wcp
@@ -603,6 +630,6 @@ def map_master_func(logfilename='',
 
     for son in mapObjs:
         son._cleanup()
-        son._pickleSon()
+        son._saveSon()
     gc.collect()
     printUsage()
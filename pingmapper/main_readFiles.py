@@ -40,40 +40,13 @@ sys.path.append(PACKAGE_DIR)
 from pingmapper.funcs_common import *
 from pingmapper.funcs_model import DEPTH_DETECTION_AVAILABLE
 from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_manifest import find_meta_files
+from pingmapper.funcs_tilewriter import format_stats
 from pingmapper.class_portstarObj import portstarObj
 
 import shutil
 
-quiet_tensorflow_warnings()
-
-try:
-    with suppress_stdout_stderr():
-        from doodleverse_utils.imports import *
-except ImportError as e:
-    import traceback
-    print('\n' + '='*80)
-    print('Could not import Doodleverse Utils. Please install these packages to use PING-Mapper.')
-    print('They are not needed for GhostVision. Trying to continue...')
-    print('\nDetailed error information:')
-    print('-'*80)
-    print(f'Error Type: {type(e).__name__}')
-    print(f'Error Message: {str(e)}')
-    print('-'*80)
-    traceback.print_exc()
-    print('='*80 + '\n')
-except Exception as e:
-    import traceback
-    print('\n' + '='*80)
-    print('Unexpected error while importing Doodleverse Utils.')
-    print('Detailed error information:')
-    print('-'*80)
-    print(f'Error Type: {type(e).__name__}')
-    print(f'Error Message: {str(e)}')
-    print('-'*80)
-    traceback.print_exc()
-    print('='*80 + '\n')
-
-from scipy.signal import savgol_filter
+savgol_filter = lazy_attr('scipy.signal', 'savgol_filter')
 
 sys.path.insert(0, r'Z:\UDEL\PythonRepos\PINGVerter')
 
@@ -89,591 +62,7 @@ from pingverter import (
 import cv2
 import copy
 
-
-def _is_sidescan_beam(beam_name):
-    beam_name = str(beam_name)
-    return beam_name.startswith('ss_port') or beam_name.startswith('ss_star')
-
-
-def _sidescan_group_key(beam_name):
-    beam_name = str(beam_name)
-    if beam_name.startswith('ss_port_'):
-        return beam_name[len('ss_port_'):]
-    if beam_name.startswith('ss_star_'):
-        return beam_name[len('ss_star_'):]
-    if beam_name in {'ss_port', 'ss_star'}:
-        return 'default'
-    return beam_name
-
-
-def _extract_chunk_id_from_path(path):
-    name = os.path.splitext(os.path.basename(path))[0]
-    match = re.search(r'_(\d+)$', name)
-    if match:
-        return int(match.group(1))
-    return None
-
-
-def _sort_tile_paths(paths):
-    def _key(path):
-        chunk_id = _extract_chunk_id_from_path(path)
-        if chunk_id is None:
-            return (1, os.path.basename(path))
-        return (0, chunk_id)
-
-    return sorted(paths, key=_key)
-
-
-def _to_bgr8(img):
-    if img is None:
-        return None
-
-    if img.dtype == np.uint16:
-        img = (img / 257.0).astype(np.uint8)
-    elif img.dtype != np.uint8:
-        arr = np.asarray(img, dtype=np.float32)
-        finite = np.isfinite(arr)
-        if finite.any():
-            lo = arr[finite].min()
-            hi = arr[finite].max()
-            if hi > lo:
-                arr = (arr - lo) / (hi - lo)
-            else:
-                arr = np.zeros_like(arr)
-        else:
-            arr = np.zeros_like(arr)
-        img = (arr * 255.0).clip(0, 255).astype(np.uint8)
-
-    if img.ndim == 2:
-        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-
-    if img.ndim == 3 and img.shape[2] == 4:
-        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-
-    return img
-
-
-def _resize_height(img, target_h):
-    if img.shape[0] == target_h:
-        return img
-
-    h, w = img.shape[:2]
-    if h <= 0 or w <= 0 or target_h <= 0:
-        return img
-
-    new_w = max(1, int(round(w * (target_h / float(h)))))
-    return cv2.resize(img, (new_w, target_h), interpolation=cv2.INTER_AREA)
-
-
-def _resize_width(img, target_w):
-    if img.shape[1] == target_w:
-        return img
-
-    h, w = img.shape[:2]
-    if h <= 0 or w <= 0 or target_w <= 0:
-        return img
-
-    new_h = max(1, int(round(h * (target_w / float(w)))))
-    return cv2.resize(img, (target_w, new_h), interpolation=cv2.INTER_AREA)
-
-
-def _downscale_if_needed(img, max_dim=20000):
-    h, w = img.shape[:2]
-    max_hw = max(h, w)
-    if max_hw <= max_dim:
-        return img
-
-    scale = float(max_dim) / float(max_hw)
-    new_w = max(1, int(round(w * scale)))
-    new_h = max(1, int(round(h * scale)))
-    print(f"\n\tDownscaling waterfall from {w}x{h} to {new_w}x{new_h} to control memory usage.")
-    return cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-
-
-def _fit_width(img, max_w):
-    h, w = img.shape[:2]
-    if w <= max_w:
-        return img
-    scale = float(max_w) / float(w)
-    new_h = max(1, int(round(h * scale)))
-    return cv2.resize(img, (max_w, new_h), interpolation=cv2.INTER_AREA)
-
-
-def _collect_mode_tile_paths(son, mode):
-    mode_dir = os.path.join(son.projDir, son.beamName, mode)
-    if not os.path.exists(mode_dir):
-        return []
-
-    exts = ['*.png', '*.jpg', '*.jpeg', '*.tif', '*.tiff']
-    paths = []
-    for ext in exts:
-        paths.extend(glob(os.path.join(mode_dir, ext)))
-
-    return _sort_tile_paths(paths)
-
-
-def _get_chunk_range_map(son):
-    chunk_range = {}
-    try:
-        meta_path = getattr(son, 'sonMetaFile', None)
-        if not meta_path or not os.path.exists(meta_path):
-            return chunk_range
-
-        df = pd.read_csv(meta_path, usecols=['chunk_id', 'ping_cnt', 'pixM'])
-        if len(df) == 0:
-            return chunk_range
-
-        df['chunk_id'] = pd.to_numeric(df['chunk_id'], errors='coerce')
-        df['ping_cnt'] = pd.to_numeric(df['ping_cnt'], errors='coerce')
-        df['pixM'] = pd.to_numeric(df['pixM'], errors='coerce')
-        df = df.dropna(subset=['chunk_id', 'ping_cnt', 'pixM'])
-        if len(df) == 0:
-            return chunk_range
-
-        # Approximate chunk range in meters from ping count and pixel size.
-        df['range_m'] = df['ping_cnt'] * df['pixM']
-        grouped = df.groupby('chunk_id', as_index=False)['range_m'].median()
-        for _, row in grouped.iterrows():
-            cid = int(row['chunk_id'])
-            rng = float(row['range_m'])
-            if np.isfinite(rng) and rng > 0:
-                chunk_range[cid] = rng
-    except Exception:
-        return {}
-
-    return chunk_range
-
-
-def _range_reference_m(chunk_range_map):
-    if not chunk_range_map:
-        return None
-    vals = [float(v) for v in chunk_range_map.values() if np.isfinite(v) and float(v) > 0]
-    if len(vals) == 0:
-        return None
-    return float(np.median(vals))
-
-
-def _pad_to_height(img, target_h):
-    h, w = img.shape[:2]
-    if h >= target_h:
-        return img
-    pad_h = target_h - h
-    return cv2.copyMakeBorder(img, 0, pad_h, 0, 0, cv2.BORDER_CONSTANT, value=0)
-
-
-def _pad_to_height_center(img, target_h):
-    h, w = img.shape[:2]
-    if h >= target_h:
-        return img
-    pad_h = target_h - h
-    top = pad_h // 2
-    bottom = pad_h - top
-    return cv2.copyMakeBorder(img, top, bottom, 0, 0, cv2.BORDER_CONSTANT, value=0)
-
-
-def _pad_to_width(img, target_w):
-    h, w = img.shape[:2]
-    if w >= target_w:
-        return img
-    pad_w = target_w - w
-    return cv2.copyMakeBorder(img, 0, 0, 0, pad_w, cv2.BORDER_CONSTANT, value=0)
-
-
-def _scale_tile_by_range(img, tile_path, chunk_range_map=None, ref_range_m=None, base_h=None):
-    if img is None:
-        return None
-    if not (chunk_range_map and ref_range_m and base_h):
-        return img
-
-    chunk_id = _extract_chunk_id_from_path(tile_path)
-    if chunk_id is None:
-        return img
-
-    rng = chunk_range_map.get(chunk_id, None)
-    if rng is None or (not np.isfinite(rng)) or rng <= 0:
-        return img
-
-    scale = float(rng) / float(ref_range_m)
-    scale = max(0.25, min(4.0, scale))
-    target_h = max(1, int(round(base_h * scale)))
-    return _resize_height(img, target_h)
-
-
-def _build_strip_from_tiles(tile_paths, chunk_range_map=None, ref_range_m=None):
-    if len(tile_paths) == 0:
-        return None
-
-    imgs = []
-    base_h = None
-    if ref_range_m is None:
-        ref_range_m = _range_reference_m(chunk_range_map)
-
-    for path in tile_paths:
-        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-        if img is None:
-            continue
-
-        if base_h is None:
-            base_h = img.shape[0]
-
-        if chunk_range_map and ref_range_m and base_h:
-            chunk_id = _extract_chunk_id_from_path(path)
-            rng = chunk_range_map.get(chunk_id, None)
-            if rng is not None and np.isfinite(rng) and rng > 0:
-                scale = float(rng) / float(ref_range_m)
-                scale = max(0.25, min(4.0, scale))
-                target_h = max(1, int(round(base_h * scale)))
-                img = _resize_height(img, target_h)
-
-        imgs.append(img)
-
-    if len(imgs) == 0:
-        return None
-
-    # Preserve range-driven vertical scaling by padding each tile to common max height.
-    max_h = max(img.shape[0] for img in imgs)
-    imgs = [_pad_to_height(img, max_h) for img in imgs]
-    strip = cv2.hconcat(imgs)
-    return strip
-
-
-def _build_sidescan_combined(port_tiles, star_tiles, port_range_map=None, star_range_map=None, ref_range_m=None):
-    if len(port_tiles) == 0 or len(star_tiles) == 0:
-        return None
-
-    def _map_by_chunk(paths):
-        mapped = {}
-        for p in paths:
-            cid = _extract_chunk_id_from_path(p)
-            if cid is not None:
-                mapped[int(cid)] = p
-        return mapped
-
-    port_by_chunk = _map_by_chunk(port_tiles)
-    star_by_chunk = _map_by_chunk(star_tiles)
-
-    # Newest chunk first so newer data sits at the top of the stitched waterfall,
-    # while the oldest chunk remains at the bottom for the initial video frame.
-    common = sorted(set(port_by_chunk.keys()) & set(star_by_chunk.keys()), reverse=True)
-    if len(common) == 0:
-        pair_paths = list(zip(port_tiles, star_tiles))
-        pair_paths = list(reversed(pair_paths))
-    else:
-        pair_paths = [(port_by_chunk[c], star_by_chunk[c]) for c in common]
-
-    # Baseline heights for range-based scaling.
-    base_h_port = None
-    base_h_star = None
-    for p_path, s_path in pair_paths:
-        if base_h_port is None:
-            p_img = cv2.imread(p_path, cv2.IMREAD_UNCHANGED)
-            if p_img is not None:
-                base_h_port = p_img.shape[0]
-        if base_h_star is None:
-            s_img = cv2.imread(s_path, cv2.IMREAD_UNCHANGED)
-            if s_img is not None:
-                base_h_star = s_img.shape[0]
-        if (base_h_port is not None) and (base_h_star is not None):
-            break
-
-    rows = []
-    for p_path, s_path in pair_paths:
-        p_img = cv2.imread(p_path, cv2.IMREAD_UNCHANGED)
-        s_img = cv2.imread(s_path, cv2.IMREAD_UNCHANGED)
-        if p_img is None or s_img is None:
-            continue
-
-        p_img = _scale_tile_by_range(p_img, p_path, port_range_map, ref_range_m, base_h_port)
-        s_img = _scale_tile_by_range(s_img, s_path, star_range_map, ref_range_m, base_h_star)
-
-        # Apply side-scan waterfall geometry: rotate both CCW, then flip port to place nadir at center.
-        p_img = cv2.rotate(p_img, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        s_img = cv2.rotate(s_img, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        p_img = cv2.flip(p_img, 1)
-
-        p_img = _to_bgr8(p_img)
-        s_img = _to_bgr8(s_img)
-
-        row_h = max(p_img.shape[0], s_img.shape[0])
-        # Align each chunk pair on the vertical centerline.
-        p_img = _pad_to_height_center(p_img, row_h)
-        s_img = _pad_to_height_center(s_img, row_h)
-
-        # Keep chunk row widths comparable before vertical stacking.
-        row = cv2.hconcat([p_img, s_img])
-        rows.append(row)
-
-    if len(rows) == 0:
-        return None
-
-    max_w = max(r.shape[1] for r in rows)
-    rows = [_pad_to_width(r, max_w) for r in rows]
-    return cv2.vconcat(rows)
-
-
-def _window_positions(length, window_size, stride, reverse=False):
-    if length <= window_size:
-        positions = [0]
-    else:
-        positions = list(range(0, length - window_size + 1, stride))
-        if positions[-1] != (length - window_size):
-            positions.append(length - window_size)
-
-    if reverse:
-        positions = list(reversed(positions))
-
-    return positions
-
-
-def _export_scrolling_video(
-    img,
-    out_video,
-    axis='x',
-    reverse=False,
-    fps=10,
-    target_size=(1920, 1080),
-    stride=64,
-):
-    os.makedirs(os.path.dirname(out_video), exist_ok=True)
-
-    h, w = img.shape[:2]
-    target_w, target_h = int(target_size[0]), int(target_size[1])
-    target_w = max(64, target_w)
-    target_h = max(64, target_h)
-
-    # Derive crop window from target resolution while preserving aspect ratio.
-    target_aspect = target_w / float(target_h)
-    win_w = min(w, target_w)
-    win_h = min(h, target_h)
-    if win_w <= 0 or win_h <= 0:
-        return
-
-    cur_aspect = win_w / float(win_h)
-    if cur_aspect > target_aspect:
-        win_w = max(1, int(round(win_h * target_aspect)))
-    else:
-        win_h = max(1, int(round(win_w / target_aspect)))
-
-    # If image is larger than target, prefer at least target-sized crop on scroll axis.
-    if axis == 'y' and h >= target_h:
-        win_h = target_h
-        win_w = min(w, max(1, int(round(win_h * target_aspect))))
-    elif axis != 'y' and w >= target_w:
-        win_w = target_w
-        win_h = min(h, max(1, int(round(win_w / target_aspect))))
-
-    # Ensure stride is valid and not too tiny for large windows.
-    stride = int(stride)
-    if stride <= 0:
-        stride = max(1, (win_h if axis == 'y' else win_w) // 10)
-    if axis == 'y':
-        win = min(win_h, h)
-        positions = _window_positions(h, win, stride, reverse=reverse)
-        first_frame = img[positions[0]:positions[0] + win, :win_w]
-    else:
-        win = min(win_w, w)
-        positions = _window_positions(w, win, stride, reverse=reverse)
-        first_frame = img[:win_h, positions[0]:positions[0] + win]
-
-    first_frame_bgr = _to_bgr8(first_frame)
-    frame_h, frame_w = target_h, target_w
-    writer = cv2.VideoWriter(
-        out_video,
-        cv2.VideoWriter_fourcc(*'mp4v'),
-        max(1, int(fps)),
-        (frame_w, frame_h),
-    )
-
-    if not writer.isOpened():
-        print(f"\n\tWARNING: Could not open video writer for {out_video}")
-        return
-
-    for pos in positions:
-        if axis == 'y':
-            frame = img[pos:pos + win, :win_w]
-        else:
-            frame = img[:win_h, pos:pos + win]
-
-        frame_bgr = _to_bgr8(frame)
-        if frame_bgr.shape[0] != frame_h or frame_bgr.shape[1] != frame_w:
-            frame_bgr = cv2.resize(frame_bgr, (frame_w, frame_h), interpolation=cv2.INTER_AREA)
-        writer.write(frame_bgr)
-
-    writer.release()
-
-
-def _export_waterfall_products(
-    sonObjs,
-    wcp,
-    wcm,
-    wcr,
-    wco,
-    mode_selection='auto',
-    ss_image=False,
-    ss_video=False,
-    di_image=False,
-    di_video=False,
-    fps=10,
-    video_resolution='1080p',
-    stride=64,
-):
-    if not (ss_image or ss_video or di_image or di_video):
-        return
-
-    mode_flags = {
-        'wcp': bool(wcp),
-        'wcm': bool(wcm),
-        'src': bool(wcr),
-        'wco': bool(wco),
-    }
-
-    mode_selection = str(mode_selection).strip().lower()
-    if mode_selection in {'wcp', 'src', 'wcp+src'}:
-        if mode_selection == 'wcp':
-            modes = ['wcp']
-        elif mode_selection == 'src':
-            modes = ['src']
-        else:
-            modes = ['wcp', 'src']
-    else:
-        modes = [m for m, enabled in mode_flags.items() if enabled]
-
-    if len(modes) == 0:
-        print('\n\tWaterfall export requested, but no sonogram tile modes are enabled (wcp/wcm/wcr/wco). Skipping.')
-        return
-
-    res_key = str(video_resolution).strip().lower()
-    if res_key in {'4k', '2160p'}:
-        target_size = (3840, 2160)
-    elif res_key in {'1080p', 'fhd'}:
-        target_size = (1920, 1080)
-    elif res_key in {'720p', 'hd'}:
-        target_size = (1280, 720)
-    elif res_key in {'4xxp', '480p'}:
-        target_size = (854, 480)
-    else:
-        target_size = (1920, 1080)
-
-    print('\nGenerating waterfall products...')
-
-    # Group side-scan beams into port/star pairs by suffix key.
-    ss_groups = {}
-    down_beams = []
-    for son in sonObjs:
-        beam = str(getattr(son, 'beamName', ''))
-        if _is_sidescan_beam(beam):
-            key = _sidescan_group_key(beam)
-            group = ss_groups.setdefault(key, {})
-            if beam.startswith('ss_port'):
-                group['port'] = son
-            elif beam.startswith('ss_star'):
-                group['star'] = son
-        else:
-            down_beams.append(son)
-
-    # Side-scan: combine port/star into one waterfall and scroll top -> bottom.
-    if ss_image or ss_video:
-        ss_any = False
-        for group_key, group in sorted(ss_groups.items()):
-            if 'port' not in group or 'star' not in group:
-                continue
-
-            proj_dir = group['port'].projDir
-            port_range_map = _get_chunk_range_map(group['port'])
-            star_range_map = _get_chunk_range_map(group['star'])
-            shared_ref = _range_reference_m(port_range_map)
-            if shared_ref is None:
-                shared_ref = _range_reference_m(star_range_map)
-
-            for mode in modes:
-                port_tiles = _collect_mode_tile_paths(group['port'], mode)
-                star_tiles = _collect_mode_tile_paths(group['star'], mode)
-                if len(port_tiles) == 0 or len(star_tiles) == 0:
-                    continue
-
-                ss_any = True
-
-                combined = _build_sidescan_combined(
-                    port_tiles,
-                    star_tiles,
-                    port_range_map=port_range_map,
-                    star_range_map=star_range_map,
-                    ref_range_m=shared_ref,
-                )
-                if combined is None:
-                    continue
-
-                # Ensure both port and star fully fit inside output frame width.
-                combined = _fit_width(combined, target_size[0])
-                combined = _downscale_if_needed(combined)
-
-                out_dir = os.path.join(proj_dir, 'waterfall_exports', 'sidescan', mode)
-                os.makedirs(out_dir, exist_ok=True)
-
-                if ss_image:
-                    cv2.imwrite(os.path.join(out_dir, 'waterfall.png'), combined)
-
-                if ss_video:
-                    _export_scrolling_video(
-                        combined,
-                        os.path.join(out_dir, 'waterfall_scroll_t2b.mp4'),
-                        axis='y',
-                        reverse=True,
-                        fps=fps,
-                        target_size=target_size,
-                        stride=stride,
-                    )
-
-        if not ss_any:
-            print('\n\tNo side-scan tiles found for requested waterfall mode(s).')
-            print('\tEnable or select matching mode(s), e.g., WCP and/or SRC.')
-
-    # Down-imaging: generate per-beam waterfall and scroll right -> left.
-    if di_image or di_video:
-        di_any = False
-        for son in down_beams:
-            beam = str(getattr(son, 'beamName', 'unknown_beam'))
-            proj_dir = son.projDir
-            down_range_map = _get_chunk_range_map(son)
-            down_ref = _range_reference_m(down_range_map)
-
-            for mode in modes:
-                tiles = _collect_mode_tile_paths(son, mode)
-                if len(tiles) == 0:
-                    continue
-
-                di_any = True
-
-                strip = _build_strip_from_tiles(
-                    tiles,
-                    chunk_range_map=down_range_map,
-                    ref_range_m=down_ref,
-                )
-                if strip is None:
-                    continue
-
-                strip = _downscale_if_needed(strip)
-
-                out_dir = os.path.join(proj_dir, 'waterfall_exports', 'down_imaging', mode)
-                os.makedirs(out_dir, exist_ok=True)
-
-                if di_image:
-                    cv2.imwrite(os.path.join(out_dir, f'{beam}_waterfall.png'), strip)
-
-                if di_video:
-                    _export_scrolling_video(
-                        strip,
-                        os.path.join(out_dir, f'{beam}_waterfall_scroll.mp4'),
-                        axis='x',
-                        reverse=False,
-                        fps=fps,
-                        target_size=target_size,
-                        stride=stride,
-                    )
-
-        if not di_any:
-            print('\n\tNo down-imaging tiles found for requested waterfall mode(s).')
-            print('\tEnable or select matching mode(s), e.g., WCP and/or SRC.')
+from pingmapper.funcs_waterfall import _export_waterfall_products
 
 
 #===========================================
@@ -701,6 +90,11 @@ def read_master_func(logfilename='',
                      coord_iqr_scale = 3.0,
                      tempC=10,
                      nchunk=500,
+                     adaptive_chunks=False,
+                     chunk_target_mb=8,
+                     chunk_target_m=100,
+                     chunk_min_pings=0,
+                     chunk_max_pings=0,
                      cropRange=0,
                      exportUnknown=False,
                      fixNoDat=False,
@@ -713,6 +107,10 @@ def read_master_func(logfilename='',
                      export_colormap_uint8=True,
                      export_16bit_colormap=False,
                      tileFile='.png',
+                     tile_writer_threads=2,
+                     tile_png_level=6,
+                     tile_jpeg_quality=75,
+                     export_cube=False,
                      egn=False,
                      egn_stretch=0,
                      egn_stretch_factor=1,
@@ -722,6 +120,7 @@ def read_master_func(logfilename='',
                      sonar_clahe=False,
                      sonar_clahe_global=True,
                      sonar_clahe_clip_limit=0.01,
+                     sonar_clahe_tile_grid=8,
                      wcp=False,
                      wcm=False,
                      wcr=False,
@@ -762,6 +161,7 @@ def read_master_func(logfilename='',
                      waterfall_video_resolution='1080p',
                      waterfall_mode_selection='auto',
                      waterfall_window_stride=64,
+                     qa_plot_every=1,
                      return_context=False,
                      **kwargs):
 
@@ -790,6 +190,15 @@ def read_master_func(logfilename='',
                       sonar tiles (sonograms).  Most testing has been on chunk
                       sizes of 500 (recommended).
         EXAMPLE -     nchunk = 500
+    adaptive_chunks : bool : [Default=False]
+        DESCRIPTION - Size chunks by sonar bytes and along-track distance
+                      instead of a fixed nchunk pings, so chunks of long
+                      pings or fast transects stay small (see
+                      funcs_chunking).  A chunk closes at chunk_target_mb
+                      MiB of samples or chunk_target_m meters along track,
+                      within chunk_min_pings and chunk_max_pings pings
+                      (0 = nchunk/4 and nchunk*4).
+        EXAMPLE -     adaptive_chunks = True
     exportUnknown : bool [Default=False]
         DESCRIPTION - Flag indicating if unknown attributes in ping
                       should be exported or not.  If a user of PING Mapper
@@ -870,15 +279,15 @@ def read_master_func(logfilename='',
     |
     |--|meta
     |  |--B000_ds_lowfreq_meta.csv : ping metadata for B000.SON (if present)
-    |  |--B000_ds_lowfreq_meta.meta : Pickled sonObj instance for B000.SON (if present)
+    |  |--B000_ds_lowfreq_meta.manifest.json : Saved sonObj state for B000.SON (if present)
     |  |--B001_ds_highfreq_meta.csv : ping metadata for B001.SON (if present)
-    |  |--B001_ds_highfreq_meta.meta : Pickled sonObj instance for B001.SON (if present)
+    |  |--B001_ds_highfreq_meta.manifest.json : Saved sonObj state for B001.SON (if present)
     |  |--B002_ss_port_meta.csv : ping metadata for B002.SON (if present)
-    |  |--B002_ss_port_meta.meta : Pickled sonObj instance for B002.SON (if present)
+    |  |--B002_ss_port_meta.manifest.json : Saved sonObj state for B002.SON (if present)
     |  |--B003_ss_star_meta.csv : ping metadata for B003.SON (if present)
-    |  |--B003_ss_star_meta.meta : Pickled sonObj instance for B003.SON (if present)
+    |  |--B003_ss_star_meta.manifest.json : Saved sonObj state for B003.SON (if present)
     |  |--B004_ds_vhighfreq.csv : ping metadata for B004.SON (if present)
-    |  |--B004_ds_vhighfreq.meta : Pickled sonObj instance for B004.SON (if present)
+    |  |--B004_ds_vhighfreq.manifest.json : Saved sonObj state for B004.SON (if present)
     |  |--DAT_meta.csv : Sonar recording metadata for *.DAT.
     |
     |--|ss_port (if B002.SON OR B003.SON [tranducer flipped] available)
@@ -896,6 +305,10 @@ def read_master_func(logfilename='',
     |  |--wcp [wcp=True]
     |     |--*.PNG : Starboard side scan (ss) sonar tiles (non-rectified), w/
     |     |          water column present (wcp)
+    |
+    |--|<beam>/cube.zarr [export_cube=True]
+    |     Decoded pings of each beam as one (ping, sample) array with
+    |     per-ping transect/chunk_id coordinates (see funcs_cube)
     '''
 
     #####################################
@@ -1056,6 +469,9 @@ def read_master_func(logfilename='',
             (getattr(son, 'output_bit_depth', 8) > 8) or (not bool(getattr(son, 'son8bit', True)))
         )
         son.export_colormap_uint8 = bool(export_colormap_uint8)
+        son.tile_writer_threads = int(tile_writer_threads)
+        son.tile_png_level = int(tile_png_level)
+        son.tile_jpeg_quality = int(tile_jpeg_quality)
         son.export_beam = True
         son.tvg = False
         son.tvg_spreading_k = float(getattr(son, 'tvg_spreading_k', 40.0))
@@ -1212,8 +628,7 @@ def read_master_func(logfilename='',
             son.sonar_clahe = bool(sonar_clahe)
             son.sonar_clahe_global = bool(sonar_clahe_global)
             son.sonar_clahe_clip_limit = float(sonar_clahe_clip_limit)
-            if son.sonar_clahe:
-                son._ensure_clahe_global_bounds()
+            son.sonar_clahe_tile_grid = int(sonar_clahe_tile_grid)
             # Do range crop, if necessary
             if cropRange > 0.0:
                 if file_type == '.xtf' and _is_sidescan_beam(getattr(son, 'beamName', '')):
@@ -1238,6 +653,12 @@ def read_master_func(logfilename='',
                 df.loc[df['ping_cnt'] > d, 'ping_cnt'] = d
                 son._saveSonMetaCSV(df)
 
+        # Intensity statistics depend on cropping; they are gathered again
+        # from the first decode of each chunk during tile export.
+        for son in sonObjs:
+            son._resetIntensityStats()
+            son._calcIntensityStats(threadCnt, decode=False)
+
         # Store flag to export un-rectified sonar tiles in each sonObj.
         for son in sonObjs:
             beam = son.beamName
@@ -1272,10 +693,10 @@ def read_master_func(logfilename='',
     else:
 
         ####################################################
-        # Check if sonObj pickle exists, append to metaFiles
+        # Check if saved sonObj state exists, append to metaFiles
         metaDir = os.path.join(projDir, "meta")
         if os.path.exists(metaDir):
-            metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+            metaFiles = find_meta_files(metaDir)
 
             if len(metaFiles) == 0:
                 projectMode_2a_inval()
@@ -1285,18 +706,14 @@ def read_master_func(logfilename='',
         del metaDir
 
         ############################################
-        # Create a sonObj instance from pickle files
+        # Create a sonObj instance from saved state
         sonObjs=[]
         for m in metaFiles:
             # Initialize empty sonObj
             son = sonObj(sonFile=None, humFile=None, projDir=None, tempC=None, nchunk=None)
 
-            # Open metafile
-            metaFile = pickle.load(open(m, 'rb'))
-
-            # Update sonObj with metadat items
-            for attr, value in metaFile.__dict__.items():
-                setattr(son, attr, value)
+            # Update sonObj with saved state
+            son._loadManifest(m)
 
             if not hasattr(son, 'tvg'):
                 son.tvg = False
@@ -1322,7 +739,7 @@ def read_master_func(logfilename='',
             for son in sonObjs:
                 temp = vars(son)
                 for t in temp:
-                    if 'Dir' in t or 'File' in t or 'file' in t or 'Pickle' in t:
+                    if 'Dir' in t or 'File' in t or 'file' in t or 'Pickle' in t or 'Manifest' in t:
                         dir = temp[t]
                         dir = dir.replace(toReplace, replaceWith)
                         dir = os.path.normpath(dir)
@@ -1411,8 +828,9 @@ def read_master_func(logfilename='',
             son.sonar_clahe = bool(sonar_clahe)
             son.sonar_clahe_global = bool(sonar_clahe_global)
             son.sonar_clahe_clip_limit = float(sonar_clahe_clip_limit)
-            if son.sonar_clahe:
-                son._ensure_clahe_global_bounds()
+            son.sonar_clahe_tile_grid = int(sonar_clahe_tile_grid)
+            son._resetIntensityStats()
+            son._calcIntensityStats(threadCnt, decode=False)
 
             beam = son.beamName
             if wcr:
@@ -1424,12 +842,24 @@ def read_master_func(logfilename='',
                 son.wcr_src = False
 
         for son in sonObjs:
-            son._pickleSon()
+            son._saveSon()
         gc.collect()
 
         del son
 
 
+    # Chunk sizing
+    for son in sonObjs:
+        son.adaptive_chunks = bool(adaptive_chunks)
+        son.chunk_target_mb = float(chunk_target_mb)
+        son.chunk_target_m = float(chunk_target_m)
+        son.chunk_min_pings = int(chunk_min_pings)
+        son.chunk_max_pings = int(chunk_max_pings)
+
+    # Filtering re-chunks the filtered pings
+    doFilter = dq_table or max_heading_deviation > 0 or min_speed > 0 or max_speed > 0 or aoi or time_table or filter_coord_outliers
+
+
     ############################################################################
     # Locating missing pings                                                   #
     ############################################################################
@@ -1487,11 +917,25 @@ def read_master_func(logfilename='',
         dfAll['orig_record_num'] = dfAll['record_num']
         dfAll['record_num'] = dfAll.index
 
+        # Adaptive chunks are sized once, on the longest side-scan beam, and
+        ## shared so every beam keeps the same chunks (as with fixed nchunk)
+        if adaptive_chunks:
+            beamCnt = dfAll['beam'].value_counts()
+            refSon = max([s for s in sonObjs if _is_sidescan_beam(s.beamName)] or sonObjs, key=lambda s: beamCnt.get(s.beam, 0))
+            adaptiveChunks = refSon._adaptiveChunkIds(dfAll[dfAll['beam'] == refSon.beam])
+            del beamCnt, refSon
+
         # Slice dfAll by beam, update chunk_id, then save to file.
         for son in sonObjs:
             df = dfAll[dfAll['beam'] == son.beam].copy()
 
-            if (len(df)%nchunk) != 0:
+            if son.adaptive_chunks:
+                if len(df) <= len(adaptiveChunks):
+                    chunks = adaptiveChunks[:len(df)]
+                else:
+                    chunks = son._adaptiveChunkIds(df)
+                rdr = False
+            elif (len(df)%nchunk) != 0:
                 rdr = nchunk-(len(df)%nchunk)
                 chunkCnt = int(len(df)/nchunk)
                 chunkCnt += 1
@@ -1499,19 +943,20 @@ def read_master_func(logfilename='',
                 rdr = False
                 chunkCnt = int(len(df)/nchunk)
 
-            chunks = np.arange(chunkCnt)
-            chunks = np.repeat(chunks, nchunk)
-            del chunkCnt
+            if not son.adaptive_chunks:
+                chunks = np.arange(chunkCnt)
+                chunks = np.repeat(chunks, nchunk)
+                del chunkCnt
 
             if rdr:
                 chunks = chunks[:-rdr]
 
             df['chunk_id'] = chunks
 
-            # Make sure last chunk is long enough
+            # Make sure last chunk is long enough (adaptive chunks already are)
             c=df['chunk_id'].max() # Get last chunk value
             lastChunk=df[df['chunk_id']==c] # Get last chunk rows
-            if len(lastChunk) <= (nchunk/2):
+            if not son.adaptive_chunks and len(lastChunk) <= (nchunk/2):
                 df.loc[df['chunk_id']==c, 'chunk_id'] = c-1
 
             df = df.drop(columns = ['beam'])
@@ -1537,6 +982,27 @@ def read_master_func(logfilename='',
             for son in sonObjs:
                 son.fixNoDat = fixNoDat
 
+            # chunk_id is still pingverter's fixed nchunk; filtering re-chunks
+            ## below, otherwise size adaptive chunks here, shared as above
+            if adaptive_chunks and not doFilter:
+                frames = {}
+                for son in sonObjs:
+                    son._loadSonMeta()
+                    frames[son.beam] = son.sonMetaDF
+                    son._cleanup()
+
+                refSon = max([s for s in sonObjs if _is_sidescan_beam(s.beamName)] or sonObjs, key=lambda s: len(frames[s.beam]))
+                adaptiveChunks = refSon._adaptiveChunkIds(frames[refSon.beam])
+
+                for son in sonObjs:
+                    df = frames[son.beam]
+                    if len(df) <= len(adaptiveChunks):
+                        df['chunk_id'] = adaptiveChunks[:len(df)]
+                    else:
+                        df['chunk_id'] = son._adaptiveChunkIds(df)
+                    son._saveSonMetaCSV(df)
+                del frames, refSon, adaptiveChunks, df
+
     ############################################################################
     # Print Metadata Summary                                                   #
     ############################################################################
@@ -1628,7 +1094,7 @@ def read_master_func(logfilename='',
         printUsage()
 
     for son in sonObjs:
-        son._pickleSon()
+        son._saveSon()
 
     
 
@@ -1636,7 +1102,7 @@ def read_master_func(logfilename='',
     # For Filtering                                                            #
     ############################################################################
 
-    if dq_table or max_heading_deviation > 0 or min_speed > 0 or max_speed > 0 or aoi or time_table or filter_coord_outliers:
+    if doFilter:
 
         start_time = time.time()
 
@@ -1937,8 +1403,12 @@ def read_master_func(logfilename='',
     if pltBedPick and psObj is not None and len(chunks) > 0:
         start_time = time.time()
 
+        # Optionally plot every Nth chunk only, in one batch per worker
+        pltChunks = np.asarray(chunks)[::max(1, int(qa_plot_every))]
+        batches = [b for b in np.array_split(pltChunks, safe_n_jobs(len(pltChunks), threadCnt) * 4) if len(b) > 0]
+
         print("\n\nExporting bedpick plots to {}...".format(tileFile))
-        Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(psObj._plotBedPick)(int(chunk), True, autoBed, tileFile) for chunk in tqdm(chunks))
+        Parallel(n_jobs=safe_n_jobs(len(batches), threadCnt))(delayed(psObj._plotBedPickBatch)(batch, True, autoBed, tileFile) for batch in tqdm(batches))
 
         print("\nDone!")
         print("Time (s):", round(time.time() - start_time, ndigits=1))
@@ -1954,7 +1424,7 @@ def read_master_func(logfilename='',
 
     for son in sonObjs:
         son._cleanup()
-        son._pickleSon()
+        son._saveSon()
     del son
 
 
@@ -2071,7 +1541,7 @@ def read_master_func(logfilename='',
             son.remShadow = -1*son.remShadow
 
     for son in sonObjs:
-        son._pickleSon()
+        son._saveSon()
 
     # Cleanup
     try:
@@ -2123,7 +1593,7 @@ def read_master_func(logfilename='',
                 del min_max
 
                 son._cleanup()
-                son._pickleSon()
+                son._saveSon()
 
                 gc.collect()
                 printUsage()
@@ -2157,7 +1627,7 @@ def read_master_func(logfilename='',
 
             # Tidy up
             son._cleanup()
-            son._pickleSon()
+            son._saveSon()
             gc.collect()
 
         # Need to calculate histogram if egn_stretch is greater then 0
@@ -2221,7 +1691,7 @@ def read_master_func(logfilename='',
 
                     # Tidy up
                     son._cleanup()
-                    son._pickleSon()
+                    son._saveSon()
                     gc.collect()
 
             for son in sonObjs:
@@ -2241,7 +1711,7 @@ def read_master_func(logfilename='',
 
                     # Tidy up
                     son._cleanup()
-                    son._pickleSon()
+                    son._saveSon()
                     gc.collect()
 
 
@@ -2296,15 +1766,27 @@ def read_master_func(logfilename='',
 
                 print('\n\tExporting', chunkCnt, 'sonograms for', son.beamName)
 
+                # Resolve CLAHE bounds here so workers don't each decode the beam
+                if son.sonar_clahe:
+                    son._ensure_clahe_global_bounds(threadCnt)
+
+                # Otherwise intensity statistics are sketched by the export tasks
+                sketch = 'raw' not in son._getIntensityStats()
+
                 # Load sonMetaDF
                 son._loadSonMeta()
 
-                Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(son._exportTilesSpd)(i, tileFile=imgType, spdCor=spdCor, mask_shdw=mask_shdw, maxCrop=maxCrop) for i in tqdm(chunks))
+                r = Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(son._exportTilesSpd)(i, tileFile=imgType, spdCor=spdCor, mask_shdw=mask_shdw, maxCrop=maxCrop, sketch=sketch) for i in tqdm(chunks))
+                r, chunk_stats = [s for s, _ in r], [c for _, c in r]
+                if sketch:
+                    son._intensityCalcGlobalStats(chunk_stats)
+                if format_stats(r):
+                    print('\t'+format_stats(r))
                 # for i in tqdm(chunks):
                 #     son._exportTilesSpd(i, tileFile=imgType, spdCor=spdCor, mask_shdw=mask_shdw, maxCrop=maxCrop)
                 #     sys.exit()
 
-                son._pickleSon()
+                son._saveSon()
 
 
 
@@ -2317,6 +1799,23 @@ def read_master_func(logfilename='',
         print("Time (s):", round(time.time() - start_time, ndigits=1))
         printUsage()
 
+    ############################################################################
+    # Export sonar cubes                                                       #
+    ############################################################################
+
+    if export_cube:
+        start_time = time.time()
+        for son in sonObjs:
+            print('\n\tWriting sonar cube for', son.beamName)
+            son._exportCube(threadCnt)
+            son._saveSon()
+            gc.collect()
+
+        del son
+        print("\nDone!")
+        print("Time (s):", round(time.time() - start_time, ndigits=1))
+        printUsage()
+
     if bool(waterfall_ss_image) or bool(waterfall_ss_video) or bool(waterfall_di_image) or bool(waterfall_di_video):
         start_time = time.time()
         print("\nGenerating waterfall image/video exports...")
@@ -2335,6 +1834,7 @@ def read_master_func(logfilename='',
                 fps=int(waterfall_video_fps),
                 video_resolution=str(waterfall_video_resolution),
                 stride=int(waterfall_window_stride),
+                threadCnt=threadCnt,
             )
         except Exception as e:
             print(f"\nWaterfall export failed: {e}")
@@ -2348,7 +1848,7 @@ def read_master_func(logfilename='',
     ##############################################
 
     for son in sonObjs:
-        son._pickleSon()
+        son._saveSon()
     gc.collect()
     printUsage()
 
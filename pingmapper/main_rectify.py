@@ -42,6 +42,8 @@ from pingmapper.funcs_common import *
 from pingmapper.class_rectObj import rectObj
 from pingmapper.class_portstarObj import portstarObj
 from pingmapper.funcs_rectify import smoothTrackline
+from pingmapper.funcs_manifest import find_meta_files
+from pingmapper.funcs_tilewriter import format_stats
 
 import inspect
 
@@ -101,6 +103,7 @@ def rectify_master_func(logfilename='',
                         sonFiles='',
                         projDir='',
                         coverage=False,
+                        vector_format='shp',
                         aoi=False,
                         max_heading_deviation = False,
                         max_heading_distance = False,
@@ -119,8 +122,12 @@ def rectify_master_func(logfilename='',
                         y_offset=0,
                         export_16bit=False,
                         export_colormap_uint8=True,
+                        export_colormap_palette=False,
                         export_16bit_colormap=False,
                         tileFile=False,
+                        tile_writer_threads=2,
+                        rect_tiff_compression='deflate',
+                        rect_tiff_level=9,
                         egn=False,
                         egn_stretch=0,
                         egn_stretch_factor=1,
@@ -130,6 +137,7 @@ def rectify_master_func(logfilename='',
                         sonar_clahe=False,
                         sonar_clahe_global=True,
                         sonar_clahe_clip_limit=0.01,
+                        sonar_clahe_tile_grid=8,
                         wcp=False,
                         wcm=False,
                         wcr=False,
@@ -281,10 +289,10 @@ def rectify_master_func(logfilename='',
     ############################################################################
 
     ####################################################
-    # Check if sonObj pickle exists, append to metaFiles
+    # Check if saved sonObj state exists, append to metaFiles
     metaDir = os.path.join(projDir, "meta")
     if os.path.exists(metaDir):
-        metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+        metaFiles = find_meta_files(metaDir)
 
         if len(metaFiles) == 0:
             projectMode_2a_inval()
@@ -294,7 +302,7 @@ def rectify_master_func(logfilename='',
     del metaDir
 
     #############################################
-    # Create a rectObj instance from pickle files
+    # Create a rectObj instance from saved state
     rectObjs = []
     for meta in metaFiles:
         son = rectObj(meta) # Initialize rectObj()
@@ -346,13 +354,13 @@ def rectify_master_func(logfilename='',
     if coverage:
         start_time = time.time()
         print("\nExporting coverage and trackline shapefiles:\n")
-        portstar[0]._exportTrkShp()
+        portstar[0]._exportTrkShp(vector_format=vector_format)
 
         trk_files = []
         for son in portstar:
             # trk_files.append(son.smthTrkFile)
 
-            son._exportCovShp()
+            son._exportCovShp(vector_format=vector_format)
 
         # print(trk_files)
 
@@ -372,12 +380,17 @@ def rectify_master_func(logfilename='',
         son.rect_wcr = rect_wcr
         son.export_16bit = bool(export_16bit) and (not bool(getattr(son, 'son8bit', True)))
         son.export_colormap_uint8 = bool(export_colormap_uint8)
+        son.export_colormap_palette = bool(export_colormap_palette)
+        son.tile_writer_threads = int(tile_writer_threads)
+        son.rect_tiff_compression = str(rect_tiff_compression)
+        son.rect_tiff_level = int(rect_tiff_level)
         son.sonar_db_transform = bool(sonar_db_transform)
         son.sonar_clahe = bool(sonar_clahe)
         son.sonar_clahe_global = bool(sonar_clahe_global)
         son.sonar_clahe_clip_limit = float(sonar_clahe_clip_limit)
+        son.sonar_clahe_tile_grid = int(sonar_clahe_tile_grid)
         if son.sonar_clahe:
-            son._ensure_clahe_global_bounds()
+            son._ensure_clahe_global_bounds(threadCnt)
 
     # ############################################################################
     # # Rectify Heading sonar imagery - Pingwise, not Rubbersheeting             #
@@ -429,14 +442,16 @@ def rectify_master_func(logfilename='',
 
                 if son.export_16bit and son._rect_colormap_selected(son=True):
                     if rect_wcp:
-                        son._prime_rect_global_colormap_bounds('rect_wcp')
+                        son._prime_rect_global_colormap_bounds('rect_wcp', threadCnt=threadCnt)
                     if rect_wcr:
-                        son._prime_rect_global_colormap_bounds('rect_wcr')
+                        son._prime_rect_global_colormap_bounds('rect_wcr', threadCnt=threadCnt)
 
                 print('\n\tExporting', len(chunks), 'GeoTiffs for', son.beamName)
 
                 # Parallel(n_jobs= np.min([len(sDF), threadCnt]))(delayed(son._rectSonHeadingMain)(sonarCoordsDF[sonarCoordsDF['chunk_id']==chunk], chunk) for chunk in tqdm(range(len(chunks))))
-                Parallel(n_jobs=safe_n_jobs(len(sDF), threadCnt))(delayed(son._rectSonHeadingMain)(sDF[sDF['chunk_id']==chunk], chunk, heading=heading, interp_dist=rectInterpDist) for chunk in tqdm(chunks))
+                r = Parallel(n_jobs=safe_n_jobs(len(sDF), threadCnt))(delayed(son._rectSonHeadingMain)(sDF[sDF['chunk_id']==chunk], chunk, heading=heading, interp_dist=rectInterpDist) for chunk in tqdm(chunks))
+                if format_stats(r):
+                    print('\t'+format_stats(r))
                 # for i in chunks:
                 #     # son._rectSonHeading(sonarCoordsDF[sonarCoordsDF['chunk_id']==i], i)
                 #     r = son._rectSonHeadingMain(sDF[sDF['chunk_id']==i], i, heading=heading, interp_dist=rectInterpDist)
@@ -476,8 +491,9 @@ def rectify_master_func(logfilename='',
         son.sonar_clahe = bool(sonar_clahe)
         son.sonar_clahe_global = bool(sonar_clahe_global)
         son.sonar_clahe_clip_limit = float(sonar_clahe_clip_limit)
+        son.sonar_clahe_tile_grid = int(sonar_clahe_tile_grid)
         if son.sonar_clahe:
-            son._ensure_clahe_global_bounds()
+            son._ensure_clahe_global_bounds(threadCnt)
 
     if (rect_wcp and rubberSheeting) or (rect_wcr and rubberSheeting):
         # Always use COG for rubber sheeting
@@ -498,15 +514,17 @@ def rectify_master_func(logfilename='',
 
                 if son.export_16bit and son._rect_colormap_selected(son=True):
                     if rect_wcp:
-                        son._prime_rect_global_colormap_bounds('rect_wcp')
+                        son._prime_rect_global_colormap_bounds('rect_wcp', threadCnt=threadCnt)
                     if rect_wcr:
-                        son._prime_rect_global_colormap_bounds('rect_wcr')
+                        son._prime_rect_global_colormap_bounds('rect_wcr', threadCnt=threadCnt)
 
                 print('\n\tExporting', len(chunks), 'GeoTiffs for', son.beamName)
                 # for i in chunks:
                 #     son._rectSonRubber(i, filter, cog, wgs=False)
                     # sys.exit()
-                Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(son._rectSonRubber)(i, filter, cog, wgs=False) for i in tqdm(chunks))
+                r = Parallel(n_jobs=safe_n_jobs(len(chunks), threadCnt))(delayed(son._rectSonRubber)(i, filter, cog, wgs=False) for i in tqdm(chunks))
+                if format_stats(r):
+                    print('\t'+format_stats(r))
                 son._cleanup()
                 gc.collect()
                 printUsage()
@@ -521,7 +539,7 @@ def rectify_master_func(logfilename='',
                 del son.smthTrk
             except:
                 pass
-            son._pickleSon()
+            son._saveSon()
         del son
     print("Done!")
     print("Time (s):", round(time.time() - start_time, ndigits=1))
@@ -596,7 +614,7 @@ def rectify_master_func(logfilename='',
     ##############################################
 
     for son in portstar:
-        son._pickleSon()
+        son._saveSon()
         del son
 
     # Cleanup
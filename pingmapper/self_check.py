@@ -13,6 +13,7 @@ REQUIRED_MODULES = [
     "pandas",
     "geopandas",
     "rasterio",
+    "h5py",
     "pyproj",
     "cv2",
     "pinginstaller",
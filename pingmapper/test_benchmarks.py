@@ -0,0 +1,104 @@
+"""Unit tests for the synthetic recordings and benchmark bookkeeping."""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from pingmapper.benchmarks.suite import compare
+from pingmapper.benchmarks.synthetic import (
+    HUM_HEAD_END,
+    HUM_HEAD_START,
+    HUM_PING_DTYPE,
+    JSF_MARKER,
+    JSF_MSG80_SIZE,
+    write_humminbird,
+    write_jsf,
+)
+
+
+class TestSyntheticHumminbird(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_son_records_decode(self):
+        datFile = write_humminbird(self.tmp, n_pings=250, n_beams=3, samples=200, block=100)
+
+        with open(datFile, 'rb') as f:
+            dat = f.read()
+        self.assertEqual(len(dat), 64)
+        self.assertEqual(struct.unpack_from('>i', dat, 44)[0], 250)
+        self.assertEqual(dat[32:42].rstrip(b'\0'), b'R00001.DAT')
+
+        for b, (beamFile, beam, samples) in enumerate([('B002', 2, 200), ('B003', 3, 200), ('B001', 1, 100)]):
+            sonFile = os.path.join(self.tmp, 'R00001', beamFile + '.SON')
+            rec = np.dtype([('head', HUM_PING_DTYPE), ('ping', 'u1', samples)])
+            self.assertEqual(os.path.getsize(sonFile), 250 * rec.itemsize)
+
+            head = np.fromfile(sonFile, dtype=rec)['head']
+            self.assertTrue((head['head_start'] == HUM_HEAD_START).all())
+            self.assertTrue((head['head_end'] == HUM_HEAD_END).all())
+            self.assertTrue((head['SP160'] == 160).all())
+            self.assertTrue((head['beam'] == beam).all())
+            self.assertTrue((head['ping_cnt'] == samples).all())
+            np.testing.assert_array_equal(head['record_num'], np.arange(250) * 3 + b)
+            self.assertTrue((np.diff(head['time_s'].astype(int)) > 0).all())
+
+    def test_beam_count_is_checked(self):
+        with self.assertRaises(ValueError):
+            write_humminbird(self.tmp, n_pings=10, n_beams=6)
+
+
+class TestSyntheticJsf(unittest.TestCase):
+
+    def test_messages_decode(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            jsfFile = write_jsf(os.path.join(tmp, 'line.jsf'), n_pings=30, samples=64, block=8)
+            with open(jsfFile, 'rb') as f:
+                buf = f.read()
+
+            pos, msgs = 0, []
+            while pos < len(buf):
+                marker, msg_type = struct.unpack_from('<H', buf, pos)[0], struct.unpack_from('<H', buf, pos + 4)[0]
+                size = struct.unpack_from('<i', buf, pos + 12)[0]
+                self.assertEqual((marker, msg_type), (JSF_MARKER, 80))
+                samples = struct.unpack_from('<H', buf, pos + 16 + 114)[0]
+                ping = struct.unpack_from('<I', buf, pos + 16 + 8)[0]
+                msgs.append((ping, buf[pos + 8], samples))
+                self.assertEqual(size, JSF_MSG80_SIZE + 2 * samples)
+                pos += 16 + size
+
+            self.assertEqual(pos, len(buf))
+            self.assertEqual(msgs[:2], [(0, 0, 64), (0, 1, 64)])
+            self.assertEqual(len(msgs), 60)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestCompare(unittest.TestCase):
+
+    def _record(self, commit, seconds, pings=100):
+        return {'commit': commit, 'config': {'pings': pings},
+                'stages': {'egn': {'seconds': seconds, 'calls': 1}}}
+
+    def test_flags_regression_against_same_config(self):
+        records = [self._record('aaa', 1.0), self._record('bbb', 0.2, pings=5), self._record('ccc', 1.3)]
+        base, head, rows = compare(records, threshold=0.1)
+        self.assertEqual((base['commit'], head['commit']), ('aaa', 'ccc'))
+        self.assertTrue(rows[0][-1])
+
+    def test_small_changes_are_noise(self):
+        records = [self._record('aaa', 0.01), self._record('bbb', 0.03)]
+        self.assertFalse(compare(records, base='aaa', head='bbb')[2][0][-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Unit tests for adaptive chunk sizing."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_chunking import adaptive_chunk_ids, chunk_lengths
+
+
+class TestChunkLengths(unittest.TestCase):
+
+    def test_byte_target(self):
+        lengths = chunk_lengths(np.full(1000, 2000.0), target_bytes=200000, target_dist=None)
+        self.assertTrue((lengths == 100).all())
+        self.assertEqual(lengths.sum(), 1000)
+
+        # Longer pings give proportionally shorter chunks
+        nbytes = np.r_[np.full(500, 1000.0), np.full(500, 8000.0)]
+        lengths = chunk_lengths(nbytes, target_bytes=400000, target_dist=None)
+        self.assertEqual(list(lengths[:3]), [400, 137, 50])
+        self.assertEqual(lengths[-1], 13)
+
+    def test_distance_target(self):
+        dist = np.cumsum(np.r_[np.full(300, 0.125), np.full(300, 1.0)])
+        dist[[10, 400]] = np.nan
+        lengths = chunk_lengths(np.ones(600), dist, target_bytes=None, target_dist=10)
+        self.assertEqual(lengths.sum(), 600)
+        self.assertEqual(lengths[0], 80)
+        self.assertEqual(lengths[3], 62)
+        self.assertTrue((lengths[4:-1] == 10).all())
+
+    def test_bounds_and_tail(self):
+        nbytes = np.full(1050, 1.0)
+        self.assertTrue((chunk_lengths(nbytes, target_bytes=5, min_pings=20, max_pings=1000)[:-1] == 20).all())
+        self.assertTrue((chunk_lengths(nbytes, target_bytes=1e9, min_pings=1, max_pings=300)[:-1] == 300).all())
+
+        # A short last chunk joins the previous one, split evenly if too long
+        lengths = chunk_lengths(nbytes, target_bytes=100, min_pings=60, max_pings=120)
+        self.assertEqual(list(lengths[-2:]), [75, 75])
+        self.assertEqual(list(chunk_lengths(np.ones(130), target_bytes=100, min_pings=60, max_pings=200)), [130])
+        self.assertEqual(len(chunk_lengths(np.ones(0))), 0)
+
+
+class TestAdaptiveChunkIds(unittest.TestCase):
+
+    def test_chunks_follow_transects(self):
+        transect = np.repeat([0, 1, 2], [250, 40, 130])
+        ids = adaptive_chunk_ids(transect, np.ones(len(transect)), target_bytes=100, target_dist=None,
+                                 min_pings=30, first_chunk=3)
+        self.assertEqual(ids[0], 3)
+        self.assertTrue((np.diff(ids) >= 0).all())
+        self.assertTrue(set(np.diff(ids)) <= {0, 1})
+        for c in np.unique(ids):
+            self.assertEqual(len(np.unique(transect[ids == c])), 1)
+        self.assertEqual(list(np.bincount(ids - 3)), [100, 100, 50, 40, 100, 30])
+
+
+class TestReassignChunks(unittest.TestCase):
+
+    def _son(self, **attrs):
+        son = sonObj.__new__(sonObj)
+        son.nchunk = 100
+        son.son8bit = True
+        for k, v in attrs.items():
+            setattr(son, k, v)
+        return son
+
+    def _df(self):
+        # Two transects (gap in the index), second with 4x longer pings
+        idx = np.r_[np.arange(0, 400), np.arange(500, 900)]
+        return pd.DataFrame({'ping_cnt': np.repeat([1000, 4000], 400),
+                             'trk_dist': np.arange(800) * 0.05}, index=idx)
+
+    def test_fixed_chunks_unchanged(self):
+        df = self._son()._reassignChunks(self._df())
+        np.testing.assert_array_equal(df['chunk_id'], np.arange(800) // 100)
+
+    def test_adaptive_chunks(self):
+        son = self._son(adaptive_chunks=True, chunk_target_mb=200000 / 2**20, chunk_target_m=100)
+        df = son._reassignChunks(self._df())
+        counts = df.groupby('chunk_id').size()
+        self.assertEqual(list(counts), [200, 200] + [50] * 8)
+        self.assertEqual(list(df.groupby('chunk_id')['transect'].nunique().unique()), [1])
+
+        # Distance target, with 16-bit samples
+        son = self._son(adaptive_chunks=True, son8bit=False, chunk_target_mb=100, chunk_target_m=7.5)
+        df = son._reassignChunks(self._df())
+        self.assertTrue((df.groupby('chunk_id').size() == 150).sum() >= 4)
+        self.assertEqual(df['chunk_id'].max() + 1, df['chunk_id'].nunique())
+
+
+if __name__ == '__main__':
+    unittest.main()
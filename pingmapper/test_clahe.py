@@ -0,0 +1,160 @@
+"""Unit tests for the OpenCV-based CLAHE engine and chunk seam blending."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.common import make_sonogram
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_clahe import (
+    CLAHE_LEVELS,
+    clahe,
+    clahe_lut,
+    level_histogram,
+    seam_weights,
+    to_clahe_levels,
+)
+
+
+class TestClahe(unittest.TestCase):
+
+    def test_close_to_skimage(self):
+        from skimage import exposure
+        arr = make_sonogram()
+        for clip_limit in (0.01, 0.03):
+            expected = exposure.equalize_adapthist(arr, clip_limit=clip_limit)
+            result = clahe(arr, clip_limit)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertLess(np.abs(result - expected).mean(), 0.05)
+
+    def test_lut_matches_single_tile(self):
+        arr = make_sonogram(64, 64, seed=1)
+        levels = to_clahe_levels(arr)
+        hist = np.bincount((levels // 257).ravel(), minlength=CLAHE_LEVELS)
+        for clip_limit in (0.005, 0.02, 1.0):
+            engine = cv2.createCLAHE(clipLimit=clip_limit * 65536.0, tileGridSize=(1, 1))
+            expected = engine.apply(levels) / 65535.0
+            result = clahe_lut(hist, clip_limit)[levels // 257]
+            np.testing.assert_allclose(result, expected, atol=2.0 / 65535)
+
+    def test_level_histogram(self):
+        hist = level_histogram([0.0, 5.0, 10.0, 20.0], [1, 2, 3, 4], 0.0, 10.0)
+        self.assertEqual(hist.sum(), 10)
+        self.assertEqual(hist[0], 1)
+        self.assertEqual(hist[128], 2)
+        self.assertEqual(hist[255], 7)
+
+    def test_seams_between_chunks(self):
+        whole = make_sonogram(400, 600, seed=2)
+        hist = np.bincount((to_clahe_levels(whole) // 257).ravel(), minlength=CLAHE_LEVELS)
+        lut = clahe_lut(hist, 0.01)
+        left, right = whole[:, :300], whole[:, 300:]
+
+        plain = [clahe(c, 0.01) for c in (left, right)]
+        blended = [clahe(c, 0.01, seam_lut=lut) for c in (left, right)]
+
+        # Both sides of the boundary use the shared mapping
+        np.testing.assert_array_equal(blended[0][:, -1], lut[to_clahe_levels(left[:, -1]) // 257])
+        np.testing.assert_array_equal(blended[1][:, 0], lut[to_clahe_levels(right[:, 0]) // 257])
+
+        # Interior pings are untouched
+        np.testing.assert_array_equal(blended[0][:, 60:240], plain[0][:, 60:240])
+
+        def seam(pair):
+            return np.abs(pair[0][:, -1].mean() - pair[1][:, 0].mean())
+        self.assertLess(seam(blended), seam(plain))
+
+    def test_seam_weights(self):
+        w = seam_weights(9, 4)
+        np.testing.assert_allclose(w, [0, 0.25, 0.5, 0.75, 1, 0.75, 0.5, 0.25, 0])
+        self.assertEqual(seam_weights(0, 4).size, 0)
+
+        # Ends without a neighbouring chunk keep the local result
+        np.testing.assert_allclose(seam_weights(9, 4, blend_start=False), [1, 1, 1, 1, 1, 0.75, 0.5, 0.25, 0])
+        np.testing.assert_allclose(seam_weights(5, 4, blend_end=False), [0, 0.25, 0.5, 0.75, 1])
+        self.assertTrue((seam_weights(5, 4, False, False) == 1).all())
+
+    def test_unblended_ends_match_plain(self):
+        arr01 = make_sonogram(200, 300, seed=5)
+        lut = clahe_lut(np.ones(CLAHE_LEVELS), 0.01)
+        plain = clahe(arr01, 0.01)
+        out = clahe(arr01, 0.01, seam_lut=lut, blend_start=False)
+        np.testing.assert_array_equal(out[:, :250], plain[:, :250])
+        self.assertFalse(np.array_equal(out[:, -1], plain[:, -1]))
+
+    def test_degenerate_shapes(self):
+        self.assertEqual(clahe(np.zeros((0, 5))).shape, (0, 5))
+        out = clahe(np.full((3, 2), 0.5), tile_grid=(8, 8))
+        self.assertEqual(out.shape, (3, 2))
+
+
+class TestDisplayEnhancements(unittest.TestCase):
+
+    def test_sonobj_uses_global_seam(self):
+        son = sonObj.__new__(sonObj)
+        son.sonar_clahe = True
+        son.sonar_clahe_global = True
+        son.sonar_clahe_clip_limit = 0.01
+        son._sonar_clahe_global_bounds = (0.0, 200.0)
+        son._sonar_clahe_global_hist = np.ones(CLAHE_LEVELS)
+
+        sonDat = (make_sonogram(200, 100, seed=3) * 255).astype(np.uint8)
+        out = son._apply_display_enhancements(sonDat)
+
+        self.assertEqual(out.shape, sonDat.shape)
+        self.assertTrue((out[sonDat == 0] == 0).all())
+        self.assertLessEqual(out.max(), 255.0)
+
+        # Flat global histogram: the first ping is mapped linearly
+        first = sonDat[:, 0]
+        levels = to_clahe_levels(np.clip(first / 200.0, 0, 1)) // 257
+        expected = clahe_lut(np.ones(CLAHE_LEVELS), 0.01)[levels] * 255.0
+        np.testing.assert_allclose(out[first > 0, 0], expected[first > 0], rtol=1e-5)
+
+    def test_sonobj_blends_only_chunk_seams(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        son = sonObj.__new__(sonObj)
+        son.sonMetaFile = os.path.join(tmp, 'B002_ss_port_meta.csv')
+        pd.DataFrame({'chunk_id': [0, 0, 1, 1, 2, 3],
+                      'transect': [0, 0, 0, 0, 0, 1]}).to_csv(son.sonMetaFile, index=False)
+
+        self.assertEqual(son._clahe_seam_ends(0), (False, True))
+        self.assertEqual(son._clahe_seam_ends(1), (True, True))
+        self.assertEqual(son._clahe_seam_ends(2), (True, False))
+        self.assertEqual(son._clahe_seam_ends(3), (False, False))
+        self.assertEqual(son._clahe_seam_ends(None), (True, True))
+
+        son.sonar_clahe = True
+        son.sonar_clahe_global = True
+        son.sonar_clahe_clip_limit = 0.01
+        son._sonar_clahe_global_bounds = (0.0, 200.0)
+        son._sonar_clahe_global_hist = np.ones(CLAHE_LEVELS)
+
+        sonDat = (make_sonogram(200, 100, seed=3) * 255).astype(np.uint8)
+        arr01 = np.clip(sonDat / 200.0, 0, 1).astype(np.float32)
+        expected = clahe(arr01, 0.01) * 255.0
+        expected[sonDat == 0] = 0
+        np.testing.assert_allclose(son._apply_display_enhancements(sonDat, 3), expected, rtol=1e-6)
+
+    def test_sonobj_tile_grid_setting(self):
+        son = sonObj.__new__(sonObj)
+        son.sonar_clahe = True
+        son.sonar_clahe_global = False
+        son.sonar_clahe_clip_limit = 0.02
+        son.sonar_clahe_tile_grid = 3
+
+        sonDat = (make_sonogram(200, 100, seed=4) * 255).astype(np.uint8)
+        arr01 = np.clip(sonDat / float(sonDat.max()), 0, 1).astype(np.float32)
+        expected = clahe(arr01, 0.02, tile_grid=(3, 3)) * 255.0
+        expected[sonDat == 0] = 0
+        np.testing.assert_allclose(son._apply_display_enhancements(sonDat), expected, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
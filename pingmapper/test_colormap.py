@@ -0,0 +1,107 @@
+"""Unit tests for colormap lookup tables used by colorized exports."""
+
+import unittest
+
+import numpy as np
+
+from pingmapper.benchmarks.common import loop_colorize
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_colormap import (
+    colorize,
+    colormap_palette,
+    colormap_size,
+    level_colormap_lut,
+    level_index_lut,
+    rgb_table,
+)
+
+CMAPS = ('copper', 'Greys_r', 'viridis')
+
+
+def _make_norm(shape=(64, 48), seed=0):
+    """Normalized data including 0, 1 and exact colormap entry edges."""
+    rng = np.random.default_rng(seed)
+    norm = rng.random(shape).astype(np.float32)
+    norm.flat[:257] = np.arange(257, dtype=np.float32) / 256
+    norm[0, :3] = [0.0, 1.0, np.nextafter(np.float32(1), np.float32(0))]
+    return norm
+
+
+class TestColorize(unittest.TestCase):
+
+    def test_matches_matplotlib(self):
+        norm = _make_norm()
+        valid = norm > 0.1
+        for name in CMAPS:
+            for scale_max, dtype in ((255.0, np.uint8), (65535.0, np.uint16)):
+                with self.subTest(name=name, dtype=dtype):
+                    result = colorize(norm, valid, name, scale_max, dtype)
+                    self.assertEqual(result.dtype, dtype)
+                    np.testing.assert_array_equal(result, loop_colorize(norm, valid, name, scale_max, dtype))
+
+    def test_tables_are_cached_and_read_only(self):
+        table = rgb_table('copper')
+        self.assertIs(table, rgb_table('copper', 255, 'uint8'))
+        self.assertFalse(table.flags.writeable)
+        self.assertEqual(colormap_size('copper'), 256)
+
+    def test_level_lut_keeps_no_data(self):
+        lut = level_colormap_lut('Greys_r', np.linspace(0, 1, 256, dtype=np.float32))
+        self.assertTrue((lut[0] == 0).all())
+        self.assertTrue((lut[1:] >= 1).all())
+
+
+class TestSonObjColormap(unittest.TestCase):
+
+    def setUp(self):
+        self.son = sonObj.__new__(sonObj)
+        rng = np.random.default_rng(1)
+        self.data16 = np.minimum(rng.gamma(2.0, 4000.0, (80, 60)), 65535).astype(np.uint16)
+        self.data16[:10] = 0
+
+    def test_sonar_array_8bit(self):
+        data = (self.data16 >> 8).astype(np.uint8)
+        for name in CMAPS:
+            norm = self.son._normalize_for_colormap(data, bit_depth=8)
+            expected = loop_colorize(norm, data > 0, name, 255.0, np.uint8)
+            np.testing.assert_array_equal(self.son._colorize_sonar_array(data, name), expected)
+
+    def test_sonar_array_16bit(self):
+        norm = self.son._normalize_for_colormap(self.data16, bit_depth=16)
+        for rgb_uint8, scale_max, dtype in ((True, 255.0, np.uint8), (False, 65535.0, np.uint16)):
+            expected = loop_colorize(norm, self.data16 > 0, 'copper', scale_max, dtype)
+            result = self.son._colorize_sonar_array(self.data16, 'copper', bit_depth=16, rgb_uint8=rgb_uint8)
+            np.testing.assert_array_equal(result, expected)
+
+    def test_pre_normalized_uint16(self):
+        norm = np.clip(self.data16.astype(np.float32) / 65535.0, 0.0, 1.0)
+        for rgb_uint8, scale_max, dtype in ((True, 255.0, np.uint8), (False, 65535.0, np.uint16)):
+            expected = loop_colorize(norm, self.data16 > 0, 'viridis', scale_max, dtype)
+            result = self.son._colorize_pre_normalized_uint16(self.data16, 'viridis', rgb_uint8=rgb_uint8)
+            np.testing.assert_array_equal(result, expected)
+
+
+class TestPalette(unittest.TestCase):
+
+    def test_palette_index_matches_rgb(self):
+        norm_levels = np.clip(np.arange(65536, dtype=np.float32) / 40000.0, 0.0, 1.0)
+        data = np.random.default_rng(2).integers(0, 65536, (50, 40)).astype(np.uint16)
+        data[:5] = 0
+
+        palette = colormap_palette('copper')
+        index = level_index_lut(norm_levels, len(palette))[data]
+
+        self.assertEqual(index.dtype, np.uint8)
+        self.assertTrue((index[:5] == 0).all())
+
+        # Valid samples hold their colormap entry, moved off 0 (no-data)
+        entry = np.minimum(norm_levels[data] * np.float32(256), 255).astype(np.uint8)
+        np.testing.assert_array_equal(index[5:], np.maximum(entry[5:], 1))
+
+        colors = np.array([palette[i][:3] for i in range(len(palette))], dtype=np.uint8)
+        np.testing.assert_array_equal(colors, rgb_table('copper')[:256])
+        self.assertEqual(palette[255][3], 255)
+
+
+if __name__ == '__main__':
+    unittest.main()
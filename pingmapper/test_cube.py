@@ -0,0 +1,148 @@
+"""Unit tests for the per-beam sonar cube store."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.synthetic import HUM_PING_DTYPE, write_humminbird
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_cube import ZarrArray, create_cube, cube_coords, open_cube
+
+
+class TestZarrArray(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data = np.random.default_rng(0).integers(0, 65535, (230, 17)).astype('uint16')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _written(self, level):
+        arr = ZarrArray.create(os.path.join(self.tmp, 'a{}'.format(level)), self.data.shape, 'uint16', 64, level=level)
+        for s, e in arr.chunk_ranges():
+            arr.write(s, self.data[s:e])
+        return ZarrArray(arr.path)
+
+    def test_round_trip_any_span(self):
+        for level in (1, 0):
+            arr = self._written(level)
+            self.assertEqual(arr.n_chunks, 4)
+            for start, end in [(0, 230), (5, 6), (60, 70), (63, 200), (199, 230)]:
+                np.testing.assert_array_equal(arr.read(start, end), self.data[start:end])
+            np.testing.assert_array_equal(arr[100], self.data[100])
+            np.testing.assert_array_equal(arr[-3:, 2], self.data[-3:, 2])
+
+    def test_zarr_v2_layout(self):
+        arr = self._written(1)
+        with open(os.path.join(arr.path, '.zarray')) as f:
+            meta = json.load(f)
+        self.assertEqual((meta['zarr_format'], meta['chunks'], meta['dtype']), (2, [64, 17], '<u2'))
+
+        # Edge chunks are stored at full chunk size, padded with the fill value
+        with open(os.path.join(arr.path, '3.0'), 'rb') as f:
+            last = np.frombuffer(zlib.decompress(f.read()), dtype='<u2').reshape(64, 17)
+        np.testing.assert_array_equal(last[:38], self.data[192:])
+        self.assertTrue((last[38:] == 0).all())
+
+    def test_unwritten_chunks_read_as_fill(self):
+        arr = ZarrArray.create(os.path.join(self.tmp, 'f'), (100, 3), 'float32', 40, fill_value=np.nan)
+        arr.write(40, np.ones((40, 3)))
+        out = arr.read(30, 90)
+        self.assertTrue(np.isnan(out[:10]).all())
+        self.assertTrue((out[10:50] == 1).all())
+        self.assertTrue(np.isnan(out[50:]).all())
+
+    def test_unaligned_writes_raise(self):
+        arr = ZarrArray.create(os.path.join(self.tmp, 'u'), (100, 3), 'uint8', 40)
+        for start, n in [(10, 30), (0, 50), (80, 30)]:
+            with self.assertRaises(ValueError):
+                arr.write(start, np.zeros((n, 3)))
+        arr.write(80, np.zeros((20, 3)))
+
+
+class TestSonarCube(unittest.TestCase):
+
+    def test_coordinates_and_ping_range(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            meta = pd.DataFrame({
+                'record_num': np.arange(50),
+                'transect': np.repeat([0, 1], 25),
+                'chunk_id': np.repeat(np.arange(5), 10).astype(float),
+                'date': ['2025-01-01'] * 50,
+            })
+            meta.loc[3, 'chunk_id'] = np.nan
+            coords = cube_coords(meta)
+            self.assertEqual(list(coords), ['record_num', 'transect', 'chunk_id'])
+
+            cube = create_cube(os.path.join(tmp, 'cube.zarr'), 50, 8, 'uint8', chunk_pings=16,
+                               coords=coords, attrs={'beam': 'ss_port'})
+            cube = open_cube(cube.path)
+            self.assertEqual(cube.attrs['beam'], 'ss_port')
+            self.assertEqual(cube.ping_range(transect=1), (25, 50))
+            self.assertEqual(cube.ping_range(transect=0, chunk_id=2), (20, 25))
+            self.assertEqual(cube.ping_range(chunk_id=9), (0, 0))
+            self.assertTrue(np.isnan(cube.coord('chunk_id')[3]))
+            self.assertIsNone(open_cube(os.path.join(tmp, 'missing.zarr')))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestExportCube(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_cube_holds_decoded_pings(self):
+        n, samples = 45, 120
+        write_humminbird(self.tmp, n_pings=n, n_beams=2, samples=samples)
+        sonFile = os.path.join(self.tmp, 'R00001', 'B002.SON')
+        rec = np.dtype([('head', HUM_PING_DTYPE), ('ping', 'u1', samples)])
+        pings = np.fromfile(sonFile, dtype=rec)['ping']
+
+        # Pings shorter than the record, one of them unreadable
+        ping_cnt = np.random.default_rng(0).integers(90, samples + 1, n)
+        meta = pd.DataFrame({
+            'record_num': np.arange(n),
+            'index': np.arange(n) * rec.itemsize,
+            'son_offset': HUM_PING_DTYPE.itemsize,
+            'ping_cnt': ping_cnt,
+            'transect': 0,
+            'chunk_id': np.arange(n) // 10,
+        })
+        meta.loc[7, 'index'] = np.nan
+        metaFile = os.path.join(self.tmp, 'B002_ss_port_meta.csv')
+        meta.to_csv(metaFile, index=False)
+
+        son = sonObj.__new__(sonObj)
+        son.sonFile = sonFile
+        son.sonMetaFile = metaFile
+        son.projDir = self.tmp
+        son.beamName = 'ss_port'
+        son.son8bit = True
+        son.flip_port = False
+        son.nchunk = 16
+        cube = son._exportCube(threadCnt=1)
+
+        self.assertEqual(son.cubeFile, os.path.join(self.tmp, 'ss_port', 'cube.zarr'))
+        self.assertEqual((cube.shape, cube.dtype, cube.chunk_pings), ((n, ping_cnt.max()), np.uint8, 16))
+        expected = np.zeros(cube.shape, dtype=np.uint8)
+        for i, cnt in enumerate(ping_cnt):
+            if i != 7:
+                expected[i, :cnt] = pings[i, :cnt]
+        np.testing.assert_array_equal(open_cube(son.cubeFile).read(), expected)
+        np.testing.assert_array_equal(cube.coord('chunk_id'), meta['chunk_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
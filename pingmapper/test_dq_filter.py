@@ -1,4 +1,4 @@
-"""Unit tests for _filterDQ / _applyDQEventState on sonObj."""
+"""Unit tests for _filterDQ on sonObj."""
 
 import io
 import unittest
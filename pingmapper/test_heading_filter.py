@@ -0,0 +1,81 @@
+"""Unit tests for the binned heading-deviation filter on sonObj."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.class_sonObj import sonObj
+
+
+def _loop_filter(df, dev, d):
+    """Reference filter built the way _filterHeading used to, one window at a time."""
+    dev = np.deg2rad(dev)
+    max_dist = df['trk_dist'].max()
+    df = df.copy()
+    df['filter'] = False
+
+    dist_start = 0
+    dist_end = dist_start + d
+    while dist_start < max_dist:
+        if dist_end < max_dist:
+            mask = (df['trk_dist'] >= dist_start) & (df['trk_dist'] < dist_end)
+        else:
+            mask = (df['trk_dist'] >= dist_start) & (df['trk_dist'] <= max_dist)
+        dfFilt = df.loc[mask]
+        head_vals = dfFilt['instr_heading'].to_numpy(copy=True)
+        head_vals = head_vals[np.isfinite(head_vals)]
+        if len(head_vals) > 1 and np.ptp(np.unwrap(np.deg2rad(head_vals))) < dev:
+            df.loc[dfFilt.index, 'filter'] = True
+        dist_start = dist_end
+        dist_end = dist_start + d
+
+    trk_step = df['trk_dist'].diff().abs()
+    jump_idx = trk_step[(trk_step > d) & np.isfinite(trk_step)].index
+    df.loc[jump_idx, 'filter'] = False
+    df.loc[jump_idx - 1, 'filter'] = False
+    return df
+
+
+def _make_track(n=5000, seed=0):
+    """Meandering trackline that repeatedly crosses north, with gaps and NaNs."""
+    rng = np.random.default_rng(seed)
+    step = rng.uniform(0.0, 0.4, n)
+    step[rng.choice(n, 5, replace=False)] = 25.0  # GPS jumps
+    heading = (np.cumsum(rng.normal(0, 1.5, n)) + 350) % 360
+    heading[rng.choice(n, 50, replace=False)] = np.nan
+    return pd.DataFrame({'trk_dist': np.cumsum(step), 'instr_heading': heading})
+
+
+class TestHeadingFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.son = sonObj.__new__(sonObj)
+
+    def _assert_matches_loop(self, df, dev, d):
+        expected = _loop_filter(df, dev, d)
+        result = self.son._filterHeading(df, dev, d)
+        pd.testing.assert_series_equal(result['filter'], expected['filter'])
+        self.assertNotIn('filter', df.columns)
+
+    def test_matches_window_loop(self):
+        df = _make_track()
+        for dev, d in [(5, 10), (20, 10), (20, 3.3), (45, 50)]:
+            self._assert_matches_loop(df, dev, d)
+
+    def test_pings_on_window_edges(self):
+        # Distances on exact multiples of d, including max_dist itself
+        df = pd.DataFrame({'trk_dist': np.repeat(np.arange(0, 10.5, 0.5), 2),
+                           'instr_heading': np.resize([359.0, 1.0, 10.0, 2.0], 42)})
+        for d in (0.5, 1.0, 0.1 * 3):
+            self._assert_matches_loop(df, 15, d)
+
+    def test_nan_distance_is_rejected(self):
+        df = _make_track(500, seed=1)
+        df.iloc[10:20, 0] = np.nan
+        self._assert_matches_loop(df, 20, 10)
+        self.assertFalse(self.son._filterHeading(df, 20, 10)['filter'].iloc[10:20].any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""Unit tests for global intensity sketches and their persistence."""
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_intensity import (
+    DB_RESOLUTION,
+    QuantileSketch,
+    intensity_stats_path,
+    load_intensity_stats,
+    merge_sketches,
+    save_intensity_stats,
+)
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_integer_percentiles_are_exact(self):
+        rng = np.random.default_rng(0)
+        for hi in (256, 65536):
+            x = rng.integers(1, hi, 50001)
+            sketch = QuantileSketch().update(x)
+            self.assertEqual(sketch.level, 0)
+            for q in (0, 1.0, 37.3, 50, 99.5, 100):
+                self.assertAlmostEqual(sketch.percentile(q), np.percentile(x, q))
+
+    def test_merge_is_order_independent(self):
+        rng = np.random.default_rng(1)
+        parts = [rng.uniform(0, 10 ** k, 1000) for k in (1, 6, 3, 2)]
+        a = merge_sketches([QuantileSketch().update(p) for p in parts])
+        b = merge_sketches([QuantileSketch().update(p) for p in parts[::-1]])
+        c = QuantileSketch().update(np.concatenate(parts))
+        for s in (b, c):
+            self.assertEqual(s.level, a.level)
+            np.testing.assert_array_equal(s.counts, a.counts)
+        self.assertGreater(a.level, 0)
+
+    def test_float_percentiles_within_one_bin(self):
+        x = np.random.default_rng(2).gamma(2.0, 8.0, 20000)
+        sketch = QuantileSketch(resolution=DB_RESOLUTION).update(np.r_[x, np.nan, -1.0, np.inf])
+        self.assertEqual(sketch.n, len(x))
+        for q in (1.0, 50, 99.5):
+            self.assertLessEqual(abs(sketch.percentile(q) - np.percentile(x, q)), sketch.width)
+
+    def test_bounds_fall_back_to_range(self):
+        sketch = QuantileSketch().update(np.r_[np.full(1000, 7), 9])
+        self.assertEqual(sketch.bounds(1.0, 99.5), (7.0, 9.0))
+        self.assertIsNone(QuantileSketch().update([5, 5]).bounds())
+        self.assertIsNone(QuantileSketch().bounds())
+
+
+class TestIntensityStatsFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = intensity_stats_path(os.path.join(self.tmp, 'B002_ss_port_meta.csv'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_path_next_to_metadata(self):
+        self.assertEqual(os.path.basename(self.path), 'B002_ss_port_intensity.npz')
+
+    def test_round_trip_keeps_other_sketches(self):
+        raw = QuantileSketch().update(np.arange(1, 256))
+        db = QuantileSketch(resolution=DB_RESOLUTION).update([0.5, 20.0, 48.1])
+        save_intensity_stats(self.path, {'raw': raw, 'db': db})
+        save_intensity_stats(self.path, {'rect_wcp': QuantileSketch().update([100, 200])})
+
+        stats = load_intensity_stats(self.path)
+        self.assertEqual(sorted(stats), ['db', 'raw', 'rect_wcp'])
+        np.testing.assert_array_equal(stats['raw'].counts, raw.counts)
+        self.assertEqual(stats['db'].resolution, DB_RESOLUTION)
+        self.assertEqual(stats['db'].bounds(0, 100), (0.5, 48.1))
+
+        save_intensity_stats(self.path, {'raw': raw}, replace=True)
+        self.assertEqual(sorted(load_intensity_stats(self.path)), ['raw'])
+
+    def test_missing_file(self):
+        self.assertEqual(load_intensity_stats(self.path), {})
+
+
+class TestClaheGlobalBounds(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_legacy_project_decodes_once_in_parent(self):
+        son = sonObj.__new__(sonObj)
+        son.sonMetaFile = os.path.join(self.tmp, 'B002_ss_port_meta.csv')
+        son.sonar_clahe_global = True
+        calls = []
+
+        def calc(threadCnt=0, decode=True):
+            calls.append(threadCnt)
+            stats = {'raw': QuantileSketch().update(np.arange(1, 256))}
+            save_intensity_stats(intensity_stats_path(son.sonMetaFile), stats)
+            return stats
+        son._calcIntensityStats = calc
+
+        bounds = son._ensure_clahe_global_bounds(threadCnt=4)
+        self.assertEqual(calls, [4])
+        self.assertIsNotNone(bounds)
+
+        # Workers receive a copy with the bounds cached
+        del son._calcIntensityStats
+        worker = pickle.loads(pickle.dumps(son))
+        worker._calcIntensityStats = calc
+        self.assertEqual(worker._ensure_clahe_global_bounds(), bounds)
+        self.assertEqual(calls, [4])
+
+
+class TestTileExportSketch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def make_son(self):
+        son = sonObj.__new__(sonObj)
+        son.outDir = self.tmp
+        son.sonMetaFile = os.path.join(self.tmp, 'B002_ss_port_meta.csv')
+        son.sonMetaDF = pd.DataFrame({'chunk_id': [0, 0, 1], 'ping_cnt': [50, 50, 50], 'pixM': 0.02})
+        son.wcp = son.wcm = son.wco = True
+        son.wcr_src = False
+        son.egn = False
+        son.remShadow = 0
+        son.decoded = []
+
+        def load(chunk):
+            son.decoded.append(chunk)
+            son.sonDat = np.arange(1, 101, dtype=np.uint8).reshape(50, 2) * (chunk + 1)
+        son._getScanChunkSingle = load
+        son._WCR_crop = son._WCO = lambda sonMeta, crop=0: None
+        son._writeTilesPlot = lambda *args, **kwargs: None
+        son._tile_writer = lambda: type('W', (), {'flush': lambda self: {'files': 1}})()
+        return son
+
+    def test_sketches_first_decode(self):
+        son = self.make_son()
+        stats, sketch = son._exportTilesSpd(1, sketch=True)
+        self.assertEqual(stats, {'files': 1})
+        self.assertEqual(son.decoded, [1, 1, 1])
+        self.assertEqual(sketch['raw'].n, 100)
+        self.assertEqual(sketch['raw'].bounds(0, 100), (2.0, 200.0))
+        self.assertFalse(hasattr(son, '_chunkSketch'))
+
+        son.decoded = []
+        self.assertIsNone(son._exportTilesSpd(0)[1])
+        self.assertEqual(son.decoded, [0, 0, 0])
+
+    def test_parent_merges_task_sketches(self):
+        son = self.make_son()
+        son._sonar_clahe_global_bounds = (0.0, 1.0)
+        chunk_stats = [son._exportTilesSpd(c, sketch=True)[1] for c in (0, 1)]
+        son._intensityCalcGlobalStats(chunk_stats + [None])
+
+        stats = son._getIntensityStats()
+        self.assertEqual(sorted(stats), ['db', 'raw'])
+        self.assertEqual(stats['raw'].n, 200)
+        self.assertFalse(hasattr(son, '_sonar_clahe_global_bounds'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Unit tests for the vectorized time-interval engine."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.common import loop_interval_mask, make_intervals
+from pingmapper.funcs_intervals import event_lookup, interval_mask, parse_datetimes
+
+
+class TestIntervalMask(unittest.TestCase):
+
+    def test_matches_interval_loop(self):
+        for n_intervals in (10, 50, 500):
+            times, starts, ends = make_intervals(3000, n_intervals, seed=n_intervals)
+            np.testing.assert_array_equal(interval_mask(times, starts, ends),
+                                          loop_interval_mask(times, starts, ends))
+
+    def test_closed_bounds_and_nested_intervals(self):
+        times = np.array([0.0, 1.0, 2.0, 5.0, 7.0, 9.0, 10.0, 11.0])
+        # [1, 10] contains [2, 5]; a later short interval must not hide it
+        mask = interval_mask(times, [1.0, 2.0, 6.0], [10.0, 5.0, 6.5])
+        self.assertEqual(mask.tolist(), [False, True, True, True, True, True, True, False])
+
+    def test_datetimes_and_missing_bounds(self):
+        times = pd.to_datetime(['2024-01-01 00:00:01', None, '2024-01-01 00:00:05']).to_numpy()
+        starts = pd.to_datetime(['2024-01-01 00:00:00', None]).to_numpy()
+        ends = pd.to_datetime(['2024-01-01 00:00:02', '2024-01-01 00:00:09']).to_numpy()
+        self.assertEqual(interval_mask(times, starts, ends).tolist(), [True, False, False])
+        self.assertFalse(interval_mask(times, [], []).any())
+
+
+class TestEventLookup(unittest.TestCase):
+
+    def test_step_function(self):
+        values, found = event_lookup([0.5, 1.0, 1.5, 3.0, np.nan, 9.0],
+                                     [3.0, 1.0, 2.0], ['c', 'a', 'b'])
+        self.assertEqual(found.tolist(), [False, True, True, True, False, True])
+        self.assertEqual(values[found].tolist(), ['a', 'a', 'c', 'c'])
+
+    def test_duplicate_times_last_event_wins(self):
+        values, found = event_lookup([1.0, 2.0], [1.0, 1.0, 1.0], [True, True, False])
+        self.assertEqual(values.tolist(), [False, False])
+        self.assertTrue(found.all())
+
+    def test_no_events(self):
+        values, found = event_lookup([1.0, 2.0], [np.nan], [True])
+        self.assertFalse(found.any())
+
+
+class TestParseDatetimes(unittest.TestCase):
+
+    def test_matches_mixed_parser(self):
+        for vals in (['2024-01-01 00:00:01', '2024-01-01 00:00:01.250000', 'nan nan'],
+                     ['2024-01-01T00:00:10+00:00'],
+                     ['01/02/2024 10:00', '2024-01-01']):
+            s = pd.Series(vals)
+            pd.testing.assert_series_equal(parse_datetimes(s),
+                                           pd.to_datetime(s, errors='coerce', format='mixed'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Unit tests for vectorized substrate label post-processing kernels."""
+
+import unittest
+
+import numpy as np
+
+from pingmapper.benchmarks.common import loop_fill_runs, loop_fill_span
+from pingmapper.funcs_label import bed_mask, fill_zero_runs, fill_zero_span
+
+
+def _random_label(rng, H=60, W=40):
+    label = rng.integers(1, 5, (H, W)).astype('uint8')
+    # Sprinkle runs of zeros of varying length, incl. at the bed and bottom
+    for _ in range(80):
+        p = rng.integers(0, W)
+        r = rng.integers(0, H)
+        label[r:r + rng.integers(1, 12), p] = 0
+    label[:, 0] = 0  # entire ping empty
+    label[-1, 1] = 0  # single zero at the bottom
+    bedPick = rng.integers(0, H // 2, W)
+    bedPick[2] = H - 1  # one-sample ping below the bed
+    bedPick[3] = H  # no samples below the bed
+    return label, bedPick
+
+
+class TestLabelKernels(unittest.TestCase):
+
+    def test_bed_mask(self):
+        mask = bed_mask([0, 2, 5], (4, 3))
+        expected = np.zeros((4, 3), dtype=bool)
+        for p, s in enumerate([0, 2, 5]):
+            expected[s:, p] = True
+        np.testing.assert_array_equal(mask, expected)
+        self.assertEqual(bed_mask([1, 2], (3, 2, 4)).shape, (3, 2, 4))
+
+    def test_fill_zero_span_matches_loop(self):
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            label, bedPick = _random_label(rng)
+            np.testing.assert_array_equal(fill_zero_span(label, bedPick), loop_fill_span(label, bedPick))
+
+    def test_fill_zero_span_clears_class_below_bed(self):
+        rng = np.random.default_rng(2)
+        for _ in range(20):
+            label, bedPick = _random_label(rng)
+            label[rng.random(label.shape) < 0.05] = 8
+            ref = np.where(bed_mask(bedPick, label.shape) & (label == 8), 0, label)
+            np.testing.assert_array_equal(fill_zero_span(label, bedPick, clear_value=8),
+                                          loop_fill_span(ref, bedPick))
+
+    def test_fill_zero_runs_matches_loop(self):
+        rng = np.random.default_rng(1)
+        for _ in range(50):
+            label, bedPick = _random_label(rng)
+            np.testing.assert_array_equal(fill_zero_runs(label, bedPick), loop_fill_runs(label, bedPick))
+
+
+if __name__ == '__main__':
+    unittest.main()
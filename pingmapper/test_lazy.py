@@ -0,0 +1,73 @@
+"""Unit tests for deferred imports."""
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pingmapper.funcs_lazy import lazy_attr, lazy_import, module_available
+
+_MODULE = '''
+REGISTRY = {'a': 1}
+
+def double(x):
+    return 2 * x
+'''
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.name = '_lazy_probe_{}'.format(os.path.basename(self.tmp))
+        with open(os.path.join(self.tmp, self.name + '.py'), 'w') as f:
+            f.write(_MODULE)
+        sys.path.insert(0, self.tmp)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp)
+        sys.modules.pop(self.name, None)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_module_imported_on_first_attribute(self):
+        mod = lazy_import(self.name)
+        self.assertNotIn(self.name, sys.modules)
+        self.assertIn('lazy module', repr(mod))
+        self.assertEqual(mod.double(2), 4)
+        self.assertIn(self.name, sys.modules)
+
+    def test_setup_runs_once_before_import(self):
+        calls = []
+
+        def setup():
+            calls.append(self.name in sys.modules)
+
+        mod = lazy_import(self.name, setup)
+        mod.double(1)
+        mod.double(1)
+        self.assertEqual(calls, [False])
+
+    def test_attr_call_and_container(self):
+        double = lazy_attr(self.name, 'double')
+        registry = lazy_attr(self.name, 'REGISTRY')
+        self.assertNotIn(self.name, sys.modules)
+        self.assertEqual(double(3), 6)
+        self.assertEqual(registry['a'], 1)
+        self.assertIn('a', registry)
+        self.assertEqual(list(registry), ['a'])
+
+    def test_pickled_attr_stays_lazy(self):
+        double = pickle.loads(pickle.dumps(lazy_attr(self.name, 'double')))
+        self.assertNotIn(self.name, sys.modules)
+        self.assertEqual(double(5), 10)
+
+    def test_module_available_does_not_import(self):
+        self.assertTrue(module_available(self.name))
+        self.assertNotIn(self.name, sys.modules)
+        self.assertFalse(module_available('_no_such_module_here'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Unit tests for the lookup-table intensity transforms on integer samples."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pingmapper.benchmarks.common import array_db_transform, array_to_uint8, make_samples
+from pingmapper.benchmarks.synthetic import HUM_PING_DTYPE, write_humminbird
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_intensity import DB_RESOLUTION, QuantileSketch
+from pingmapper.funcs_lut import db_lut, level_counts, sample_storage_dtype, uint8_lut
+
+
+def _array_float_to_uint8(arr):
+    """Reference percentile stretch of float samples, two nanpercentile calls."""
+    arr = np.array(arr, dtype=np.float32)
+    arr[~np.isfinite(arr)] = 0.0
+    arr[arr < 0] = 0.0
+    vals = arr[arr > 0]
+    lo = float(np.nanpercentile(vals, 1.0))
+    hi = float(np.nanpercentile(vals, 99.5))
+    return np.clip((arr - lo) * (255.0 / (hi - lo)), 0, 255).astype(np.uint8)
+
+
+class TestLut(unittest.TestCase):
+
+    def setUp(self):
+        self.son = sonObj.__new__(sonObj)
+        self.son.son8bit = False
+
+    def test_db_transform_matches_samples(self):
+        for dtype in (np.uint8, np.uint16):
+            arr = make_samples(dtype)
+            arr[arr < 3] = 0
+            result = self.son._apply_display_db_transform(arr, db_transform=True)
+            self.assertEqual(result.dtype, np.float32)
+            np.testing.assert_array_equal(result, array_db_transform(arr))
+
+    def test_db_transform_all_zero(self):
+        arr = np.zeros((5, 4), dtype=np.uint8)
+        self.assertIsNone(db_lut(level_counts(arr)))
+        self.assertFalse(self.son._apply_display_db_transform(arr, db_transform=True).any())
+
+    def test_uint16_to_uint8(self):
+        plain = make_samples(np.uint16)
+        cases = {
+            'plain': plain,
+            'packed12': ((plain >> 12) << 8).astype(np.uint16),
+            'packed16': (plain & 0xFF00).astype(np.uint16),
+            'zero': np.zeros((4, 4), dtype=np.uint16),
+        }
+        for name, arr in cases.items():
+            with self.subTest(name):
+                np.testing.assert_array_equal(self.son._convert_son_dat_to_uint8(arr), array_to_uint8(arr))
+                # Wider integer arrays take the same route
+                np.testing.assert_array_equal(self.son._convert_son_dat_to_uint8(arr.astype(np.int64)), array_to_uint8(arr))
+        self.assertIsNone(uint8_lut(level_counts(cases['zero'])))
+
+    def test_float_stretch_unchanged(self):
+        arr = make_samples(np.uint16).astype(np.float32) * np.float32(0.37)
+        arr[0, :3] = [np.nan, -1.0, np.inf]
+        np.testing.assert_array_equal(self.son._convert_son_dat_to_uint8(arr.copy()), _array_float_to_uint8(arr))
+
+    def test_uint8_passes_through(self):
+        self.son.son8bit = True
+        arr = make_samples(np.uint8)
+        self.assertIs(self.son._convert_son_dat_to_uint8(arr), arr)
+
+    def test_storage_dtype(self):
+        self.assertEqual(sample_storage_dtype(True, '<u2'), np.uint8)
+        self.assertEqual(sample_storage_dtype(False), np.uint16)
+        self.assertEqual(sample_storage_dtype(False, '>u1'), np.uint16)
+        self.assertEqual(sample_storage_dtype(False, '<i2'), np.int64)
+        self.assertEqual(sample_storage_dtype(False, '<u4'), np.int64)
+
+
+class TestDecode(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_samples_decode_in_own_bit_depth(self):
+        write_humminbird(self.tmp, n_pings=40, n_beams=2, samples=120)
+        sonFile = os.path.join(self.tmp, 'R00001', 'B002.SON')
+        rec = np.dtype([('head', HUM_PING_DTYPE), ('ping', 'u1', 120)])
+        pings = np.fromfile(sonFile, dtype=rec)['ping']
+
+        son = sonObj.__new__(sonObj)
+        son.sonFile = sonFile
+        son.son8bit = True
+        son.flip_port = False
+        son.export_16bit = False
+        son.pingMax = 120
+        son.pingCnt = np.full(40, 120)
+        son.headIdx = np.arange(40) * rec.itemsize
+        son.son_offset = np.full(40, HUM_PING_DTYPE.itemsize)
+        son.bytesPerSample = np.ones(40)
+        son._loadSonChunk()
+
+        self.assertEqual(son.sonDat.dtype, np.uint8)
+        np.testing.assert_array_equal(son.sonDat, pings.T)
+
+
+class TestChunkStats(unittest.TestCase):
+
+    def test_histogram_sketches_match_samples(self):
+        son = sonObj.__new__(sonObj)
+        sonDat = make_samples(np.uint8, seed=1)
+
+        def load(chunk):
+            son.sonDat = sonDat
+        son._getScanChunkSingle = load
+        stats = son._intensityCalcChunkStats(0)
+
+        db = array_db_transform(sonDat)
+        expected = {
+            'raw': QuantileSketch().update(sonDat[sonDat > 0]),
+            'db': QuantileSketch(resolution=DB_RESOLUTION).update(db[db > 0]),
+        }
+        self.assertEqual(set(stats), set(expected))
+        for key, sketch in expected.items():
+            meta, counts = stats[key].to_arrays()
+            np.testing.assert_array_equal(meta, sketch.to_arrays()[0])
+            np.testing.assert_array_equal(counts, sketch.to_arrays()[1])
+
+    def test_weighted_update_skips_empty_levels(self):
+        sketch = QuantileSketch().update([0, 5, 9, 12], [3, 0, 2, 0])
+        self.assertEqual(sketch.n, 5)
+        self.assertEqual((sketch.vmin, sketch.vmax), (0.0, 9.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
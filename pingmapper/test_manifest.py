@@ -0,0 +1,147 @@
+"""Unit tests for manifest-based sonObj state."""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.funcs_manifest import (
+    MANIFEST_VERSION,
+    ManifestState,
+    find_meta_files,
+    manifest_path,
+)
+
+
+class _Son(ManifestState):
+    """Stand-in for sonObj: any ManifestState child behaves the same."""
+
+
+def _make_son():
+    son = _Son()
+    son.beamName = 'ss_port'
+    son.nchunk = np.int64(500)
+    son.pixM = np.float64(0.02)
+    son.humDat = {'water_type': 'fresh', 'numrecords': 10}
+    son.son_colorMap = {0: (0, 0, 0, 255), 1: (1, 1, 1, 255)}
+    son.egn_bed_means = np.linspace(0, 1, 1000, dtype='float32')
+    son.sonMetaDF = pd.DataFrame({'record_num': np.arange(5)})
+    return son
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.metaFile = manifest_path(os.path.join(self.tmp, 'B002_ss_port_meta.csv'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _reopen(self):
+        son = _Son()
+        son._loadManifest(self.metaFile)
+        return son
+
+    def test_scalars_in_json_arrays_in_sidecars(self):
+        _make_son()._saveManifest(self.metaFile)
+        with open(self.metaFile) as f:
+            manifest = json.load(f)
+
+        self.assertEqual(manifest['version'], MANIFEST_VERSION)
+        self.assertEqual(manifest['attrs']['nchunk'], 500)
+        self.assertEqual(manifest['attrs']['humDat']['water_type'], 'fresh')
+        self.assertEqual(manifest['sidecars']['egn_bed_means']['kind'], 'npy')
+        self.assertEqual(manifest['sidecars']['son_colorMap']['kind'], 'pickle')
+        self.assertEqual(manifest['sidecars']['sonMetaDF']['kind'], 'pickle')
+
+    def test_sidecars_attach_lazily(self):
+        ref = _make_son()
+        ref._saveManifest(self.metaFile)
+        son = self._reopen()
+
+        self.assertEqual(son.beamName, 'ss_port')
+        self.assertNotIn('egn_bed_means', son.__dict__)
+        self.assertTrue(hasattr(son, 'egn_bed_means'))
+
+        arr = son.egn_bed_means
+        self.assertIsInstance(arr, np.memmap)
+        self.assertFalse(arr.flags.writeable)
+        np.testing.assert_array_equal(arr, ref.egn_bed_means)
+        self.assertEqual(son.son_colorMap[1], (1, 1, 1, 255))
+        pd.testing.assert_frame_equal(son.sonMetaDF, ref.sonMetaDF)
+        self.assertFalse(hasattr(son, 'missing'))
+
+    def test_set_and_delete_shadow_sidecars(self):
+        _make_son()._saveManifest(self.metaFile)
+        son = self._reopen()
+
+        del son.sonMetaDF
+        self.assertFalse(hasattr(son, 'sonMetaDF'))
+        son.egn_bed_means = np.zeros(3)
+        np.testing.assert_array_equal(son.egn_bed_means, np.zeros(3))
+
+    def test_resave_keeps_unloaded_and_drops_deleted(self):
+        _make_son()._saveManifest(self.metaFile)
+        son = self._reopen()
+        son.egn_bed_means  # attach, then save over its own sidecar
+        del son.sonMetaDF
+        son._saveManifest(self.metaFile)
+
+        files = sorted(os.listdir(self.tmp))
+        self.assertNotIn('B002_ss_port_meta.sonMetaDF.pkl', files)
+        self.assertIn('B002_ss_port_meta.son_colorMap.pkl', files)
+
+        son = self._reopen()
+        self.assertEqual(son.son_colorMap[0], (0, 0, 0, 255))
+        self.assertEqual(float(son.egn_bed_means[-1]), 1.0)
+
+    def test_pickles_small_before_attach(self):
+        _make_son()._saveManifest(self.metaFile)
+        son = pickle.loads(pickle.dumps(self._reopen()))
+        self.assertNotIn('sonMetaDF', son.__dict__)
+        self.assertEqual(len(son.sonMetaDF), 5)
+
+    def test_newer_version_is_rejected(self):
+        _make_son()._saveManifest(self.metaFile)
+        with open(self.metaFile) as f:
+            manifest = json.load(f)
+        manifest['version'] = MANIFEST_VERSION + 1
+        with open(self.metaFile, 'w') as f:
+            json.dump(manifest, f)
+        with self.assertRaises(ValueError):
+            self._reopen()
+
+
+class TestLegacyMeta(unittest.TestCase):
+
+    def test_legacy_meta_loads_and_manifest_wins(self):
+        root = tempfile.mkdtemp()
+        tmp = os.path.join(root, 'proj', 'meta')
+        os.makedirs(tmp)
+        try:
+            legacy = os.path.join(tmp, 'B002_ss_port_meta.meta')
+            with open(legacy, 'wb') as f:
+                pickle.dump(_make_son(), f)
+            other = os.path.join(tmp, 'B003_ss_star_meta.meta')
+            shutil.copyfile(legacy, other)
+
+            son = _Son()
+            son._loadManifest(legacy)
+            self.assertEqual(son.beamName, 'ss_port')
+
+            son._saveManifest(manifest_path(os.path.join(tmp, 'B002_ss_port_meta.csv')))
+            self.assertEqual([os.path.basename(f) for f in find_meta_files(tmp)],
+                             ['B002_ss_port_meta.manifest.json', 'B003_ss_star_meta.meta'])
+            self.assertEqual(len(find_meta_files(root, '*ss_port_meta', recursive=True)), 1)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
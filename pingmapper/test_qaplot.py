@@ -0,0 +1,108 @@
+"""Unit tests for headless QA figure rendering."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from pingmapper.funcs_qaplot import (
+    blend_labels,
+    blend_scalar,
+    colormap_lut,
+    draw_trace,
+    gray_image,
+    grid,
+    legend_image,
+    paste,
+    save_image,
+    softmax,
+    to_bgr,
+)
+
+
+class TestOverlays(unittest.TestCase):
+
+    def test_gray_image_autoscales(self):
+        arr = np.array([[10.0, 20.0], [30.0, np.nan]])
+        img = gray_image(arr)
+        self.assertEqual(img.shape, (2, 2, 3))
+        self.assertEqual(img[0, 0, 0], 0)
+        self.assertEqual(img[1, 0, 0], 255)
+        self.assertEqual(img[1, 1, 0], 0)
+
+    def test_trace_breaks_on_nan(self):
+        img = np.zeros((40, 20, 3), dtype='uint8')
+        x = np.full(40, 10.0)
+        x[15:25] = np.nan
+        draw_trace(img, x, 'red', dash=None)
+
+        drawn = img[:, :, 2].max(axis=1) > 0
+        self.assertTrue(drawn[:15].all())
+        self.assertFalse(drawn[16:24].any())
+        self.assertTrue(drawn[25:].all())
+        self.assertEqual(tuple(img[5, 10]), to_bgr('red'))
+
+    def test_dashdot_trace_has_gaps(self):
+        img = np.zeros((44, 20, 3), dtype='uint8')
+        draw_trace(img, np.full(44, 5.0), 'lime')
+        drawn = img[:, 5, 1] > 0
+        self.assertGreater(drawn.sum(), 20)
+        self.assertLess(drawn.sum(), 44)
+
+    def test_blend_labels_masks_to_black(self):
+        base = np.full((2, 2, 3), 200, dtype='uint8')
+        label = np.array([[0, 1], [1, 0]])
+        mask = np.array([[False, False], [False, True]])
+        out = blend_labels(base, label, ['#000000', '#FFFFFF'], mask=mask, alpha=0.5)
+        self.assertEqual(out[0, 0, 0], 100)
+        self.assertEqual(out[0, 1, 0], 228)
+        self.assertEqual(out[1, 1, 0], 100)
+
+    def test_blend_scalar_leaves_nan(self):
+        base = np.full((1, 3, 3), 50, dtype='uint8')
+        out = blend_scalar(base, np.array([[0.0, np.nan, 1.0]]), 0.0, 1.0, alpha=1.0)
+        np.testing.assert_array_equal(out[0, 0], colormap_lut('viridis')[0])
+        np.testing.assert_array_equal(out[0, 1], base[0, 1])
+        np.testing.assert_array_equal(out[0, 2], colormap_lut('viridis')[-1])
+
+    def test_softmax_sums_to_one(self):
+        x = np.random.default_rng(0).normal(size=(4, 5, 3))
+        np.testing.assert_allclose(softmax(x).sum(axis=-1), 1.0, rtol=1e-6)
+
+
+class TestLayout(unittest.TestCase):
+
+    def test_legend_is_cached_and_drawn(self):
+        a = legend_image(('Auto Depth',), ('blue',), styles=('-.',))
+        b = legend_image(('Auto Depth',), ('blue',), styles=('-.',))
+        self.assertIs(a, b)
+        self.assertEqual(a.ndim, 3)
+        self.assertLess(a.min(), 255)
+
+    def test_paste_falls_back_to_stacking(self):
+        img = np.zeros((50, 50, 3), dtype='uint8')
+        small = np.full((10, 10, 3), 7, dtype='uint8')
+        big = np.full((10, 80, 3), 7, dtype='uint8')
+        self.assertEqual(paste(img, small).shape, img.shape)
+        self.assertEqual(paste(img, small)[-5, -5, 0], 7)
+        self.assertEqual(paste(img, big).shape, (60, 80, 3))
+
+    def test_grid_shape(self):
+        panels = [np.zeros((10, 20, 3), dtype='uint8')] * 5
+        out = grid(panels, ncols=2, gap=2)
+        self.assertEqual(out.shape, (3 * 10 + 2 * 2, 2 * 20 + 2, 3))
+
+    def test_save_image(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            f = save_image(os.path.join(tmp, 'plot.png'), np.zeros((4, 4, 3), dtype='uint8'))
+            self.assertEqual(cv2.imread(f).shape, (4, 4, 3))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
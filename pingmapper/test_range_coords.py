@@ -0,0 +1,105 @@
+"""Unit tests for range extent coordinates."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyproj
+
+from pingmapper.class_rectObj import rectObj
+
+
+def make_trackline(n=300, chunk=70, seed=0):
+    rng = np.random.default_rng(seed)
+    record = np.arange(n)
+    time_s = record * 0.1
+    # Time steps backwards in the second chunk
+    time_s[chunk + 10:chunk + 20] -= 5.0
+    lons = -89.0 + np.cumsum(rng.normal(1e-5, 2e-6, n))
+    lats = 31.0 + np.cumsum(rng.normal(1e-5, 2e-6, n))
+    return pd.DataFrame({
+        'record_num': record,
+        'chunk_id': record // chunk,
+        'ping_cnt': np.where(record % 7 == 0, 900, 1000),
+        'time_s': time_s,
+        'pixM': 0.02,
+        'lons': lons,
+        'lats': lats,
+        'utm_es': 0.0,
+        'utm_ns': 0.0,
+        'dep_m': 2.0,
+        'instr_heading': 45.0,
+        'cog': np.linspace(40.0, 50.0, n),
+        'transect': 0,
+    })
+
+
+def make_son(beamName, smthTrk, metaDir):
+    son = rectObj.__new__(rectObj)
+    son.beamName = beamName
+    son.metaDir = metaDir
+    son.smthTrk = smthTrk.copy()
+    son.smthTrkFile = os.path.join(metaDir, 'Trackline_Smth_'+beamName+'.csv')
+    son.sonMetaDF = smthTrk[['chunk_id', 'pixM']].copy()
+    son.trans = pyproj.Proj('EPSG:32616')
+    son._loadSonMeta = lambda: None
+    son._saveSon = lambda: None
+    return son
+
+
+class TestRangeCoords(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_matches_per_chunk_splines(self):
+        trk = make_trackline()
+        port = make_son('ss_port', trk, self.tmp)
+        star = make_son('ss_star', trk, self.tmp)
+        port._getRangeCoords(filt=10, sons=[port, star])
+
+        for son in (port, star):
+            sDF = son.smthTrk
+            for chunk, schunkDF in sDF.groupby('chunk_id', sort=True):
+                knots = pd.concat([schunkDF.iloc[::10], schunkDF.iloc[-1:]])
+                ref = son._interpTrack(df=knots.reset_index(drop=True), dfOrig=schunkDF.copy(),
+                                       xlon='range_lon', ylat='range_lat', xutm='range_e',
+                                       yutm='range_n', filt=0, deg=1)
+                out = son.rangeExt.loc[schunkDF['record_num']]
+                np.testing.assert_allclose(out['range_lons'], ref['range_lons'], rtol=0, atol=1e-9)
+                np.testing.assert_allclose(out['range_lats'], ref['range_lats'], rtol=0, atol=1e-9)
+                np.testing.assert_allclose(out['range_cog'], ref['cog'], atol=1e-6)
+
+        # Sides are written separately and point away from the trackline
+        csv = pd.read_csv(port.smthTrkFile, index_col='record_num')
+        self.assertEqual(len(csv), len(trk))
+        self.assertTrue((port.rangeExt['range_lons'] < star.rangeExt['range_lons']).all())
+        np.testing.assert_allclose(csv['range_es'], port.rangeExt['range_es'])
+
+    def test_single_ping_chunk_is_not_smoothed(self):
+        trk = make_trackline(n=141)
+        son = make_son('ss_star', trk, self.tmp)
+        son._getRangeCoords(filt=10)
+        last = son.rangeExt.iloc[-1]
+        raw = son.smthTrk.iloc[-1]
+        self.assertEqual(last['range_lons'], raw['range_lon'])
+        self.assertEqual(last['range_cog'], raw['cog'])
+
+    def test_heading_writes_unsmoothed_extent(self):
+        trk = make_trackline()
+        son = make_son('ss_port', trk, self.tmp)
+        son._getRangeCoords(filt=10, cog=False)
+        csv = pd.read_csv(son.smthTrkFile)
+        np.testing.assert_allclose(csv['range_lons'], son.smthTrk['range_lon'])
+        self.assertIn('chunk_id_2', csv.columns)
+        self.assertFalse(hasattr(son, 'rangeExt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
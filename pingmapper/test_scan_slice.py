@@ -0,0 +1,163 @@
+"""Unit tests for ping-range reads over the binary ping index and sonar cube."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.synthetic import HUM_PING_DTYPE, write_humminbird
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_cube import _index_cache, ping_index, ping_index_path
+
+
+class TestPingIndex(unittest.TestCase):
+
+    def test_numeric_columns_rebuilt_with_csv(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            f = os.path.join(tmp, 'B002_ss_port_meta.csv')
+            pd.DataFrame({'record_num': np.arange(5), 'pixM': 0.02,
+                          'date': ['2025-01-01'] * 5, 'filter': True}).to_csv(f, index=False)
+            index = ping_index(f)
+            self.assertEqual(index.dtype.names, ('record_num', 'pixM', 'filter'))
+            self.assertIsInstance(index, np.memmap)
+            self.assertIs(ping_index(f), index)
+            self.assertTrue(os.path.exists(ping_index_path(f)))
+
+            time.sleep(0.01)
+            pd.DataFrame({'record_num': np.arange(7)}).to_csv(f, index=False)
+            np.testing.assert_array_equal(ping_index(f)['record_num'], np.arange(7))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_rewrite_within_same_mtime(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            f = os.path.join(tmp, 'B002_ss_port_meta.csv')
+            pd.DataFrame({'record_num': np.arange(5)}).to_csv(f, index=False)
+            ping_index(f)
+            mtime = os.stat(f).st_mtime_ns
+
+            # Coarse filesystem clocks: the rewrite keeps the old mtime
+            pd.DataFrame({'record_num': np.arange(12)}).to_csv(f, index=False)
+            os.utime(f, ns=(mtime, mtime))
+            os.utime(ping_index_path(f), ns=(mtime, mtime))
+            np.testing.assert_array_equal(ping_index(f)['record_num'], np.arange(12))
+
+            # A new process (empty cache) checks the stamp saved with the index
+            _index_cache.clear()
+            pd.DataFrame({'record_num': np.arange(30)}).to_csv(f, index=False)
+            os.utime(f, ns=(mtime, mtime))
+            np.testing.assert_array_equal(ping_index(f)['record_num'], np.arange(30))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestScanSlice(unittest.TestCase):
+
+    n, samples = 60, 100
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        write_humminbird(self.tmp, n_pings=self.n, n_beams=2, samples=self.samples)
+        sonFile = os.path.join(self.tmp, 'R00001', 'B002.SON')
+        rec = np.dtype([('head', HUM_PING_DTYPE), ('ping', 'u1', self.samples)])
+        self.pings = np.fromfile(sonFile, dtype=rec)['ping']
+
+        self.meta = pd.DataFrame({
+            'record_num': np.arange(self.n),
+            'index': np.arange(self.n) * rec.itemsize,
+            'son_offset': HUM_PING_DTYPE.itemsize,
+            'ping_cnt': self.samples,
+            'transect': np.repeat([0, 1], [25, 35]),
+            'chunk_id': np.arange(self.n) // 10,
+            'dep_m': 0.5,
+            'pixM': 0.02,
+            'date': '2025-01-01',
+        })
+        self.metaFile = os.path.join(self.tmp, 'B002_ss_port_meta.csv')
+        self.meta.to_csv(self.metaFile, index=False)
+
+        son = sonObj.__new__(sonObj)
+        son.sonFile = sonFile
+        son.sonMetaFile = self.metaFile
+        son.projDir = self.tmp
+        son.beamName = 'ss_port'
+        son.son8bit = True
+        son.flip_port = False
+        son.nchunk = 16
+        son.egn = False
+        self.son = son
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_slice_spans_chunks(self):
+        sonMeta = self.son._getScanSlice(1, 3, 23)
+        np.testing.assert_array_equal(sonMeta['ping_row'], np.arange(28, 48))
+        np.testing.assert_array_equal(sonMeta['record_num'], np.arange(28, 48))
+        np.testing.assert_array_equal(self.son.sonDat, self.pings[28:48].T)
+
+        # Slice semantics within the transect, and across the whole beam
+        self.assertEqual(len(self.son._getScanSlice(0, -5, None)), 5)
+        self.son._getScanSlice(None, 20, 30)
+        np.testing.assert_array_equal(self.son.sonDat, self.pings[20:30].T)
+
+    def test_matches_chunk_load(self):
+        self.son._getScanChunkSingle(2)
+        chunk = self.son.sonDat
+        self.son._getScanSlice(None, 20, 30)
+        np.testing.assert_array_equal(self.son.sonDat, chunk)
+
+    def test_cube_matches_son_file(self):
+        ping_cnt = np.random.default_rng(0).integers(70, self.samples + 1, self.n)
+        self.meta['ping_cnt'] = ping_cnt
+        self.meta.to_csv(self.metaFile, index=False)
+
+        spans = [(0, 35), (4, 17)]
+        for flip in (False, True):
+            self.son.flip_port = flip
+            self.son.cubeFile = None
+            expected = []
+            for s, e in spans:
+                self.son._getScanSlice(1, s, e)
+                expected.append(self.son.sonDat)
+
+            self.son._exportCube()
+            for (s, e), want in zip(spans, expected):
+                sonMeta = self.son._getScanSlice(1, s, e)
+                np.testing.assert_array_equal(self.son.sonDat, want)
+
+            # Flipped pings longer than pingMax are re-read from the son file
+            self.son._setPingReads(sonMeta)
+            from_cube = self.son._readCubePings(sonMeta['ping_row'].to_numpy())
+            self.son._clearPingReads()
+            self.assertEqual(from_cube is None, flip)
+            shutil.rmtree(self.son.cubeFile)
+
+    def test_processed_views(self):
+        sonMeta = self.son._getScanSlice(0, 0, 10)
+        self.son._WCR_SRC(sonMeta)
+        expected = self.son.sonDat
+
+        self.son._getScanSlice(0, 0, 10, view='src')
+        np.testing.assert_array_equal(self.son.sonDat, expected)
+        self.son._getScanSlice(0, 0, 10, remWater=True)
+        np.testing.assert_array_equal(self.son.sonDat, expected)
+
+        with self.assertRaises(ValueError):
+            self.son._getScanSlice(0, 0, 10, view='egn')
+        with self.assertRaises(ValueError):
+            self.son._getScanSlice(0, 0, 10, view='wcp')
+
+    def test_empty_slice(self):
+        self.assertEqual(len(self.son._getScanSlice(5, 0, 10)), 0)
+        self.assertEqual(self.son.sonDat.shape, (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Unit tests for the compact substrate softmax store."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pingmapper.funcs_softmax import load_softmax, save_softmax
+
+
+class TestSoftmaxStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.arr = rng.normal(0, 4, (300, 120, 4))
+        self.arr[:20] = np.nan
+        self.classes = ['Fines Ripple', 'Fines Flat', 'Cobble Boulder', 'Hard Bottom']
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip_float16(self):
+        f = save_softmax(os.path.join(self.tmp, 'sub.h5'), self.arr, self.classes)
+        arr, classes = load_softmax(f)
+
+        self.assertEqual(arr.dtype, np.float32)
+        self.assertEqual(classes, self.classes)
+        self.assertTrue(np.isnan(arr[:20]).all())
+        np.testing.assert_allclose(arr[20:], self.arr[20:], atol=1e-2)
+        np.testing.assert_array_equal(arr[20:].argmax(-1), self.arr[20:].astype('float16').argmax(-1))
+
+    def test_lazy_slicing(self):
+        f = save_softmax(os.path.join(self.tmp, 'sub.h5'), self.arr, self.classes, dtype='float32')
+        arr, _ = load_softmax(f, rows=slice(50, 60), bands=[3, 1])
+        np.testing.assert_array_equal(arr, self.arr[50:60][:, :, [3, 1]].astype('float32'))
+
+    def test_reads_legacy_npz(self):
+        f = os.path.join(self.tmp, 'sub.npz')
+        np.savez_compressed(f, substrate=self.arr, classes=self.classes)
+        arr, classes = load_softmax(f, bands=slice(0, 2))
+        np.testing.assert_array_equal(arr, self.arr[:, :, :2].astype('float32'))
+        self.assertEqual(list(classes), self.classes)
+
+    def test_rejects_unknown_dtype(self):
+        with self.assertRaises(ValueError):
+            save_softmax(os.path.join(self.tmp, 'sub.h5'), self.arr, self.classes, dtype='uint8')
+
+
+if __name__ == '__main__':
+    unittest.main()
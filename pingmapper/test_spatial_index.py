@@ -0,0 +1,228 @@
+"""Unit tests for chunk footprint construction and the persisted chunk index."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import rasterio
+import shapely
+from shapely.geometry import Polygon
+
+from pingmapper.funcs_spatial import (
+    aoi_mask,
+    cascaded_union,
+    chunk_bounds,
+    chunk_footprints,
+    load_chunk_index,
+    polygonize_tiled,
+    raster_footprint,
+    save_chunk_index,
+    StreamingMosaic,
+)
+
+
+def _make_trackline(n_chunks=4, pings_per_chunk=10):
+    """Straight east-bound trackline with a 20 m range extent to the north."""
+    n = n_chunks * pings_per_chunk
+    e = np.arange(n, dtype=float)
+    return pd.DataFrame({
+        'record_num': np.arange(n),
+        'chunk_id': np.repeat(np.arange(n_chunks), pings_per_chunk),
+        'transect': 0,
+        'trk_utm_es': e,
+        'trk_utm_ns': np.zeros(n),
+        'range_es': e,
+        'range_ns': np.full(n, 20.0),
+    })
+
+
+def _loop_footprint(df, chunk):
+    """Reference polygon built the way rectObj._exportCovShp did per chunk."""
+    d = df[df['chunk_id'] == chunk]
+    xs = d['range_es'].tolist() + d['trk_utm_es'].tolist()[::-1]
+    ys = d['range_ns'].tolist() + d['trk_utm_ns'].tolist()[::-1]
+    return Polygon(zip(xs, ys))
+
+
+class TestAoiMask(unittest.TestCase):
+
+    def test_matches_within(self):
+        aoi = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+        x = np.array([-1.0, 5.0, 9.9, 10.0, 15.0])
+        y = np.array([5.0, 5.0, 0.1, 5.0, 5.0])
+        expected = [shapely.Point(a, b).within(aoi) for a, b in zip(x, y)]
+        self.assertEqual(aoi_mask(aoi, x, y).tolist(), expected)
+
+    def test_empty_aoi_masks_everything(self):
+        mask = aoi_mask(Polygon(), [1.0, 2.0], [1.0, 2.0])
+        self.assertFalse(mask.any())
+
+
+class TestChunkFootprints(unittest.TestCase):
+
+    def test_footprints_match_per_chunk_polygons(self):
+        df = _make_trackline()
+        gdf = chunk_footprints(df)
+
+        self.assertEqual(gdf['chunk_id'].tolist(), [0, 1, 2, 3])
+        for chunk in range(4):
+            ref = _loop_footprint(df, chunk)
+            self.assertTrue(gdf.loc[chunk, 'geometry'].equals(ref))
+            self.assertEqual(gdf.loc[chunk, 'ping_start'], chunk * 10)
+            self.assertEqual(gdf.loc[chunk, 'ping_end'], chunk * 10 + 9)
+
+    def test_single_ping_chunks_are_skipped(self):
+        df = _make_trackline()
+        df = df[~((df['chunk_id'] == 2) & (df['record_num'] > 20))]
+        gdf = chunk_footprints(df)
+        self.assertEqual(gdf['chunk_id'].tolist(), [0, 1, 3])
+
+
+class TestChunkIndexPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip_and_bounds(self):
+        gdf = chunk_footprints(_make_trackline(), crs='EPSG:32616')
+        out = save_chunk_index(self.tmp, {'ss_port': gdf})
+        self.assertTrue(os.path.exists(out))
+
+        loaded = load_chunk_index(self.tmp, 'ss_port')
+        self.assertEqual(loaded.index.tolist(), [0, 1, 2, 3])
+
+        # Chunks 1-2 span pings 10-29, trackline to range extent
+        self.assertEqual(chunk_bounds(loaded, [2, 1]), (10.0, 0.0, 29.0, 20.0))
+        self.assertIsNone(chunk_bounds(loaded, [3, 4]))
+        self.assertIsNone(chunk_bounds(None, [0]))
+
+    def test_missing_layer_returns_none(self):
+        self.assertIsNone(load_chunk_index(self.tmp, 'ss_star'))
+
+
+class TestPolygonizeTiled(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        arr = np.kron(rng.integers(0, 4, (12, 12)), np.ones((8, 8), dtype='int64')).astype('uint8')
+        arr[5, 5] = 9
+        self.arr = arr
+        self.rasterFile = os.path.join(self.tmp, 'map_sub.tif')
+        with rasterio.open(self.rasterFile, 'w', driver='GTiff',
+                           width=arr.shape[1], height=arr.shape[0], count=1,
+                           dtype='uint8', crs='EPSG:32616', nodata=0,
+                           transform=rasterio.Affine(0.5, 0, 500000, 0, -0.5, 4000000)) as dst:
+            dst.write(arr, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_tiles_match_single_pass(self):
+        whole, unexpected = polygonize_tiled(self.rasterFile, valid_values=[1, 2, 3], tile_size=1000)
+        tiled, _ = polygonize_tiled(self.rasterFile, valid_values=[1, 2, 3], tile_size=20)
+
+        self.assertEqual(unexpected, [9])
+        self.assertEqual(len(whole), len(tiled))
+        for v in [1, 2, 3]:
+            a = whole[whole['value'] == v].union_all()
+            b = tiled[tiled['value'] == v].union_all()
+            self.assertAlmostEqual(a.symmetric_difference(b).area, 0.0)
+            self.assertEqual((whole['value'] == v).sum(), (tiled['value'] == v).sum())
+
+    def test_area_matches_pixel_count(self):
+        gdf, _ = polygonize_tiled(self.rasterFile, valid_values=[1, 2, 3], tile_size=20)
+        expected = np.isin(self.arr, [1, 2, 3]).sum() * 0.25
+        self.assertAlmostEqual(gdf.geometry.area.sum(), expected)
+
+
+class TestBanklineUnion(unittest.TestCase):
+
+    def test_cascaded_union_matches_union_all(self):
+        rng = np.random.default_rng(1)
+        # Two separate swaths of overlapping chunk boxes plus an isolated one
+        x = np.concatenate([np.cumsum(rng.uniform(2, 6, 150)), 2000 + np.cumsum(rng.uniform(2, 6, 150)), [5000]])
+        boxes = shapely.box(x, 0, x + rng.uniform(5, 10, len(x)), rng.uniform(10, 30, len(x)))
+
+        expected = shapely.union_all(boxes)
+        result = cascaded_union(list(boxes) + [None], group_size=8)
+
+        self.assertTrue(result.is_valid)
+        self.assertEqual(len(shapely.get_parts(result)), len(shapely.get_parts(expected)))
+        self.assertAlmostEqual(result.symmetric_difference(expected).area, 0.0, places=6)
+
+    def test_cascaded_union_empty(self):
+        self.assertTrue(cascaded_union([]).is_empty)
+
+    def test_raster_footprint_covers_nonzero_pixels(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            arr = np.zeros((20, 30), dtype='uint8')
+            arr[2:10, 3:25] = 120
+            arr[15:18, 5:8] = 7
+            f = os.path.join(tmp, 'rect_wcr.tif')
+            with rasterio.open(f, 'w', driver='GTiff', width=30, height=20, count=1,
+                               dtype='uint8', crs='EPSG:32616',
+                               transform=rasterio.Affine(0.5, 0, 500000, 0, -0.5, 4000000)) as dst:
+                dst.write(arr, 1)
+
+            geom, crs = raster_footprint(f)
+            self.assertEqual(crs.to_epsg(), 32616)
+            self.assertAlmostEqual(geom.area, (arr > 0).sum() * 0.25)
+
+            arr[:] = 0
+            with rasterio.open(f, 'r+') as dst:
+                dst.write(arr, 1)
+            self.assertIsNone(raster_footprint(f)[0])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestStreamingMosaic(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_later_chunk_wins_on_overlap(self):
+        outFile = os.path.join(self.tmp, 'mosaic.tif')
+        mosaic = StreamingMosaic(outFile, (0, 0, 20, 10), 1.0, 'EPSG:32616')
+
+        first = np.full((10, 12), 1, dtype='uint8')
+        second = np.full((10, 12), 2, dtype='uint8')
+        second[:, -2:] = 0  # nodata must not overwrite
+        mosaic.paste(first, rasterio.Affine(1, 0, 0, 0, -1, 10))
+        mosaic.paste(second, rasterio.Affine(1, 0, 8, 0, -1, 10))
+        mosaic.close(overview=False)
+
+        with rasterio.open(outFile) as src:
+            arr = src.read(1)
+            self.assertTrue(src.profile['tiled'])
+
+        self.assertFalse(os.path.exists(outFile + '.canvas'))
+        self.assertTrue((arr[:, :8] == 1).all())
+        self.assertTrue((arr[:, 8:18] == 2).all())
+        self.assertTrue((arr[:, 18:] == 0).all())
+
+    def test_resamples_to_mosaic_grid(self):
+        outFile = os.path.join(self.tmp, 'mosaic.tif')
+        mosaic = StreamingMosaic(outFile, (0, 0, 10, 10), 0.5, 'EPSG:32616')
+        chunk = np.arange(1, 26, dtype='uint8').reshape(5, 5)
+        mosaic.paste(chunk, rasterio.Affine(2, 0, 0, 0, -2, 10))
+        mosaic.close(overview=False)
+
+        with rasterio.open(outFile) as src:
+            arr = src.read(1)
+        np.testing.assert_array_equal(arr, np.kron(chunk, np.ones((4, 4), dtype='uint8')))
+
+
+if __name__ == '__main__':
+    unittest.main()
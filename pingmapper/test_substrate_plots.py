@@ -0,0 +1,77 @@
+"""Unit tests for batched substrate plot export."""
+
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pingmapper.benchmarks.synthetic import HUM_PING_DTYPE, write_humminbird
+from pingmapper.class_mapSubstrateObj import mapSubObj
+from pingmapper.funcs_softmax import save_softmax
+
+
+class TestPltSubClassBatch(unittest.TestCase):
+
+    n, samples, nchunk = 30, 80, 10
+    classes = ['Shadow', 'Fines Ripple', 'Fines Flat', 'Cobble Boulder', 'Hard Bottom', 'Wood', 'Other', 'Water']
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        write_humminbird(self.tmp, n_pings=self.n, n_beams=2, samples=self.samples)
+        rec_size = HUM_PING_DTYPE.itemsize + self.samples
+        metaFile = os.path.join(self.tmp, 'B002_ss_port_meta.csv')
+        pd.DataFrame({
+            'record_num': np.arange(self.n),
+            'index': np.arange(self.n) * rec_size,
+            'son_offset': HUM_PING_DTYPE.itemsize,
+            'ping_cnt': self.samples,
+            'transect': 0,
+            'chunk_id': np.arange(self.n) // self.nchunk,
+            'dep_m': 0.2,
+            'pixM': 0.02,
+            'date': '2025-01-01',
+        }).to_csv(metaFile, index=False)
+
+        son = mapSubObj.__new__(mapSubObj)
+        son.sonFile = os.path.join(self.tmp, 'R00001', 'B002.SON')
+        son.sonMetaFile = metaFile
+        son.projDir = self.tmp
+        son.outDir = self.tmp
+        son.beamName = 'ss_port'
+        son.son8bit = True
+        son.flip_port = False
+        son.nchunk = self.nchunk
+        son.egn = False
+        son.shadow = {c: {} for c in range(3)}
+        self.son = son
+
+        rng = np.random.default_rng(0)
+        self.items = []
+        for c in range(3):
+            f = os.path.join(self.tmp, 'softmax_{}.h5'.format(c))
+            save_softmax(f, rng.random((self.samples, self.nchunk, len(self.classes))), self.classes)
+            self.items.append((c, f))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_batch_without_speed_correction(self):
+        self.son._pltSubClassBatch('max', self.items, spdCor=0, probs=True)
+        self.assertFalse(hasattr(self.son, 'sonMetaDF'))
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp, '*pltSub_classified_max*.png'))), 3)
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp, '*probability*.png'))), 3)
+
+    def test_metadata_loaded_once(self):
+        calls = []
+        load = self.son._loadSonMeta
+        self.son._loadSonMeta = lambda: (calls.append(1), load())
+        self.son._pltSubClassBatch('max', self.items, spdCor=0)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""Unit tests for background tile encoding and codec settings."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+import rasterio
+import tifffile
+
+from pingmapper.class_sonObj import sonObj
+from pingmapper.funcs_tilewriter import (
+    TileWriter,
+    format_stats,
+    geotiff_options,
+    shared_writer,
+    write_image,
+)
+
+
+def _image(shape=(60, 80, 3), dtype='uint8', seed=0):
+    rng = np.random.default_rng(seed)
+    hi = np.iinfo(dtype).max
+    return rng.integers(0, hi, shape, endpoint=True).astype(dtype)
+
+
+class TestWriteImage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_png_round_trip(self):
+        for name, data in [('rgb.png', _image()),
+                           ('rgba.png', _image((20, 30, 4))),
+                           ('gray16.png', _image((20, 30), 'uint16'))]:
+            f = self._path(name)
+            nbytes = write_image(f, data, png_level=1)
+            self.assertEqual(nbytes, os.path.getsize(f))
+
+            out = cv2.imread(f, cv2.IMREAD_UNCHANGED)
+            if data.ndim == 3:
+                out = cv2.cvtColor(out, cv2.COLOR_BGR2RGB if data.shape[-1] == 3 else cv2.COLOR_BGRA2RGBA)
+            np.testing.assert_array_equal(out, data)
+
+    def test_jpeg_quality(self):
+        y, x = np.mgrid[0:60, 0:80]
+        data = np.dstack([x * 3, y * 4, (x + y) * 2]).astype('uint8')
+        small = write_image(self._path('q30.jpg'), data, jpeg_quality=30)
+        large = write_image(self._path('q95.jpg'), data, jpeg_quality=95)
+        self.assertLess(small, large)
+
+        out = cv2.cvtColor(cv2.imread(self._path('q95.jpg')), cv2.COLOR_BGR2RGB)
+        self.assertLess(np.abs(out.astype(int) - data).mean(), 3)
+
+    def test_tiff_falls_back_to_deflate(self):
+        # zstd needs imagecodecs; either way the tile must be written losslessly
+        data = _image((40, 50), 'uint16')
+        f = self._path('tile.tif')
+        write_image(f, data, tiff_compression='zstd')
+        np.testing.assert_array_equal(tifffile.imread(f), data)
+
+        rgb = _image()
+        write_image(f, rgb, tiff_compression='none')
+        np.testing.assert_array_equal(tifffile.imread(f), rgb)
+
+
+class TestGeotiffOptions(unittest.TestCase):
+
+    def test_codec_options(self):
+        opts = geotiff_options('zstd', 15, dtype='uint16')
+        self.assertEqual((opts['compress'], opts['zstd_level'], opts['predictor']), ('zstd', 15, 2))
+        self.assertTrue(opts['tiled'])
+
+        opts = geotiff_options('DEFLATE', 9, dtype='float32')
+        self.assertEqual((opts['compress'], opts['zlevel'], opts['predictor']), ('deflate', 9, 3))
+
+        opts = geotiff_options('lerc_zstd', 5, max_z_error=0.5)
+        self.assertNotIn('predictor', opts)
+        self.assertEqual((opts['max_z_error'], opts['zstd_level']), (0.5, 5))
+
+        self.assertNotIn('compress', geotiff_options('none'))
+        self.assertNotIn('predictor', geotiff_options('deflate', predictor=False))
+
+    def test_unknown_codec_raises(self):
+        with self.assertRaises(ValueError):
+            geotiff_options('jpeg2000')
+
+    def test_lossless_round_trip(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            data = _image((300, 270), 'uint16')
+            for codec in ('deflate', 'zstd', 'lerc'):
+                f = os.path.join(tmp, codec + '.tif')
+                with rasterio.open(f, 'w', driver='GTiff', height=300, width=270, count=1,
+                                   dtype='uint16', crs='EPSG:32616',
+                                   transform=rasterio.Affine(0.5, 0, 500000, 0, -0.5, 4000000),
+                                   **geotiff_options(codec, dtype='uint16', level=None)) as dst:
+                    dst.write(data, 1)
+                with rasterio.open(f) as src:
+                    np.testing.assert_array_equal(src.read(1), data)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TestTileWriter(unittest.TestCase):
+
+    def test_queue_is_bounded(self):
+        gate = threading.Event()
+        writer = TileWriter(threads=1, max_pending=2)
+        try:
+            writer.submit(gate.wait)
+            writer.submit(gate.wait)
+
+            done = threading.Event()
+            t = threading.Thread(target=lambda: (writer.submit(lambda: 0), done.set()))
+            t.start()
+            self.assertFalse(done.wait(0.2))
+
+            gate.set()
+            self.assertTrue(done.wait(5))
+            t.join()
+            stats = writer.flush()
+        finally:
+            gate.set()
+            writer.close()
+
+        self.assertEqual(stats['files'], 3)
+        self.assertGreater(stats['wait_s'], 0.1)
+
+    def test_flush_reports_and_resets(self):
+        with TileWriter(threads=2) as writer:
+            for n in (10, 20, 30):
+                writer.submit(lambda n=n: (time.sleep(0.01), n)[1])
+            stats = writer.flush()
+            self.assertEqual((stats['files'], stats['bytes']), (3, 60))
+            self.assertGreater(stats['encode_s'], 0)
+            self.assertEqual(writer.flush()['files'], 0)
+
+        line = format_stats([stats, None, {'files': 1, 'bytes': 2 ** 20, 'encode_s': 0.5, 'wait_s': 0.0}])
+        self.assertTrue(line.startswith('Wrote 4 files (1.0 MB)'))
+        self.assertEqual(format_stats([None]), '')
+
+    def test_errors_surface_on_flush(self):
+        def fail():
+            raise IOError('disk full')
+
+        writer = TileWriter(threads=2)
+        writer.submit(fail)
+        writer.submit(lambda: 5)
+        with self.assertRaises(IOError):
+            writer.flush()
+
+        # The writer stays usable
+        writer.submit(lambda: 5)
+        self.assertEqual(writer.close()['files'], 1)
+
+    def test_inline_writer(self):
+        writer = TileWriter(threads=0)
+        self.assertIsNone(writer.submit(lambda: 7))
+        self.assertEqual(writer.flush()['bytes'], 7)
+
+    def test_shared_writer_per_process(self):
+        self.assertIs(shared_writer(1, 3), shared_writer(1, 3))
+        self.assertIsNot(shared_writer(1, 3), shared_writer(2, 3))
+
+
+class TestSonObjTiles(unittest.TestCase):
+
+    def test_save_tile_image_is_flushed(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            son = sonObj.__new__(sonObj)
+            son.tile_writer_threads = 2
+            son.tile_png_level = 1
+            data = _image()
+            files = [os.path.join(tmp, 'tile{}.png'.format(i)) for i in range(6)]
+            for f in files:
+                son._save_tile_image(f, data)
+
+            stats = son._tile_writer().flush()
+            self.assertEqual(stats['files'], 6)
+            self.assertEqual(stats['bytes'], sum(os.path.getsize(f) for f in files))
+            out = cv2.cvtColor(cv2.imread(files[-1]), cv2.COLOR_BGR2RGB)
+            np.testing.assert_array_equal(out, data)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
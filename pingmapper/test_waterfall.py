@@ -0,0 +1,172 @@
+"""Unit tests for the out-of-core waterfall builder."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import rasterio
+
+from pingmapper.funcs_waterfall import (
+    _BandStrip,
+    _TransposedStrip,
+    _export_scrolling_video,
+    _load_sidescan_band,
+    _load_strip_band,
+    _pad_to_height,
+    _pad_to_width,
+    _sidescan_layout,
+    _strip_layout,
+    _write_strip_tiff,
+)
+
+
+def _write_tiles(root, name, widths, height=40, seed=0):
+    """Random uint8 sonogram tiles named like PINGMapper exports."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(root, exist_ok=True)
+    paths = []
+    for i, w in enumerate(widths):
+        path = os.path.join(root, '{}_{}.png'.format(name, i))
+        cv2.imwrite(path, rng.integers(0, 255, (height, w), dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def _loop_strip(paths, range_map=None, ref=None):
+    """Reference in-memory strip built the way the waterfall export used to."""
+    imgs = []
+    base_h = None
+    for p in paths:
+        img = cv2.imread(p, cv2.IMREAD_UNCHANGED)
+        base_h = base_h or img.shape[0]
+        if range_map:
+            rng = range_map[int(os.path.splitext(p)[0].rsplit('_', 1)[1])]
+            h = max(1, int(round(base_h * max(0.25, min(4.0, rng / ref)))))
+            img = cv2.resize(img, (max(1, int(round(img.shape[1] * h / float(img.shape[0])))), h),
+                             interpolation=cv2.INTER_AREA)
+        imgs.append(img)
+    max_h = max(i.shape[0] for i in imgs)
+    return cv2.hconcat([_pad_to_height(i, max_h) for i in imgs])
+
+
+def _loop_sidescan(port, star):
+    """Reference in-memory side-scan waterfall (newest pair on top)."""
+    rows = []
+    for p, s in reversed(list(zip(port, star))):
+        p_img = cv2.flip(cv2.rotate(cv2.imread(p, cv2.IMREAD_UNCHANGED), cv2.ROTATE_90_COUNTERCLOCKWISE), 1)
+        s_img = cv2.rotate(cv2.imread(s, cv2.IMREAD_UNCHANGED), cv2.ROTATE_90_COUNTERCLOCKWISE)
+        p_img = cv2.cvtColor(p_img, cv2.COLOR_GRAY2BGR)
+        s_img = cv2.cvtColor(s_img, cv2.COLOR_GRAY2BGR)
+        row_h = max(p_img.shape[0], s_img.shape[0])
+        pads = []
+        for img in (p_img, s_img):
+            top = (row_h - img.shape[0]) // 2
+            pads.append(cv2.copyMakeBorder(img, top, row_h - img.shape[0] - top, 0, 0,
+                                           cv2.BORDER_CONSTANT, value=0))
+        rows.append(cv2.hconcat(pads))
+    max_w = max(r.shape[1] for r in rows)
+    return cv2.vconcat([_pad_to_width(r, max_w) for r in rows])
+
+
+class TestBandStrip(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_down_imaging_matches_in_memory_strip(self):
+        paths = _write_tiles(self.tmp, 'down', [30, 25, 30, 12])
+        range_map = {0: 10.0, 1: 20.0, 2: 10.0, 3: 5.0}
+
+        strip = _BandStrip(_strip_layout(paths, range_map, ref_range_m=10.0), _load_strip_band)
+        view = _TransposedStrip(strip)
+        ref = _loop_strip(paths, range_map, ref=10.0)
+
+        self.assertEqual(view.shape, ref.shape)
+        np.testing.assert_array_equal(view.read(0, view.shape[1]), ref)
+        np.testing.assert_array_equal(view.read(17, 61), ref[:, 17:61])
+
+    def test_sidescan_matches_in_memory_waterfall(self):
+        port = _write_tiles(os.path.join(self.tmp, 'port'), 'ss_port', [30, 20, 30], seed=1)
+        star = _write_tiles(os.path.join(self.tmp, 'star'), 'ss_star', [30, 20, 30], height=35, seed=2)
+
+        strip = _BandStrip(_sidescan_layout(port, star), _load_sidescan_band)
+        ref = _loop_sidescan(port, star)
+
+        self.assertEqual(strip.shape, ref.shape[:2])
+        np.testing.assert_array_equal(strip.read(0, strip.length), ref)
+        np.testing.assert_array_equal(strip.read(25, 52), ref[25:52])
+
+    def test_only_overlapping_bands_stay_decoded(self):
+        paths = _write_tiles(self.tmp, 'down', [30] * 6)
+        strip = _BandStrip(_strip_layout(paths), _load_strip_band)
+        strip.read(95, 125)
+        self.assertEqual(sorted(strip._cache), [3, 4])
+
+
+class TestWaterfallOutputs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_tiff_matches_strip(self):
+        paths = _write_tiles(self.tmp, 'down', [300, 250, 300], height=200)
+        strip = _BandStrip(_strip_layout(paths), _load_strip_band)
+        out = _write_strip_tiff(strip, os.path.join(self.tmp, 'waterfall.tif'), axis='x', block=128)
+
+        with rasterio.open(out) as src:
+            arr = src.read(1)
+            self.assertTrue(src.profile['tiled'])
+            self.assertGreater(len(src.overviews(1)), 0)
+        np.testing.assert_array_equal(arr, _loop_strip(paths))
+
+    def test_scrolling_video_frame_count(self):
+        paths = _write_tiles(self.tmp, 'down', [200, 200], height=90)
+        strip = _BandStrip(_strip_layout(paths), _load_strip_band)
+        out = os.path.join(self.tmp, 'video', 'scroll.mp4')
+        _export_scrolling_video(_TransposedStrip(strip), out, axis='x', fps=5,
+                                target_size=(160, 90), stride=40)
+
+        cap = cv2.VideoCapture(out)
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if n == 0:
+            self.skipTest('mp4v encoder unavailable')
+        self.assertEqual(n, len(range(0, 400 - 160 + 1, 40)))
+
+    def test_parallel_frames_keep_order(self):
+        img = np.zeros((90, 1600), dtype=np.uint8)
+        for i in range(0, 1600, 160):
+            img[:, i:i + 160] = 20 + i // 8  # one flat shade per frame
+
+        means = []
+        for n_workers in (1, 4):
+            out = os.path.join(self.tmp, 'scroll_{}.mp4'.format(n_workers))
+            _export_scrolling_video(img, out, axis='x', target_size=(160, 90),
+                                    stride=160, n_workers=n_workers)
+            cap = cv2.VideoCapture(out)
+            frames = []
+            ok, frame = cap.read()
+            while ok:
+                frames.append(frame.mean())
+                ok, frame = cap.read()
+            cap.release()
+            means.append(frames)
+
+        if len(means[0]) == 0:
+            self.skipTest('mp4v encoder unavailable')
+        self.assertEqual(len(means[1]), 10)
+        np.testing.assert_allclose(means[0], means[1], atol=1.0)
+        self.assertTrue(np.all(np.diff(means[1]) > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
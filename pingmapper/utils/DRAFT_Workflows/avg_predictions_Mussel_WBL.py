@@ -10,6 +10,8 @@ sys.path.insert(0, 'src')
 
 from class_mapSubstrateObj import mapSubObj
 from class_portstarObj import portstarObj
+from funcs_manifest import find_meta_files
+from funcs_softmax import SOFTMAX_EXT, load_softmax, save_softmax
 from joblib import Parallel, delayed, cpu_count
 from glob import glob
 import numpy as np
@@ -53,16 +55,9 @@ def npzAvg(k, v, npz_raw, outDir_npz, nchunk):
 
     try:
 
-        # Get npzs
-        npz_1 = np.load(v) # EGN
-        npz_2 = np.load(npz_raw[k]) # Raw
-
-        # Get class names
-        classes = npz_1['classes']
-
-        # Get substrate
-        npz_1 = npz_1['substrate']
-        npz_2 = npz_2['substrate']
+        # Get substrate and class names (legacy .npz or .h5)
+        npz_1, classes = load_softmax(v) # EGN
+        npz_2, _ = load_softmax(npz_raw[k]) # Raw
 
         # # make sure same size
         # if npz_1.shape[1] != nchunk:
@@ -132,15 +127,11 @@ def npzAvg(k, v, npz_raw, outDir_npz, nchunk):
             npz_3[:,:,i] = c
         del a, b, c
 
-        # Save npz file
-        datadict = {}
-        datadict['substrate'] = npz_3.astype('float16')
-        datadict['classes'] = classes
-
-        f = os.path.basename(v)
+        # Save softmax file
+        f = os.path.splitext(os.path.basename(v))[0] + SOFTMAX_EXT
         f = os.path.join(outDir_npz, f)
 
-        np.savez_compressed(f, **datadict)
+        save_softmax(f, npz_3, classes)
 
         return
 
@@ -166,10 +157,10 @@ def doWork(i, projDir, outDir_parent):
 
 
     ####################################################
-    # Check if sonObj pickle exists, append to metaFiles
+    # Check if saved sonObj state exists, append to metaFiles
     metaDir = os.path.join(projDir, "meta")
     if os.path.exists(metaDir):
-        metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+        metaFiles = find_meta_files(metaDir)
 
     #     if len(metaFiles) == 0:
     #         projectMode_2a_inval()
@@ -181,7 +172,7 @@ def doWork(i, projDir, outDir_parent):
 
 
     ############################################
-    # Create a mapObj instance from pickle files
+    # Create a mapObj instance from saved state
     sonObjs = []
     for meta in metaFiles:
         son = mapSubObj(meta) # Initialize mapObj()
@@ -362,10 +353,10 @@ def doWork(i, projDir, outDir_parent):
     # Create son objects from current directory and update dirs
 
     ####
-    # Check if sonObj pickle exists, append to metaFiles
+    # Check if saved sonObj state exists, append to metaFiles
     metaDir = destination
     if os.path.exists(metaDir):
-        metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+        metaFiles = find_meta_files(metaDir)
 
         if len(metaFiles) == 0:
             projectMode_2a_inval()
@@ -376,7 +367,7 @@ def doWork(i, projDir, outDir_parent):
 
 
     ####
-    # Create a mapObj instance from pickle files
+    # Create a mapObj instance from saved state
     sonObjs = []
     for meta in metaFiles:
         son = mapSubObj(meta) # Initialize mapObj()
@@ -404,7 +395,7 @@ def doWork(i, projDir, outDir_parent):
                 print(v)
                 setattr(son, attr, v)
 
-        son._pickleSon()
+        son._saveSon()
 
     
     ##################
@@ -24,6 +24,7 @@ import pandas as pd
 from glob import glob
 from class_mapSubstrateObj import mapSubObj
 from class_portstarObj import portstarObj
+from funcs_manifest import find_meta_files
 from funcs_common import *
 from shapely import Point, LineString, MultiPolygon, MultiLineString
 from shapely.ops import split
@@ -142,10 +143,10 @@ def doWork(i, projDir):
     try:
 
         ####################################################
-        # Check if sonObj pickle exists, append to metaFiles
+        # Check if saved sonObj state exists, append to metaFiles
         metaDir = os.path.join(projDir, "meta")
         if os.path.exists(metaDir):
-            metaFiles = sorted(glob(metaDir+os.sep+"*.meta"))
+            metaFiles = find_meta_files(metaDir)
 
             if len(metaFiles) == 0:
                 projectMode_2a_inval()
@@ -156,7 +157,7 @@ def doWork(i, projDir):
 
 
         ############################################
-        # Create a mapObj instance from pickle files
+        # Create a mapObj instance from saved state
         sonObjs = []
         for meta in metaFiles:
             son = mapSubObj(meta) # Initialize mapObj()
@@ -40,6 +40,7 @@ from funcs_common import *
 from class_sonObj import sonObj
 from class_rectObj import rectObj
 from class_portstarObj import portstarObj
+from funcs_manifest import find_meta_files
 
 import time
 import datetime
@@ -174,8 +175,7 @@ def rangeCoordinates(sons):
     filter = int(sons[0].nchunk*0.1) #Filters trackline coordinates for smoothing
     filterRange = filter #int(nchunk*0.05) #Filters range extent coordinates for smoothing
 
-    for son in sons:
-        son._getRangeCoords(flip, filterRange)
+    sons[0]._getRangeCoords(flip, filterRange, sons=sons)
 
 
 # Pixel functions from:
@@ -276,9 +276,9 @@ projDir = os.path.join(transectDir, projName)
 if not os.path.exists(projDir):
     os.mkdir(projDir)
 
-# Get star and port pickle files for each transect
-sonMetasPort = glob(os.path.join(transectDir, '**', '*ss_port_meta.meta'), recursive=True)
-sonMetasStar = glob(os.path.join(transectDir, '**', '*ss_star_meta.meta'), recursive=True)
+# Get star and port saved states for each transect
+sonMetasPort = find_meta_files(transectDir, '*ss_port_meta', recursive=True)
+sonMetasStar = find_meta_files(transectDir, '*ss_star_meta', recursive=True)
 
 sonMetas = sorted(sonMetasPort+sonMetasStar) # Concatenate into single list
 del sonMetasPort, sonMetasStar
@@ -287,7 +287,7 @@ del sonMetasPort, sonMetasStar
 #============================================
 
 ###########################################
-# Create rectObj instance from pickle files
+# Create rectObj instance from saved states
 rectObjs = []
 for m in sonMetas:
     son = rectObj(m) # Initialize object
@@ -323,7 +323,7 @@ Parallel(n_jobs=safe_n_jobs(len(portstar), threadCnt), verbose=10)(delayed(range
 for sons in portstar:
     for son in sons:
         son._cleanup()
-        son._pickleSon()
+        son._saveSon()
 
 
 #============================================
@@ -607,7 +607,7 @@ if rect_wcp or rect_wcr:
             except:
                 pass
             son._cleanup()
-            # son._pickleSon()
+            # son._saveSon()
 
 #============================================
 